@@ -5,9 +5,13 @@ import sys
 import json
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
+from PIL import ImageTk
 import random
 
+# Share the thumbnail cache with the wallpaper color manager
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "wallpaper_color_manager_new"))
+from utils.thumbnail_cache import load_thumbnail
+
 class ImageColorLabeler:
     def __init__(self, root):
         self.root = root
@@ -113,19 +117,11 @@ class ImageColorLabeler:
         
         # Load and display image
         try:
-            image = Image.open(self.current_image_path)
-            
             # Resize image to fit the window while maintaining aspect ratio
             window_width = self.root.winfo_width() - 40
             window_height = self.root.winfo_height() - 200
             
-            img_width, img_height = image.size
-            scale = min(window_width / img_width, window_height / img_height)
-            
-            new_width = int(img_width * scale)
-            new_height = int(img_height * scale)
-            
-            image = image.resize((new_width, new_height), Image.LANCZOS)
+            image = load_thumbnail(self.current_image_path, (window_width, window_height))
             
             self.photo_image = ImageTk.PhotoImage(image)
             self.image_label.config(image=self.photo_image)
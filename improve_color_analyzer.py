@@ -4,9 +4,12 @@ import os
 import sys
 import json
 import numpy as np
-from PIL import Image
 import re
 
+# Share the analysis image loader with the wallpaper color manager
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "wallpaper_color_manager_new"))
+from utils.image_loader import load_analysis_image
+
 def analyze_labeled_images():
     """
     Analyze labeled images to improve color ranges.
@@ -58,10 +61,8 @@ def analyze_labeled_images():
                 continue
             
             try:
-                # Open image and resize for faster processing
-                img = Image.open(image_path)
-                img = img.resize((100, 100))
-                img = img.convert('RGB')
+                # Open image at reduced size for faster processing
+                img = load_analysis_image(image_path, (100, 100))
                 
                 # Convert image to numpy array
                 img_array = np.array(img)
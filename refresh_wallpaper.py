@@ -13,6 +13,10 @@ from pathlib import Path
 from datetime import datetime, timedelta
 import importlib.util
 
+# Add the wallpaper_color_manager_new directory to the path so we can import the utils package
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "wallpaper_color_manager_new"))
+from utils import directory_swap, file_manifest, folder_catalog
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
@@ -28,6 +32,9 @@ CONFIG_PATH = "/home/twain/Projects/tail/wallpaper_color_manager_new/config.json
 CURRENT_COLOR_FILE = "/home/twain/Projects/tail/current_wallpaper_color.txt"
 LBM_DIRS_PATH = "/home/twain/Pictures/lbm_dirs"
 
+# Image file extensions linked into the target directory (matched case-insensitively)
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'})
+
 def load_favorites_module():
     """Dynamically load the wallpaper_favorites module."""
     try:
@@ -50,7 +57,7 @@ def load_favorites_module():
         logger.error(f"Error loading wallpaper favorites module: {e}")
         return None
 
-def create_symlinks_from_favorites():
+def create_symlinks_from_favorites(target_dir=TARGET_DIR):
     """Create symlinks in the target directory for all favorite wallpapers."""
     logger.info("Creating symlinks from favorite wallpapers")
     try:
@@ -60,7 +67,7 @@ def create_symlinks_from_favorites():
             return False
         
         # Create symlinks from favorites
-        return favorites_module.create_symlinks_from_favorites(TARGET_DIR)
+        return favorites_module.create_symlinks_from_favorites(target_dir)
     except Exception as e:
         logger.error(f"Error creating symlinks from favorites: {e}")
         return False
@@ -121,17 +128,17 @@ def save_current_color(color):
         logger.error(f"Error saving current color: {e}")
         return False
 
-def clear_target_directory():
+def clear_target_directory(target_dir=TARGET_DIR):
     """Clear all symlinks from the target directory."""
-    logger.info(f"Clearing target directory: {TARGET_DIR}")
+    logger.info(f"Clearing target directory: {target_dir}")
     try:
         # Ensure target directory exists
-        os.makedirs(TARGET_DIR, exist_ok=True)
+        os.makedirs(target_dir, exist_ok=True)
         
         # Remove all symlinks in the target directory
         count = 0
-        for item in os.listdir(TARGET_DIR):
-            item_path = os.path.join(TARGET_DIR, item)
+        for item in os.listdir(target_dir):
+            item_path = os.path.join(target_dir, item)
             if os.path.islink(item_path):
                 os.unlink(item_path)
                 count += 1
@@ -142,41 +149,32 @@ def clear_target_directory():
         logger.error(f"Error clearing target directory: {e}")
         return False
 
-def create_symlinks_from_folder(source_folder):
+def create_symlinks_from_folder(source_folder, target_dir=TARGET_DIR):
     """Create symlinks in the target directory for all images in the source folder."""
     logger.info(f"refresh_wallpaper.py: create_symlinks_from_folder: Received source_folder: {source_folder}") # ADDED LOG
     try:
         # Ensure target directory exists
-        os.makedirs(TARGET_DIR, exist_ok=True)
+        os.makedirs(target_dir, exist_ok=True)
         
-        # Get all image files in the source folder
-        image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp']
-        image_files = []
+        # When rebuilding from the current target itself, link to the real images:
+        # the generation the old links live in is removed after the swap
+        resolve_links = os.path.realpath(source_folder) == os.path.realpath(TARGET_DIR)
         
-        for ext in image_extensions:
-            image_files.extend(glob.glob(os.path.join(source_folder, f"*{ext}")))
-            image_files.extend(glob.glob(os.path.join(source_folder, f"*{ext.upper()}")))
+        # Get all image files in the source folder (listed again only if it changed)
+        images = list_source_images(source_folder, resolve_links)
+        logger.info(f"refresh_wallpaper.py: create_symlinks_from_folder: Found {len(images)} images in {source_folder}") # ADDED LOG
         
-        logger.info(f"refresh_wallpaper.py: create_symlinks_from_folder: Found {len(image_files)} images in {source_folder}") # ADDED LOG
-        # Create symlinks for each image file
-        count = 0
-        for image_path in image_files:
-            filename = os.path.basename(image_path)
-            symlink_path = os.path.join(TARGET_DIR, filename)
-            logger.info(f"refresh_wallpaper.py: create_symlinks_from_folder: Linking '{image_path}' to '{symlink_path}'") # ADDED LOG
-            
-            # Create symlink if it doesn't exist
-            if not os.path.exists(symlink_path):
-                os.symlink(image_path, symlink_path)
-                count += 1
+        # Link every image whose name is not in the target directory yet, in one batch
+        links, _ = plan_symlinks([(source_folder, images)], os.listdir(target_dir))
+        count, errors = apply_symlinks(links, target_dir)
         
-        logger.info(f"Created {count} symlinks in target directory")
+        logger.info(f"Created {count} symlinks in target directory ({errors} errors)")
         return count > 0
     except Exception as e:
         logger.error(f"Error creating symlinks: {e}")
         return False
 
-def create_symlinks_from_color_folder(color):
+def create_symlinks_from_color_folder(color, target_dir=TARGET_DIR):
     """Create symlinks in the target directory for all images in the color folder."""
     logger.info(f"Creating symlinks for color: {color}")
     try:
@@ -188,54 +186,155 @@ def create_symlinks_from_color_folder(color):
         color_dir = os.path.join(BASE_DIR, config["paths"]["color_dirs"][color])
         
         # Create symlinks from the color directory
-        return create_symlinks_from_folder(color_dir)
+        return create_symlinks_from_folder(color_dir, target_dir)
     except Exception as e:
         logger.error(f"Error creating symlinks for color {color}: {e}")
         return False
 
-def create_symlinks_from_multiple_colors(colors):
-    """Create symlinks in the target directory for all images in multiple color folders."""
+def list_source_images(source_dir, resolve_links=False):
+    """
+    List the image files in a directory for plan_symlinks.
+    
+    The directory is listed through the shared file manifest, so it is only
+    read again if it changed since the last scan.
+    
+    Args:
+        source_dir: Directory to list
+        resolve_links: If True, give the real path of each image instead of
+                       its path in source_dir
+        
+    Returns:
+        list: (filename, path) pairs, sorted by filename
+    """
+    files = file_manifest.scan_directory(source_dir, IMAGE_EXTENSIONS, recursive=False)["files"]
+    
+    images = []
+    for image_path, real_path in files.items():
+        filename = os.path.basename(image_path)
+        # Hidden files are skipped, as glob("*.ext") did
+        if filename.startswith("."):
+            continue
+        images.append((filename, real_path if resolve_links else image_path))
+    
+    images.sort()
+    return images
+
+def plan_symlinks(sources, existing_names=()):
+    """
+    Pick the symlinks to create for several source directories.
+    
+    A filename is linked from the first source that has it; names already
+    present in the target directory are left alone.
+    
+    Args:
+        sources: (source_dir, [(filename, path)]) pairs in priority order
+        existing_names: Names already present in the target directory
+        
+    Returns:
+        tuple: ({filename: path} to create, {source_dir: {"found": int, "linked": int}})
+    """
+    links = {}
+    taken = set(existing_names)
+    per_source = {}
+    
+    for source_dir, images in sources:
+        linked = 0
+        for filename, image_path in images:
+            if filename in taken:
+                continue
+            taken.add(filename)
+            links[filename] = image_path
+            linked += 1
+        per_source[source_dir] = {"found": len(images), "linked": linked}
+    
+    return links, per_source
+
+def apply_symlinks(links, target_dir):
+    """
+    Create a batch of symlinks in the target directory.
+    
+    Args:
+        links: Symlink target keyed by filename
+        target_dir: Directory to create the symlinks in
+        
+    Returns:
+        tuple: (created, errors)
+    """
+    created = 0
+    errors = 0
+    for filename, image_path in links.items():
+        try:
+            os.symlink(image_path, os.path.join(target_dir, filename))
+            created += 1
+        except OSError as e:
+            logger.error(f"Error creating symlink {filename}: {e}")
+            errors += 1
+    return created, errors
+
+def create_symlinks_from_multiple_colors(colors, target_dir=TARGET_DIR):
+    """
+    Create symlinks in the target directory for all images in multiple color folders.
+    
+    The config is loaded once, each color folder is listed once, images in
+    more than one color are linked from the first color that has them, and
+    all symlinks are created in one batch. Per-phase timings are logged.
+    
+    Args:
+        colors: Color categories, in priority order
+        target_dir: Directory to create the symlinks in
+        
+    Returns:
+        bool: True if any symlinks were created
+    """
     logger.info(f"Creating symlinks for multiple colors: {colors}")
     try:
-        success = True
-        total_count = 0
+        timings = {}
+        phase_start = time.perf_counter()
+        
+        config = load_config()
+        if not config:
+            return False
         
+        color_dirs = []
         for color in colors:
-            logger.info(f"Processing color: {color}")
-            config = load_config()
-            if not config:
+            if color not in config["paths"]["color_dirs"]:
+                logger.error(f"Unknown color: {color}")
                 return False
-            
-            # Get color directory path
-            color_dir = os.path.join(BASE_DIR, config["paths"]["color_dirs"][color])
-            
-            # Get all image files in the color folder
-            image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp']
-            image_files = []
-            
-            for ext in image_extensions:
-                image_files.extend(glob.glob(os.path.join(color_dir, f"*{ext}")))
-                image_files.extend(glob.glob(os.path.join(color_dir, f"*{ext.upper()}")))
-            
-            # Create symlinks for each image file
-            count = 0
-            for image_path in image_files:
-                filename = os.path.basename(image_path)
-                symlink_path = os.path.join(TARGET_DIR, filename)
-                
-                # Create symlink if it doesn't exist
-                if not os.path.exists(symlink_path):
-                    os.symlink(image_path, symlink_path)
-                    count += 1
-            
-            logger.info(f"Created {count} symlinks from color {color}")
-            total_count += count
-            
-            # If we couldn't create any symlinks for this color, log a warning
-            if count == 0:
+            color_dirs.append((color, os.path.join(BASE_DIR, config["paths"]["color_dirs"][color])))
+        
+        now = time.perf_counter()
+        timings["config"] = now - phase_start
+        phase_start = now
+        
+        os.makedirs(target_dir, exist_ok=True)
+        existing_names = os.listdir(target_dir)
+        sources = [(color_dir, list_source_images(color_dir)) for _, color_dir in color_dirs]
+        
+        now = time.perf_counter()
+        timings["scan"] = now - phase_start
+        phase_start = now
+        
+        links, per_source = plan_symlinks(sources, existing_names)
+        
+        now = time.perf_counter()
+        timings["plan"] = now - phase_start
+        phase_start = now
+        
+        total_count, errors = apply_symlinks(links, target_dir)
+        timings["apply"] = time.perf_counter() - phase_start
+        
+        for color, color_dir in color_dirs:
+            counts = per_source[color_dir]
+            logger.info(f"Color {color}: {counts['found']} images, {counts['linked']} linked "
+                        f"({counts['found'] - counts['linked']} duplicate names skipped)")
+            if counts["found"] == 0:
                 logger.warning(f"No images found in color directory: {color_dir}")
         
-        logger.info(f"Created a total of {total_count} symlinks from {len(colors)} colors")
+        logger.info(f"Created a total of {total_count} symlinks from {len(colors)} colors ({errors} errors)")
+        logger.info(
+            f"Symlink timings: config {timings['config']:.3f}s, scan {timings['scan']:.3f}s, "
+            f"plan {timings['plan']:.3f}s, apply {timings['apply']:.3f}s"
+        )
         return total_count > 0
     except Exception as e:
         logger.error(f"Error creating symlinks for multiple colors: {e}")
@@ -246,91 +345,28 @@ def create_symlinks_from_multiple_colors(colors):
 def parse_folder_date(folder_name):
     """
     Parse a folder name in the format 'lbm-M-D-YY' to extract the date.
-    Also handles other common date formats in folder names.
+    Also handles other common date formats in folder names (see
+    utils.folder_catalog.parse_folder_date).
     """
-    logger.info(f"Attempting to parse date from folder name: '{folder_name}'")
-    try:
-        # Split by '-' to handle variable-length month and day parts
-        parts = folder_name.split('-')
-        logger.info(f"Split parts: {parts}")
-        
-        # Check if we have the expected format (lbm-M-D-YY)
-        if len(parts) >= 3:  # More flexible format checking
-            # Try to extract date parts based on different patterns
-            
-            # Pattern: lbm-M-D-YY
-            if len(parts) == 4 and parts[0] == 'lbm':
-                logger.info(f"Matched pattern: lbm-M-D-YY")
-                month_part, day_part, year_part = parts[1], parts[2], parts[3]
-            # Pattern: M-D-YY (without prefix)
-            elif len(parts) == 3 and all(p.isdigit() for p in parts):
-                logger.info(f"Matched pattern: M-D-YY")
-                month_part, day_part, year_part = parts[0], parts[1], parts[2]
-            # Pattern: YYYY-MM-DD
-            elif len(parts) == 3 and len(parts[0]) == 4 and parts[0].isdigit():
-                logger.info(f"Matched pattern: YYYY-MM-DD")
-                year_part, month_part, day_part = parts[0], parts[1], parts[2]
-                # Convert 4-digit year to 2-digit for consistency
-                year_part = year_part[2:]
-            else:
-                # Try to find any sequence of 3 numbers that could be a date
-                digit_parts = [p for p in parts if p.isdigit()]
-                logger.info(f"Looking for digit parts, found: {digit_parts}")
-                if len(digit_parts) >= 3:
-                    logger.info(f"Using digit parts as date components")
-                    month_part, day_part, year_part = digit_parts[0], digit_parts[1], digit_parts[2]
-                else:
-                    logger.info(f"No recognizable date pattern in folder name: {folder_name}")
-                    return None
-            
-            # Validate parts are numeric
-            if not month_part.isdigit() or not day_part.isdigit() or not year_part.isdigit():
-                logger.debug(f"Non-numeric date parts in folder name: {folder_name}")
-                return None
-                
-            month = int(month_part)
-            day = int(day_part)
-            year = int(year_part)
-            
-            # Basic validation
-            if month < 1 or month > 12:
-                logger.debug(f"Invalid month ({month}) in folder name: {folder_name}")
-                return None
-                
-            if day < 1 or day > 31:
-                logger.debug(f"Invalid day ({day}) in folder name: {folder_name}")
-                return None
-            
-            # Assume 2-digit year format (e.g., 25 -> 2025)
-            if year < 100:
-                year += 2000
-            
-            # Create date object with additional validation
-            try:
-                date_obj = datetime(year, month, day).date()
-                logger.info(f"Successfully parsed date {date_obj} from folder {folder_name}")
-                return date_obj
-            except ValueError as e:
-                # This catches invalid dates like February 30
-                logger.debug(f"Invalid date combination in folder name: {folder_name}, error: {e}")
-                return None
-                
-    except Exception as e:
-        logger.debug(f"Error parsing date from folder name {folder_name}: {e}")
-    
-    return None
+    return folder_catalog.parse_folder_date(folder_name)
 
 def get_recent_folders(days_back=7):
-    """Get folders that have dates within the specified number of days from today."""
+    """
+    Get folders that have dates within the specified number of days from today.
+    
+    Dated folders come from the shared folder catalog, which only lists
+    LBM_DIRS_PATH again when it changes.
+    
+    Args:
+        days_back: Number of days to look back
+        
+    Returns:
+        list: Folder paths, most recent first
+    """
     logger.info(f"Getting folders from the last {days_back} days")
     try:
         today = datetime.now().date()
         cutoff_date = today - timedelta(days=days_back)
-        logger.info(f"Today's date: {today}, cutoff date: {cutoff_date}")
-        logger.info(f"LBM_DIRS_PATH is set to: {LBM_DIRS_PATH}")
-        
-        # Get all subdirectories in the lbm_dirs path
-        folders = []
         
         # Check if lbm_dirs path exists
         if not os.path.exists(LBM_DIRS_PATH):
@@ -346,82 +382,44 @@ def get_recent_folders(days_back=7):
                         return [os.path.join(base_pictures_dir, item)]
             return []
         
-        # Get all items in the directory
-        all_items = os.listdir(LBM_DIRS_PATH)
-        logger.info(f"Found {len(all_items)} items in {LBM_DIRS_PATH}")
-        
-        # Log all folder names for debugging
-        logger.info(f"All folder names: {', '.join(all_items)}")
-        
-        # First pass: Try to find folders with dates in their names
-        for item in all_items:
-            full_path = os.path.join(LBM_DIRS_PATH, item)
-            
-            # Check if it's a directory
-            if os.path.isdir(full_path):
-                logger.info(f"Processing directory: {item}")
-                # Parse date from folder name
-                folder_date = parse_folder_date(item)
-                if folder_date:
-                    logger.info(f"Folder {item} has date {folder_date}")
-                    if folder_date >= cutoff_date:
-                        logger.info(f"Folder {item} with date {folder_date} is within range (>= {cutoff_date})")
-                        folders.append((full_path, folder_date))
-                    else:
-                        logger.info(f"Folder {item} with date {folder_date} is too old (< {cutoff_date})")
-                else:
-                    logger.info(f"Could not parse date from folder {item}")
+        # First pass: folders with dates in their names
+        catalog = folder_catalog.get_catalog(LBM_DIRS_PATH)
+        folders = catalog.folders_since(cutoff_date)
         
         # If no folders with dates found, try to use folder modification times as a fallback
         if not folders:
             logger.info("No folders with date in name found, trying modification times")
-            for item in all_items:
-                full_path = os.path.join(LBM_DIRS_PATH, item)
-                
-                if os.path.isdir(full_path):
-                    try:
-                        # Get folder modification time
-                        mod_time = os.path.getmtime(full_path)
-                        mod_date = datetime.fromtimestamp(mod_time).date()
-                        
-                        logger.info(f"Folder {item} has modification date {mod_date}")
-                        if mod_date >= cutoff_date:
-                            logger.info(f"Folder {item} with mod date {mod_date} is within range (>= {cutoff_date})")
-                            folders.append((full_path, mod_date))
-                        else:
-                            logger.info(f"Folder {item} with mod date {mod_date} is too old (< {cutoff_date})")
-                    except Exception as e:
-                        logger.error(f"Error getting modification time for {item}: {e}")
+            dated_folders = []
+            for full_path in catalog.all_folders():
+                try:
+                    mod_date = datetime.fromtimestamp(os.path.getmtime(full_path)).date()
+                except OSError as e:
+                    logger.error(f"Error getting modification time for {os.path.basename(full_path)}: {e}")
+                    continue
+                if mod_date >= cutoff_date:
+                    dated_folders.append((full_path, mod_date))
+            
+            dated_folders.sort(key=lambda x: x[1], reverse=True)
+            folders = [path for path, _ in dated_folders]
         
         # If still no folders found, just use all directories as a last resort
         if not folders and days_back > 365:  # Only for "all time" queries
             logger.info("No folders with dates found, using all directories")
-            for item in all_items:
-                full_path = os.path.join(LBM_DIRS_PATH, item)
-                if os.path.isdir(full_path):
-                    # Use current date as a placeholder
-                    folders.append((full_path, today))
-        
-        # Sort by date (most recent first)
-        folders.sort(key=lambda x: x[1], reverse=True)
+            folders = catalog.all_folders()
         
-        # Log the sorted folders
         if folders:
-            logger.info("Sorted folders by date (most recent first):")
-            for i, (path, date) in enumerate(folders):
-                logger.info(f"  {i+1}. {os.path.basename(path)} - {date}")
+            logger.info(f"Found {len(folders)} folders since {cutoff_date}, most recent: {os.path.basename(folders[0])}")
         else:
             logger.warning("No folders with valid dates found within range")
         
-        # Return just the paths
-        return [folder[0] for folder in folders]
+        return folders
     except Exception as e:
         logger.error(f"Error getting recent folders: {e}")
         import traceback
         logger.error(traceback.format_exc())
         return []
 
-def create_symlinks_from_recent_folders(days_back=7):
+def create_symlinks_from_recent_folders(days_back=7, target_dir=TARGET_DIR):
     """Create symlinks from folders with dates within the specified number of days."""
     logger.info(f"Creating symlinks from folders in the last {days_back} days")
     try:
@@ -453,7 +451,7 @@ def create_symlinks_from_recent_folders(days_back=7):
             folder_count = 0
             for image_path in image_files:
                 filename = os.path.basename(image_path)
-                symlink_path = os.path.join(TARGET_DIR, filename)
+                symlink_path = os.path.join(target_dir, filename)
                 
                 # Create symlink if it doesn't exist
                 if not os.path.exists(symlink_path):
@@ -470,7 +468,7 @@ def create_symlinks_from_recent_folders(days_back=7):
                             counter = 1
                             while True:
                                 new_filename = f"{base_name}_{counter}{ext}"
-                                new_symlink_path = os.path.join(TARGET_DIR, new_filename)
+                                new_symlink_path = os.path.join(target_dir, new_filename)
                                 if not os.path.exists(new_symlink_path):
                                     os.symlink(image_path, new_symlink_path)
                                     total_count += 1
@@ -491,21 +489,82 @@ def create_symlinks_from_recent_folders(days_back=7):
         logger.error(traceback.format_exc())
         return False
 
-def update_wallpaper_folder(color=None, latest_folder=None, days_back=None, source_colors_str=None, use_favorites=False):
+def update_wallpaper_folder(color=None, latest_folder=None, days_back=None, source_colors_str=None, use_favorites=False, in_place=False):
     """
     Update the wallpaper folder with images from the specified source.
     
+    By default the new contents are built in a staging directory and
+    swapped in atomically (utils.directory_swap), so the slideshow never
+    sees an empty or partially filled folder. Old generations are removed
+    in the background.
+    
     Args:
         color: Color category to use (single color)
         latest_folder: Path to the latest folder to use
         days_back: Number of days to look back for folders
         source_colors_str: Comma-separated string of color names to use as sources
         use_favorites: Whether to use favorite wallpapers
+        in_place: If True, clear and refill the target directory directly
         
     Returns:
         tuple: (success, changed, previous_color)
     """
-    logger.info(f"Updating wallpaper folder: color={color}, latest_folder={latest_folder}, days_back={days_back}, source_colors_str={source_colors_str}, use_favorites={use_favorites}")
+    if in_place:
+        return fill_wallpaper_folder(TARGET_DIR, color, latest_folder, days_back, source_colors_str, use_favorites)
+    
+    try:
+        staging_dir = directory_swap.create_staging_dir(TARGET_DIR)
+    except Exception as e:
+        logger.error(f"Error creating staging directory, updating in place: {e}")
+        return fill_wallpaper_folder(TARGET_DIR, color, latest_folder, days_back, source_colors_str, use_favorites)
+    
+    fill_start = time.perf_counter()
+    success, changed, prev_color = fill_wallpaper_folder(
+        staging_dir, color, latest_folder, days_back, source_colors_str, use_favorites
+    )
+    fill_time = time.perf_counter() - fill_start
+    
+    # Keep serving the old contents if the new ones could not be built
+    if not success:
+        directory_swap.discard_staging_dir(staging_dir)
+        return False, False, prev_color
+    
+    # Nothing to swap (or refresh) if the folder would hold the same links
+    compare_start = time.perf_counter()
+    unchanged = directory_swap.has_same_contents(TARGET_DIR, staging_dir)
+    compare_time = time.perf_counter() - compare_start
+    if unchanged:
+        logger.info("Wallpaper folder contents unchanged, keeping the current generation")
+        logger.info(f"Refresh timings: fill {fill_time:.3f}s, compare {compare_time:.3f}s")
+        directory_swap.discard_staging_dir(staging_dir)
+        return True, False, prev_color
+    
+    swap_start = time.perf_counter()
+    if not directory_swap.swap_in(TARGET_DIR, staging_dir):
+        directory_swap.discard_staging_dir(staging_dir)
+        return False, False, prev_color
+    
+    logger.info(f"Refresh timings: fill {fill_time:.3f}s, compare {compare_time:.3f}s, "
+                f"swap {time.perf_counter() - swap_start:.3f}s")
+    directory_swap.collect_generations_async(TARGET_DIR)
+    return success, changed, prev_color
+
+def fill_wallpaper_folder(target_dir, color=None, latest_folder=None, days_back=None, source_colors_str=None, use_favorites=False):
+    """
+    Fill a directory with symlinks to images from the specified source.
+    
+    Args:
+        target_dir: Directory to fill (the target directory or a staging directory)
+        color: Color category to use (single color)
+        latest_folder: Path to the latest folder to use
+        days_back: Number of days to look back for folders
+        source_colors_str: Comma-separated string of color names to use as sources
+        use_favorites: Whether to use favorite wallpapers
+        
+    Returns:
+        tuple: (success, changed, previous_color)
+    """
+    logger.info(f"Updating wallpaper folder: target_dir={target_dir}, color={color}, latest_folder={latest_folder}, days_back={days_back}, source_colors_str={source_colors_str}, use_favorites={use_favorites}")
     
     prev_color = get_current_color()
     config = load_config()
@@ -518,9 +577,9 @@ def update_wallpaper_folder(color=None, latest_folder=None, days_back=None, sour
             return False, False, prev_color
         
         logger.info(f"Using --source-colors: {selected_colors}")
-        if not clear_target_directory():
+        if not clear_target_directory(target_dir):
             return False, False, prev_color
-        success = create_symlinks_from_multiple_colors(selected_colors)
+        success = create_symlinks_from_multiple_colors(selected_colors, target_dir)
         if success and selected_colors:
             current_selection_primary_color = selected_colors[0] # Use first color for 'changed' status
             save_current_color(current_selection_primary_color)
@@ -540,8 +599,8 @@ def update_wallpaper_folder(color=None, latest_folder=None, days_back=None, sour
             selected_colors_cfg = config.get("direct_color_selection", [])
             if selected_colors_cfg:
                 logger.info(f"Using direct color selection from config with colors: {selected_colors_cfg}")
-                if not clear_target_directory(): return False, False, prev_color
-                success = create_symlinks_from_multiple_colors(selected_colors_cfg)
+                if not clear_target_directory(target_dir): return False, False, prev_color
+                success = create_symlinks_from_multiple_colors(selected_colors_cfg, target_dir)
                 if success:
                     current_selection_primary_color = selected_colors_cfg[0]
                     save_current_color(current_selection_primary_color)
@@ -569,8 +628,8 @@ def update_wallpaper_folder(color=None, latest_folder=None, days_back=None, sour
                 index = COLOR_ORDER.index(habit_color)
                 inclusive_colors = COLOR_ORDER[:index+1]
                 logger.info(f"Config: Using inclusive colors: {inclusive_colors}")
-                if not clear_target_directory(): return False, False, prev_color
-                success = create_symlinks_from_multiple_colors(inclusive_colors)
+                if not clear_target_directory(target_dir): return False, False, prev_color
+                success = create_symlinks_from_multiple_colors(inclusive_colors, target_dir)
                 if success:
                     current_selection_primary_color = habit_color
                     save_current_color(current_selection_primary_color)
@@ -604,17 +663,17 @@ def update_wallpaper_folder(color=None, latest_folder=None, days_back=None, sour
     if not source_colors_str and not (config and "wallpaper_source" in config and
                                      ((config["wallpaper_source"] == "direct_color_selection" and "direct_color_selection" in config and config["direct_color_selection"]) or
                                       (config["wallpaper_source"] == "weekly_habits_inclusive" and "habit_color" in locals() and habit_color in COLOR_ORDER))):
-        if not clear_target_directory():
+        if not clear_target_directory(target_dir):
             return False, False, prev_color
     
     # Update based on the determined source
     if use_favorites:
         # Clear the target directory first
-        if not clear_target_directory():
+        if not clear_target_directory(target_dir):
             return False, False, prev_color
         
         # Create symlinks from favorites
-        success = create_symlinks_from_favorites()
+        success = create_symlinks_from_favorites(target_dir)
         
         # Save "favorites" as the current color
         if success:
@@ -622,17 +681,17 @@ def update_wallpaper_folder(color=None, latest_folder=None, days_back=None, sour
         
         return success, "favorites" != prev_color, prev_color
     elif latest_folder:
-        success = create_symlinks_from_folder(latest_folder)
+        success = create_symlinks_from_folder(latest_folder, target_dir)
         # For latest_folder, we don't have a specific 'color' to save, so don't update current_color.txt
         # The 'changed' status will depend on whether TARGET_DIR content actually changed, which is hard to track here.
         # We'll assume it changed if successful.
         return success, True if success else False, prev_color
     elif days_back is not None:
-        success = create_symlinks_from_recent_folders(days_back)
+        success = create_symlinks_from_recent_folders(days_back, target_dir)
         # Similar to latest_folder, no specific color to save.
         return success, True if success else False, prev_color
     elif color: # This handles single color cases
-        success = create_symlinks_from_color_folder(color)
+        success = create_symlinks_from_color_folder(color, target_dir)
         if success and current_selection_primary_color and current_selection_primary_color != prev_color:
             save_current_color(current_selection_primary_color)
         return success, current_selection_primary_color != prev_color if current_selection_primary_color else False, prev_color
@@ -645,8 +704,14 @@ def get_most_recent_folder():
     """Get the most recent folder based on date in folder name or modification time."""
     logger.info("Getting the most recent folder by date")
     try:
-        # Get all folders with dates (using a large days_back value to include all)
-        logger.info("Calling get_recent_folders with days_back=36500 (100 years)")
+        # The latest dated folder, straight from the catalog
+        if os.path.isdir(LBM_DIRS_PATH):
+            most_recent = folder_catalog.get_catalog(LBM_DIRS_PATH).most_recent()
+            if most_recent:
+                logger.info(f"Most recent folder: {most_recent}")
+                return most_recent
+        
+        # No dated folders: fall back to modification times and alternative directories
         folders = get_recent_folders(days_back=36500)  # ~100 years
         logger.info(f"get_recent_folders returned {len(folders)} folders")
         
@@ -893,6 +958,7 @@ if __name__ == "__main__":
     skip_refresh = '--no-refresh' in args
     most_recent_only = '--most-recent-only' in args
     use_favorites = '--use-favorites' in args
+    in_place = '--in-place' in args
     source_colors_arg = None
 
     latest_folder = None
@@ -991,7 +1057,7 @@ if __name__ == "__main__":
                 color_arg = arg_val
                 break
                 
-    success, changed, prev_color = update_wallpaper_folder(color_arg, latest_folder, days_back, source_colors_str=source_colors_arg, use_favorites=use_favorites)
+    success, changed, prev_color = update_wallpaper_folder(color_arg, latest_folder, days_back, source_colors_str=source_colors_arg, use_favorites=use_favorites, in_place=in_place)
 
     weekly_count = get_weekly_habit_count()
     current_color = get_color_from_count(weekly_count)
@@ -4,7 +4,8 @@ Update Wallpaper Folder
 
 This script updates the /home/twain/Pictures/llm_baby_monster directory
 with images from the appropriate color category based on the current
-week's habit average.
+week's habit average. The new contents are built in a staging directory
+and swapped in atomically, so the slideshow never sees a partial folder.
 
 Usage:
     python3 update_wallpaper_folder.py [color]
@@ -22,6 +23,10 @@ import subprocess
 import time
 from pathlib import Path
 
+# Add the wallpaper_color_manager_new directory to the path so we can import the utils package
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "wallpaper_color_manager_new"))
+from utils import directory_swap
+
 # Ensure log directory exists
 log_dir = '/home/twain/logs'
 os.makedirs(log_dir, exist_ok=True)
@@ -520,26 +525,6 @@ def update_wallpaper_folder(color=None):
         logger.error(f"Source directory does not exist: {source_dir}")
         return False, color_changed, previous_color
     
-    # Ensure target directory exists
-    os.makedirs(TARGET_DIR, exist_ok=True)
-    
-    # Get current files in target directory before clearing
-    old_files = set()
-    for item in os.listdir(TARGET_DIR):
-        if item.lower().endswith(('.jpg', '.jpeg', '.png', '.gif')):
-            old_files.add(item)
-    
-    # Clear the target directory
-    for item in os.listdir(TARGET_DIR):
-        item_path = os.path.join(TARGET_DIR, item)
-        try:
-            if os.path.islink(item_path):
-                os.unlink(item_path)
-            elif os.path.isfile(item_path):
-                os.remove(item_path)
-        except Exception as e:
-            logger.error(f"Error removing {item_path}: {e}")
-    
     # Get all image files from the source directory
     image_files = []
     for filename in os.listdir(source_dir):
@@ -575,24 +560,53 @@ def update_wallpaper_folder(color=None):
         logger.error(f"No images found in {color} category or fallback")
         return False, color_changed, previous_color
     
-    # Create symlinks in the target directory
+    # Build the new contents in a staging directory; the slideshow keeps
+    # reading the old ones until they are swapped in at once
+    try:
+        staging_dir = directory_swap.create_staging_dir(TARGET_DIR)
+    except Exception as e:
+        logger.error(f"Error creating staging directory: {e}")
+        return False, color_changed, previous_color
+    
+    # Create symlinks in the staging directory
     count = 0
-    new_files = set()
     for filename, source_path in image_files:
         try:
-            target_path = os.path.join(TARGET_DIR, filename)
+            target_path = os.path.join(staging_dir, filename)
             os.symlink(source_path, target_path)
-            new_files.add(filename)
             count += 1
         except Exception as e:
             logger.error(f"Error creating symlink for {filename}: {e}")
     
-    logger.info(f"Created {count} symlinks in {TARGET_DIR}")
+    logger.info(f"Created {count} symlinks in {staging_dir}")
+    
+    # Record the color with the generation, so a color switch is noticed even
+    # if both colors hold the same images (or the color file was rewritten)
+    try:
+        directory_swap.set_generation_label(staging_dir, color)
+    except Exception as e:
+        logger.error(f"Error recording color of {staging_dir}: {e}")
+    shown_color = directory_swap.get_generation_label(TARGET_DIR)
+    if shown_color != color:
+        color_changed = True
     
     # Check if files have changed
-    files_changed = old_files != new_files
+    files_changed = not directory_swap.has_same_contents(TARGET_DIR, staging_dir)
+    if not files_changed and not color_changed:
+        logger.info("Wallpaper directory contents unchanged")
+        directory_swap.discard_staging_dir(staging_dir)
+        return True, False, previous_color
+    
     if files_changed:
         logger.info("Wallpaper directory contents have changed")
+    else:
+        logger.info(f"Wallpaper directory contents unchanged, but now shown for {color}")
+    if not directory_swap.swap_in(TARGET_DIR, staging_dir):
+        directory_swap.discard_staging_dir(staging_dir)
+        return False, color_changed, previous_color
+    
+    # Remove old generations without delaying the refresh
+    directory_swap.collect_generations_async(TARGET_DIR)
     
     # Return success and whether color or files changed
     return True, (color_changed or files_changed), previous_color
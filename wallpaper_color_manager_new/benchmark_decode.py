@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Benchmark Decode
+
+This script compares the full-resolution decode used by the analysis before
+reduced decoding was introduced against the shared reduced-resolution
+loader (utils.image_loader):
+- Decode time per image for both loaders
+- Difference in color percentages and in the resulting categories
+
+Usage:
+    ./benchmark_decode.py [options] PATH [PATH ...]
+
+Paths may be image files or directories (scanned recursively).
+
+Options:
+    --config FILE       Use a specific configuration file
+    --limit N           Only benchmark the first N images
+    --verbose           Enable verbose logging
+    --help              Show this help message and exit
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+from typing import Dict, List, Any, Tuple
+import numpy as np
+from PIL import Image
+
+# Add the parent directory to the path so we can import the utils package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import utility modules
+from utils import config_manager, color_analysis, file_operations
+from utils.image_loader import load_analysis_image
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def load_full_decode(image_path: str, resize_dimensions: Tuple[int, int]) -> Image.Image:
+    """
+    Load an analysis image the way the analysis did before reduced decoding.
+    
+    Args:
+        image_path: Path to the image file
+        resize_dimensions: Dimensions to resize image for analysis
+    
+    Returns:
+        PIL.Image.Image: The resized RGB image
+    """
+    img = Image.open(image_path)
+    img = img.resize(resize_dimensions)
+    return img.convert('RGB')
+
+
+def percentages_for(img: Image.Image, color_params: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Get weighted color percentages for an already loaded analysis image.
+    
+    Args:
+        img: Resized RGB image
+        color_params: Color detection parameters
+    
+    Returns:
+        dict: Weighted percentage for each category
+    """
+    masks = color_analysis.categorize_pixels_multi(np.asarray(img), color_params)
+    counts = {color: int(np.count_nonzero(mask)) for color, mask in masks.items()}
+    percentages, _, _ = color_analysis.calculate_weighted_percentages(counts, color_params)
+    return percentages
+
+
+def collect_images(paths: List[str]) -> List[str]:
+    """
+    Expand files and directories into a list of image files.
+    
+    Args:
+        paths: Image files or directories
+    
+    Returns:
+        list: Paths to image files
+    """
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            images.extend(sorted(file_operations.get_image_files_recursive(path)))
+        elif os.path.isfile(path):
+            images.append(path)
+        else:
+            logger.warning(f"Skipping missing path: {path}")
+    return images
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+    
+    Returns:
+        argparse.Namespace: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmark Decode")
+    
+    parser.add_argument("paths", nargs="+",
+                        help="Image files or directories to benchmark")
+    
+    parser.add_argument("--config", type=str,
+                        help="Use a specific configuration file")
+    
+    parser.add_argument("--limit", type=int, default=0,
+                        help="Only benchmark the first N images")
+    
+    parser.add_argument("--verbose", action="store_true",
+                        help="Enable verbose logging")
+    
+    return parser.parse_args()
+
+
+def main():
+    """
+    Main function.
+    
+    Returns:
+        int: Exit code
+    """
+    # Parse command-line arguments
+    args = parse_arguments()
+    
+    # Set logging level
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+        logger.debug("Verbose logging enabled")
+    
+    # Load configuration
+    config = config_manager.load_config(args.config)
+    resize_dimensions = tuple(config["resize_dimensions"])
+    color_params = config.get("color_detection_params")
+    thresholds = config["color_thresholds"]
+    color_limits = config.get("color_selection_limits")
+    
+    images = collect_images(args.paths)
+    if args.limit > 0:
+        images = images[:args.limit]
+    
+    if not images:
+        logger.error("No images to benchmark")
+        return 1
+    
+    full_times = []
+    reduced_times = []
+    max_diffs = []
+    same_categories = 0
+    
+    for image_path in images:
+        try:
+            start = time.perf_counter()
+            full_img = load_full_decode(image_path, resize_dimensions)
+            full_times.append(time.perf_counter() - start)
+            
+            start = time.perf_counter()
+            reduced_img = load_analysis_image(image_path, resize_dimensions)
+            reduced_times.append(time.perf_counter() - start)
+        except Exception as e:
+            logger.error(f"Error decoding {image_path}: {e}")
+            continue
+        
+        full_pct = percentages_for(full_img, color_params)
+        reduced_pct = percentages_for(reduced_img, color_params)
+        
+        max_diff = max(abs(full_pct[color] - reduced_pct[color]) for color in color_analysis.COLOR_CATEGORIES)
+        max_diffs.append(max_diff)
+        
+        full_categories = color_analysis.apply_thresholds(full_pct, thresholds, color_limits)
+        reduced_categories = color_analysis.apply_thresholds(reduced_pct, thresholds, color_limits)
+        if sorted(full_categories) == sorted(reduced_categories):
+            same_categories += 1
+        
+        logger.debug(
+            f"{os.path.basename(image_path)}: full {full_times[-1] * 1000:.1f} ms, "
+            f"reduced {reduced_times[-1] * 1000:.1f} ms, max diff {max_diff:.2f} points"
+        )
+    
+    count = len(full_times)
+    if count == 0:
+        logger.error("No images could be decoded")
+        return 1
+    
+    full_ms = 1000 * sum(full_times) / count
+    reduced_ms = 1000 * sum(reduced_times) / count
+    
+    print(f"\nImages benchmarked: {count}")
+    print(f"Full decode:      {full_ms:8.1f} ms/image")
+    print(f"Reduced decode:   {reduced_ms:8.1f} ms/image")
+    if reduced_ms > 0:
+        print(f"Speedup:          {full_ms / reduced_ms:8.1f}x")
+    print("\nColor percentage difference (percentage points):")
+    print(f"  mean of per-image max: {np.mean(max_diffs):.2f}")
+    print(f"  95th percentile:       {np.percentile(max_diffs, 95):.2f}")
+    print(f"  worst image:           {np.max(max_diffs):.2f}")
+    print(f"Same categories: {same_categories}/{count} ({100 * same_categories / count:.1f}%)")
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
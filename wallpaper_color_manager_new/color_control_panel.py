@@ -34,13 +34,14 @@ import matplotlib
 matplotlib.use('TkAgg')  # Use TkAgg backend for matplotlib
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from PIL import Image, ImageTk, ImageDraw
+from PIL import ImageTk, ImageDraw
 
 # Add the parent directory to the path so we can import the utils package
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import utility modules
-from utils import config_manager, color_analysis, file_operations
+from utils import config_manager, color_analysis, color_lut, file_operations, folder_catalog, job_runner, preview_loader, thumbnail_cache, processed_ledger, symlink_reconciler
+from utils.library_counts import LibraryCounts
 
 # Setup logging - disable file logging to prevent log file buildup
 logging.basicConfig(
@@ -94,12 +95,28 @@ class ColorControlPanel:
         self.color_picker_start_pos = None
         self.color_picker_current_pos = None
         self.color_picker_selection = None
-        
-        # Load and initialize processed files tracking
-        self.processed_files = self.config.get("processed_files", {})
-        if not isinstance(self.processed_files, dict):
-            self.processed_files = {}
-            self.config["processed_files"] = {}
+        self.color_picker_update_id = None
+        
+        # Raw category counts of the last analyzed library (see LibraryCounts)
+        self.library_counts = None
+        
+        # Runs analysis, reset and restart in the background (see job_runner)
+        self.job_runner = job_runner.JobRunner()
+        self.job_finished_callback = None
+        
+        # Decodes and analyzes sample images off the Tk thread (see preview_loader)
+        self.preview_loader = preview_loader.PreviewLoader()
+        self.preview_request = None
+        self.preview_sizes = []
+        self.preview_poll_id = None
+        
+        # Open the processed files ledger, moving it out of the config if an
+        # older version stored it there
+        had_legacy_ledger = "processed_files" in self.config
+        self.processed_ledger = processed_ledger.open_ledger(
+            self.config, config_manager.get_config_path(self.config_path)
+        )
+        if had_legacy_ledger:
             config_manager.save_config(self.config, self.config_path)
         self.cleanup_processed_files()  # Clean up old entries on startup
         
@@ -373,6 +390,25 @@ class ColorControlPanel:
             command=self.run_analysis
         )
         run_button.pack(side=tk.RIGHT, padx=5)
+        
+        # Cancel button (only enabled while a job is running)
+        self.cancel_button = ttk.Button(
+            action_frame,
+            text="Cancel",
+            command=self.cancel_job,
+            state="disabled"
+        )
+        self.cancel_button.pack(side=tk.RIGHT, padx=5)
+        
+        # Progress of the running job
+        self.job_progress_var = tk.DoubleVar(value=0.0)
+        job_progress_bar = ttk.Progressbar(
+            action_frame,
+            variable=self.job_progress_var,
+            maximum=100.0,
+            length=200
+        )
+        job_progress_bar.pack(side=tk.RIGHT, padx=5)
     
     def create_settings_tab_ui(self):
         """
@@ -804,6 +840,9 @@ class ColorControlPanel:
         """
         self.status_var.set("Loading sample images...")
         
+        # Previews prepared for the previous list may be out of date
+        self.preview_loader.clear()
+        
         # Get sample images directory
         sample_dir = self.config.get("sample_images_dir", "sample_images")
         
@@ -866,54 +905,75 @@ class ColorControlPanel:
         
         self.current_image_index = index
         self.current_image_path = self.sample_images[index]
+        self.update_counter_label()
+        
+        # Get label dimensions
+        label_width = self.image_label.winfo_width()
+        label_height = self.image_label.winfo_height()
+        
+        # If the label hasn't been fully initialized yet, use default dimensions
+        if label_width < 10 or label_height < 10:
+            label_width = 400
+            label_height = 300
+        sizes = [(label_width, label_height)]
+        
+        # Also fit the image to the color picker canvas if on that tab
+        if self.notebook.index(self.notebook.select()) == 2:  # Color Picker tab
+            sizes.append(self.get_color_picker_canvas_size())
+        
+        # Decode in the background, preparing the neighbours for the next flip
+        count = len(self.sample_images)
+        neighbours = [self.sample_images[(index + 1) % count], self.sample_images[(index - 1) % count]]
+        self.preview_sizes = sizes
+        self.preview_request = self.preview_loader.request(
+            self.current_image_path,
+            sizes,
+            tuple(self.config["resize_dimensions"]),
+            self.get_color_params(),
+            prefetch=neighbours
+        )
+        self.status_var.set(f"Loading image: {os.path.basename(self.current_image_path)}")
+        
+        # Show it right away if it was prepared ahead
+        if self.preview_poll_id is not None:
+            self.root.after_cancel(self.preview_poll_id)
+        self._poll_preview()
+    
+    def _poll_preview(self):
+        """
+        Show the requested preview once it is ready; called on a short cadence.
+        """
+        self.preview_poll_id = None
+        result = self.preview_loader.poll()
+        if result is None:
+            if self.preview_request is not None:
+                self.preview_poll_id = self.root.after(preview_loader.POLL_INTERVAL_MS, self._poll_preview)
+            return
+        
+        self.preview_request = None
+        if "error" in result:
+            logger.error(f"Error showing image: {result['error']}")
+            self.status_var.set(f"Error showing image: {result['error']}")
+            return
         
         try:
-            # Load and display image
-            img = Image.open(self.current_image_path)
-            
-            # Resize to fit the label while maintaining aspect ratio
-            img_width, img_height = img.size
-            
-            # Get label dimensions
-            label_width = self.image_label.winfo_width()
-            label_height = self.image_label.winfo_height()
-            
-            # If the label hasn't been fully initialized yet, use default dimensions
-            if label_width < 10 or label_height < 10:
-                label_width = 400
-                label_height = 300
-            
-            # Ensure we don't divide by zero
-            if img_width == 0 or img_height == 0:
-                logger.error(f"Invalid image dimensions: {img_width}x{img_height}")
-                self.status_var.set("Error: Invalid image dimensions")
-                return
-                
-            # Calculate scale factor
-            scale = min(label_width / img_width, label_height / img_height)
-            
-            # Calculate new dimensions
-            new_width = int(img_width * scale)
-            new_height = int(img_height * scale)
-            
-            # Resize image
-            img = img.resize((new_width, new_height), Image.LANCZOS)
-            
             # Convert to PhotoImage
-            self.current_image_tk = ImageTk.PhotoImage(img)
+            images = result["images"]
+            self.current_image_tk = ImageTk.PhotoImage(images[self.preview_sizes[0]])
             
             # Update label
             self.image_label.config(image=self.current_image_tk)
             
-            # Update counter label
-            self.update_counter_label()
-            
-            # Analyze image
-            self.analyze_current_image()
+            # Categorize with the current thresholds; analyze here only if the
+            # background analysis failed
+            if result["analysis"] is not None:
+                self.apply_current_analysis(result["analysis"])
+            else:
+                self.analyze_current_image()
             
             # Update color picker image if on that tab
-            if self.notebook.index(self.notebook.select()) == 2:  # Color Picker tab
-                self.show_color_picker_image(index)
+            if len(self.preview_sizes) > 1:
+                self.display_color_picker_image(images[self.preview_sizes[1]], self.preview_sizes[1])
             
             self.status_var.set(f"Showing image: {os.path.basename(self.current_image_path)}")
             
@@ -921,6 +981,35 @@ class ColorControlPanel:
             logger.error(f"Error showing image: {e}")
             self.status_var.set(f"Error showing image: {e}")
     
+    def apply_current_analysis(self, multi_result):
+        """
+        Categorize a color analysis of the current image and update the UI.
+        
+        Args:
+            multi_result: Result of color_analysis.analyze_image_multi
+        """
+        thresholds = {
+            color: var.get()
+            for color, var in self.threshold_vars.items()
+        }
+        
+        self.current_analysis = {
+            "filename": os.path.basename(self.current_image_path),
+            "color_percentages": multi_result["color_percentages"],
+            "categories": color_analysis.apply_thresholds(
+                multi_result["color_percentages"],
+                thresholds,
+                self.config.get("color_selection_limits")
+            ),
+            "pixel_map": multi_result["pixel_map"]
+        }
+        
+        # Update color distribution chart
+        self.update_distribution_chart()
+        
+        # Update category indicators
+        self.update_category_indicators()
+    
     def analyze_current_image(self):
         """
         Analyze the current image and update the UI.
@@ -1075,8 +1164,42 @@ class ColorControlPanel:
         # Save configuration
         config_manager.save_config(self.config, self.config_path)
         
-        # Re-analyze current image
-        self.analyze_current_image()
+        # Re-apply thresholds to the current image
+        self.recategorize_current_image()
+    
+    def recategorize_current_image(self):
+        """
+        Re-derive the current image's categories from its existing analysis.
+        
+        Thresholds and selection limits do not change the color percentages,
+        so there is no need to analyze the image again.
+        """
+        if not self.current_analysis:
+            self.analyze_current_image()
+            return
+        
+        try:
+            # Get thresholds from UI
+            thresholds = {
+                color: var.get()
+                for color, var in self.threshold_vars.items()
+            }
+            
+            self.current_analysis["categories"] = color_analysis.apply_thresholds(
+                self.current_analysis["color_percentages"],
+                thresholds,
+                self.config.get("color_selection_limits")
+            )
+            
+            # Update color distribution chart
+            self.update_distribution_chart()
+            
+            # Update category indicators
+            self.update_category_indicators()
+            
+        except Exception as e:
+            logger.error(f"Error recategorizing image: {e}")
+            self.status_var.set(f"Error recategorizing image: {e}")
     
     def prev_image(self):
         """
@@ -1163,54 +1286,57 @@ class ColorControlPanel:
         if not result:
             return
         
-        # Disable UI during reset
-        self.disable_ui()
         self.status_var.set("Resetting categories...")
+        self.start_job("reset categories", self._reset_categories_job, self._reset_categories_finished)
+    
+    def _reset_categories_job(self, context):
+        """
+        Reset categories in the background.
         
-        # Run reset in a separate thread
-        thread = threading.Thread(target=self._reset_categories_thread)
-        thread.daemon = True
-        thread.start()
+        Args:
+            context: Job context (see job_runner)
+        
+        Returns:
+            dict: Reset statistics
+        """
+        # Removing symlinks is not interrupted halfway
+        with context.critical():
+            return file_operations.reset_categories(self.config)
     
-    def _reset_categories_thread(self):
+    def _reset_categories_finished(self, event):
         """
-        Reset categories in a separate thread.
+        Show the result of a category reset.
+        
+        Args:
+            event: Final job event
         """
-        try:
-            # Reset categories
-            stats = file_operations.reset_categories(self.config)
-            
-            # Update UI
-            self.root.after(0, lambda: self.status_var.set(
-                f"Reset complete: {stats['total_removed']} symlinks removed, "
-                f"{stats['errors']} errors"
-            ))
-            
-            # Show result
-            if stats["errors"] > 0:
-                self.root.after(0, lambda: messagebox.showwarning(
-                    "Reset Complete",
-                    f"Reset completed with {stats['errors']} errors.\n\n"
-                    f"See log for details."
-                ))
-            else:
-                self.root.after(0, lambda: messagebox.showinfo(
-                    "Reset Complete",
-                    f"Reset completed successfully.\n\n"
-                    f"{stats['total_removed']} symlinks removed."
-                ))
-            
-        except Exception as e:
-            logger.error(f"Error resetting categories: {e}")
-            self.root.after(0, lambda: self.status_var.set(f"Error resetting categories: {e}"))
-            self.root.after(0, lambda: messagebox.showerror(
+        if event["type"] == "error":
+            self.status_var.set(f"Error resetting categories: {event['error']}")
+            messagebox.showerror(
                 "Error",
-                f"An error occurred while resetting categories:\n\n{e}"
-            ))
+                f"An error occurred while resetting categories:\n\n{event['error']}"
+            )
+            return
+        if event["type"] != "done":
+            return
         
-        finally:
-            # Re-enable UI
-            self.root.after(0, self.enable_ui)
+        stats = event["result"]
+        self.status_var.set(
+            f"Reset complete: {stats['total_removed']} symlinks removed, "
+            f"{stats['errors']} errors"
+        )
+        if stats["errors"] > 0:
+            messagebox.showwarning(
+                "Reset Complete",
+                f"Reset completed with {stats['errors']} errors.\n\n"
+                f"See log for details."
+            )
+        else:
+            messagebox.showinfo(
+                "Reset Complete",
+                f"Reset completed successfully.\n\n"
+                f"{stats['total_removed']} symlinks removed."
+            )
     
     def browse_new_images_dir(self):
         """
@@ -1255,175 +1381,169 @@ class ColorControlPanel:
         if not result:
             return
         
-        # Disable UI during analysis
-        self.disable_ui()
         self.status_var.set("Running analysis...")
         
-        # Run analysis in a separate thread
-        thread = threading.Thread(target=self._run_analysis_thread)
-        thread.daemon = True
-        thread.start()
+        # Read the settings here: Tk variables belong to the UI thread
+        self.start_job(
+            "analysis",
+            self._run_analysis_job,
+            self._run_analysis_finished,
+            custom_dir,
+            self.directories_after_date_var.get().strip(),
+            self.get_color_params()
+        )
     
-    def _run_analysis_thread(self):
+    def _run_analysis_job(self, context, custom_dir, directories_after_date, color_params):
         """
-        Run analysis in a separate thread.
-        """
-        try:
-            # Get color parameters
-            color_params = self.get_color_params()
-            
-            # Check if a custom directory is specified
-            custom_dir = self.new_images_dir_var.get().strip()
-            
-            # Check if a date filter is specified
-            directories_after_date = self.directories_after_date_var.get().strip()
-            
-            # Save current analysis settings
-            current_settings = {
-                "color_thresholds": self.config["color_thresholds"].copy(),
-                "color_detection_params": self.config["color_detection_params"].copy(),
-                "color_selection_limits": self.config["color_selection_limits"].copy(),
-                "resize_dimensions": self.config["resize_dimensions"]
-            }
-            
-            # Create a settings hash for tracking processed files
-            settings_hash = str(hash(str(current_settings)))
-            self.config["last_analysis_settings"] = current_settings.copy()
-            # Add timestamp to last_analysis_settings but not to the hash
-            self.config["last_analysis_settings"]["timestamp"] = time.time()
-            
-            # Save the directories_after_date to config
-            self.config["last_directories_after_date"] = directories_after_date
-            config_manager.save_config(self.config, self.config_path)
-            
-            # Initialize processed files tracking for this settings hash if needed
-            if settings_hash not in self.processed_files:
-                self.processed_files[settings_hash] = {}
-            
-            if custom_dir:
-                # When using a custom directory, we don't reset categories
-                # We just add the new images to the existing categories
-                reset_stats = {"total_removed": 0, "errors": 0}
-                
-                # Create a copy of the config with the custom directory
-                custom_config = self.config.copy()
-                custom_config["paths"] = self.config["paths"].copy()
-                custom_config["paths"]["original_dir"] = custom_dir
-                
-                # Process images from the custom directory
-                self.root.after(0, lambda: self.status_var.set(
-                    f"Processing images from custom directory: {custom_dir}..."
-                ))
-                
-                # Process new images from custom directory with file tracking
-                # Force reprocessing of all images if settings have changed
-                new_stats = self.process_new_images_with_tracking(
-                    custom_config,
-                    color_params,
-                    settings_hash,
-                    force_reprocess=True,  # Force reprocessing when using custom directory
-                    directories_after_date=directories_after_date
-                )
-                
-                # Skip categorizing existing images since we're only processing the custom directory
-                existing_stats = {"processed": 0, "errors": 0, "categories": {}}
-            else:
-                # For the original directory, first reset categories
-                reset_stats = file_operations.reset_categories(self.config)
-                
-                # Update UI
-                self.root.after(0, lambda: self.status_var.set(
-                    f"Reset complete. Analyzing images..."
-                ))
-                
-                # Process new images from the original directory in config with file tracking
-                # Force reprocessing of all images if settings have changed
-                new_stats = self.process_new_images_with_tracking(
-                    self.config,
-                    color_params,
-                    settings_hash,
-                    force_reprocess=True,  # Force reprocessing when resetting categories
-                    directories_after_date=directories_after_date
-                )
-                
-                # Update UI
-                self.root.after(0, lambda: self.status_var.set(
-                    f"Processed new images. Categorizing existing images..."
-                ))
-                
-                # Categorize existing images with file tracking
-                existing_stats = self.process_new_images_with_tracking(
-                    self.config,
-                    color_params,
-                    settings_hash,
-                    force_reprocess=True,  # Force reprocessing when categorizing existing images
-                    directories_after_date=directories_after_date
-                )
+        Run analysis in the background.
+        
+        Images are decoded in worker processes; categories and symlinks are
+        only written once every image has been analyzed, so cancelling
+        leaves the category directories and the ledger as they were.
+        
+        Args:
+            context: Job context (see job_runner)
+            custom_dir: Directory to process instead of the original directory
+            directories_after_date: Only process folders dated on or after this (M-D-YY)
+            color_params: Color detection parameters
+        
+        Returns:
+            dict: {"message": str, "errors": int, "custom_dir": str}
+        """
+        # Save current analysis settings
+        current_settings = {
+            "color_thresholds": self.config["color_thresholds"].copy(),
+            "color_detection_params": self.config["color_detection_params"].copy(),
+            "color_selection_limits": self.config["color_selection_limits"].copy(),
+            "resize_dimensions": self.config["resize_dimensions"]
+        }
+        
+        # Create a settings fingerprint for tracking processed files
+        # (stable across sessions, unlike hash())
+        settings_hash = processed_ledger.settings_fingerprint(current_settings)
+        
+        # Save the directories_after_date to config
+        self.config["last_directories_after_date"] = directories_after_date
+        config_manager.save_config(self.config, self.config_path)
+        
+        if custom_dir:
+            # When using a custom directory, we don't reset categories
+            # We just add the new images to the existing categories
+            reset_stats = {"total_removed": 0, "errors": 0}
+            
+            # Create a copy of the config with the custom directory
+            custom_config = self.config.copy()
+            custom_config["paths"] = self.config["paths"].copy()
+            custom_config["paths"]["original_dir"] = custom_dir
+            
+            # Process images from the custom directory
+            context.status(f"Processing images from custom directory: {custom_dir}...")
+            
+            # Process new images from custom directory with file tracking
+            # Force reprocessing of all images if settings have changed
+            new_stats = self.process_new_images_with_tracking(
+                custom_config,
+                color_params,
+                settings_hash,
+                force_reprocess=True,  # Force reprocessing when using custom directory
+                directories_after_date=directories_after_date,
+                context=context
+            )
             
-            # Save processed files to config
-            self.config["processed_files"] = self.processed_files
-            config_manager.save_config(self.config, self.config_path)
+            # Skip categorizing existing images since we're only processing the custom directory
+            existing_stats = {"processed": 0, "errors": 0, "categories": {}}
+        else:
+            # For the original directory, the analysis replaces the categories.
+            # Instead of removing every symlink first, stale links are pruned
+            # and only changed links are touched.
+            reset_stats = {"total_removed": 0, "errors": 0}
             
             # Update UI
-            self.root.after(0, lambda: self.status_var.set(
-                f"Analysis complete"
-            ))
-            
-            # Prepare result message
-            message = "Analysis completed.\n\n"
-            
-            # Add information about the directory used
-            custom_dir = self.new_images_dir_var.get().strip()
-            if custom_dir:
-                message += f"Processed images from custom directory:\n{custom_dir}\n\n"
-            
-            if new_stats["processed"] > 0:
-                message += f"Processed {new_stats['processed']} new images.\n"
-            
-            if existing_stats["processed"] > 0:
-                message += f"Categorized {existing_stats['processed']} existing images.\n"
-            
-            message += "\nCategory counts:\n"
-            
-            # Combine category counts
-            category_counts = {}
-            for category in self.config["color_thresholds"]:
-                count = (new_stats["categories"].get(category, 0) +
-                        existing_stats["categories"].get(category, 0))
-                category_counts[category] = count
-                message += f"  {category}: {count} images\n"
-            
-            # Show result
-            total_errors = (reset_stats["errors"] + new_stats["errors"] +
-                           existing_stats["errors"])
-            
-            if total_errors > 0:
-                message += f"\nCompleted with {total_errors} errors. See log for details."
-                self.root.after(0, lambda: messagebox.showwarning(
-                    "Analysis Complete",
-                    message
-                ))
-            else:
-                self.root.after(0, lambda: messagebox.showinfo(
-                    "Analysis Complete",
-                    message
-                ))
-                
-            # Clear the custom directory field after processing
-            if custom_dir:
-                self.root.after(0, lambda: self.new_images_dir_var.set(""))
+            context.status("Analyzing images...")
             
-        except Exception as e:
-            logger.error(f"Error running analysis: {e}")
-            self.root.after(0, lambda: self.status_var.set(f"Error running analysis: {e}"))
-            self.root.after(0, lambda: messagebox.showerror(
+            # Process new images from the original directory in config with file tracking
+            # Force reprocessing of all images if settings have changed
+            new_stats = self.process_new_images_with_tracking(
+                self.config,
+                color_params,
+                settings_hash,
+                force_reprocess=True,  # Force reprocessing when resetting categories
+                directories_after_date=directories_after_date,
+                prune=True,
+                context=context
+            )
+            
+            # Every image was categorized in the pass above
+            existing_stats = {"processed": 0, "errors": 0, "categories": {}}
+        
+        # Commit the remaining processed file records
+        self.processed_ledger.flush()
+        
+        # Record the settings only once the analysis has been applied
+        self.config["last_analysis_settings"] = current_settings.copy()
+        # Add timestamp to last_analysis_settings but not to the hash
+        self.config["last_analysis_settings"]["timestamp"] = time.time()
+        config_manager.save_config(self.config, self.config_path)
+        
+        # Prepare result message
+        message = "Analysis completed.\n\n"
+        
+        # Add information about the directory used
+        if custom_dir:
+            message += f"Processed images from custom directory:\n{custom_dir}\n\n"
+        
+        if new_stats["processed"] > 0:
+            message += f"Processed {new_stats['processed']} new images.\n"
+        
+        if existing_stats["processed"] > 0:
+            message += f"Categorized {existing_stats['processed']} existing images.\n"
+        
+        message += "\nCategory counts:\n"
+        
+        # Combine category counts (full category sizes when they were reconciled)
+        category_counts = {}
+        new_counts = new_stats.get("category_totals", new_stats["categories"])
+        for category in self.config["color_thresholds"]:
+            count = (new_counts.get(category, 0) +
+                    existing_stats["categories"].get(category, 0))
+            category_counts[category] = count
+            message += f"  {category}: {count} images\n"
+        
+        total_errors = (reset_stats["errors"] + new_stats["errors"] +
+                       existing_stats["errors"])
+        if total_errors > 0:
+            message += f"\nCompleted with {total_errors} errors. See log for details."
+        
+        return {"message": message, "errors": total_errors, "custom_dir": custom_dir}
+    
+    def _run_analysis_finished(self, event):
+        """
+        Show the result of an analysis run.
+        
+        Args:
+            event: Final job event
+        """
+        if event["type"] == "cancelled":
+            self.status_var.set("Analysis cancelled; categories were left unchanged")
+            return
+        if event["type"] == "error":
+            self.status_var.set(f"Error running analysis: {event['error']}")
+            messagebox.showerror(
                 "Error",
-                f"An error occurred while running analysis:\n\n{e}"
-            ))
+                f"An error occurred while running analysis:\n\n{event['error']}"
+            )
+            return
         
-        finally:
-            # Re-enable UI
-            self.root.after(0, self.enable_ui)
+        result = event["result"]
+        self.status_var.set(f"Analysis complete in {job_runner.format_duration(event['elapsed'])}")
+        if result["errors"] > 0:
+            messagebox.showwarning("Analysis Complete", result["message"])
+        else:
+            messagebox.showinfo("Analysis Complete", result["message"])
+        
+        # Clear the custom directory field after processing
+        if result["custom_dir"]:
+            self.new_images_dir_var.set("")
     
     def add_hue_range(self, color):
         """
@@ -1843,6 +1963,23 @@ class ColorControlPanel:
             self.color_picker_selection,
             x1, y1, x2, y2
         )
+        
+        # Update the color information live, once the pending motion events are handled
+        if self.color_picker_update_id is None:
+            self.color_picker_update_id = self.root.after_idle(self.update_color_picker_drag)
+    
+    def update_color_picker_drag(self):
+        """
+        Analyze the color picker selection while it is still being dragged.
+        """
+        self.color_picker_update_id = None
+        
+        if not self.color_picker_active:
+            return
+        
+        x1, y1 = self.color_picker_start_pos
+        x2, y2 = self.color_picker_current_pos
+        self.analyze_selected_region(min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
     
     def on_color_picker_end(self, event):
         """
@@ -1857,6 +1994,11 @@ class ColorControlPanel:
         # End selection
         self.color_picker_active = False
         
+        # The final analysis below supersedes any pending live update
+        if self.color_picker_update_id is not None:
+            self.root.after_cancel(self.color_picker_update_id)
+            self.color_picker_update_id = None
+        
         # Get selection coordinates
         x1, y1 = self.color_picker_start_pos
         x2, y2 = self.color_picker_current_pos
@@ -1925,8 +2067,8 @@ class ColorControlPanel:
             # Get color parameters
             color_params = self.get_color_params()
             
-            # Analyze region with color parameters
-            result = color_analysis.analyze_region(region, color_params)
+            # Analyze region with the same lookup table as whole images
+            result = color_analysis.analyze_region(region, color_params, color_lut.get_lut(color_params))
             
             # Update color information
             self.update_color_information(result)
@@ -2129,50 +2271,12 @@ class ColorControlPanel:
         self.current_image_path = self.sample_images[index]
         
         try:
-            # Load and display image
-            img = Image.open(self.current_image_path)
-            
-            # Resize to fit the canvas while maintaining aspect ratio
-            img_width, img_height = img.size
-            
-            # Get canvas dimensions
-            canvas_width = self.color_picker_canvas.winfo_width()
-            canvas_height = self.color_picker_canvas.winfo_height()
-            
-            # If the canvas hasn't been fully initialized yet, use default dimensions
-            if canvas_width < 10 or canvas_height < 10:
-                canvas_width = 600
-                canvas_height = 400
-            
-            # Calculate scale factor
-            scale = min(canvas_width / img_width, canvas_height / img_height)
-            
-            # Calculate new dimensions
-            new_width = int(img_width * scale)
-            new_height = int(img_height * scale)
-            
-            # Resize image
-            img = img.resize((new_width, new_height), Image.LANCZOS)
+            canvas_size = self.get_color_picker_canvas_size()
             
-            # Convert to PhotoImage
-            self.current_overlay_image = img
-            self.current_overlay_tk = ImageTk.PhotoImage(img)
-            
-            # Clear canvas
-            self.color_picker_canvas.delete("all")
-            
-            # Create image on canvas
-            self.color_picker_canvas.create_image(
-                canvas_width // 2,
-                canvas_height // 2,
-                image=self.current_overlay_tk,
-                anchor=tk.CENTER
-            )
-            
-            # Update counter label
-            self.color_picker_counter_label.config(
-                text=f"{self.current_image_index + 1}/{len(self.sample_images)}"
-            )
+            # Load from the shared thumbnail cache, resized to fit the canvas
+            # while maintaining aspect ratio
+            img = thumbnail_cache.load_thumbnail(self.current_image_path, canvas_size).convert("RGB")
+            self.display_color_picker_image(img, canvas_size)
             
             self.status_var.set(f"Showing image: {os.path.basename(self.current_image_path)}")
             
@@ -2180,6 +2284,53 @@ class ColorControlPanel:
             logger.error(f"Error showing image in color picker: {e}")
             self.status_var.set(f"Error showing image in color picker: {e}")
     
+    def get_color_picker_canvas_size(self):
+        """
+        Get the size images are fitted to in the color picker.
+        
+        Returns:
+            tuple: (width, height) of the canvas
+        """
+        canvas_width = self.color_picker_canvas.winfo_width()
+        canvas_height = self.color_picker_canvas.winfo_height()
+        
+        # If the canvas hasn't been fully initialized yet, use default dimensions
+        if canvas_width < 10 or canvas_height < 10:
+            canvas_width = 600
+            canvas_height = 400
+        
+        return (canvas_width, canvas_height)
+    
+    def display_color_picker_image(self, img, canvas_size):
+        """
+        Show a fitted RGB image of the current image in the color picker.
+        
+        Args:
+            img: Image already fitted to the canvas
+            canvas_size: (width, height) of the canvas
+        """
+        canvas_width, canvas_height = canvas_size
+        
+        # Convert to PhotoImage
+        self.current_overlay_image = img
+        self.current_overlay_tk = ImageTk.PhotoImage(img)
+        
+        # Clear canvas
+        self.color_picker_canvas.delete("all")
+        
+        # Create image on canvas
+        self.color_picker_canvas.create_image(
+            canvas_width // 2,
+            canvas_height // 2,
+            image=self.current_overlay_tk,
+            anchor=tk.CENTER
+        )
+        
+        # Update counter label
+        self.color_picker_counter_label.config(
+            text=f"{self.current_image_index + 1}/{len(self.sample_images)}"
+        )
+    
     def create_limits_tab_ui(self):
         """
         Create the UI for the color selection limits tab.
@@ -2212,13 +2363,6 @@ class ColorControlPanel:
                 "without_white_gray_black": {"min_colors": 1, "max_colors": 3}
             }
         
-        # Initialize processed files structure
-        if "processed_files" not in self.config:
-            self.config["processed_files"] = {}
-        elif not isinstance(self.config["processed_files"], dict):
-            # Convert old format to new format if needed
-            self.config["processed_files"] = {}
-        
         # Create frame for with_white_gray_black settings
         with_wgb_frame = ttk.LabelFrame(
             main_frame,
@@ -2418,8 +2562,8 @@ class ColorControlPanel:
         # Save configuration
         config_manager.save_config(self.config, self.config_path)
         
-        # Re-analyze current image
-        self.analyze_current_image()
+        # Re-apply limits to the current image
+        self.recategorize_current_image()
         
         # Show success message
         messagebox.showinfo(
@@ -2443,56 +2587,120 @@ class ColorControlPanel:
         if not result:
             return
         
-        # Disable UI during restart
-        self.disable_ui()
         self.status_var.set("Restarting sorting...")
+        self.start_job("restart sorting", self._restart_sorting_job, self._restart_sorting_finished)
+    
+    def _restart_sorting_job(self, context):
+        """
+        Restart sorting in the background.
         
-        # Run restart in a separate thread
-        thread = threading.Thread(target=self._restart_sorting_thread)
-        thread.daemon = True
-        thread.start()
+        Args:
+            context: Job context (see job_runner)
+        
+        Returns:
+            dict: Restart statistics
+        """
+        # Remove symlinks from both color folders and the main folder in one go
+        with context.critical():
+            return file_operations.restart_sorting(self.config)
     
-    def _restart_sorting_thread(self):
+    def _restart_sorting_finished(self, event):
         """
-        Restart sorting in a separate thread.
+        Show the result of a sorting restart.
+        
+        Args:
+            event: Final job event
         """
-        try:
-            # Use the restart_sorting function to remove symlinks from both color folders and main folder
-            stats = file_operations.restart_sorting(self.config)
-            
-            # Update UI
-            self.root.after(0, lambda: self.status_var.set(
-                f"Restart complete: {stats['total_removed']} symlinks removed, "
-                f"{stats['errors']} errors"
-            ))
-            
-            # Show result
-            if stats["errors"] > 0:
-                self.root.after(0, lambda: messagebox.showwarning(
-                    "Restart Complete",
-                    f"Restart completed with {stats['errors']} errors.\n\n"
-                    f"See log for details."
-                ))
-            else:
-                self.root.after(0, lambda: messagebox.showinfo(
-                    "Restart Complete",
-                    f"Restart completed successfully.\n\n"
-                    f"{stats['total_removed']} symlinks removed."
-                ))
-            
-        except Exception as e:
-            logger.error(f"Error restarting sorting: {e}")
-            self.root.after(0, lambda: self.status_var.set(f"Error restarting sorting: {e}"))
-            self.root.after(0, lambda: messagebox.showerror(
+        if event["type"] == "error":
+            self.status_var.set(f"Error restarting sorting: {event['error']}")
+            messagebox.showerror(
                 "Error",
-                f"An error occurred while restarting sorting:\n\n{e}"
-            ))
+                f"An error occurred while restarting sorting:\n\n{event['error']}"
+            )
+            return
+        if event["type"] != "done":
+            return
+        
+        stats = event["result"]
+        self.status_var.set(
+            f"Restart complete: {stats['total_removed']} symlinks removed, "
+            f"{stats['errors']} errors"
+        )
+        if stats["errors"] > 0:
+            messagebox.showwarning(
+                "Restart Complete",
+                f"Restart completed with {stats['errors']} errors.\n\n"
+                f"See log for details."
+            )
+        else:
+            messagebox.showinfo(
+                "Restart Complete",
+                f"Restart completed successfully.\n\n"
+                f"{stats['total_removed']} symlinks removed."
+            )
+    
+    def start_job(self, name, func, finished_callback, *args):
+        """
+        Run a long operation through the job runner with the UI disabled.
         
-        finally:
-            # Re-enable UI
-            self.root.after(0, self.enable_ui)
+        Args:
+            name: Name of the job
+            func: Job function, called as func(context, *args)
+            finished_callback: Called in the UI thread with the final event
+            *args: Arguments for the job function
+        """
+        if self.job_runner.busy:
+            messagebox.showwarning("Busy", "Another operation is still running.")
+            return
+        
+        self.disable_ui()
+        self.cancel_button.state(["!disabled"])
+        self.job_progress_var.set(0.0)
+        self.job_finished_callback = finished_callback
+        
+        if not self.job_runner.start(name, func, *args):
+            self._finish_job()
+            return
+        self.root.after(job_runner.POLL_INTERVAL_MS, self._poll_job)
+    
+    def _poll_job(self):
+        """
+        Show the events of the running job; called on a fixed cadence.
+        """
+        for event in self.job_runner.poll():
+            if event["type"] == "status":
+                self.status_var.set(event["message"])
+            elif event["type"] == "progress":
+                self.status_var.set(job_runner.format_progress(event))
+                if event["total"]:
+                    self.job_progress_var.set(100.0 * event["done"] / event["total"])
+            else:
+                callback = self.job_finished_callback
+                self._finish_job()
+                if callback is not None:
+                    callback(event)
+                return
+        
+        self.root.after(job_runner.POLL_INTERVAL_MS, self._poll_job)
+    
+    def _finish_job(self):
+        """
+        Restore the UI after a job ended.
+        """
+        self.job_finished_callback = None
+        self.job_progress_var.set(0.0)
+        self.enable_ui()
+        self.cancel_button.state(["disabled"])
+    
+    def cancel_job(self):
+        """
+        Ask the running job to stop.
+        """
+        if self.job_runner.cancel():
+            self.cancel_button.state(["disabled"])
+            self.status_var.set("Cancelling...")
 
-    def process_new_images_with_tracking(self, config, color_params, settings_hash, force_reprocess=False, directories_after_date=None):
+    def process_new_images_with_tracking(self, config, color_params, settings_hash, force_reprocess=False, directories_after_date=None, prune=False, context=None):
         """
         Process new images with tracking of processed files.
         
@@ -2501,6 +2709,12 @@ class ColorControlPanel:
             color_params: Color detection parameters
             settings_hash: Hash of the current analysis settings
             force_reprocess: If True, reprocess all images even if they've been processed before
+            prune: If True, the processed images are the complete contents of the
+                   category directories: other links are removed and links in the
+                   wrong category are retargeted
+            context: Optional job context (see job_runner). Decoding then runs in
+                     its worker processes and reports progress, and the job can be
+                     cancelled until the results are written.
             
         Returns:
             dict: Statistics about the processing
@@ -2574,22 +2788,20 @@ class ColorControlPanel:
                 "color_selection_limits": color_limits,
                 "resize_dimensions": config["resize_dimensions"]
             }
-            settings_hash = str(hash(str(settings_digest)))
+            settings_hash = processed_ledger.settings_fingerprint(settings_digest)
             
             # Track which files have been processed with these exact settings
+            processed_paths = self.processed_ledger.get_processed_paths(settings_hash)
             for image_path in image_files:
-                if settings_hash not in self.processed_files:
-                    self.processed_files[settings_hash] = {}
-                
                 # Check if this file has been processed with these settings
-                if image_path not in self.processed_files[settings_hash]:
+                if image_path not in processed_paths:
                     unprocessed_files.append(image_path)
                     logger.debug(f"File needs processing: {image_path}")
                 else:
                     logger.debug(f"Skipping already processed file: {image_path}")
         
         # If all files have been processed with these settings, return empty stats
-        if not unprocessed_files:
+        if not unprocessed_files and not prune:
             logger.info(f"All files already processed with current settings")
             return {"processed": 0, "errors": 0, "categories": {}}
         
@@ -2600,50 +2812,103 @@ class ColorControlPanel:
             "categories": {}
         }
         
-        # Process each unprocessed image
+        # Stage one: raw category counts. These only depend on the detection
+        # parameters, so a threshold or limit change reuses the counts already
+        # held in memory instead of decoding every image again
+        resize_dimensions = tuple(config["resize_dimensions"])
+        analysis_hash = color_analysis.percentages_settings_hash(resize_dimensions, color_params)
+        library_counts = self.library_counts
+        if (library_counts is not None
+                and library_counts.matches(resize_dimensions, color_params)
+                and set(unprocessed_files).issubset(library_counts.image_paths)):
+            # Stage two: categories for every image from the counts matrix
+            results = library_counts.categorize(thresholds, color_limits, color_params)
+        else:
+            # Percentages recorded by an earlier session with the same detection
+            # settings and hue weights only need the current thresholds and
+            # limits applied
+            recorded = self.processed_ledger.get_percentages(analysis_hash, unprocessed_files)
+            results = {
+                image_path: {
+                    "categories": color_analysis.apply_thresholds(color_percentages, thresholds, color_limits),
+                    "color_percentages": color_percentages
+                }
+                for image_path, color_percentages in recorded.items()
+            }
+            logger.info(f"Reusing recorded color percentages for {len(recorded)} images")
+            
+            remaining_files = [image_path for image_path in unprocessed_files if image_path not in recorded]
+            if remaining_files:
+                progress_callback = None
+                if context is not None:
+                    context.check_cancelled()
+                    progress_callback = lambda done, total: context.progress("Decoding images", done, total)
+                library_counts = LibraryCounts.build(
+                    remaining_files,
+                    resize_dimensions,
+                    color_params,
+                    color_lut.get_lut(color_params),
+                    progress_callback=progress_callback,
+                    jobs=context.jobs if context is not None else 1
+                )
+                self.library_counts = library_counts
+                
+                # Stage two: categories for every image from the counts matrix
+                results.update(library_counts.categorize(thresholds, color_limits, color_params))
+        
+        # Everything below writes results: a cancellation waits until it is done
+        if context is not None:
+            context.check_cancelled()
+            with context.critical():
+                return self._apply_analysis_results(
+                    config, unprocessed_files, results, settings_hash, analysis_hash,
+                    stats, prune, newest_dir_date, context
+                )
+        return self._apply_analysis_results(
+            config, unprocessed_files, results, settings_hash, analysis_hash,
+            stats, prune, newest_dir_date
+        )
+    
+    def _apply_analysis_results(self, config, unprocessed_files, results, settings_hash, analysis_hash,
+                                stats, prune, newest_dir_date, context=None):
+        """
+        Record analysis results and bring the category symlinks up to date.
+        
+        Args:
+            config: Configuration dictionary
+            unprocessed_files: Paths of the analyzed images
+            results: Categorization result for each image path
+            settings_hash: Hash of the current analysis settings
+            analysis_hash: Hash of the detection settings the percentages belong to
+            stats: Statistics to update
+            prune: If True, the images are the complete contents of the category directories
+            newest_dir_date: Newest folder date seen so far, or None
+            context: Optional job context for progress reporting
+            
+        Returns:
+            dict: Statistics about the processing
+        """
+        category_counts = {}
+        
+        # Process each unprocessed image; symlinks are applied in one pass afterwards
+        assignments = []
         for image_path in unprocessed_files:
             try:
-                # Get filename for symlink creation
-                filename = os.path.basename(image_path)
+                # Get the categorization result
+                if image_path not in results:
+                    raise ValueError("image could not be analyzed")
+                result = results[image_path]
+                assignments.append((image_path, result["categories"]))
                 
-                # Analyze and categorize image
-                result = color_analysis.analyze_and_categorize(
+                # Add to the processed files ledger (committed in batches)
+                self.processed_ledger.record(
+                    settings_hash,
                     image_path,
-                    thresholds,
-                    tuple(config["resize_dimensions"]),
-                    color_params,
-                    color_limits
+                    result["categories"],
+                    result["color_percentages"],
+                    analysis_hash=analysis_hash
                 )
                 
-                # Create symlinks for each category
-                for category in result["categories"]:
-                    # Get color directory
-                    color_dir = os.path.join(base_dir, config["paths"]["color_dirs"][category])
-                    
-                    # Create symlink
-                    symlink_path = os.path.join(color_dir, filename)
-                    
-                    # Check if symlink already exists
-                    if os.path.exists(symlink_path):
-                        # Skip if already exists
-                        continue
-                    
-                    # Create symlink
-                    os.symlink(image_path, symlink_path)
-                    
-                    # Update stats
-                    stats["categories"][category] = stats["categories"].get(category, 0) + 1
-                
-                # Add to processed files list with timestamp and result
-                self.processed_files[settings_hash][image_path] = {
-                    'timestamp': time.time(),
-                    'categories': list(result["categories"]),
-                    'color_percentages': result["color_percentages"]
-                }
-                # Save the updated processed files list to config
-                self.config["processed_files"] = self.processed_files
-                config_manager.save_config(self.config, self.config_path)
-                
                 # Update stats
                 stats["processed"] += 1
                 
@@ -2663,6 +2928,9 @@ class ColorControlPanel:
                     if newest_dir_date is None or dir_date > newest_dir_date:
                         newest_dir_date = dir_date
                 
+                for category in result["categories"]:
+                    category_counts[category] = category_counts.get(category, 0) + 1
+                
                 # Log progress
                 if stats["processed"] % 100 == 0:
                     logger.info(f"Processed {stats['processed']} images")
@@ -2670,8 +2938,25 @@ class ColorControlPanel:
             except Exception as e:
                 logger.error(f"Error processing image {image_path}: {e}")
                 stats["errors"] += 1
+            
+            if context is not None:
+                context.progress("Categorizing", stats["processed"] + stats["errors"],
+                                 len(unprocessed_files), category_counts)
+        
+        # Bring the category directories up to date, touching only changed links
+        if context is not None:
+            context.status("Updating category links...")
+        try:
+            reconcile_stats = symlink_reconciler.reconcile_categories(config, assignments, prune)
+            stats["categories"] = reconcile_stats["categories"]
+            stats["category_totals"] = reconcile_stats["category_totals"]
+            stats["errors"] += reconcile_stats["errors"]
+        except Exception as e:
+            logger.error(f"Error updating category symlinks: {e}")
+            stats["errors"] += 1
         
         logger.info(f"Processing complete: {stats['processed']} images processed, {stats['errors']} errors")
+        self.processed_ledger.flush()
         
         # Update the directories_after_date field with the newest directory date we found
         if newest_dir_date:
@@ -2704,8 +2989,8 @@ class ColorControlPanel:
         # Save configuration
         config_manager.save_config(self.config, self.config_path)
         
-        # Re-analyze current image
-        self.analyze_current_image()
+        # Re-apply limits to the current image
+        self.recategorize_current_image()
         
         # Show success message
         messagebox.showinfo(
@@ -3043,82 +3328,15 @@ class ColorControlPanel:
         Returns:
             datetime.date: The parsed date, or None if the format doesn't match
         """
-        import datetime
-        import traceback
-        import time
-        
-        # Generate a unique ID for this operation
-        operation_id = f"parse_date_{folder_name}"
-        
-        # Start timing
-        start_time = time.time()
-        
-        logger.debug(f"[{operation_id}] Parsing date from folder name: {folder_name}")
-        
-        # Check if folder_name is valid
-        if not folder_name or not isinstance(folder_name, str):
-            logger.warning(f"[{operation_id}] Invalid folder name: {folder_name}")
-            return None
-        
-        # Split by '-' to handle variable-length month and day parts
-        parts = folder_name.split('-')
-        
-        # Check if we have the expected format (lbm-M-D-YY)
-        if len(parts) == 4 and parts[0] == 'lbm':
-            try:
-                # Validate each part
-                if not parts[1].isdigit() or not parts[2].isdigit() or not parts[3].isdigit():
-                    logger.warning(f"[{operation_id}] Non-numeric date parts in folder name: {folder_name}")
-                    return None
-                
-                month = int(parts[1])
-                day = int(parts[2])
-                year = int(parts[3])
-                
-                # Basic validation
-                if month < 1 or month > 12:
-                    logger.warning(f"[{operation_id}] Invalid month ({month}) in folder name: {folder_name}")
-                    return None
-                
-                if day < 1 or day > 31:
-                    logger.warning(f"[{operation_id}] Invalid day ({day}) in folder name: {folder_name}")
-                    return None
-                
-                # Assume 2-digit year format (e.g., 25 -> 2025)
-                if year < 100:
-                    year += 2000
-                
-                # Create date object with additional validation
-                try:
-                    date_obj = datetime.date(year, month, day)
-                    logger.debug(f"[{operation_id}] Successfully parsed date: {date_obj}")
-                    return date_obj
-                except ValueError as e:
-                    # This catches invalid dates like February 30
-                    logger.warning(f"[{operation_id}] Invalid date combination in folder name: {folder_name}, error: {e}")
-                    return None
-                
-            except (ValueError, IndexError) as e:
-                logger.warning(f"[{operation_id}] Failed to parse date from folder name: {folder_name}, error: {e}")
-                logger.debug(traceback.format_exc())
-                return None
-            except Exception as e:
-                logger.error(f"[{operation_id}] Unexpected error parsing date from folder name: {folder_name}, error: {e}")
-                logger.debug(traceback.format_exc())
-                return None
-            
-            # End timing and log duration
-            end_time = time.time()
-            duration_ms = (end_time - start_time) * 1000  # Convert to milliseconds
-            logger.debug(f"[{operation_id}] Parsing completed in {duration_ms:.2f} ms")
-        else:
-            logger.debug(f"[{operation_id}] Folder name does not match expected format (lbm-M-D-YY): {folder_name}")
-            return None
+        return folder_catalog.parse_folder_date(folder_name, lbm_only=True)
     
     def get_recent_folders(self, base_dir, days_back=7):
         """
         Get folders that have dates within the specified number of days from today.
         
+        Uses the shared folder catalog, which only lists base_dir again
+        when it changes and finds the folders by binary search.
+        
         Args:
             base_dir: Base directory to search in
             days_back: Number of days to look back
@@ -3127,101 +3345,15 @@ class ColorControlPanel:
             list: List of folder paths sorted by date (most recent first)
         """
         import datetime
-        import os
-        import traceback
-        
-        # Generate a unique ID for this operation to track it in logs
-        operation_id = f"get_folders_{int(datetime.datetime.now().timestamp())}"
-        
-        # Start timing
-        start_time = time.time()
-        
-        logger.debug(f"[{operation_id}] Starting get_recent_folders with base_dir={base_dir}, days_back={days_back}")
-        
-        today = datetime.date.today()
-        cutoff_date = today - datetime.timedelta(days=days_back)
-        
-        logger.debug(f"[{operation_id}] Looking for folders with dates >= {cutoff_date}")
         
-        # Get all subdirectories
-        folders = []
-        try:
-            # Check if base_dir exists
-            if not os.path.exists(base_dir):
-                logger.error(f"[{operation_id}] Base directory does not exist: {base_dir}")
-                return []
-                
-            # Check if base_dir is a directory
-            if not os.path.isdir(base_dir):
-                logger.error(f"[{operation_id}] Path is not a directory: {base_dir}")
-                return []
-            
-            # List directory contents
-            logger.debug(f"[{operation_id}] Listing contents of {base_dir}")
-            items = os.listdir(base_dir)
-            logger.debug(f"[{operation_id}] Found {len(items)} items in {base_dir}")
-            
-            # Add a safety limit to prevent processing too many folders
-            max_items = 500  # Set a reasonable limit
-            if len(items) > max_items:
-                logger.warning(f"[{operation_id}] Too many items ({len(items)}) in directory, limiting to {max_items}")
-                items = items[:max_items]
-            
-            # Process each item
-            for item_index, item in enumerate(items):
-                # Log progress for large directories
-                if item_index % 20 == 0 and item_index > 0:
-                    logger.debug(f"[{operation_id}] Processed {item_index}/{len(items)} items")
-                
-                full_path = os.path.join(base_dir, item)
-                
-                # Check if it's a directory
-                if os.path.isdir(full_path):
-                    # Parse date from folder name
-                    try:
-                        folder_date = self.parse_folder_date(item)
-                        if folder_date:
-                            logger.debug(f"[{operation_id}] Parsed date {folder_date} from folder {item}")
-                            if folder_date >= cutoff_date:
-                                logger.debug(f"[{operation_id}] Folder {item} with date {folder_date} is within range")
-                                folders.append((full_path, folder_date))
-                            else:
-                                logger.debug(f"[{operation_id}] Folder {item} with date {folder_date} is too old")
-                        else:
-                            logger.debug(f"[{operation_id}] Could not parse date from folder {item}")
-                    except Exception as e:
-                        logger.error(f"[{operation_id}] Error parsing date for folder {item}: {e}")
-                        logger.error(traceback.format_exc())
-                        # Continue processing other folders
-                        continue
-                else:
-                    logger.debug(f"[{operation_id}] Skipping non-directory item: {item}")
-        except Exception as e:
-            logger.error(f"[{operation_id}] Error listing directories in {base_dir}: {e}")
-            logger.error(traceback.format_exc())
+        if not os.path.isdir(base_dir):
+            logger.error(f"Base directory does not exist or is not a directory: {base_dir}")
             return []
         
-        # Sort by date (most recent first)
-        logger.debug(f"[{operation_id}] Sorting {len(folders)} folders by date")
-        folders.sort(key=lambda x: x[1], reverse=True)
-        
-        logger.debug(f"[{operation_id}] Found {len(folders)} folders with valid dates within range")
-        if folders:
-            for i, (path, date) in enumerate(folders[:5]):  # Log only the first 5 to avoid log spam
-                logger.debug(f"[{operation_id}]   {i+1}. {os.path.basename(path)} - {date}")
-            if len(folders) > 5:
-                logger.debug(f"[{operation_id}]   ... and {len(folders) - 5} more")
-        
-        # Return just the paths
-        result = [folder[0] for folder in folders]
-        
-        # End timing and log duration
-        end_time = time.time()
-        duration_sec = end_time - start_time
-        logger.debug(f"[{operation_id}] get_recent_folders completed in {duration_sec:.2f} seconds")
-        logger.debug(f"[{operation_id}] Returning {len(result)} folder paths")
-        
-        return result
+        cutoff_date = datetime.date.today() - datetime.timedelta(days=days_back)
+        folders = folder_catalog.get_catalog(base_dir, lbm_only=True).folders_since(cutoff_date)
+        logger.debug(f"Found {len(folders)} folders dated on or after {cutoff_date} in {base_dir}")
+        return folders
     
     def add_folder_to_modified(self, folder_path):
         """
@@ -3248,37 +3380,11 @@ class ColorControlPanel:
     
     def cleanup_processed_files(self):
         """
-        Clean up old processed file entries to prevent config file from growing too large.
+        Clean up old processed file entries to keep the ledger from growing without bound.
         Only keeps entries from the last 30 days.
         """
-        current_time = time.time()
         max_age = 30 * 24 * 60 * 60  # 30 days in seconds
-        
-        if not isinstance(self.processed_files, dict):
-            self.processed_files = {}
-            return
-            
-        for settings_hash in list(self.processed_files.keys()):
-            if not isinstance(self.processed_files[settings_hash], dict):
-                self.processed_files[settings_hash] = {}
-                continue
-                
-            # Clean up old entries for each settings hash
-            for file_path in list(self.processed_files[settings_hash].keys()):
-                entry = self.processed_files[settings_hash][file_path]
-                if isinstance(entry, dict) and 'timestamp' in entry:
-                    if current_time - entry['timestamp'] > max_age:
-                        del self.processed_files[settings_hash][file_path]
-                else:
-                    # Remove invalid entries
-                    del self.processed_files[settings_hash][file_path]
-            
-            # Remove empty settings hashes
-            if not self.processed_files[settings_hash]:
-                del self.processed_files[settings_hash]
-        # Save the cleaned up processed files list
-        self.config["processed_files"] = self.processed_files
-        config_manager.save_config(self.config, self.config_path)
+        self.processed_ledger.cleanup(max_age)
     
     def load_favorites(self):
         """
@@ -3631,63 +3737,10 @@ class ColorControlPanel:
                     )
                     return
                 
-                # Get recent folders based on date naming convention - CRITICAL SECTION
-                # This is where the app might hang, so we'll add extra logging and error handling
+                # Get recent folders based on date naming convention
                 try:
-                    logger.debug(f"[{operation_id}] Starting to get recent folders from {lbm_dirs_path} with days_back={days_back}")
-                    # Add a timeout mechanism for the get_recent_folders call
-                    import threading
-                    import queue
-                    
-                    result_queue = queue.Queue()
-                    
-                    def get_folders_with_timeout():
-                        try:
-                            folders = self.get_recent_folders(lbm_dirs_path, days_back)
-                            result_queue.put(("success", folders))
-                        except Exception as e:
-                            logger.error(f"[{operation_id}] Error in get_recent_folders: {e}")
-                            logger.error(traceback.format_exc())
-                            result_queue.put(("error", str(e)))
-                    
-                    # Start the folder retrieval in a separate thread
-                    folder_thread = threading.Thread(target=get_folders_with_timeout)
-                    folder_thread.daemon = True
-                    folder_thread.start()
-                    
-                    # Wait for the thread to complete with a timeout
-                    folder_thread.join(timeout=5)  # 5 second timeout
-                    
-                    if folder_thread.is_alive():
-                        # Thread is still running after timeout
-                        logger.warning(f"[{operation_id}] get_recent_folders timed out after 5 seconds")
-                        messagebox.showwarning(
-                            "Operation Timeout",
-                            f"The folder search operation timed out. This might be due to a large number of folders or system load.\n\nTry again with a smaller number of days."
-                        )
-                        return
-                    
-                    # Get the result from the queue
-                    if result_queue.empty():
-                        logger.error(f"[{operation_id}] No result from get_recent_folders thread")
-                        messagebox.showerror(
-                            "Error",
-                            "Failed to retrieve folder information. Please try again."
-                        )
-                        return
-                    
-                    status, result = result_queue.get()
-                    if status == "error":
-                        logger.error(f"[{operation_id}] Error from get_recent_folders: {result}")
-                        messagebox.showerror(
-                            "Error",
-                            f"An error occurred while retrieving folders: {result}"
-                        )
-                        return
-                    
-                    recent_folders = result
+                    recent_folders = self.get_recent_folders(lbm_dirs_path, days_back)
                     logger.debug(f"[{operation_id}] Successfully retrieved {len(recent_folders)} folders")
-                    
                 except Exception as e:
                     logger.error(f"[{operation_id}] Error in folder retrieval process: {e}")
                     logger.error(traceback.format_exc())
@@ -31,7 +31,7 @@ from PIL import Image, ImageTk, ImageDraw
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import utility modules
-from utils import config_manager, color_analysis
+from utils import config_manager, color_analysis, color_lut
 
 # Setup logging
 logging.basicConfig(
@@ -73,6 +73,7 @@ class ColorPicker:
         self.start_pos = None
         self.current_pos = None
         self.selection_rect = None
+        self.drag_update_id = None
         
         # Create UI
         self.create_ui()
@@ -331,6 +332,23 @@ class ColorPicker:
             self.selection_rect,
             x1, y1, x2, y2
         )
+        
+        # Update the color information live, once the pending motion events are handled
+        if self.drag_update_id is None:
+            self.drag_update_id = self.root.after_idle(self.update_drag_selection)
+    
+    def update_drag_selection(self):
+        """
+        Analyze the selection while it is still being dragged.
+        """
+        self.drag_update_id = None
+        
+        if not self.selection_active:
+            return
+        
+        x1, y1 = self.start_pos
+        x2, y2 = self.current_pos
+        self.analyze_selected_region(min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
     
     def on_mouse_up(self, event):
         """
@@ -345,6 +363,11 @@ class ColorPicker:
         # End selection
         self.selection_active = False
         
+        # The final analysis below supersedes any pending live update
+        if self.drag_update_id is not None:
+            self.root.after_cancel(self.drag_update_id)
+            self.drag_update_id = None
+        
         # Get selection coordinates
         x1, y1 = self.start_pos
         x2, y2 = self.current_pos
@@ -410,8 +433,10 @@ class ColorPicker:
             logger.debug(f"Selected region: ({x1}, {y1}) to ({x2}, {y2})")
             logger.debug(f"Region size: {region.size}")
             
-            # Analyze region
-            result = color_analysis.analyze_region(region)
+            # Analyze region with the configured parameters and the same
+            # lookup table the control panel and CLI categorize images with
+            color_params = self.config.get("color_detection_params")
+            result = color_analysis.analyze_region(region, color_params, color_lut.get_lut(color_params))
             
             # Update color information
             self.update_color_information(result)
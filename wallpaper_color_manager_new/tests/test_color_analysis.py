@@ -0,0 +1,158 @@
+"""
+Tests for the vectorized pixel categorization in utils.color_analysis.
+
+categorize_pixels_multi must give every pixel exactly the categories
+categorize_pixel_multi gives it, for the default detection parameters and
+for the ones configured in config.json. What users see (the weighted
+percentages and categories of analyze_image_multi) must match a per-pixel
+reference, including after the hue weights change.
+"""
+
+import os
+import sys
+import copy
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import analysis_cache, color_analysis, color_lut
+from utils.color_analysis import COLOR_CATEGORIES, DEFAULT_COLOR_DETECTION_PARAMS
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")
+
+
+def configured_params():
+    """Get the color detection parameters from config.json."""
+    with open(CONFIG_FILE, "r") as f:
+        return json.load(f)["color_detection_params"]
+
+
+def sample_pixels(count=20000, seed=0):
+    """
+    Get random RGB pixels plus every gray and the corners of the RGB cube.
+
+    Args:
+        count: Number of random pixels
+        seed: Random seed
+
+    Returns:
+        np.ndarray: Array of shape (n, 3) with RGB values (0-255)
+    """
+    rng = np.random.default_rng(seed)
+    random_pixels = rng.integers(0, 256, size=(count, 3))
+    grays = np.repeat(np.arange(256)[:, None], 3, axis=1)
+    corners = np.array([[r, g, b] for r in (0, 255) for g in (0, 255) for b in (0, 255)])
+    return np.concatenate([random_pixels, grays, corners]).astype(np.uint8)
+
+
+@pytest.mark.parametrize("params_name", ["default", "configured"])
+def test_categorize_pixels_multi_matches_per_pixel(params_name):
+    color_params = None if params_name == "default" else configured_params()
+    pixels = sample_pixels()
+
+    masks = color_analysis.categorize_pixels_multi(pixels, color_params)
+
+    assert list(masks) == COLOR_CATEGORIES
+    for i, (r, g, b) in enumerate(pixels.tolist()):
+        expected = color_analysis.categorize_pixel_multi(r, g, b, color_params)
+        actual = {color for color in COLOR_CATEGORIES if masks[color][i]}
+        assert actual == expected, f"pixel {(r, g, b)}: {actual} != {expected}"
+
+
+def test_categorize_pixels_multi_keeps_image_shape():
+    pixels = sample_pixels(count=600)[:600].reshape(20, 30, 3)
+
+    masks = color_analysis.categorize_pixels_multi(pixels)
+
+    for color in COLOR_CATEGORIES:
+        assert masks[color].shape == (20, 30)
+
+
+def configured_config():
+    """Get config.json."""
+    with open(CONFIG_FILE, "r") as f:
+        return json.load(f)
+
+
+def reference_analysis(image_path, color_params):
+    """
+    Analyze an image one pixel at a time, as analyze_image_multi used to.
+    
+    Args:
+        image_path: Path to an image already at the analysis size
+        color_params: Color detection parameters
+    
+    Returns:
+        tuple: (color percentages, {(x, y): categories})
+    """
+    img = Image.open(image_path).convert("RGB")
+    width, height = img.size
+    color_counts = {color: 0 for color in COLOR_CATEGORIES}
+    pixel_map = {}
+    for x in range(width):
+        for y in range(height):
+            categories = color_analysis.categorize_pixel_multi(*img.getpixel((x, y)), color_params)
+            pixel_map[(x, y)] = categories
+            for category in categories:
+                color_counts[category] += 1
+    
+    weighted_counts = {}
+    for color, count in color_counts.items():
+        color_param = color_params.get(color, DEFAULT_COLOR_DETECTION_PARAMS[color])
+        if color == "white_gray_black":
+            weight = 1.0
+        elif color_param.get("hue_weights"):
+            weight = sum(w * w for w in color_param["hue_weights"]) / len(color_param["hue_weights"])
+        else:
+            weight = 360 / (color_analysis.calculate_range_size(color_param["hue_ranges"]) + 60)
+        weighted_counts[color] = count * weight
+    total = sum(weighted_counts.values())
+    return {color: weighted / total * 100 for color, weighted in weighted_counts.items()}, pixel_map
+
+
+@pytest.fixture
+def isolated_cache(tmp_path, monkeypatch):
+    """Persistent analysis cache in tmp_path instead of the user's cache."""
+    store = analysis_cache.AnalysisCache(str(tmp_path / "analysis_cache.sqlite3"))
+    monkeypatch.setattr(analysis_cache, "_default_cache", store)
+    return store
+
+
+@pytest.mark.parametrize("use_lut", [False, True])
+def test_analyze_image_multi_matches_per_pixel_reference(tmp_path, isolated_cache, use_lut):
+    config = configured_config()
+    size = (32, 24)
+    image_path = str(tmp_path / "synthetic.png")
+    pixels = sample_pixels(count=size[0] * size[1], seed=1)[:size[0] * size[1]]
+    Image.fromarray(pixels.reshape(size[1], size[0], 3)).save(image_path)
+    
+    # Same image and detection settings, different hue weights: the second
+    # analysis reuses the cached counts and must still re-weight them
+    reweighted = copy.deepcopy(config["color_detection_params"])
+    reweighted["red"]["hue_weights"] = [3.0, 2.0]
+    reweighted["pink"]["hue_weights"] = [0.5]
+    del reweighted["blue"]["hue_weights"]
+    
+    for color_params in (config["color_detection_params"], reweighted):
+        expected_percentages, expected_pixel_map = reference_analysis(image_path, color_params)
+        expected_categories = color_analysis.apply_thresholds(
+            expected_percentages, config["color_thresholds"], config["color_selection_limits"]
+        )
+        lut = color_lut.get_lut(color_params, str(tmp_path)) if use_lut else None
+        
+        result = color_analysis.analyze_image_multi(image_path, size, color_params, lut)
+        
+        assert result["color_percentages"] == pytest.approx(expected_percentages)
+        for position, categories in expected_pixel_map.items():
+            assert set(result["pixel_map"][position]) == categories
+        for include_pixel_map in (True, False):
+            categorized = color_analysis.analyze_and_categorize(
+                image_path, config["color_thresholds"], size, color_params,
+                config["color_selection_limits"], lut, include_pixel_map=include_pixel_map
+            )
+            assert categorized["color_percentages"] == pytest.approx(expected_percentages)
+            assert categorized["categories"] == expected_categories
@@ -0,0 +1,43 @@
+"""
+Tests for generation labels in utils.directory_swap.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import directory_swap
+
+
+def build_generation(target_dir, label):
+    staging_dir = directory_swap.create_staging_dir(target_dir)
+    os.symlink("/images/a.jpg", os.path.join(staging_dir, "a.jpg"))
+    directory_swap.set_generation_label(staging_dir, label)
+    return staging_dir
+
+
+def test_label_follows_the_current_generation(tmp_path):
+    target_dir = str(tmp_path / "wallpapers")
+    assert directory_swap.get_generation_label(target_dir) is None
+
+    red = build_generation(target_dir, "red")
+    assert directory_swap.swap_in(target_dir, red)
+    blue = build_generation(target_dir, "blue")
+
+    # Same images, different label: only the label tells the two apart
+    assert directory_swap.has_same_contents(target_dir, blue)
+    assert directory_swap.get_generation_label(target_dir) == "red"
+    assert directory_swap.swap_in(target_dir, blue)
+    assert directory_swap.get_generation_label(target_dir) == "blue"
+    # The label is kept next to the generation, not inside the folder
+    assert os.listdir(target_dir) == ["a.jpg"]
+
+
+def test_labels_are_removed_with_their_generation(tmp_path):
+    target_dir = str(tmp_path / "wallpapers")
+    staging_dir = build_generation(target_dir, "red")
+
+    directory_swap.discard_staging_dir(staging_dir)
+
+    assert os.listdir(directory_swap.get_generations_dir(target_dir)) == []
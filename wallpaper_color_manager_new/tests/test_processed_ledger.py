@@ -0,0 +1,90 @@
+"""
+Tests for the settings fingerprints and percentage reuse in utils.processed_ledger.
+
+Recorded percentages are weighted, so anything that changes the weighting
+(hue weights in particular) must change both fingerprints.
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import color_analysis, processed_ledger
+from utils.processed_ledger import ProcessedLedger
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")
+
+
+@pytest.fixture
+def settings():
+    """Analysis settings as the control panel and CLI build them from config.json."""
+    with open(CONFIG_FILE, "r") as f:
+        config = json.load(f)
+    return {
+        "color_thresholds": config["color_thresholds"],
+        "color_detection_params": config["color_detection_params"],
+        "color_selection_limits": config["color_selection_limits"],
+        "resize_dimensions": config["resize_dimensions"]
+    }
+
+
+def with_red_weights(settings, weights):
+    changed = copy.deepcopy(settings)
+    changed["color_detection_params"]["red"]["hue_weights"] = weights
+    return changed
+
+
+def percentages_hash(settings):
+    return color_analysis.percentages_settings_hash(
+        tuple(settings["resize_dimensions"]), settings["color_detection_params"]
+    )
+
+
+def test_fingerprints_are_stable(settings):
+    assert processed_ledger.settings_fingerprint(settings) == \
+        processed_ledger.settings_fingerprint(copy.deepcopy(settings))
+    assert percentages_hash(settings) == percentages_hash(copy.deepcopy(settings))
+
+
+def test_hue_weight_change_changes_fingerprints(settings):
+    weighted = with_red_weights(settings, [3.0, 3.0])
+
+    assert processed_ledger.settings_fingerprint(weighted) != processed_ledger.settings_fingerprint(settings)
+    assert percentages_hash(weighted) != percentages_hash(settings)
+    # Raw category counts do not depend on the weights
+    assert color_analysis.analysis_settings_hash((100, 100), weighted["color_detection_params"]) == \
+        color_analysis.analysis_settings_hash((100, 100), settings["color_detection_params"])
+
+
+def test_percentages_are_not_reused_across_weights(tmp_path, settings):
+    image_path = str(tmp_path / "image.jpg")
+    open(image_path, "wb").close()
+    ledger = ProcessedLedger(str(tmp_path / "ledger.sqlite3"))
+    ledger.record(processed_ledger.settings_fingerprint(settings), image_path,
+                  ["red"], {"red": 50.0}, timestamp=time.time() + 1,
+                  analysis_hash=percentages_hash(settings))
+
+    assert ledger.get_percentages(percentages_hash(settings), [image_path]) == {image_path: {"red": 50.0}}
+    weighted = with_red_weights(settings, [3.0, 3.0])
+    assert ledger.get_percentages(percentages_hash(weighted), [image_path]) == {}
+    ledger.close()
+
+
+def test_migrated_entries_are_processed_but_not_reused(tmp_path, settings):
+    image_path = str(tmp_path / "image.jpg")
+    open(image_path, "wb").close()
+    last_settings = dict(settings, timestamp=time.time())
+    ledger = ProcessedLedger(str(tmp_path / "ledger.sqlite3"))
+    # Entry keyed by a randomized hash() from an older version
+    ledger.record("-4242", image_path, ["red"], {"red": 50.0}, timestamp=last_settings["timestamp"] + 1)
+
+    assert ledger.migrate_legacy_hashes(last_settings) == 1
+    assert ledger.get_processed_paths(processed_ledger.settings_fingerprint(settings)) == {image_path}
+    assert ledger.get_percentages(percentages_hash(settings), [image_path]) == {}
+    ledger.close()
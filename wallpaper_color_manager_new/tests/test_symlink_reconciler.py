@@ -0,0 +1,36 @@
+"""
+Tests for regular files in directories managed by utils.symlink_reconciler.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import symlink_reconciler
+
+
+def test_regular_file_is_a_conflict_without_prune(tmp_path):
+    (tmp_path / "a.jpg").write_text("kept")
+    desired = {str(tmp_path): {"a.jpg": "/images/a.jpg", "b.jpg": "/images/b.jpg"}}
+
+    stats = symlink_reconciler.reconcile_directories(desired, prune=False)
+
+    assert stats["added"] == 1
+    assert stats["conflicts"] == 1
+    assert stats["errors"] == 0
+    assert stats["plans"][str(tmp_path)]["conflicts"] == ["a.jpg"]
+    assert (tmp_path / "a.jpg").read_text() == "kept"
+    assert os.readlink(tmp_path / "b.jpg") == "/images/b.jpg"
+    assert "a.jpg (not a symlink, skipped)" in symlink_reconciler.format_report(stats)
+
+
+def test_regular_file_is_never_removed_by_prune(tmp_path):
+    (tmp_path / "a.jpg").write_text("kept")
+    os.symlink("/images/old.jpg", tmp_path / "old.jpg")
+
+    stats = symlink_reconciler.reconcile_directories({str(tmp_path): {}}, prune=True)
+
+    assert stats["removed"] == 1
+    assert stats["errors"] == 0
+    assert sorted(os.listdir(tmp_path)) == ["a.jpg"]
@@ -4,9 +4,39 @@ Utils Package
 This package provides utility modules for the Wallpaper Color Manager system:
 - config_manager: Configuration loading and saving
 - color_analysis: Color analysis and categorization
+- image_loader: Reduced-resolution image loading for analysis
+- color_lut: Precompiled RGB to color category lookup tables
+- analysis_cache: Persistent cache of per-image category counts
+- library_counts: Library-wide counts matrix for threshold-only re-evaluation
+- batch_analysis: Multi-process batch analysis with ordered results
+- symlink_reconciler: Diff-based updates of symlink directories
+- category_index: In-memory image <-> category index of the color directories
+- file_manifest: Incremental directory scanning with a persisted file manifest
+- folder_catalog: Date-indexed catalog of dated (lbm-M-D-YY) image folders
 - file_operations: File operations for managing color categories
+- processed_ledger: Record of images processed per analysis settings
+- thumbnail_cache: Shared on-disk thumbnail store for image viewers
+- directory_swap: Atomic replacement of wallpaper target folders
+- image_watcher: inotify/polling watcher for newly added images
+- job_runner: Cancellable background jobs with progress for the control panel
+- preview_loader: Asynchronous sample image previews with prefetching
 """
 
 from . import config_manager
+from . import image_loader
 from . import color_analysis
-from . import file_operations
\ No newline at end of file
+from . import color_lut
+from . import analysis_cache
+from . import library_counts
+from . import batch_analysis
+from . import symlink_reconciler
+from . import category_index
+from . import file_manifest
+from . import folder_catalog
+from . import file_operations
+from . import processed_ledger
+from . import thumbnail_cache
+from . import directory_swap
+from . import image_watcher
+from . import job_runner
+from . import preview_loader
\ No newline at end of file
@@ -0,0 +1,291 @@
+"""
+Analysis Cache Module
+
+This module provides a persistent, size-bounded cache of raw per-category
+pixel counts, so images only have to be decoded once per set of analysis
+settings:
+- Entries are keyed by (path, size, mtime, analysis-settings hash)
+- Entries whose file has changed on disk are treated as misses
+- The least recently used entries are evicted past a maximum entry count
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Default database path
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "tail", "analysis_cache.sqlite3")
+
+# Default maximum number of cached analyses
+DEFAULT_MAX_ENTRIES = 100000
+
+# How many writes to allow between eviction passes
+EVICTION_INTERVAL = 500
+
+# Shared cache instance (False once opening it has failed)
+_default_cache = None
+
+
+class AnalysisCache:
+    """
+    SQLite-backed store of per-category pixel counts.
+    """
+    
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Open (or create) the cache database.
+        
+        Args:
+            db_path: Path to the SQLite database
+            max_entries: Maximum number of entries to keep
+        """
+        if db_path is None:
+            db_path = DEFAULT_CACHE_PATH
+        
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes_since_eviction = 0
+        self._lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        
+        # The control panel reads from the UI thread and writes from worker threads
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            " path TEXT NOT NULL,"
+            " settings_hash TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " counts TEXT NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (path, settings_hash))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS analyses_last_used ON analyses (last_used)"
+        )
+        self._conn.commit()
+    
+    def get(self, image_path: str, settings_hash: str) -> Optional[Dict[str, int]]:
+        """
+        Get cached category counts for an image.
+        
+        Args:
+            image_path: Path to the image file
+            settings_hash: Hash of the analysis settings
+        
+        Returns:
+            dict: Pixel count for each category, or None on a miss
+        """
+        try:
+            st = os.stat(image_path)
+        except OSError:
+            return None
+        
+        path = os.path.abspath(image_path)
+        
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, counts FROM analyses WHERE path = ? AND settings_hash = ?",
+                (path, settings_hash)
+            ).fetchone()
+            
+            # Entries for files that changed since they were analyzed are stale
+            if row is None or row[0] != st.st_size or row[1] != st.st_mtime_ns:
+                self.misses += 1
+                return None
+            
+            self._conn.execute(
+                "UPDATE analyses SET last_used = ? WHERE path = ? AND settings_hash = ?",
+                (time.time(), path, settings_hash)
+            )
+            self._conn.commit()
+            self.hits += 1
+        
+        return json.loads(row[2])
+    
+    def get_many(self, image_paths: List[str], settings_hash: str) -> Dict[str, Dict[str, int]]:
+        """
+        Get cached category counts for many images with a single query.
+        
+        Args:
+            image_paths: Paths to the image files
+            settings_hash: Hash of the analysis settings
+            
+        Returns:
+            dict: Pixel counts for each image that was a hit, keyed by the
+                  path as given
+        """
+        with self._lock:
+            rows = {
+                path: (size, mtime_ns, counts)
+                for path, size, mtime_ns, counts in self._conn.execute(
+                    "SELECT path, size, mtime_ns, counts FROM analyses WHERE settings_hash = ?",
+                    (settings_hash,)
+                )
+            }
+        
+        found = {}
+        for image_path in image_paths:
+            path = os.path.abspath(image_path)
+            row = rows.get(path)
+            if row is None:
+                continue
+            try:
+                st = os.stat(image_path)
+            except OSError:
+                continue
+            if row[0] == st.st_size and row[1] == st.st_mtime_ns:
+                found[image_path] = json.loads(row[2])
+        
+        with self._lock:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE analyses SET last_used = ? WHERE path = ? AND settings_hash = ?",
+                [(now, os.path.abspath(image_path), settings_hash) for image_path in found]
+            )
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(image_paths) - len(found)
+        
+        return found
+    
+    def put(self, image_path: str, settings_hash: str, counts: Dict[str, int]) -> None:
+        """
+        Store category counts for an image.
+        
+        Args:
+            image_path: Path to the image file
+            settings_hash: Hash of the analysis settings
+            counts: Pixel count for each category
+        """
+        try:
+            st = os.stat(image_path)
+        except OSError:
+            return
+        
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses (path, settings_hash, size, mtime_ns, counts, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(image_path), settings_hash, st.st_size, st.st_mtime_ns,
+                 json.dumps(counts), time.time())
+            )
+            self._conn.commit()
+            
+            self._writes_since_eviction += 1
+            if self._writes_since_eviction >= EVICTION_INTERVAL:
+                self._evict()
+    
+    def _evict(self) -> int:
+        """
+        Remove the least recently used entries beyond max_entries.
+        Must be called with the lock held.
+        
+        Returns:
+            int: Number of entries removed
+        """
+        self._writes_since_eviction = 0
+        
+        total = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+        excess = total - self.max_entries
+        if excess <= 0:
+            return 0
+        
+        self._conn.execute(
+            "DELETE FROM analyses WHERE rowid IN "
+            "(SELECT rowid FROM analyses ORDER BY last_used LIMIT ?)",
+            (excess,)
+        )
+        self._conn.commit()
+        logger.info(f"Evicted {excess} entries from analysis cache")
+        return excess
+    
+    def evict(self) -> int:
+        """
+        Remove the least recently used entries beyond max_entries.
+        
+        Returns:
+            int: Number of entries removed
+        """
+        with self._lock:
+            return self._evict()
+    
+    def clear(self) -> None:
+        """
+        Remove all entries.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM analyses")
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get statistics about the cache.
+        
+        Returns:
+            dict: Cache statistics
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+            images = self._conn.execute("SELECT COUNT(DISTINCT path) FROM analyses").fetchone()[0]
+        
+        size_bytes = 0
+        for suffix in ("", "-wal"):
+            try:
+                size_bytes += os.path.getsize(self.db_path + suffix)
+            except OSError:
+                pass
+        
+        return {
+            "entries": entries,
+            "images": images,
+            "max_entries": self.max_entries,
+            "size_bytes": size_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+    
+    def close(self) -> None:
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self._conn.close()
+
+
+def get_default_cache() -> Optional[AnalysisCache]:
+    """
+    Get the shared cache instance, opening it on first use.
+    
+    Returns:
+        AnalysisCache: The shared cache, or None if it could not be opened
+    """
+    global _default_cache
+    
+    if _default_cache is None:
+        try:
+            _default_cache = AnalysisCache()
+        except Exception as e:
+            logger.error(f"Error opening analysis cache: {e}")
+            _default_cache = False
+    
+    return _default_cache or None
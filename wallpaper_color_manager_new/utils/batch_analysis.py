@@ -0,0 +1,226 @@
+"""
+Batch Analysis Module
+
+This module provides functions for analyzing many images at once:
+- Counts already in the persistent analysis cache are reused
+- The remaining images are decoded in chunks, optionally across a pool of
+  worker processes
+- Results stream back in input order, whatever the number of workers, so a
+  single writer in the parent process can create symlinks deterministically
+"""
+
+import os
+import logging
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+from . import analysis_cache, color_analysis, color_lut
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Default number of images sent to a worker at a time
+DEFAULT_CHUNK_SIZE = 32
+
+# Settings of the current worker process (set by _init_worker)
+_worker_state = {}
+
+
+def _init_worker(resize_dimensions: Tuple[int, int], color_params: Dict[str, Any]) -> None:
+    """
+    Initialize a worker process.
+    
+    The parent compiles the lookup table before starting the pool, so each
+    worker only memory-maps it and they all share the same pages.
+    
+    Args:
+        resize_dimensions: Dimensions to resize image for analysis
+        color_params: Color detection parameters
+    """
+    _worker_state["resize_dimensions"] = resize_dimensions
+    _worker_state["color_params"] = color_params
+    _worker_state["lut"] = color_lut.get_lut(color_params)
+
+
+def _count_chunk(image_paths: List[str]) -> List[Tuple[str, Optional[Dict[str, int]], Optional[str]]]:
+    """
+    Count categories for a chunk of images in a worker process.
+    
+    Args:
+        image_paths: Paths to the image files
+    
+    Returns:
+        list: (image_path, counts, error) for each image, in order
+    """
+    results = []
+    for image_path in image_paths:
+        try:
+            counts = color_analysis.count_image_categories(
+                image_path,
+                _worker_state["resize_dimensions"],
+                _worker_state["color_params"],
+                _worker_state["lut"],
+                use_cache=False
+            )
+            results.append((image_path, counts, None))
+        except Exception as e:
+            results.append((image_path, None, str(e)))
+    return results
+
+
+def _iter_chunk_results(chunks: List[List[str]],
+                        resize_dimensions: Tuple[int, int],
+                        color_params: Dict[str, Any],
+                        jobs: int,
+                        max_in_flight: int) -> Iterator[Tuple[str, Optional[Dict[str, int]], Optional[str]]]:
+    """
+    Count categories for chunks of images, yielding results in chunk order.
+    
+    Args:
+        chunks: Lists of image paths
+        resize_dimensions: Dimensions to resize image for analysis
+        color_params: Color detection parameters
+        jobs: Number of worker processes (1 means in this process)
+        max_in_flight: Maximum number of chunks submitted but not yet consumed
+    
+    Yields:
+        tuple: (image_path, counts, error)
+    """
+    if jobs <= 1:
+        _init_worker(resize_dimensions, color_params)
+        for chunk in chunks:
+            yield from _count_chunk(chunk)
+        return
+    
+    pool = ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(resize_dimensions, color_params)
+    )
+    try:
+        chunk_iter = iter(chunks)
+        pending = deque(
+            pool.submit(_count_chunk, chunk)
+            for chunk in itertools.islice(chunk_iter, max_in_flight)
+        )
+        
+        while pending:
+            results = pending.popleft().result()
+            
+            # Keep the pool busy while the caller consumes this chunk
+            next_chunk = next(chunk_iter, None)
+            if next_chunk is not None:
+                pending.append(pool.submit(_count_chunk, next_chunk))
+            
+            yield from results
+    finally:
+        # Drop queued chunks if the caller stops early
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def count_images(image_paths: List[str],
+                 resize_dimensions: Tuple[int, int] = (100, 100),
+                 color_params: Dict[str, Any] = None,
+                 jobs: int = 1,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_in_flight: Optional[int] = None) -> Iterator[Tuple[str, Optional[Dict[str, int]], Optional[str]]]:
+    """
+    Decode images and count categories, streaming results in input order.
+    
+    The persistent analysis cache is neither read nor written; callers
+    store the counts they want to keep. Closing the iterator early cancels
+    the chunks that were not started yet.
+    
+    Args:
+        image_paths: Paths to the image files
+        resize_dimensions: Dimensions to resize image for analysis
+        color_params: Color detection parameters
+        jobs: Number of worker processes (1 means in this process)
+        chunk_size: Number of images per work item
+        max_in_flight: Maximum number of chunks queued at once (bounds
+                       memory); defaults to twice the number of workers
+    
+    Yields:
+        tuple: (image_path, counts, error) where counts is None if error is set
+    """
+    resize_dimensions = tuple(resize_dimensions)
+    jobs = max(1, jobs)
+    chunk_size = max(1, chunk_size)
+    if max_in_flight is None:
+        max_in_flight = 2 * jobs
+    
+    # Compile the lookup table once, before any worker needs it
+    if image_paths:
+        color_lut.get_lut(color_params)
+    
+    chunks = [image_paths[i:i + chunk_size] for i in range(0, len(image_paths), chunk_size)]
+    return _iter_chunk_results(chunks, resize_dimensions, color_params, jobs, max_in_flight)
+
+
+def analyze_images(image_paths: List[str],
+                   thresholds: Dict[str, float],
+                   resize_dimensions: Tuple[int, int] = (100, 100),
+                   color_params: Dict[str, Any] = None,
+                   color_limits: Optional[Dict[str, Dict[str, int]]] = None,
+                   jobs: int = 1,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   max_in_flight: Optional[int] = None) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Analyze and categorize many images, streaming results in input order.
+    
+    Args:
+        image_paths: Paths to the image files
+        thresholds: Threshold percentage for each color
+        resize_dimensions: Dimensions to resize image for analysis
+        color_params: Color detection parameters
+        color_limits: Min/max color limits for with/without white_gray_black
+        jobs: Number of worker processes
+        chunk_size: Number of images per work item
+        max_in_flight: Maximum number of chunks queued at once (bounds
+                       memory); defaults to twice the number of workers
+    
+    Yields:
+        tuple: (image_path, result, error) where result has the same
+        "filename", "color_percentages" and "categories" keys as
+        color_analysis.analyze_and_categorize, or is None if error is set
+    """
+    resize_dimensions = tuple(resize_dimensions)
+    
+    # Reuse counts from the persistent cache
+    settings_hash = color_analysis.analysis_settings_hash(resize_dimensions, color_params)
+    store = analysis_cache.get_default_cache()
+    cached = store.get_many(image_paths, settings_hash) if store is not None else {}
+    
+    misses = [path for path in image_paths if path not in cached]
+    logger.info(f"Counts cached for {len(cached)} images, decoding {len(misses)} with {max(1, jobs)} job(s)")
+    
+    computed = count_images(misses, resize_dimensions, color_params, jobs, chunk_size, max_in_flight)
+    
+    try:
+        for image_path in image_paths:
+            error = None
+            if image_path in cached:
+                counts = cached.pop(image_path)
+            else:
+                _, counts, error = next(computed)
+                if counts is not None and store is not None:
+                    store.put(image_path, settings_hash, counts)
+            
+            if counts is None:
+                yield image_path, None, error
+                continue
+            
+            color_percentages, _, _ = color_analysis.calculate_weighted_percentages(counts, color_params)
+            yield image_path, {
+                "filename": os.path.basename(image_path),
+                "color_percentages": color_percentages,
+                "categories": color_analysis.apply_thresholds(color_percentages, thresholds, color_limits)
+            }, None
+    finally:
+        computed.close()
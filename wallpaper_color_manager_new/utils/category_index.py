@@ -0,0 +1,255 @@
+"""
+Category Index Module
+
+This module provides an in-memory index of which images are in which
+color category, built from the category symlink directories:
+- Each color directory is read with a single os.scandir pass
+- Lookups by filename, counts per category and uncategorized checks are
+  dictionary operations instead of a stat per image and category
+- A directory is only scanned again when its mtime changes, which
+  happens whenever a symlink is added to or removed from it
+- Deleting or restoring the image a symlink points to does not change
+  the directory mtime, so get_categories checks the targets of the
+  filename it is asked about; get_categorized_names may still include
+  images deleted since the last scan until invalidate is called
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Any, Set, Tuple
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Directories modified this recently (seconds) are scanned again on the
+# next query, since a change within the same mtime tick would not show
+RACY_MTIME_WINDOW = 1.0
+
+# Shared indices, keyed by base directory and color directories
+_indices = {}
+
+
+class CategoryIndex:
+    """
+    Bidirectional image <-> category index of the color directories.
+    """
+    
+    def __init__(self, base_dir: str, color_dirs: Dict[str, str]):
+        """
+        Create an index; directories are scanned on first use.
+        
+        Args:
+            base_dir: Base directory the color directories are relative to
+            color_dirs: Directory of each category, relative to base_dir
+        """
+        self.base_dir = base_dir
+        self.color_dirs = {
+            category: os.path.join(base_dir, color_dir)
+            for category, color_dir in color_dirs.items()
+        }
+        self.scans = 0
+        self._lock = threading.RLock()
+        
+        # Per category: directory mtime at the last scan (None = scan again),
+        # all symlinks {filename: target}, and names whose target exists
+        self._mtimes = {category: None for category in self.color_dirs}
+        self._links = {category: {} for category in self.color_dirs}
+        self._valid = {category: set() for category in self.color_dirs}
+        
+        # Reverse index: filename -> categories with a valid symlink
+        self._by_name = {}
+    
+    def _scan(self, category: str) -> None:
+        """
+        Read one color directory into the index.
+        
+        Args:
+            category: Color category
+        """
+        directory = self.color_dirs[category]
+        links = {}
+        valid = set()
+        
+        try:
+            scan_start = time.time()
+            mtime_ns = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if not entry.is_symlink():
+                        continue
+                    try:
+                        links[entry.name] = os.readlink(entry.path)
+                        # Follows the link: fails for dangling symlinks
+                        entry.stat()
+                        valid.add(entry.name)
+                    except OSError:
+                        pass
+            
+            if scan_start - mtime_ns / 1e9 < RACY_MTIME_WINDOW:
+                mtime_ns = None
+        except (FileNotFoundError, NotADirectoryError):
+            mtime_ns = None
+        
+        # Update the reverse index for names that left or joined the category
+        for name in self._valid[category] - valid:
+            categories = self._by_name.get(name)
+            if categories is not None:
+                categories.discard(category)
+                if not categories:
+                    del self._by_name[name]
+        for name in valid - self._valid[category]:
+            self._by_name.setdefault(name, set()).add(category)
+        
+        self._mtimes[category] = mtime_ns
+        self._links[category] = links
+        self._valid[category] = valid
+        self.scans += 1
+    
+    def _recheck(self, category: str, name: str) -> None:
+        """
+        Check whether one symlink's target still exists and update the index.
+        
+        Args:
+            category: Color category
+            name: Symlink filename
+        """
+        exists = os.path.exists(os.path.join(self.color_dirs[category], name))
+        if exists == (name in self._valid[category]):
+            return
+        
+        if exists:
+            self._valid[category].add(name)
+            self._by_name.setdefault(name, set()).add(category)
+        else:
+            self._valid[category].discard(name)
+            categories = self._by_name.get(name)
+            if categories is not None:
+                categories.discard(category)
+                if not categories:
+                    del self._by_name[name]
+    
+    def refresh(self) -> int:
+        """
+        Scan the color directories that changed since they were last read.
+        
+        Returns:
+            int: Number of directories scanned
+        """
+        scanned = 0
+        with self._lock:
+            for category, directory in self.color_dirs.items():
+                try:
+                    mtime_ns = os.stat(directory).st_mtime_ns
+                except OSError:
+                    mtime_ns = None
+                
+                if mtime_ns is None or mtime_ns != self._mtimes[category]:
+                    self._scan(category)
+                    scanned += 1
+        
+        if scanned:
+            logger.debug(f"Category index: scanned {scanned} directories")
+        return scanned
+    
+    def invalidate(self) -> None:
+        """
+        Force every directory to be scanned again on the next query.
+        """
+        with self._lock:
+            for category in self._mtimes:
+                self._mtimes[category] = None
+    
+    def get_categories(self, filename: str) -> List[str]:
+        """
+        Get the categories a filename has a (non-dangling) symlink in.
+        
+        The targets are checked on every call, since deleting an image
+        does not change the mtime of the directories linking to it.
+        
+        Args:
+            filename: Image filename
+        
+        Returns:
+            list: Categories, in color directory order
+        """
+        with self._lock:
+            self.refresh()
+            for category, links in self._links.items():
+                if filename in links:
+                    self._recheck(category, filename)
+            categories = self._by_name.get(filename, ())
+            return [category for category in self.color_dirs if category in categories]
+    
+    def get_counts(self) -> Dict[str, int]:
+        """
+        Get the number of symlinks in each category.
+        
+        Returns:
+            dict: Number of symlinks in each category
+        """
+        with self._lock:
+            self.refresh()
+            return {category: len(links) for category, links in self._links.items()}
+    
+    def get_categorized_names(self) -> Set[str]:
+        """
+        Get the filenames that are in at least one category.
+        
+        Returns:
+            set: Categorized filenames
+        """
+        with self._lock:
+            self.refresh()
+            return set(self._by_name)
+    
+    def get_links(self, category: str) -> Dict[str, str]:
+        """
+        Get the symlinks of one category.
+        
+        Args:
+            category: Color category
+        
+        Returns:
+            dict: Symlink target keyed by filename
+        """
+        with self._lock:
+            self.refresh()
+            return dict(self._links.get(category, {}))
+
+
+def _index_key(config: Dict[str, Any]) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    """
+    Get the key of the shared index for a configuration.
+    
+    Args:
+        config: Configuration dictionary
+    
+    Returns:
+        tuple: Base directory and color directories
+    """
+    paths = config["paths"]
+    return paths["base_dir"], tuple(paths["color_dirs"].items())
+
+
+def get_index(config: Dict[str, Any]) -> CategoryIndex:
+    """
+    Get the shared index for a configuration, creating it on first use.
+    
+    Args:
+        config: Configuration dictionary
+    
+    Returns:
+        CategoryIndex: The shared index
+    """
+    key = _index_key(config)
+    index = _indices.get(key)
+    if index is None:
+        index = CategoryIndex(config["paths"]["base_dir"], config["paths"]["color_dirs"])
+        _indices[key] = index
+    return index
@@ -5,15 +5,27 @@ This module provides functions for:
 - Categorizing pixels into color categories
 - Analyzing images to determine their color distribution
 - Applying thresholds to determine which categories an image belongs to
+- Exposing per-pixel categories as a compact, lazily computed pixel map
 """
 
 import os
+import json
+import hashlib
 import logging
-from typing import Dict, List, Tuple, Optional, Any, Set
+from collections.abc import Mapping
+from typing import Dict, List, Tuple, Optional, Any, Set, Callable, Iterator
 import numpy as np
 from PIL import Image
 import colorsys
 
+try:
+    from . import analysis_cache
+    from .image_loader import load_analysis_image
+except ImportError:
+    # Running this file directly as a script
+    import analysis_cache
+    from image_loader import load_analysis_image
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -32,6 +44,9 @@ COLOR_CATEGORIES = [
     "white_gray_black"
 ]
 
+# Bit assigned to each category in per-pixel category bitmasks
+CATEGORY_BITS = {color: 1 << i for i, color in enumerate(COLOR_CATEGORIES)}
+
 # Default color detection parameters
 DEFAULT_COLOR_DETECTION_PARAMS = {
     "red": {
@@ -71,8 +86,14 @@ DEFAULT_COLOR_DETECTION_PARAMS = {
     }
 }
 
-# Cache for analyzed images
-# Format: {image_path: {resize_dims: analysis_result}}
+# Bump when a change to the analysis would alter raw category counts
+ANALYSIS_VERSION = 2
+
+# Maximum number of images kept in the in-memory analysis cache
+MAX_MEMORY_CACHE_IMAGES = 256
+
+# Cache for analyzed images, least recently used first
+# Format: {image_path: {cache_key: analysis_result}}
 _analysis_cache = {}
 
 
@@ -188,6 +209,202 @@ def categorize_pixel(r: int, g: int, b: int, color_params: Dict[str, Any] = None
     return "white_gray_black"
 
 
+def rgb_array_to_hsv(rgb: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convert an array of RGB pixels to HSV in one pass.
+    
+    The arithmetic mirrors colorsys.rgb_to_hsv step for step, so every
+    element is identical to what rgb_to_hsv() returns for the same pixel.
+    
+    Args:
+        rgb: Array of shape (..., 3) with RGB values (0-255)
+        
+    Returns:
+        tuple: (hue, saturation, value) arrays where:
+            - hue is in degrees (0-360)
+            - saturation is 0-1
+            - value is 0-1
+    """
+    # Normalize RGB values to 0-1
+    rgb = np.asarray(rgb, dtype=np.float64) / 255.0
+    r = rgb[..., 0]
+    g = rgb[..., 1]
+    b = rgb[..., 2]
+    
+    maxc = np.maximum(np.maximum(r, g), b)
+    minc = np.minimum(np.minimum(r, g), b)
+    rangec = maxc - minc
+    v = maxc
+    
+    # Grays have no hue or saturation; avoid dividing by zero for them
+    gray = rangec == 0
+    safe_maxc = np.where(gray, 1.0, maxc)
+    safe_rangec = np.where(gray, 1.0, rangec)
+    
+    s = np.where(gray, 0.0, rangec / safe_maxc)
+    rc = (maxc - r) / safe_rangec
+    gc = (maxc - g) / safe_rangec
+    bc = (maxc - b) / safe_rangec
+    
+    # Same precedence as colorsys: red wins ties, then green, then blue
+    h = np.where(r == maxc, bc - gc,
+                 np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    h = np.mod(h / 6.0, 1.0)
+    h = np.where(gray, 0.0, h)
+    
+    # Convert hue to degrees
+    return (h * 360, s, v)
+
+
+def categorize_pixels_multi(rgb: np.ndarray, color_params: Dict[str, Any] = None) -> Dict[str, np.ndarray]:
+    """
+    Vectorized version of categorize_pixel_multi for a whole array of pixels.
+    
+    Args:
+        rgb: Array of shape (..., 3) with RGB values (0-255)
+        color_params: Color detection parameters
+        
+    Returns:
+        dict: Boolean mask (shape (...)) for each color category
+    """
+    # Use default parameters if none provided
+    if color_params is None:
+        color_params = DEFAULT_COLOR_DETECTION_PARAMS
+    
+    h, s, v = rgb_array_to_hsv(rgb)
+    
+    # White/gray/black wins outright for low saturation or extreme value
+    wgb_params = color_params.get("white_gray_black", DEFAULT_COLOR_DETECTION_PARAMS["white_gray_black"])
+    sat_threshold = wgb_params.get("saturation_threshold", 0.2)
+    low_val_threshold = wgb_params.get("low_value_threshold", 0.15)
+    high_val_threshold = wgb_params.get("high_value_threshold", 0.95)
+    
+    wgb_mask = (s < sat_threshold) | (v < low_val_threshold) | (v > high_val_threshold)
+    
+    masks = {}
+    any_color = np.zeros(h.shape, dtype=bool)
+    
+    for color in COLOR_CATEGORIES:
+        if color == "white_gray_black":
+            continue
+        
+        color_param = color_params.get(color, DEFAULT_COLOR_DETECTION_PARAMS[color])
+        hue_ranges = color_param.get("hue_ranges", DEFAULT_COLOR_DETECTION_PARAMS[color]["hue_ranges"])
+        sat_range = color_param.get("saturation_range", DEFAULT_COLOR_DETECTION_PARAMS[color]["saturation_range"])
+        val_range = color_param.get("value_range", DEFAULT_COLOR_DETECTION_PARAMS[color]["value_range"])
+        
+        hue_mask = np.zeros(h.shape, dtype=bool)
+        for hue_range in hue_ranges:
+            hue_mask |= (hue_range[0] <= h) & (h < hue_range[1])
+        
+        mask = (hue_mask
+                & (sat_range[0] <= s) & (s <= sat_range[1])
+                & (val_range[0] <= v) & (v <= val_range[1])
+                & ~wgb_mask)
+        masks[color] = mask
+        any_color |= mask
+    
+    # Pixels matching no color fall back to white_gray_black
+    masks["white_gray_black"] = wgb_mask | ~any_color
+    
+    return {color: masks[color] for color in COLOR_CATEGORIES}
+
+
+def masks_to_codes(masks: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Pack per-category boolean masks into one uint8 bitmask per pixel.
+    
+    Args:
+        masks: Boolean mask for each color category
+        
+    Returns:
+        numpy.ndarray: Category bitmask for each pixel (see CATEGORY_BITS)
+    """
+    codes = None
+    for color, bit in CATEGORY_BITS.items():
+        if codes is None:
+            codes = np.zeros(masks[color].shape, dtype=np.uint8)
+        codes[masks[color]] |= bit
+    return codes
+
+
+def code_to_categories(code: int) -> List[str]:
+    """
+    Unpack a category bitmask into a list of category names.
+    
+    Args:
+        code: Category bitmask (see CATEGORY_BITS)
+        
+    Returns:
+        list: Color category names, in COLOR_CATEGORIES order
+    """
+    return [color for color, bit in CATEGORY_BITS.items() if code & bit]
+
+
+class PixelMap(Mapping):
+    """
+    Read-only {(x, y): [categories]} view over a uint8 category bitmask array.
+    
+    The bitmask array takes one byte per pixel instead of a tuple key and a
+    list of strings. It can also be created from a loader, in which case the
+    image is only classified the first time a pixel is looked up.
+    """
+    
+    def __init__(self, codes: Optional[np.ndarray] = None,
+                 loader: Optional[Callable[[], np.ndarray]] = None):
+        """
+        Initialize the pixel map.
+        
+        Args:
+            codes: Category bitmask for each pixel, indexed [y, x]
+            loader: Called once to produce codes when they are first needed
+        """
+        self._codes = codes
+        self._loader = loader
+        self._categories = {}
+    
+    @property
+    def codes(self) -> np.ndarray:
+        """
+        Category bitmask for each pixel, indexed [y, x] (see CATEGORY_BITS).
+        """
+        if self._codes is None:
+            loader, self._loader = self._loader, None
+            self._codes = loader() if loader is not None else np.zeros((0, 0), dtype=np.uint8)
+        return self._codes
+    
+    def __getitem__(self, key: Tuple[int, int]) -> List[str]:
+        try:
+            x, y = key
+        except (TypeError, ValueError):
+            raise KeyError(key)
+        
+        codes = self.codes
+        if not (0 <= y < codes.shape[0] and 0 <= x < codes.shape[1]):
+            raise KeyError(key)
+        
+        # Spell out each distinct bitmask only once
+        code = int(codes[y, x])
+        if code not in self._categories:
+            self._categories[code] = code_to_categories(code)
+        return list(self._categories[code])
+    
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        height, width = self.codes.shape[:2]
+        for y in range(height):
+            for x in range(width):
+                yield (x, y)
+    
+    def __len__(self) -> int:
+        return int(self.codes.size)
+    
+    def __repr__(self) -> str:
+        if self._codes is None:
+            return "PixelMap(<not loaded>)"
+        height, width = self._codes.shape[:2]
+        return f"PixelMap({width}x{height})"
+
+
 def calculate_range_size(hue_ranges: List[List[float]]) -> float:
     """
     Calculate the total size of a set of hue ranges.
@@ -210,9 +427,311 @@ def calculate_range_size(hue_ranges: List[List[float]]) -> float:
     return total_size
 
 
+def normalize_detection_params(color_params: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Reduce color detection parameters to the values that decide pixel categories.
+    
+    Missing values are filled from DEFAULT_COLOR_DETECTION_PARAMS exactly as
+    categorize_pixel_multi does, and every number is converted to float, so
+    equivalent parameter dicts normalize to the same result. Hue weights are
+    dropped because they only affect weighting, not categorization.
+    
+    Args:
+        color_params: Color detection parameters
+        
+    Returns:
+        dict: Normalized color detection parameters
+    """
+    if color_params is None:
+        color_params = DEFAULT_COLOR_DETECTION_PARAMS
+    
+    normalized = {}
+    
+    for color in COLOR_CATEGORIES:
+        defaults = DEFAULT_COLOR_DETECTION_PARAMS[color]
+        color_param = color_params.get(color, defaults)
+        
+        if color == "white_gray_black":
+            normalized[color] = {
+                "saturation_threshold": float(color_param.get("saturation_threshold", 0.2)),
+                "low_value_threshold": float(color_param.get("low_value_threshold", 0.15)),
+                "high_value_threshold": float(color_param.get("high_value_threshold", 0.95))
+            }
+        else:
+            normalized[color] = {
+                "hue_ranges": [[float(lo), float(hi)]
+                               for lo, hi in color_param.get("hue_ranges", defaults["hue_ranges"])],
+                "saturation_range": [float(x) for x in color_param.get("saturation_range", defaults["saturation_range"])],
+                "value_range": [float(x) for x in color_param.get("value_range", defaults["value_range"])]
+            }
+    
+    return normalized
+
+
+def analysis_settings_hash(resize_dimensions: Tuple[int, int] = (100, 100),
+                           color_params: Dict[str, Any] = None) -> str:
+    """
+    Get a stable hash of the settings that determine raw category counts.
+    
+    Thresholds, selection limits and hue weights are not included, since
+    they are applied on top of the counts.
+    
+    Args:
+        resize_dimensions: Dimensions to resize image for analysis
+        color_params: Color detection parameters
+        
+    Returns:
+        str: Hex digest of the settings
+    """
+    payload = {
+        "version": ANALYSIS_VERSION,
+        "categories": COLOR_CATEGORIES,
+        "resize_dimensions": [int(d) for d in resize_dimensions],
+        "params": normalize_detection_params(color_params)
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def calculate_range_weights(color_params: Dict[str, Any] = None) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """
+    Get the hue range size and weight of each color category.
+    
+    Args:
+        color_params: Color detection parameters
+        
+    Returns:
+        tuple: (range_sizes, range_weights)
+    """
+    # Get range weights from parameters or calculate them
+    range_sizes = {}
+    range_weights = {}
+    
+    # Use default parameters if none provided
+    if color_params is None:
+        color_params = DEFAULT_COLOR_DETECTION_PARAMS
+    
+    # Get or calculate weights for each color (except white_gray_black)
+    for color in COLOR_CATEGORIES:
+        if color == "white_gray_black":
+            continue
+            
+        color_param = color_params.get(color, DEFAULT_COLOR_DETECTION_PARAMS[color])
+        hue_ranges = color_param.get("hue_ranges", DEFAULT_COLOR_DETECTION_PARAMS[color]["hue_ranges"])
+        
+        # Calculate total range size (for information only)
+        range_size = calculate_range_size(hue_ranges)
+        range_sizes[color] = range_size
+        
+        # Check if user-provided weights exist
+        if "hue_weights" in color_param and len(color_param["hue_weights"]) > 0:
+            # Use the average of user-provided weights
+            user_weights = color_param["hue_weights"]
+            # Apply a stronger effect by using the square of the weights
+            # This makes higher weights have a much stronger impact
+            squared_weights = [w * w for w in user_weights]
+            range_weights[color] = sum(squared_weights) / len(squared_weights)
+        else:
+            # Calculate weight based on inverse of range size (legacy method)
+            range_weights[color] = 360 / (range_size + 60)
+    
+    # Set weight for white_gray_black to 1.0 (no adjustment)
+    range_weights["white_gray_black"] = 1.0
+    
+    return range_sizes, range_weights
+
+
+def percentages_settings_hash(resize_dimensions: Tuple[int, int] = (100, 100),
+                              color_params: Dict[str, Any] = None) -> str:
+    """
+    Get a stable hash of the settings that determine weighted color percentages.
+    
+    This covers everything analysis_settings_hash does plus the range
+    weights, so percentages recorded under other hue weights never match.
+    
+    Args:
+        resize_dimensions: Dimensions to resize image for analysis
+        color_params: Color detection parameters
+        
+    Returns:
+        str: Hex digest of the settings
+    """
+    _, range_weights = calculate_range_weights(color_params)
+    payload = {
+        "analysis": analysis_settings_hash(resize_dimensions, color_params),
+        "range_weights": {color: float(weight) for color, weight in range_weights.items()}
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def calculate_weighted_percentages(color_counts: Dict[str, int],
+                                   color_params: Dict[str, Any] = None) -> Tuple[Dict[str, float], Dict[str, float], Dict[str, float]]:
+    """
+    Turn raw per-category pixel counts into weighted percentages.
+    
+    Args:
+        color_counts: Pixel count for each category
+        color_params: Color detection parameters
+        
+    Returns:
+        tuple: (color_percentages, range_sizes, range_weights)
+    """
+    range_sizes, range_weights = calculate_range_weights(color_params)
+    
+    # Calculate weighted counts
+    weighted_counts = {}
+    for color, count in color_counts.items():
+        weighted_counts[color] = count * range_weights.get(color, 1.0)
+    
+    # Calculate total weighted count
+    total_weighted_count = sum(weighted_counts.values())
+    
+    # Calculate weighted percentages
+    if total_weighted_count > 0:
+        color_percentages = {
+            color: (weighted_count / total_weighted_count) * 100
+            for color, weighted_count in weighted_counts.items()
+        }
+    else:
+        # Fallback if total_weighted_count is 0
+        color_percentages = {color: 0 for color in COLOR_CATEGORIES}
+    
+    return color_percentages, range_sizes, range_weights
+
+
+def _classify_image(image_path: str,
+                    resize_dimensions: Tuple[int, int],
+                    color_params: Dict[str, Any] = None,
+                    lut: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Load, resize and classify an image into per-pixel category bitmasks.
+    
+    Args:
+        image_path: Path to the image file
+        resize_dimensions: Dimensions to resize image for analysis
+        color_params: Color detection parameters
+        lut: Optional lookup table compiled from color_params
+        
+    Returns:
+        numpy.ndarray: Category bitmask for each pixel, indexed [y, x]
+    """
+    # Load image, decoding at reduced size where the format allows it
+    img = load_analysis_image(image_path, resize_dimensions)
+    
+    # Categorize every pixel at once
+    pixels = np.asarray(img)
+    if lut is not None:
+        return np.asarray(lut[(pixels[..., 0].astype(np.uint32) << 16)
+                              | (pixels[..., 1].astype(np.uint32) << 8)
+                              | pixels[..., 2]])
+    return masks_to_codes(categorize_pixels_multi(pixels, color_params))
+
+
+def _count_codes(codes: np.ndarray) -> Dict[str, int]:
+    """
+    Count the pixels in each category.
+    
+    Args:
+        codes: Category bitmask for each pixel
+        
+    Returns:
+        dict: Pixel count for each category
+    """
+    return {
+        color: int(np.count_nonzero(codes & bit))
+        for color, bit in CATEGORY_BITS.items()
+    }
+
+
+def count_image_categories(image_path: str,
+                           resize_dimensions: Tuple[int, int] = (100, 100),
+                           color_params: Dict[str, Any] = None,
+                           lut: Optional[np.ndarray] = None,
+                           use_cache: bool = True) -> Dict[str, int]:
+    """
+    Get raw per-category pixel counts for an image.
+    
+    Counts are served from the persistent analysis cache when the file and
+    analysis settings are unchanged; otherwise the image is decoded and the
+    counts are stored for next time.
+    
+    Args:
+        image_path: Path to the image file
+        resize_dimensions: Dimensions to resize image for analysis
+        color_params: Color detection parameters
+        lut: Optional lookup table compiled from color_params
+        use_cache: If False, always decode and leave the persistent cache
+                   alone (worker processes leave caching to their parent)
+        
+    Returns:
+        dict: Pixel count for each category
+    """
+    resize_dimensions = tuple(resize_dimensions)
+    if not use_cache:
+        return _count_codes(_classify_image(image_path, resize_dimensions, color_params, lut))
+    
+    settings_hash = analysis_settings_hash(resize_dimensions, color_params)
+    
+    store = analysis_cache.get_default_cache()
+    if store is not None:
+        counts = store.get(image_path, settings_hash)
+        if counts is not None:
+            return counts
+    
+    counts = _count_codes(_classify_image(image_path, resize_dimensions, color_params, lut))
+    
+    if store is not None:
+        store.put(image_path, settings_hash, counts)
+    
+    return counts
+
+
+def _load_codes(image_path: str,
+                resize_dimensions: Tuple[int, int],
+                color_params: Dict[str, Any] = None,
+                lut: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Classify an image for a lazily loaded pixel map.
+    
+    Args:
+        image_path: Path to the image file
+        resize_dimensions: Dimensions to resize image for analysis
+        color_params: Color detection parameters
+        lut: Optional lookup table compiled from color_params
+        
+    Returns:
+        numpy.ndarray: Category bitmask for each pixel, or an empty array on error
+    """
+    try:
+        return _classify_image(image_path, resize_dimensions, color_params, lut)
+    except Exception as e:
+        logger.error(f"Error loading pixel map for {image_path}: {e}")
+        return np.zeros((0, 0), dtype=np.uint8)
+
+
+def _remember(image_path: str, cache_key: Tuple, result: Dict[str, Any]) -> None:
+    """
+    Store a result in the in-memory analysis cache, evicting the least
+    recently used image once MAX_MEMORY_CACHE_IMAGES is exceeded.
+    
+    Args:
+        image_path: Path to the image file
+        cache_key: Key of the analysis
+        result: Analysis result
+    """
+    analyses = _analysis_cache.pop(image_path, {})
+    analyses[cache_key] = result
+    _analysis_cache[image_path] = analyses
+    
+    while len(_analysis_cache) > MAX_MEMORY_CACHE_IMAGES:
+        del _analysis_cache[next(iter(_analysis_cache))]
+
+
 def analyze_image_multi(image_path: str,
                        resize_dimensions: Tuple[int, int] = (100, 100),
-                       color_params: Dict[str, Any] = None) -> Dict[str, Dict[str, float]]:
+                       color_params: Dict[str, Any] = None,
+                       lut: Optional[np.ndarray] = None) -> Dict[str, Dict[str, float]]:
     """
     Analyze an image to determine its color distribution with multi-category support.
     
@@ -220,93 +739,42 @@ def analyze_image_multi(image_path: str,
         image_path: Path to the image file
         resize_dimensions: Dimensions to resize image for analysis
         color_params: Color detection parameters
+        lut: Optional lookup table compiled from color_params
+             (see color_lut.get_lut); classification becomes a single gather
         
     Returns:
-        dict: Contains color percentages and pixel map
+        dict: Contains color percentages and pixel map (a PixelMap, which
+              reads like the {(x, y): [categories]} dict it replaces)
     """
     # Check cache first
     cache_key = (image_path, resize_dimensions, str(color_params), "multi")
     if image_path in _analysis_cache and cache_key in _analysis_cache[image_path]:
-        return _analysis_cache[image_path][cache_key]
+        result = _analysis_cache[image_path][cache_key]
+        _remember(image_path, cache_key, result)
+        return result
     
     try:
-        # Load and resize image
-        img = Image.open(image_path)
-        img = img.resize(resize_dimensions)
-        img = img.convert('RGB')
-        
-        # Initialize counters
-        color_counts = {color: 0 for color in COLOR_CATEGORIES}
-        total_pixels = resize_dimensions[0] * resize_dimensions[1]
-        
-        # Create pixel map to store category assignments
-        pixel_map = {}
+        resize_dimensions = tuple(resize_dimensions)
+        settings_hash = analysis_settings_hash(resize_dimensions, color_params)
+        store = analysis_cache.get_default_cache()
+        color_counts = store.get(image_path, settings_hash) if store is not None else None
         
-        # Process each pixel
-        for x in range(resize_dimensions[0]):
-            for y in range(resize_dimensions[1]):
-                r, g, b = img.getpixel((x, y))
-                categories = categorize_pixel_multi(r, g, b, color_params)
-                
-                # Store in pixel map
-                pixel_map[(x, y)] = list(categories)
-                
-                # Update counts
-                for category in categories:
-                    color_counts[category] += 1
-        
-        # Get range weights from parameters or calculate them
-        range_sizes = {}
-        range_weights = {}
-        
-        # Use default parameters if none provided
-        if color_params is None:
-            color_params = DEFAULT_COLOR_DETECTION_PARAMS
-        
-        # Get or calculate weights for each color (except white_gray_black)
-        for color in COLOR_CATEGORIES:
-            if color == "white_gray_black":
-                continue
-                
-            color_param = color_params.get(color, DEFAULT_COLOR_DETECTION_PARAMS[color])
-            hue_ranges = color_param.get("hue_ranges", DEFAULT_COLOR_DETECTION_PARAMS[color]["hue_ranges"])
+        if color_counts is not None:
+            # Counts are cached; only classify pixels if someone reads the pixel map
+            pixel_map = PixelMap(loader=lambda: _load_codes(image_path, resize_dimensions, color_params, lut))
+        else:
+            # Categorize every pixel into category bitmasks
+            codes = _classify_image(image_path, resize_dimensions, color_params, lut)
             
-            # Calculate total range size (for information only)
-            range_size = calculate_range_size(hue_ranges)
-            range_sizes[color] = range_size
+            # Count pixels and share the counts with batch analysis
+            color_counts = _count_codes(codes)
+            if store is not None:
+                store.put(image_path, settings_hash, color_counts)
             
-            # Check if user-provided weights exist
-            if "hue_weights" in color_param and len(color_param["hue_weights"]) > 0:
-                # Use the average of user-provided weights
-                user_weights = color_param["hue_weights"]
-                # Apply a stronger effect by using the square of the weights
-                # This makes higher weights have a much stronger impact
-                squared_weights = [w * w for w in user_weights]
-                range_weights[color] = sum(squared_weights) / len(squared_weights)
-            else:
-                # Calculate weight based on inverse of range size (legacy method)
-                range_weights[color] = 360 / (range_size + 60)
-        
-        # Set weight for white_gray_black to 1.0 (no adjustment)
-        range_weights["white_gray_black"] = 1.0
-        
-        # Calculate weighted counts
-        weighted_counts = {}
-        for color, count in color_counts.items():
-            weighted_counts[color] = count * range_weights.get(color, 1.0)
-        
-        # Calculate total weighted count
-        total_weighted_count = sum(weighted_counts.values())
+            pixel_map = PixelMap(codes)
         
         # Calculate weighted percentages
-        if total_weighted_count > 0:
-            color_percentages = {
-                color: (weighted_count / total_weighted_count) * 100
-                for color, weighted_count in weighted_counts.items()
-            }
-        else:
-            # Fallback if total_weighted_count is 0
-            color_percentages = {color: 0 for color in COLOR_CATEGORIES}
+        color_percentages, range_sizes, range_weights = calculate_weighted_percentages(color_counts, color_params)
         
         # Prepare result
         result = {
@@ -317,9 +785,7 @@ def analyze_image_multi(image_path: str,
         }
         
         # Cache the result
-        if image_path not in _analysis_cache:
-            _analysis_cache[image_path] = {}
-        _analysis_cache[image_path][cache_key] = result
+        _remember(image_path, cache_key, result)
         
         return result
         
@@ -450,7 +916,9 @@ def analyze_and_categorize(image_path: str,
                            thresholds: Dict[str, float],
                            resize_dimensions: Tuple[int, int] = (100, 100),
                            color_params: Dict[str, Any] = None,
-                           color_limits: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, Any]:
+                           color_limits: Optional[Dict[str, Dict[str, int]]] = None,
+                           lut: Optional[np.ndarray] = None,
+                           include_pixel_map: bool = True) -> Dict[str, Any]:
     """
     Analyze an image and determine which categories it belongs to.
     
@@ -460,13 +928,23 @@ def analyze_and_categorize(image_path: str,
         resize_dimensions: Dimensions to resize image for analysis
         color_params: Color detection parameters
         color_limits: Min/max color limits for with/without white_gray_black
+        lut: Optional lookup table compiled from color_params
+        include_pixel_map: If False, skip the pixel map so cached counts can
+                           be used without decoding the image (batch mode)
         
     Returns:
         dict: Analysis result with color percentages and categories
     """
-    # Analyze the image
-    multi_result = analyze_image_multi(image_path, resize_dimensions, color_params)
-    color_percentages = multi_result["color_percentages"]
+    if include_pixel_map:
+        # Analyze the image
+        multi_result = analyze_image_multi(image_path, resize_dimensions, color_params, lut)
+        color_percentages = multi_result["color_percentages"]
+        pixel_map = multi_result["pixel_map"]
+    else:
+        # Counts alone are enough for categorization
+        color_counts = count_image_categories(image_path, resize_dimensions, color_params, lut)
+        color_percentages, _, _ = calculate_weighted_percentages(color_counts, color_params)
+        pixel_map = {}
     
     # Apply thresholds with color limits
     categories = apply_thresholds(color_percentages, thresholds, color_limits)
@@ -476,7 +954,7 @@ def analyze_and_categorize(image_path: str,
         "filename": os.path.basename(image_path),
         "color_percentages": color_percentages,
         "categories": categories,
-        "pixel_map": multi_result["pixel_map"]
+        "pixel_map": pixel_map
     }
 
 
@@ -497,10 +975,8 @@ def get_pixel_color_info(image_path: str, x: int, y: int,
         dict: Color information for the pixel
     """
     try:
-        # Load and resize image
-        img = Image.open(image_path)
-        img = img.resize(resize_dimensions)
-        img = img.convert('RGB')
+        # Load image, decoding at reduced size where the format allows it
+        img = load_analysis_image(image_path, resize_dimensions)
         
         # Get pixel color
         r, g, b = img.getpixel((x, y))
@@ -526,22 +1002,39 @@ def get_pixel_color_info(image_path: str, x: int, y: int,
         }
 
 
-def clear_cache() -> None:
+def clear_cache(persistent: bool = False) -> None:
     """
     Clear the analysis cache.
+    
+    Args:
+        persistent: Also clear the on-disk cache of category counts. Not
+                    needed when settings change, since entries are keyed by
+                    a hash of the settings.
     """
     global _analysis_cache
     _analysis_cache = {}
+    
+    if persistent:
+        store = analysis_cache.get_default_cache()
+        if store is not None:
+            store.clear()
+    
     logger.info("Analysis cache cleared")
 
 
-def analyze_region(image: Image.Image, color_params: Dict[str, Any] = None) -> Dict[str, Any]:
+def analyze_region(image: Image.Image, color_params: Dict[str, Any] = None,
+                   lut: Optional[np.ndarray] = None) -> Dict[str, Any]:
     """
     Analyze a region of an image to determine its color information.
     
+    All pixels are processed as arrays in one pass, so this is fast enough
+    to run on every drag update of a selection.
+    
     Args:
         image: PIL Image object of the region
         color_params: Color detection parameters
+        lut: Optional lookup table compiled from color_params, so regions
+             are categorized exactly like whole images (see color_lut.get_lut)
         
     Returns:
         dict: Color information for the region
@@ -563,100 +1056,44 @@ def analyze_region(image: Image.Image, color_params: Dict[str, Any] = None) -> D
                 "categories": []
             }
         
-        # Initialize RGB and HSV accumulators
-        r_total, g_total, b_total = 0, 0, 0
-        h_total, s_total, v_total = 0, 0, 0
-        
-        # Initialize category counters
-        color_counts = {color: 0 for color in COLOR_CATEGORIES}
-        
-        # Process each pixel
-        for x in range(width):
-            for y in range(height):
-                r, g, b = image.getpixel((x, y))
-                
-                # Accumulate RGB values
-                r_total += r
-                g_total += g
-                b_total += b
-                
-                # Convert to HSV and accumulate
-                h, s, v = rgb_to_hsv(r, g, b)
-                h_total += h
-                s_total += s
-                v_total += v
-                
-                # Categorize pixel
-                categories = categorize_pixel_multi(r, g, b, color_params)
-                
-                # Update category counts
-                for category in categories:
-                    color_counts[category] += 1
-        
-        # Calculate averages
-        avg_r = r_total / total_pixels
-        avg_g = g_total / total_pixels
-        avg_b = b_total / total_pixels
-        
-        avg_h = h_total / total_pixels
-        avg_s = s_total / total_pixels
-        avg_v = v_total / total_pixels
-        
-        # Get range weights from parameters or calculate them
-        range_sizes = {}
-        range_weights = {}
-        
-        # Use default parameters if none provided
-        if color_params is None:
-            color_params = DEFAULT_COLOR_DETECTION_PARAMS
-        
-        # Get or calculate weights for each color (except white_gray_black)
-        for color in COLOR_CATEGORIES:
-            if color == "white_gray_black":
-                continue
-                
-            color_param = color_params.get(color, DEFAULT_COLOR_DETECTION_PARAMS[color])
-            hue_ranges = color_param.get("hue_ranges", DEFAULT_COLOR_DETECTION_PARAMS[color]["hue_ranges"])
-            
-            # Calculate total range size (for information only)
-            range_size = calculate_range_size(hue_ranges)
-            range_sizes[color] = range_size
-            
-            # Check if user-provided weights exist
-            if "hue_weights" in color_param and len(color_param["hue_weights"]) > 0:
-                # Use the average of user-provided weights
-                user_weights = color_param["hue_weights"]
-                # Apply a stronger effect by using the square of the weights
-                # This makes higher weights have a much stronger impact
-                squared_weights = [w * w for w in user_weights]
-                range_weights[color] = sum(squared_weights) / len(squared_weights)
-            else:
-                # Calculate weight based on inverse of range size (legacy method)
-                range_weights[color] = 360 / (range_size + 60)
-        
-        # Set weight for white_gray_black to 1.0 (no adjustment)
-        range_weights["white_gray_black"] = 1.0
-        
-        # Calculate weighted counts
-        weighted_counts = {}
-        for color, count in color_counts.items():
-            weighted_counts[color] = count * range_weights.get(color, 1.0)
-        
-        # Calculate total weighted count
-        total_weighted_count = sum(weighted_counts.values())
+        pixels = np.asarray(image).reshape(-1, 3)
         
-        # Calculate weighted percentages
-        if total_weighted_count > 0:
-            category_percentages = {
-                color: (weighted_count / total_weighted_count) * 100
-                for color, weighted_count in weighted_counts.items()
-            }
+        # Average RGB values
+        avg_r, avg_g, avg_b = (float(value) for value in pixels.mean(axis=0))
+        
+        # Convert to HSV and average
+        h, s, v = rgb_array_to_hsv(pixels)
+        avg_s = float(s.mean())
+        avg_v = float(v.mean())
+        
+        # Hue is an angle, so average it on the circle (350 and 10 average
+        # to 0, not 180). Weight by saturation, since grays have no real hue.
+        radians = np.radians(h)
+        sin_total = float((np.sin(radians) * s).sum())
+        cos_total = float((np.cos(radians) * s).sum())
+        if abs(sin_total) > 1e-9 or abs(cos_total) > 1e-9:
+            avg_h = float(np.degrees(np.arctan2(sin_total, cos_total)) % 360)
         else:
-            # Fallback if total_weighted_count is 0
-            category_percentages = {color: 0 for color in COLOR_CATEGORIES}
+            avg_h = 0.0
+        
+        # Count pixels in each category
+        if lut is not None:
+            color_counts = _count_codes(np.asarray(lut[(pixels[:, 0].astype(np.uint32) << 16)
+                                                       | (pixels[:, 1].astype(np.uint32) << 8)
+                                                       | pixels[:, 2]]))
+        else:
+            masks = categorize_pixels_multi(pixels, color_params)
+            color_counts = {color: int(np.count_nonzero(masks[color])) for color in COLOR_CATEGORIES}
+        
+        # Calculate weighted percentages
+        category_percentages, range_sizes, range_weights = calculate_weighted_percentages(color_counts, color_params)
         
         # Find dominant category based on weighted counts
-        dominant_category = max(weighted_counts.items(), key=lambda x: x[1])[0] if weighted_counts else "white_gray_black"
+        weighted_counts = {
+            color: count * range_weights.get(color, 1.0)
+            for color, count in color_counts.items()
+        }
+        dominant_category = max(weighted_counts.items(), key=lambda x: x[1])[0]
         
         # Get categories above 10% threshold
         significant_categories = [
@@ -686,7 +1123,7 @@ def analyze_region(image: Image.Image, color_params: Dict[str, Any] = None) -> D
 
 def get_cache_stats() -> Dict[str, int]:
     """
-    Get statistics about the analysis cache.
+    Get statistics about the in-memory and on-disk analysis caches.
     
     Returns:
         dict: Cache statistics
@@ -694,10 +1131,17 @@ def get_cache_stats() -> Dict[str, int]:
     total_images = len(_analysis_cache)
     total_analyses = sum(len(analyses) for analyses in _analysis_cache.values())
     
-    return {
+    stats = {
         "total_images": total_images,
         "total_analyses": total_analyses
     }
+    
+    store = analysis_cache.get_default_cache()
+    if store is not None:
+        for key, value in store.stats().items():
+            stats[f"persistent_{key}"] = value
+    
+    return stats
 
 
 if __name__ == "__main__":
@@ -0,0 +1,210 @@
+"""
+Color Lookup Table Module
+
+This module provides functions for:
+- Compiling color detection parameters into a 24-bit RGB lookup table
+- Hashing color detection parameters into a stable cache key
+- Persisting compiled tables to disk and memory-mapping them back
+- Classifying whole pixel arrays with a single indexed gather
+
+Each table entry is a uint8 bitmask with one bit per category, in the
+order of color_analysis.COLOR_CATEGORIES (see color_analysis.CATEGORY_BITS).
+"""
+
+import os
+import json
+import hashlib
+import logging
+from typing import Dict, Any, Optional
+import numpy as np
+
+from .color_analysis import (
+    COLOR_CATEGORIES,
+    categorize_pixels_multi,
+    masks_to_codes,
+    normalize_detection_params
+)
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Bump when the table layout or the categorization rules change
+LUT_VERSION = 1
+
+# Number of entries in a full 24-bit RGB table
+LUT_SIZE = 1 << 24
+
+# Default directory for compiled tables
+DEFAULT_LUT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "tail", "color_luts")
+
+# Maximum number of tables kept in memory at once
+MAX_MEMORY_LUTS = 4
+
+# In-memory tables
+# Format: {params_hash: lut}
+_lut_cache = {}
+
+
+def params_hash(color_params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Get a stable, process-independent hash of color detection parameters.
+    
+    Args:
+        color_params: Color detection parameters
+    
+    Returns:
+        str: Hex digest identifying the compiled lookup table
+    """
+    payload = {
+        "version": LUT_VERSION,
+        "categories": COLOR_CATEGORIES,
+        "params": normalize_detection_params(color_params)
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def compile_lut(color_params: Optional[Dict[str, Any]] = None) -> np.ndarray:
+    """
+    Compile color detection parameters into a full 24-bit RGB lookup table.
+    
+    Args:
+        color_params: Color detection parameters
+    
+    Returns:
+        numpy.ndarray: uint8 array of LUT_SIZE category bitmasks, indexed by
+        (r << 16) | (g << 8) | b
+    """
+    lut = np.empty(LUT_SIZE, dtype=np.uint8)
+    
+    # One plane of 65536 (g, b) pairs per red value keeps memory use small
+    gb = np.arange(1 << 16, dtype=np.uint32)
+    plane = np.empty((1 << 16, 3), dtype=np.uint8)
+    plane[:, 1] = gb >> 8
+    plane[:, 2] = gb & 0xFF
+    
+    for r in range(256):
+        plane[:, 0] = r
+        masks = categorize_pixels_multi(plane, color_params)
+        lut[r << 16:(r + 1) << 16] = masks_to_codes(masks)
+    
+    return lut
+
+
+def get_lut_path(color_params: Optional[Dict[str, Any]] = None, lut_dir: Optional[str] = None) -> str:
+    """
+    Get the on-disk path of the lookup table for some color detection parameters.
+    
+    Args:
+        color_params: Color detection parameters
+        lut_dir: Directory for compiled tables
+    
+    Returns:
+        str: Path to the .npy file
+    """
+    if lut_dir is None:
+        lut_dir = DEFAULT_LUT_DIR
+    return os.path.join(lut_dir, f"{params_hash(color_params)}.npy")
+
+
+def get_lut(color_params: Optional[Dict[str, Any]] = None, lut_dir: Optional[str] = None) -> np.ndarray:
+    """
+    Get the lookup table for some color detection parameters.
+    
+    Tables are looked up in memory first, then memory-mapped from disk, and
+    only compiled (and saved) if neither has them.
+    
+    Args:
+        color_params: Color detection parameters
+        lut_dir: Directory for compiled tables
+    
+    Returns:
+        numpy.ndarray: Lookup table (see compile_lut)
+    """
+    key = params_hash(color_params)
+    if key in _lut_cache:
+        # Move to the end so eviction drops the least recently used table
+        lut = _lut_cache.pop(key)
+        _lut_cache[key] = lut
+        return lut
+    
+    lut_path = get_lut_path(color_params, lut_dir)
+    lut = None
+    
+    if os.path.exists(lut_path):
+        try:
+            lut = np.load(lut_path, mmap_mode='r')
+            if lut.shape != (LUT_SIZE,) or lut.dtype != np.uint8:
+                logger.warning(f"Ignoring malformed lookup table: {lut_path}")
+                lut = None
+        except Exception as e:
+            logger.error(f"Error loading lookup table {lut_path}: {e}")
+            lut = None
+    
+    if lut is None:
+        logger.info("Compiling color lookup table...")
+        lut = compile_lut(color_params)
+        save_lut(lut, lut_path)
+    
+    # Keep only the most recently used tables in memory
+    if len(_lut_cache) >= MAX_MEMORY_LUTS:
+        del _lut_cache[next(iter(_lut_cache))]
+    _lut_cache[key] = lut
+    
+    return lut
+
+
+def save_lut(lut: np.ndarray, lut_path: str) -> bool:
+    """
+    Save a lookup table so it can be memory-mapped later.
+    
+    Args:
+        lut: Lookup table
+        lut_path: Destination .npy path
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(lut_path)), exist_ok=True)
+        
+        # Write to a temporary file first so readers never see a partial table
+        tmp_path = f"{lut_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, lut)
+        os.replace(tmp_path, lut_path)
+        
+        logger.info(f"Saved lookup table to {lut_path}")
+        return True
+    
+    except Exception as e:
+        logger.error(f"Error saving lookup table to {lut_path}: {e}")
+        return False
+
+
+def classify_pixels(rgb: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    """
+    Classify an array of RGB pixels with a lookup table.
+    
+    Args:
+        rgb: Array of shape (..., 3) with RGB values (0-255)
+        lut: Lookup table (see compile_lut)
+    
+    Returns:
+        numpy.ndarray: uint8 category bitmask for each pixel, shape (...)
+    """
+    rgb = np.asarray(rgb, dtype=np.uint32)
+    index = (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+    return np.asarray(lut[index])
+
+
+def clear_lut_cache() -> None:
+    """
+    Drop the in-memory lookup tables (files on disk are kept).
+    """
+    _lut_cache.clear()
+    logger.info("Lookup table cache cleared")
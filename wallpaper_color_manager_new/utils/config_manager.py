@@ -100,8 +100,7 @@ DEFAULT_CONFIG = {
         }
     },
     "last_analysis_dir": "",
-    "last_analysis_settings": {},
-    "processed_files": {}
+    "last_analysis_settings": {}
 }
 
 # Default configuration file path
@@ -212,18 +211,25 @@ def deep_update(target: Dict[str, Any], source: Dict[str, Any]) -> None:
             target[key] = value
 
 
-def get_config_path() -> str:
+def get_config_path(config_path: Optional[str] = None) -> str:
     """
-    Get the default configuration path.
+    Get the absolute path of a configuration file, resolved the same way
+    load_config and save_config resolve it.
+    
+    Args:
+        config_path: Path to the configuration file (default path if None)
     
     Returns:
-        str: Default configuration path
+        str: Absolute configuration path
     """
-    # Get application directory
-    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # Use default path if none provided
+    if config_path is None:
+        config_path = DEFAULT_CONFIG_PATH
     
-    # Create absolute path
-    config_path = os.path.join(app_dir, DEFAULT_CONFIG_PATH)
+    # Relative paths are relative to the application directory
+    if not os.path.isabs(config_path):
+        app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        config_path = os.path.join(app_dir, config_path)
     
     return config_path
 
@@ -0,0 +1,324 @@
+"""
+Directory Swap Module
+
+This module provides functions for replacing the contents of a wallpaper
+target folder atomically:
+- The target path is a symlink to one "generation" directory kept in a
+  hidden sibling directory (e.g. .llm_baby_monster.generations/)
+- A new generation is built in a staging directory while the old one is
+  still being served
+- The target symlink is flipped with a single rename, so readers see
+  either the complete old or the complete new set of images, never an
+  empty or partial folder
+- Old generations are removed in the background, keeping the most recent
+  ones for readers that were still listing them during the swap
+- A generation can carry a label (e.g. the color it was built for), kept
+  next to it so it never shows up in the folder itself
+"""
+
+import os
+import time
+import shutil
+import logging
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Number of previous generations kept after a swap
+DEFAULT_KEEP_GENERATIONS = 1
+
+# Prefix of generation directory names
+GENERATION_PREFIX = "gen-"
+
+# Suffix of the file holding a generation's label, next to the generation
+LABEL_SUFFIX = ".label"
+
+
+def get_generations_dir(target_dir: str) -> str:
+    """
+    Get the directory that holds the generations of a target folder.
+    
+    Args:
+        target_dir: Path of the target folder (the symlink consumers read)
+    
+    Returns:
+        str: Path to the generations directory
+    """
+    target_dir = os.path.abspath(target_dir)
+    parent, name = os.path.split(target_dir)
+    return os.path.join(parent, f".{name}.generations")
+
+
+def get_current_generation(target_dir: str) -> Optional[str]:
+    """
+    Get the generation a target folder currently points to.
+    
+    Args:
+        target_dir: Path of the target folder
+    
+    Returns:
+        str: Absolute path of the current generation, or None if the target
+             is missing or still a plain directory
+    """
+    if not os.path.islink(target_dir):
+        return None
+    
+    link = os.readlink(target_dir)
+    return os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(target_dir)), link))
+
+
+def create_staging_dir(target_dir: str) -> str:
+    """
+    Create an empty generation directory to build the next contents in.
+    
+    Args:
+        target_dir: Path of the target folder
+    
+    Returns:
+        str: Path to the new staging directory
+    """
+    generations_dir = get_generations_dir(target_dir)
+    os.makedirs(generations_dir, exist_ok=True)
+    prefix = f"{GENERATION_PREFIX}{time.strftime('%Y%m%d-%H%M%S')}-"
+    staging_dir = tempfile.mkdtemp(prefix=prefix, dir=generations_dir)
+    
+    # mkdtemp creates 0700 directories; the slideshow may run as another user
+    os.chmod(staging_dir, 0o755)
+    
+    logger.debug(f"Created staging directory: {staging_dir}")
+    return staging_dir
+
+
+def discard_staging_dir(staging_dir: str) -> None:
+    """
+    Remove a staging directory that will not be swapped in.
+    
+    Args:
+        staging_dir: Path to the staging directory
+    """
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    _remove_label(staging_dir)
+    logger.debug(f"Discarded staging directory: {staging_dir}")
+
+
+def set_generation_label(generation_dir: str, label: str) -> None:
+    """
+    Record what a generation was built for.
+    
+    Args:
+        generation_dir: Path to the generation (or staging) directory
+        label: Label to record
+    """
+    with open(generation_dir.rstrip(os.sep) + LABEL_SUFFIX, 'w') as f:
+        f.write(label)
+
+
+def get_generation_label(target_dir: str) -> Optional[str]:
+    """
+    Get the label of the generation a target folder currently points to.
+    
+    Args:
+        target_dir: Path of the target folder
+    
+    Returns:
+        str: The label, or None if the current generation has none
+    """
+    current = get_current_generation(target_dir)
+    if current is None:
+        return None
+    
+    try:
+        with open(current + LABEL_SUFFIX, 'r') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _remove_label(generation_dir: str) -> None:
+    """
+    Remove the label of a generation, if it has one.
+    
+    Args:
+        generation_dir: Path to the generation directory
+    """
+    try:
+        os.unlink(generation_dir.rstrip(os.sep) + LABEL_SUFFIX)
+    except OSError:
+        pass
+
+
+def read_links(directory: str) -> Dict[str, str]:
+    """
+    Get the entries of a directory with their symlink targets.
+    
+    Args:
+        directory: Directory path
+    
+    Returns:
+        dict: Symlink target (or "" for other entries) keyed by name
+    """
+    links = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            links[entry.name] = os.readlink(entry.path) if entry.is_symlink() else ""
+    return links
+
+
+def has_same_contents(target_dir: str, staging_dir: str) -> bool:
+    """
+    Check whether a staging directory would leave a target folder unchanged.
+    
+    Args:
+        target_dir: Path of the target folder
+        staging_dir: Fully built staging directory
+    
+    Returns:
+        bool: True if both hold the same names linking to the same files
+    """
+    try:
+        return read_links(target_dir) == read_links(staging_dir)
+    except OSError:
+        return False
+
+
+def swap_in(target_dir: str, staging_dir: str) -> bool:
+    """
+    Make a staging directory the contents of a target folder.
+    
+    The target is replaced by renaming a new symlink over it, which is
+    atomic. The first swap converts a plain target directory into a
+    generation; only that one-time conversion leaves the path missing, for
+    the moment between two renames.
+    
+    Args:
+        target_dir: Path of the target folder
+        staging_dir: Fully built staging directory
+    
+    Returns:
+        bool: True if the target now points to the staging directory
+    """
+    target_dir = os.path.abspath(target_dir)
+    tmp_link = f"{target_dir}.swap-{os.getpid()}"
+    
+    try:
+        if os.path.isdir(target_dir) and not os.path.islink(target_dir):
+            # Keep the old contents as a generation so they can be collected later
+            legacy_dir = os.path.join(
+                get_generations_dir(target_dir),
+                f"{GENERATION_PREFIX}legacy-{time.strftime('%Y%m%d-%H%M%S')}"
+            )
+            os.rename(target_dir, legacy_dir)
+            logger.info(f"Converted {target_dir} to a swappable symlink (old contents in {legacy_dir})")
+        
+        if os.path.lexists(tmp_link):
+            os.unlink(tmp_link)
+        os.symlink(os.path.relpath(staging_dir, os.path.dirname(target_dir)), tmp_link)
+        os.replace(tmp_link, target_dir)
+        
+        logger.info(f"Swapped {target_dir} to {os.path.basename(staging_dir)}")
+        return True
+    except Exception as e:
+        logger.error(f"Error swapping in {staging_dir}: {e}")
+        try:
+            if os.path.lexists(tmp_link):
+                os.unlink(tmp_link)
+        except OSError:
+            pass
+        return False
+
+
+def list_generations(target_dir: str) -> List[str]:
+    """
+    Get all generation directories of a target folder, oldest first.
+    
+    Args:
+        target_dir: Path of the target folder
+    
+    Returns:
+        list: Paths to the generation directories
+    """
+    generations_dir = get_generations_dir(target_dir)
+    generations = []
+    
+    try:
+        with os.scandir(generations_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith(GENERATION_PREFIX) and entry.is_dir(follow_symlinks=False):
+                    generations.append((entry.stat(follow_symlinks=False).st_mtime, entry.path))
+    except FileNotFoundError:
+        return []
+    
+    generations.sort()
+    return [path for _, path in generations]
+
+
+def collect_generations(target_dir: str, keep: int = DEFAULT_KEEP_GENERATIONS) -> int:
+    """
+    Remove old generations of a target folder.
+    
+    The current generation is never removed. Directories created in the
+    last minute are also left alone, since another process may still be
+    building them.
+    
+    Args:
+        target_dir: Path of the target folder
+        keep: Number of previous generations to keep
+    
+    Returns:
+        int: Number of generations removed
+    """
+    current = get_current_generation(target_dir)
+    cutoff = time.time() - 60
+    
+    old = []
+    for path in list_generations(target_dir):
+        if current and os.path.normpath(path) == current:
+            continue
+        try:
+            if os.path.getmtime(path) > cutoff:
+                continue
+        except OSError:
+            continue
+        old.append(path)
+    
+    removed = 0
+    for path in old[:max(0, len(old) - keep)]:
+        shutil.rmtree(path, ignore_errors=True)
+        _remove_label(path)
+        removed += 1
+    
+    if removed:
+        logger.info(f"Removed {removed} old generations of {target_dir}")
+    return removed
+
+
+def collect_generations_async(target_dir: str, keep: int = DEFAULT_KEEP_GENERATIONS) -> threading.Thread:
+    """
+    Remove old generations of a target folder in a background thread.
+    
+    The thread is not a daemon, so a script that exits right after a swap
+    still finishes the cleanup.
+    
+    Args:
+        target_dir: Path of the target folder
+        keep: Number of previous generations to keep
+    
+    Returns:
+        threading.Thread: The started cleanup thread
+    """
+    def run():
+        try:
+            collect_generations(target_dir, keep)
+        except Exception as e:
+            logger.error(f"Error removing old generations of {target_dir}: {e}")
+    
+    thread = threading.Thread(target=run, name="generation-cleanup")
+    thread.start()
+    return thread
@@ -0,0 +1,391 @@
+"""
+File Manifest Module
+
+This module provides an incremental directory scanner backed by a
+persistent manifest of every scanned directory:
+- For each directory the manifest stores its inode, mtime and
+  subdirectories, and (inode, size, mtime) of each file in it
+- A directory whose inode and mtime are unchanged is not listed again:
+  a rescan of an unchanged tree costs one stat per directory, not a stat
+  per file
+- Directories that did change are listed with os.scandir and their files
+  compared with the manifest, so callers get added, removed and modified
+  files instead of only a new listing
+- Editing a file in place does not change its directory's mtime; such
+  edits are only noticed by a verifying scan, which stats every file
+"""
+
+import os
+import json
+import stat
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Default database path
+DEFAULT_MANIFEST_PATH = os.path.join(os.path.expanduser("~"), ".cache", "tail", "file_manifest.sqlite3")
+
+# Directories modified this recently (seconds) are listed again on the
+# next scan, since a change within the same mtime tick would not show
+RACY_MTIME_WINDOW = 1.0
+
+# Shared manifest instance (False once opening it has failed)
+_default_manifest = None
+
+
+class FileManifest:
+    """
+    SQLite-backed record of directory contents for incremental scans.
+    
+    A directory record is a tuple (inode, mtime_ns, subdirs, files), where
+    files maps each filename to (inode, size, mtime_ns, real_path).
+    """
+    
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Open (or create) the manifest database.
+        
+        Args:
+            db_path: Path to the SQLite database
+        """
+        if db_path is None:
+            db_path = DEFAULT_MANIFEST_PATH
+        
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        
+        # Directory records already read from the database or the disk
+        self._dirs = {}
+        
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            " path TEXT PRIMARY KEY,"
+            " inode INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " subdirs TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " dir TEXT NOT NULL,"
+            " name TEXT NOT NULL,"
+            " inode INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " real_path TEXT NOT NULL,"
+            " PRIMARY KEY (dir, name))"
+        )
+        self._conn.commit()
+    
+    def _load_dir(self, directory: str) -> Optional[Tuple[int, int, List[str], Dict[str, Tuple]]]:
+        """
+        Get the recorded state of a directory.
+        
+        Args:
+            directory: Absolute directory path
+        
+        Returns:
+            tuple: Directory record, or None if the directory was never scanned
+        """
+        if directory in self._dirs:
+            return self._dirs[directory]
+        
+        row = self._conn.execute(
+            "SELECT inode, mtime_ns, subdirs FROM dirs WHERE path = ?", (directory,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        files = {
+            name: (inode, size, mtime_ns, real_path)
+            for name, inode, size, mtime_ns, real_path in self._conn.execute(
+                "SELECT name, inode, size, mtime_ns, real_path FROM files WHERE dir = ? ORDER BY name", (directory,)
+            )
+        }
+        record = (row[0], row[1], json.loads(row[2]), files)
+        self._dirs[directory] = record
+        return record
+    
+    def _read_dir(self, directory: str, dir_stat: os.stat_result,
+                  scan_start: float) -> Tuple[int, int, List[str], Dict[str, Tuple]]:
+        """
+        List a directory and stat its files.
+        
+        Args:
+            directory: Absolute directory path
+            dir_stat: Stat of the directory, taken before listing it
+            scan_start: Time the scan started
+        
+        Returns:
+            tuple: New directory record
+        """
+        real_dir = os.path.realpath(directory)
+        subdirs = []
+        files = {}
+        
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                        continue
+                    
+                    is_link = entry.is_symlink()
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        # Dangling symlink: listed, as glob would, with the link's own stat
+                        if not is_link:
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                    
+                    # Symlinks to directories are not descended into (as os.walk)
+                    if stat.S_ISDIR(st.st_mode):
+                        continue
+                    
+                    if is_link:
+                        real_path = os.path.realpath(entry.path)
+                    else:
+                        real_path = os.path.join(real_dir, entry.name)
+                    files[entry.name] = (entry.inode(), st.st_size, st.st_mtime_ns, real_path)
+                except OSError as e:
+                    logger.debug(f"Skipping {entry.path}: {e}")
+        
+        mtime_ns = dir_stat.st_mtime_ns
+        if scan_start - mtime_ns / 1e9 < RACY_MTIME_WINDOW:
+            mtime_ns = -1
+        
+        return (dir_stat.st_ino, mtime_ns, sorted(subdirs), dict(sorted(files.items())))
+    
+    def _forget(self, directory: str, updates: Dict[str, Any], removed: List[str],
+                report_subdirs: bool = True) -> None:
+        """
+        Drop a vanished directory and everything below it from the manifest.
+        
+        Args:
+            directory: Absolute directory path
+            updates: Pending changes, updated in place
+            removed: List the vanished file paths are appended to
+            report_subdirs: If False, only files directly in the directory
+                            are appended to removed
+        """
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            record = self._load_dir(current)
+            if record is None:
+                continue
+            updates[current] = None
+            if report_subdirs or current == directory:
+                removed.extend(os.path.join(current, name) for name in record[3])
+            stack.extend(os.path.join(current, subdir) for subdir in record[2])
+    
+    def _save(self, updates: Dict[str, Any]) -> None:
+        """
+        Write changed directory records in one transaction.
+        
+        Args:
+            updates: New record (or None to delete it) for each changed directory
+        """
+        if not updates:
+            return
+        
+        with self._conn:
+            for directory, record in updates.items():
+                self._conn.execute("DELETE FROM files WHERE dir = ?", (directory,))
+                self._conn.execute("DELETE FROM dirs WHERE path = ?", (directory,))
+                if record is None:
+                    self._dirs.pop(directory, None)
+                    continue
+                
+                inode, mtime_ns, subdirs, files = record
+                self._conn.execute(
+                    "INSERT INTO dirs (path, inode, mtime_ns, subdirs) VALUES (?, ?, ?, ?)",
+                    (directory, inode, mtime_ns, json.dumps(subdirs))
+                )
+                self._conn.executemany(
+                    "INSERT INTO files (dir, name, inode, size, mtime_ns, real_path) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(directory, name) + entry for name, entry in files.items()]
+                )
+                self._dirs[directory] = record
+    
+    def scan(self, root: str, extensions: Optional[Iterable[str]] = None,
+             recursive: bool = True, verify: bool = False) -> Dict[str, Any]:
+        """
+        Scan a directory tree, listing only directories that changed.
+        
+        Added, removed and modified files are relative to the last time
+        each directory was scanned (by any caller) and recorded.
+        
+        Args:
+            root: Directory to scan
+            extensions: File extensions to include, matched case-insensitively
+                        (None includes every file)
+            recursive: If True, include all subdirectories
+            verify: If True, list and stat every directory even if its mtime
+                    is unchanged, to catch files edited in place
+        
+        Returns:
+            dict: {"files": {path: real_path}, "added": [path], "removed": [path],
+                   "modified": [path], "dirs": int, "dirs_scanned": int,
+                   "elapsed": float}; files are in directory order (each
+                  directory's files by name, then its subdirectories), the
+                  other path lists are sorted
+        """
+        start = time.perf_counter()
+        scan_start = time.time()
+        root = os.path.abspath(root)
+        suffixes = tuple(ext.lower() for ext in extensions) if extensions is not None else None
+        
+        def wanted(name):
+            return suffixes is None or name.lower().endswith(suffixes)
+        
+        files = {}
+        added = []
+        removed = []
+        modified = []
+        dirs = 0
+        dirs_scanned = 0
+        updates = {}
+        
+        with self._lock:
+            stack = [root]
+            while stack:
+                directory = stack.pop()
+                old = self._load_dir(directory)
+                
+                try:
+                    dir_stat = os.stat(directory)
+                    if not stat.S_ISDIR(dir_stat.st_mode):
+                        raise NotADirectoryError(directory)
+                except (FileNotFoundError, NotADirectoryError):
+                    if old is not None:
+                        self._forget(directory, updates, removed, recursive)
+                    continue
+                
+                dirs += 1
+                if not verify and old is not None and old[0] == dir_stat.st_ino and old[1] == dir_stat.st_mtime_ns:
+                    record = old
+                else:
+                    try:
+                        record = self._read_dir(directory, dir_stat, scan_start)
+                    except OSError as e:
+                        logger.error(f"Error scanning directory {directory}: {e}")
+                        continue
+                    dirs_scanned += 1
+                    updates[directory] = record
+                    
+                    old_files = old[3] if old is not None else {}
+                    new_files = record[3]
+                    for name, entry in new_files.items():
+                        previous = old_files.get(name)
+                        if previous is None:
+                            added.append(os.path.join(directory, name))
+                        elif previous[:3] != entry[:3]:
+                            modified.append(os.path.join(directory, name))
+                    for name in old_files:
+                        if name not in new_files:
+                            removed.append(os.path.join(directory, name))
+                    
+                    # Subdirectories that disappeared take their files with them
+                    if old is not None:
+                        for subdir in set(old[2]) - set(record[2]):
+                            self._forget(os.path.join(directory, subdir), updates,
+                                         removed if recursive else [])
+                
+                prefix = directory if directory.endswith(os.sep) else directory + os.sep
+                if suffixes is None:
+                    for name, entry in record[3].items():
+                        files[prefix + name] = entry[3]
+                else:
+                    for name, entry in record[3].items():
+                        if name.lower().endswith(suffixes):
+                            files[prefix + name] = entry[3]
+                
+                if recursive:
+                    # Reversed, so subdirectories are popped in name order
+                    stack.extend(prefix + subdir for subdir in reversed(record[2]))
+            
+            try:
+                self._save(updates)
+            except sqlite3.Error as e:
+                logger.error(f"Error saving file manifest: {e}")
+                # Keep what was read for this process; the database is retried next scan
+                for directory, record in updates.items():
+                    if record is None:
+                        self._dirs.pop(directory, None)
+                    else:
+                        self._dirs[directory] = record
+        
+        result = {
+            "files": files,
+            "added": sorted(path for path in added if wanted(os.path.basename(path))),
+            "removed": sorted(path for path in removed if wanted(os.path.basename(path))),
+            "modified": sorted(path for path in modified if wanted(os.path.basename(path))),
+            "dirs": dirs,
+            "dirs_scanned": dirs_scanned,
+            "elapsed": time.perf_counter() - start
+        }
+        
+        logger.debug(
+            f"Scanned {root}: {len(result['files'])} files in {dirs} directories "
+            f"({dirs_scanned} listed), {len(result['added'])} added, "
+            f"{len(result['removed'])} removed, {len(result['modified'])} modified "
+            f"in {result['elapsed']:.3f}s"
+        )
+        return result
+
+
+def get_default_manifest() -> Optional[FileManifest]:
+    """
+    Get the shared manifest instance, opening it on first use.
+    
+    Returns:
+        FileManifest: The shared manifest, or None if it could not be opened
+    """
+    global _default_manifest
+    
+    if _default_manifest is None:
+        try:
+            _default_manifest = FileManifest()
+        except Exception as e:
+            logger.error(f"Error opening file manifest: {e}")
+            _default_manifest = False
+    
+    return _default_manifest or None
+
+
+def scan_directory(root: str, extensions: Optional[Iterable[str]] = None,
+                   recursive: bool = True) -> Dict[str, Any]:
+    """
+    Scan a directory tree with the shared manifest.
+    
+    If the manifest cannot be opened, the tree is listed in full and every
+    file is reported as added.
+    
+    Args:
+        root: Directory to scan
+        extensions: File extensions to include (None includes every file)
+        recursive: If True, include all subdirectories
+    
+    Returns:
+        dict: Scan result as returned by FileManifest.scan
+    """
+    manifest = get_default_manifest()
+    if manifest is not None:
+        return manifest.scan(root, extensions, recursive)
+    
+    return FileManifest(":memory:").scan(root, extensions, recursive)
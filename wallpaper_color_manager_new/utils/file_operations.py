@@ -12,7 +12,14 @@ This module provides functions for:
 import os
 import shutil
 import logging
-from typing import Dict, List, Any, Callable, Tuple
+from typing import Dict, List, Any, Callable, Iterable, Optional, Tuple
+
+try:
+    from . import category_index, file_manifest, symlink_reconciler
+except ImportError:
+    import category_index
+    import file_manifest
+    import symlink_reconciler
 
 # Setup logging
 logging.basicConfig(
@@ -21,6 +28,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# File extensions treated as images
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+
 
 def ensure_directory(path: str) -> bool:
     """
@@ -28,7 +38,7 @@ def ensure_directory(path: str) -> bool:
     
     Args:
         path: Directory path
-        
+    
     Returns:
         bool: True if directory exists or was created, False otherwise
     """
@@ -54,7 +64,7 @@ def setup_color_directories(config: Dict[str, Any]) -> Dict[str, bool]:
     
     Args:
         config: Configuration dictionary
-        
+    
     Returns:
         dict: Status of each directory creation
     """
@@ -91,7 +101,7 @@ def setup_sample_images(config: Dict[str, Any], max_samples: int = 5) -> List[st
     Args:
         config: Configuration dictionary
         max_samples: Maximum number of sample images to copy
-        
+    
     Returns:
         list: Paths to sample images
     """
@@ -146,106 +156,75 @@ def setup_sample_images(config: Dict[str, Any], max_samples: int = 5) -> List[st
             
             # Add to sample paths
             sample_paths.append(dst)
-            
+        
         except Exception as e:
             logger.error(f"Error copying sample image {src}: {e}")
     
     return sample_paths
 
 
-def reset_categories(config: Dict[str, Any]) -> Dict[str, int]:
+def reset_categories(config: Dict[str, Any], dry_run: bool = False) -> Dict[str, Any]:
     """
     Reset all color categories by removing symlinks.
     
+    The category directories are reconciled against an empty assignment
+    (utils.symlink_reconciler), so each is scanned once and only its
+    symlinks are removed.
+    
     Args:
         config: Configuration dictionary
-        
+        dry_run: If True, only plan the removals
+    
     Returns:
-        dict: Statistics about the reset operation
+        dict: Statistics about the reset operation ("total_removed" and
+              "errors", plus the reconcile statistics)
     """
-    stats = {
-        "total_removed": 0,
-        "errors": 0
-    }
-    
-    # Get base directory
-    base_dir = config["paths"]["base_dir"]
-    
-    # Process each color directory
-    for color, color_dir in config["paths"]["color_dirs"].items():
-        # Create absolute path
-        abs_color_dir = os.path.join(base_dir, color_dir)
-        
-        # Skip if directory doesn't exist
-        if not os.path.exists(abs_color_dir) or not os.path.isdir(abs_color_dir):
-            logger.warning(f"Color directory does not exist: {abs_color_dir}")
-            continue
-        
-        # Remove all symlinks in the directory
-        for filename in os.listdir(abs_color_dir):
-            file_path = os.path.join(abs_color_dir, filename)
-            
-            try:
-                # Check if it's a symlink
-                if os.path.islink(file_path):
-                    # Remove symlink
-                    os.unlink(file_path)
-                    stats["total_removed"] += 1
-                    logger.debug(f"Removed symlink: {file_path}")
-            except Exception as e:
-                logger.error(f"Error removing symlink {file_path}: {e}")
-                stats["errors"] += 1
+    stats = symlink_reconciler.reconcile_categories(config, [], prune=True, dry_run=dry_run)
+    stats["total_removed"] = stats["removed"]
     
     logger.info(f"Reset complete: {stats['total_removed']} symlinks removed, {stats['errors']} errors")
     return stats
 
 
-def restart_sorting(config: Dict[str, Any]) -> Dict[str, int]:
+def restart_sorting(config: Dict[str, Any],
+                    assignments: Iterable[Tuple[str, List[str]]] = (),
+                    dry_run: bool = False) -> Dict[str, Any]:
     """
     Restart sorting by removing all symlinks from color folders and the main folder.
     This provides a fresh start for sorting with new settings.
     
+    Like analyze --reset, the color folders are reconciled in one diff-based
+    pass instead of being emptied and refilled: with assignments, only the
+    links that differ from them are touched.
+    
     Args:
         config: Configuration dictionary
-        
+        assignments: (image_path, categories) for each image to keep sorted;
+                     empty to remove every category link
+        dry_run: If True, only plan the changes
+    
     Returns:
-        dict: Statistics about the restart operation
+        dict: Statistics about the restart operation ("total_removed" and
+              "errors", plus the reconcile statistics)
     """
-    stats = {
-        "total_removed": 0,
-        "errors": 0
-    }
-    
-    # First, reset all color categories
-    reset_stats = reset_categories(config)
-    stats["total_removed"] += reset_stats["total_removed"]
-    stats["errors"] += reset_stats["errors"]
-    
-    # Get base directory
-    base_dir = config["paths"]["base_dir"]
+    stats = symlink_reconciler.reconcile_categories(config, assignments, prune=True, dry_run=dry_run)
     
     # Check for the main little_baby_monster folder
     # This is assumed to be in the base directory
-    main_folder = os.path.join(base_dir, "little_baby_monster")
-    
-    if os.path.exists(main_folder) and os.path.isdir(main_folder):
-        # Remove all symlinks in the main folder
-        for filename in os.listdir(main_folder):
-            file_path = os.path.join(main_folder, filename)
-            
-            try:
-                # Check if it's a symlink
-                if os.path.islink(file_path):
-                    # Remove symlink
-                    os.unlink(file_path)
-                    stats["total_removed"] += 1
-                    logger.debug(f"Removed symlink from main folder: {file_path}")
-            except Exception as e:
-                logger.error(f"Error removing symlink from main folder {file_path}: {e}")
-                stats["errors"] += 1
+    main_folder = os.path.join(config["paths"]["base_dir"], "little_baby_monster")
+    
+    if os.path.isdir(main_folder):
+        main_stats = symlink_reconciler.reconcile_directories({main_folder: {}}, prune=True, dry_run=dry_run)
+        stats["plans"].update(main_stats["plans"])
+        stats["removed"] += main_stats["removed"]
+        stats["errors"] += main_stats["errors"]
+        for step, duration in main_stats["timings"].items():
+            stats["timings"][step] += duration
     else:
         logger.warning(f"Main folder does not exist: {main_folder}")
     
+    stats["total_removed"] = stats["removed"]
+    
     logger.info(f"Restart complete: {stats['total_removed']} symlinks removed, {stats['errors']} errors")
     return stats
 
@@ -254,29 +233,31 @@ def get_image_files_recursive(directory: str) -> List[str]:
     """
     Get all image files in a directory and its subdirectories.
     
+    Only subdirectories that changed since the last scan are listed again
+    (see file_manifest).
+    
     Args:
         directory: Directory path to scan
-        
+    
     Returns:
-        list: Absolute paths to image files
+        list: Absolute paths to image files, in directory order
     """
     image_files = []
     
     try:
-        for root, _, files in os.walk(directory):
-            for filename in files:
-                if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.gif')):
-                    # Create absolute path
-                    image_path = os.path.join(root, filename)
-                    image_files.append(image_path)
+        result = file_manifest.scan_directory(directory, IMAGE_EXTENSIONS)
+        image_files = list(result["files"])
     except Exception as e:
         logger.error(f"Error scanning directory {directory}: {e}")
     
     return image_files
 
+
 def process_new_images(
     config: Dict[str, Any],
-    analyze_func: Callable[[str, Dict[str, float], Any, Any, Any], Dict[str, Any]]
+    analyze_func: Callable[[str, Dict[str, float], Any, Any, Any], Dict[str, Any]],
+    prune: bool = False,
+    dry_run: bool = False
 ) -> Dict[str, Any]:
     """
     Process new images in the original directory.
@@ -284,16 +265,13 @@ def process_new_images(
     Args:
         config: Configuration dictionary
         analyze_func: Function to analyze and categorize images
-        
+        prune: If True, also remove and retarget symlinks that no longer
+               match the analysis (see process_analysis_results)
+        dry_run: If True, only plan the symlink changes
+    
     Returns:
         dict: Statistics about the processing
     """
-    stats = {
-        "processed": 0,
-        "errors": 0,
-        "categories": {}
-    }
-    
     # Get directories
     base_dir = config["paths"]["base_dir"]
     original_dir = os.path.join(base_dir, config["paths"]["original_dir"])
@@ -301,53 +279,81 @@ def process_new_images(
     # Check if original directory exists
     if not os.path.exists(original_dir) or not os.path.isdir(original_dir):
         logger.warning(f"Original directory does not exist: {original_dir}")
-        return stats
+        return {
+            "processed": 0,
+            "errors": 0,
+            "categories": {}
+        }
     
     # Get thresholds and color limits
     thresholds = config["color_thresholds"]
     color_limits = config.get("color_selection_limits")
     
-    # Get all image files recursively
-    image_files = get_image_files_recursive(original_dir)
+    def analyze_all():
+        for image_path in get_image_files_recursive(original_dir):
+            try:
+                yield image_path, analyze_func(image_path, thresholds, None, None, color_limits), None
+            except Exception as e:
+                yield image_path, None, str(e)
     
-    # Process each image
-    for image_path in image_files:
-        try:
-            # Get filename for symlink creation
-            filename = os.path.basename(image_path)
-            
-            # Analyze and categorize image
-            result = analyze_func(image_path, thresholds, None, None, color_limits)
-            
-            # Create symlinks for each category
-            for category in result["categories"]:
-                # Get color directory
-                color_dir = os.path.join(base_dir, config["paths"]["color_dirs"][category])
-                
-                # Create symlink
-                symlink_path = os.path.join(color_dir, filename)
-                
-                # Check if symlink already exists
-                if os.path.exists(symlink_path):
-                    # Skip if already exists
-                    continue
-                
-                # Create symlink
-                os.symlink(image_path, symlink_path)
-                
-                # Update stats
-                stats["categories"][category] = stats["categories"].get(category, 0) + 1
-            
-            # Update stats
-            stats["processed"] += 1
-            
-            # Log progress
-            if stats["processed"] % 100 == 0:
-                logger.info(f"Processed {stats['processed']} images")
-        
-        except Exception as e:
-            logger.error(f"Error processing image {image_path}: {e}")
+    return process_analysis_results(config, analyze_all(), prune, dry_run)
+
+
+def process_analysis_results(
+    config: Dict[str, Any],
+    results: Iterable[Tuple[str, Optional[Dict[str, Any]], Optional[str]]],
+    prune: bool = False,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Create symlinks for a stream of analysis results.
+    
+    This is the single writer for parallel analysis: results are consumed
+    in the order they arrive, so the output does not depend on how many
+    processes produced them. The category directories are then brought
+    up to date in one diff-based pass (utils.symlink_reconciler), so links
+    that are already correct cost nothing.
+    
+    Args:
+        config: Configuration dictionary
+        results: (image_path, result, error) tuples, as yielded by
+                 batch_analysis.analyze_images
+        prune: If True, the results are the whole library: links to other
+               images are removed and links in the wrong category are
+               retargeted, replacing a reset followed by a full re-sort
+        dry_run: If True, only plan the symlink changes
+    
+    Returns:
+        dict: Statistics about the processing, including the reconcile
+              statistics ("added", "removed", "timings", ...)
+    """
+    stats = {
+        "processed": 0,
+        "errors": 0,
+        "categories": {}
+    }
+    
+    assignments = []
+    for image_path, result, error in results:
+        if result is None:
+            logger.error(f"Error processing image {image_path}: {error}")
             stats["errors"] += 1
+            continue
+        
+        assignments.append((image_path, result["categories"]))
+        stats["processed"] += 1
+        
+        # Log progress
+        if stats["processed"] % 100 == 0:
+            logger.info(f"Processed {stats['processed']} images")
+    
+    try:
+        reconcile_stats = symlink_reconciler.reconcile_categories(config, assignments, prune, dry_run)
+        reconcile_stats["errors"] += stats["errors"]
+        stats.update(reconcile_stats)
+    except Exception as e:
+        logger.error(f"Error updating category symlinks: {e}")
+        stats["errors"] += 1
     
     logger.info(f"Processing complete: {stats['processed']} images processed, {stats['errors']} errors")
     return stats
@@ -363,7 +369,7 @@ def categorize_existing_images(
     Args:
         config: Configuration dictionary
         analyze_func: Function to analyze and categorize images
-        
+    
     Returns:
         dict: Statistics about the categorization
     """
@@ -379,34 +385,11 @@ def get_image_categories(config: Dict[str, Any], image_path: str) -> List[str]:
     Args:
         config: Configuration dictionary
         image_path: Path to the image file
-        
+    
     Returns:
         list: Categories the image belongs to
     """
-    categories = []
-    
-    # Get base directory
-    base_dir = config["paths"]["base_dir"]
-    
-    # Get image filename
-    filename = os.path.basename(image_path)
-    
-    # Check each color directory
-    for color, color_dir in config["paths"]["color_dirs"].items():
-        # Create absolute path
-        abs_color_dir = os.path.join(base_dir, color_dir)
-        
-        # Skip if directory doesn't exist
-        if not os.path.exists(abs_color_dir) or not os.path.isdir(abs_color_dir):
-            continue
-        
-        # Check if image exists in this category
-        symlink_path = os.path.join(abs_color_dir, filename)
-        
-        if os.path.exists(symlink_path) and os.path.islink(symlink_path):
-            categories.append(color)
-    
-    return categories
+    return category_index.get_index(config).get_categories(os.path.basename(image_path))
 
 
 def get_category_counts(config: Dict[str, Any]) -> Dict[str, int]:
@@ -415,36 +398,11 @@ def get_category_counts(config: Dict[str, Any]) -> Dict[str, int]:
     
     Args:
         config: Configuration dictionary
-        
+    
     Returns:
         dict: Number of images in each category
     """
-    counts = {}
-    
-    # Get base directory
-    base_dir = config["paths"]["base_dir"]
-    
-    # Count images in each color directory
-    for color, color_dir in config["paths"]["color_dirs"].items():
-        # Create absolute path
-        abs_color_dir = os.path.join(base_dir, color_dir)
-        
-        # Skip if directory doesn't exist
-        if not os.path.exists(abs_color_dir) or not os.path.isdir(abs_color_dir):
-            counts[color] = 0
-            continue
-        
-        # Count symlinks in the directory
-        count = 0
-        for filename in os.listdir(abs_color_dir):
-            file_path = os.path.join(abs_color_dir, filename)
-            
-            if os.path.islink(file_path):
-                count += 1
-        
-        counts[color] = count
-    
-    return counts
+    return category_index.get_index(config).get_counts()
 
 
 def get_uncategorized_images(config: Dict[str, Any]) -> List[str]:
@@ -453,7 +411,7 @@ def get_uncategorized_images(config: Dict[str, Any]) -> List[str]:
     
     Args:
         config: Configuration dictionary
-        
+    
     Returns:
         list: Paths to uncategorized images
     """
@@ -468,17 +426,14 @@ def get_uncategorized_images(config: Dict[str, Any]) -> List[str]:
         logger.warning(f"Original directory does not exist: {original_dir}")
         return uncategorized
     
+    # Filenames with a symlink in any category, from one pass over the color directories
+    categorized = category_index.get_index(config).get_categorized_names()
+    
     # Check each image in the original directory
     for filename in os.listdir(original_dir):
         if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.gif')):
-            # Create absolute path
-            image_path = os.path.join(original_dir, filename)
-            
-            # Check if image is categorized
-            categories = get_image_categories(config, image_path)
-            
-            if not categories:
-                uncategorized.append(image_path)
+            if filename not in categorized:
+                uncategorized.append(os.path.join(original_dir, filename))
     
     return uncategorized
 
@@ -516,7 +471,7 @@ if __name__ == "__main__":
                 uncategorized = get_uncategorized_images(config)
                 
                 print(f"  {len(uncategorized)} uncategorized images")
-                
+            
             except Exception as e:
                 print(f"Error: {e}")
         else:
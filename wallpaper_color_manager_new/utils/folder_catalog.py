@@ -0,0 +1,227 @@
+"""
+Folder Catalog Module
+
+This module provides a date-indexed catalog of the dated image folders
+(e.g. lbm-3-18-25) in a parent directory:
+- Folder names are parsed once per listing instead of on every query
+- Folders are kept sorted by date, so "folders since a date" and "most
+  recent folder" are answered by binary search, with no cap on the
+  number of folders
+- The parent directory is only listed again when its mtime changes,
+  which happens whenever a folder is added, removed or renamed
+"""
+
+import os
+import time
+import bisect
+import logging
+import datetime
+import functools
+import threading
+from typing import List, Optional
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Directories modified this recently (seconds) are listed again on the
+# next query, since a change within the same mtime tick would not show
+RACY_MTIME_WINDOW = 1.0
+
+# Shared catalogs, keyed by parent directory and parsing mode
+_catalogs = {}
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_folder_date(folder_name: str, lbm_only: bool = False) -> Optional[datetime.date]:
+    """
+    Parse the date from a folder name.
+    
+    Recognized formats are lbm-M-D-YY, M-D-YY, YYYY-MM-DD and, as a last
+    resort, the first three numeric dash-separated parts read as M-D-YY.
+    Two-digit years are taken to be 20YY.
+    
+    Args:
+        folder_name: Name of the folder (not the full path)
+        lbm_only: If True, only the lbm-M-D-YY format is recognized
+    
+    Returns:
+        datetime.date: The parsed date, or None if no valid date was found
+    """
+    if not folder_name or not isinstance(folder_name, str):
+        return None
+    
+    parts = folder_name.split('-')
+    
+    if len(parts) == 4 and parts[0] == 'lbm':
+        month_part, day_part, year_part = parts[1], parts[2], parts[3]
+    elif lbm_only or len(parts) < 3:
+        return None
+    elif len(parts) == 3 and all(p.isdigit() for p in parts):
+        if len(parts[0]) == 4:
+            year_part, month_part, day_part = parts[0][2:], parts[1], parts[2]
+        else:
+            month_part, day_part, year_part = parts[0], parts[1], parts[2]
+    else:
+        digit_parts = [p for p in parts if p.isdigit()]
+        if len(digit_parts) < 3:
+            return None
+        month_part, day_part, year_part = digit_parts[0], digit_parts[1], digit_parts[2]
+    
+    if not month_part.isdigit() or not day_part.isdigit() or not year_part.isdigit():
+        return None
+    
+    year = int(year_part)
+    if year < 100:
+        year += 2000
+    
+    try:
+        # Also rejects invalid dates like February 30
+        return datetime.date(year, int(month_part), int(day_part))
+    except ValueError:
+        return None
+
+
+class FolderCatalog:
+    """
+    Dated subfolders of one directory, sorted by date.
+    """
+    
+    def __init__(self, base_dir: str, lbm_only: bool = False):
+        """
+        Create a catalog; the directory is listed on first use.
+        
+        Args:
+            base_dir: Directory holding the dated folders
+            lbm_only: If True, only lbm-M-D-YY folder names are dated
+        """
+        self.base_dir = base_dir
+        self.lbm_only = lbm_only
+        self.scans = 0
+        self._lock = threading.Lock()
+        
+        # Directory mtime at the last listing (None = list again)
+        self._mtime_ns = None
+        
+        # Dated folders in ascending (date, name) order, as parallel lists
+        # so the dates can be bisected
+        self._dates = []
+        self._paths = []
+        
+        # Folders without a date in their name
+        self._undated = []
+    
+    def _scan(self) -> None:
+        """
+        List the directory and parse the folder names.
+        """
+        dated = []
+        undated = []
+        
+        try:
+            scan_start = time.time()
+            mtime_ns = os.stat(self.base_dir).st_mtime_ns
+            with os.scandir(self.base_dir) as entries:
+                for entry in entries:
+                    try:
+                        if not entry.is_dir():
+                            continue
+                    except OSError:
+                        continue
+                    
+                    folder_date = parse_folder_date(entry.name, self.lbm_only)
+                    if folder_date:
+                        dated.append((folder_date, entry.name, entry.path))
+                    else:
+                        undated.append(entry.path)
+            
+            if scan_start - mtime_ns / 1e9 < RACY_MTIME_WINDOW:
+                mtime_ns = None
+        except (FileNotFoundError, NotADirectoryError):
+            mtime_ns = None
+        
+        dated.sort()
+        self._dates = [folder_date for folder_date, _, _ in dated]
+        self._paths = [path for _, _, path in dated]
+        self._undated = sorted(undated)
+        self._mtime_ns = mtime_ns
+        self.scans += 1
+        
+        logger.debug(f"Folder catalog: {len(dated)} dated and {len(undated)} other folders in {self.base_dir}")
+    
+    def refresh(self) -> bool:
+        """
+        List the directory again if it changed since it was last listed.
+        
+        Returns:
+            bool: True if the directory was listed
+        """
+        with self._lock:
+            try:
+                mtime_ns = os.stat(self.base_dir).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+            
+            if mtime_ns is None or mtime_ns != self._mtime_ns:
+                self._scan()
+                return True
+            return False
+    
+    def folders_since(self, since: datetime.date) -> List[str]:
+        """
+        Get the folders dated on or after a date.
+        
+        Args:
+            since: Earliest folder date to include
+        
+        Returns:
+            list: Folder paths, most recent first
+        """
+        self.refresh()
+        with self._lock:
+            start = bisect.bisect_left(self._dates, since)
+            return self._paths[start:][::-1]
+    
+    def most_recent(self) -> Optional[str]:
+        """
+        Get the folder with the latest date.
+        
+        Returns:
+            str: Folder path, or None if no folder name has a date
+        """
+        self.refresh()
+        with self._lock:
+            return self._paths[-1] if self._paths else None
+    
+    def all_folders(self) -> List[str]:
+        """
+        Get every folder, dated or not.
+        
+        Returns:
+            list: Dated folder paths (most recent first), then the others by name
+        """
+        self.refresh()
+        with self._lock:
+            return self._paths[::-1] + self._undated
+
+
+def get_catalog(base_dir: str, lbm_only: bool = False) -> FolderCatalog:
+    """
+    Get the shared catalog of a directory, creating it on first use.
+    
+    Args:
+        base_dir: Directory holding the dated folders
+        lbm_only: If True, only lbm-M-D-YY folder names are dated
+    
+    Returns:
+        FolderCatalog: The shared catalog
+    """
+    key = (os.path.abspath(base_dir), lbm_only)
+    catalog = _catalogs.get(key)
+    if catalog is None:
+        catalog = FolderCatalog(key[0], lbm_only)
+        _catalogs[key] = catalog
+    return catalog
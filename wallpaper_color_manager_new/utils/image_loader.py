@@ -0,0 +1,71 @@
+"""
+Image Loader Module
+
+This module provides a shared loader for small analysis images:
+- JPEGs are decoded with DCT scaling (Image.draft), so libjpeg produces a
+  1/2, 1/4 or 1/8 scale image directly instead of the full resolution
+- Other formats are reduced with a fast integer box filter before the final
+  resample (Image.resize reducing_gap)
+
+Both steps stop at least REDUCING_GAP times above the target size, so the
+final resample sees enough pixels and category percentages stay
+statistically equivalent to a full decode.
+"""
+
+import logging
+from typing import Tuple
+from PIL import Image
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# How much larger than the target an intermediate image must stay
+REDUCING_GAP = 2.0
+
+
+def open_reduced(image_path: str, size: Tuple[int, int], reducing_gap: float = REDUCING_GAP) -> Image.Image:
+    """
+    Open an image, decoding as little of it as possible for a target size.
+    
+    The returned image is still at least reducing_gap times the target
+    size (or full size for formats without reduced decoding); call
+    resize() on it to reach the exact size.
+    
+    Args:
+        image_path: Path to the image file
+        size: Target (width, height)
+        reducing_gap: Minimum ratio between decoded and target size
+    
+    Returns:
+        PIL.Image.Image: The opened image
+    """
+    img = Image.open(image_path)
+    
+    if img.format == "JPEG":
+        # Let libjpeg decode at the smallest DCT scale that still covers the request
+        img.draft("RGB", (int(size[0] * reducing_gap), int(size[1] * reducing_gap)))
+    
+    return img
+
+
+def load_analysis_image(image_path: str, resize_dimensions: Tuple[int, int] = (100, 100),
+                        reducing_gap: float = REDUCING_GAP) -> Image.Image:
+    """
+    Load an image at exactly the analysis size, in RGB mode.
+    
+    Args:
+        image_path: Path to the image file
+        resize_dimensions: Dimensions to resize image for analysis
+        reducing_gap: Minimum ratio between decoded and target size
+    
+    Returns:
+        PIL.Image.Image: The resized RGB image
+    """
+    resize_dimensions = tuple(resize_dimensions)
+    img = open_reduced(image_path, resize_dimensions, reducing_gap)
+    img = img.resize(resize_dimensions, reducing_gap=reducing_gap)
+    return img.convert("RGB")
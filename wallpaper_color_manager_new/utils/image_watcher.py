@@ -0,0 +1,404 @@
+"""
+Image Watcher Module
+
+This module provides functions for noticing new images in the original
+directory as they arrive, without re-walking the whole tree:
+- On Linux, the directory tree is watched with inotify (through ctypes, so
+  no extra package is needed) and the process sleeps until a file is
+  written or moved in; folders created later are watched automatically
+- Elsewhere, or if inotify is unavailable, directories are polled: only
+  directories whose mtime changed are listed again, and a new file is only
+  reported once its size and mtime have stopped changing
+- Bursts of new files are debounced into batches
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import logging
+import ctypes
+import ctypes.util
+from typing import List, Iterator, Optional
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# File extensions picked up (same as file_operations.get_image_files_recursive)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+
+# Seconds without new files before a batch is released
+DEFAULT_DEBOUNCE = 2.0
+
+# Maximum seconds a file waits while new files keep arriving
+DEFAULT_MAX_DELAY = 30.0
+
+# Seconds between polls when inotify is not used
+DEFAULT_POLL_INTERVAL = 5.0
+
+# inotify constants (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF
+
+# struct inotify_event header: wd, mask, cookie, len
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_image_file(path: str) -> bool:
+    """
+    Check whether a path has an image extension.
+    
+    Args:
+        path: File path
+    
+    Returns:
+        bool: True for image files
+    """
+    return path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+class InotifyWatcher:
+    """
+    Watches a directory tree for new image files with inotify.
+    """
+    
+    def __init__(self, root: str):
+        """
+        Start watching a directory tree.
+        
+        Args:
+            root: Directory to watch, including all subdirectories
+        
+        Raises:
+            OSError: If inotify is not available
+        """
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+        
+        self.root = root
+        self.needs_rescan = False
+        self._dirs = {}
+        self._add_tree(root)
+        logger.info(f"Watching {len(self._dirs)} directories under {root} with inotify")
+    
+    def _add_watch(self, directory: str) -> bool:
+        """
+        Watch one directory.
+        
+        Args:
+            directory: Directory path
+        
+        Returns:
+            bool: True if the directory is watched
+        """
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                logger.error("inotify watch limit reached; raise fs.inotify.max_user_watches")
+            else:
+                logger.error(f"Error watching {directory}: {os.strerror(err)}")
+            return False
+        
+        self._dirs[wd] = directory
+        return True
+    
+    def _add_tree(self, directory: str) -> List[str]:
+        """
+        Watch a directory and all its subdirectories.
+        
+        Args:
+            directory: Directory path
+        
+        Returns:
+            list: Image files already in the tree (written before it was watched)
+        """
+        files = []
+        for root, dirs, filenames in os.walk(directory):
+            self._add_watch(root)
+            files.extend(os.path.join(root, f) for f in filenames if is_image_file(f))
+        return files
+    
+    def read_events(self, timeout: Optional[float]) -> List[str]:
+        """
+        Wait for new image files.
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits until something happens)
+        
+        Returns:
+            list: Paths of image files that were completely written or moved in
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        
+        paths = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_len].rstrip(b"\0"))
+            offset += name_len
+            
+            if mask & IN_Q_OVERFLOW:
+                logger.warning("inotify event queue overflowed; a rescan is needed")
+                self.needs_rescan = True
+                continue
+            
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # New folder: watch it and pick up anything already inside
+                    paths.extend(self._add_tree(path))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and is_image_file(name):
+                paths.append(path)
+        
+        return paths
+    
+    def close(self) -> None:
+        """
+        Stop watching.
+        """
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """
+    Watches a directory tree for new image files by polling directory mtimes.
+    """
+    
+    def __init__(self, root: str, interval: float = DEFAULT_POLL_INTERVAL):
+        """
+        Start watching a directory tree; files already present are not reported.
+        
+        Args:
+            root: Directory to watch, including all subdirectories
+            interval: Seconds between polls
+        """
+        self.root = root
+        self.interval = interval
+        self.needs_rescan = False
+        self._dir_mtimes = {}
+        self._files = set()
+        self._settling = {}
+        
+        for directory in self._walk_dirs(root):
+            self._list(directory, report=False)
+        logger.info(f"Polling {len(self._dir_mtimes)} directories under {root} every {interval:g}s")
+    
+    def _walk_dirs(self, root: str) -> List[str]:
+        """
+        Get a directory and all its subdirectories.
+        
+        Args:
+            root: Directory path
+        
+        Returns:
+            list: Directory paths
+        """
+        return [directory for directory, _, _ in os.walk(root)]
+    
+    def _list(self, directory: str, report: bool = True) -> None:
+        """
+        List a directory, remembering its mtime and new files and folders.
+        
+        Args:
+            directory: Directory path
+            report: If True, new files are queued for reporting
+        """
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.path not in self._dir_mtimes:
+                            self._dir_mtimes[entry.path] = None
+                    elif is_image_file(entry.name) and entry.path not in self._files:
+                        self._files.add(entry.path)
+                        if report:
+                            self._settling[entry.path] = None
+        except FileNotFoundError:
+            self._dir_mtimes.pop(directory, None)
+            return
+        
+        self._dir_mtimes[directory] = mtime_ns
+    
+    def _poll(self) -> List[str]:
+        """
+        Check directory mtimes and settling files once.
+        
+        Returns:
+            list: Paths of new image files whose size and mtime stopped changing
+        """
+        for directory, known_mtime in list(self._dir_mtimes.items()):
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except FileNotFoundError:
+                self._dir_mtimes.pop(directory, None)
+                continue
+            
+            if mtime_ns != known_mtime:
+                self._list(directory)
+                # New folders are listed right away, not one poll later
+                for subdir in [d for d, m in self._dir_mtimes.items() if m is None]:
+                    self._list(subdir)
+        
+        ready = []
+        for path, last in list(self._settling.items()):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                del self._settling[path]
+                self._files.discard(path)
+                continue
+            
+            current = (st.st_size, st.st_mtime_ns)
+            if current == last:
+                del self._settling[path]
+                ready.append(path)
+            else:
+                self._settling[path] = current
+        
+        return ready
+    
+    def read_events(self, timeout: Optional[float]) -> List[str]:
+        """
+        Wait for new image files.
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits for the next poll)
+        
+        Returns:
+            list: Paths of new image files
+        """
+        delay = self.interval if timeout is None else min(timeout, self.interval)
+        time.sleep(delay)
+        return self._poll()
+    
+    def close(self) -> None:
+        """
+        Stop watching.
+        """
+        self._dir_mtimes.clear()
+        self._settling.clear()
+
+
+def create_watcher(root: str, use_polling: bool = False,
+                   poll_interval: float = DEFAULT_POLL_INTERVAL):
+    """
+    Create the best available watcher for a directory tree.
+    
+    Args:
+        root: Directory to watch
+        use_polling: If True, poll even when inotify is available
+        poll_interval: Seconds between polls for the polling watcher
+    
+    Returns:
+        InotifyWatcher or PollingWatcher: The watcher
+    """
+    if not use_polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            logger.warning(f"inotify unavailable ({e}), falling back to polling")
+    
+    return PollingWatcher(root, poll_interval)
+
+
+def iter_batches(watcher, debounce: float = DEFAULT_DEBOUNCE,
+                 max_delay: float = DEFAULT_MAX_DELAY) -> Iterator[List[str]]:
+    """
+    Group new image files into batches.
+    
+    A batch is released once no new file has arrived for debounce seconds,
+    or max_delay seconds after its first file if files keep arriving. While
+    nothing is pending the watcher blocks, so an idle loop costs no CPU
+    (with inotify) or one stat per directory per poll.
+    
+    Args:
+        watcher: Watcher created by create_watcher
+        debounce: Quiet period that ends a batch
+        max_delay: Maximum age of the oldest file in a batch
+    
+    If the watcher lost events (inotify queue overflow), every image under
+    its root is included in the next batch.
+    
+    Yields:
+        list: Sorted paths of new image files that still exist
+    """
+    pending = {}
+    first_seen = None
+    last_seen = None
+    
+    while True:
+        if pending:
+            now = time.monotonic()
+            timeout = max(0.0, min(last_seen + debounce, first_seen + max_delay) - now)
+        else:
+            timeout = None
+        
+        paths = watcher.read_events(timeout)
+        now = time.monotonic()
+        
+        if watcher.needs_rescan:
+            # Events were lost: offer every image again and let the caller skip known ones
+            watcher.needs_rescan = False
+            paths = paths + [
+                os.path.join(root, f)
+                for root, _, filenames in os.walk(watcher.root)
+                for f in filenames if is_image_file(f)
+            ]
+        
+        for path in paths:
+            if path not in pending:
+                pending[path] = now
+        if paths:
+            last_seen = now
+            if first_seen is None:
+                first_seen = now
+        
+        if pending and (now - last_seen >= debounce or now - first_seen >= max_delay):
+            batch = sorted(path for path in pending if os.path.exists(path))
+            pending = {}
+            first_seen = None
+            last_seen = None
+            if batch:
+                yield batch
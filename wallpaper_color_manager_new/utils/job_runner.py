@@ -0,0 +1,289 @@
+"""
+Job Runner Module
+
+This module provides a runner for the control panel's long operations
+(analysis, reset, restart):
+- One job runs at a time on a coordinator thread; CPU-bound decoding is
+  fanned out to worker processes by the job (see batch_analysis), while
+  all filesystem writes stay in the coordinator
+- Progress is posted to a queue that the Tk loop drains at a fixed
+  cadence, instead of scheduling a callback per update
+- Progress events carry throughput (images/sec), an ETA and
+  per-category counts
+- A job can be cancelled between work items; the part of a job that
+  writes its results runs as a critical section that is finished before
+  a cancellation takes effect, so no half-written state is left behind
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Any, Callable, Optional
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# How often (milliseconds) the UI should drain the progress queue
+POLL_INTERVAL_MS = 100
+
+# Minimum seconds between two progress events of the same phase
+PROGRESS_INTERVAL = 0.2
+
+# Default number of worker processes for decoding
+DEFAULT_JOBS = max(1, (os.cpu_count() or 1) - 1)
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a job when it has been cancelled.
+    """
+
+
+class JobContext:
+    """
+    Handle a running job uses to report progress and check for cancellation.
+    """
+    
+    def __init__(self, events: "queue.Queue", cancel_event: threading.Event, jobs: int):
+        """
+        Create the context of one job run.
+        
+        Args:
+            events: Queue progress events are posted to
+            cancel_event: Set when the job should stop
+            jobs: Number of worker processes the job may use
+        """
+        self.jobs = jobs
+        self._events = events
+        self._cancel_event = cancel_event
+        self._critical = 0
+        self._phase = None
+        self._phase_start = 0.0
+        self._last_progress = 0.0
+    
+    @property
+    def cancel_requested(self) -> bool:
+        """
+        Whether cancellation was requested (it may be deferred by a critical section).
+        """
+        return self._cancel_event.is_set()
+    
+    def check_cancelled(self) -> None:
+        """
+        Stop the job if it was cancelled, unless inside a critical section.
+        
+        Raises:
+            JobCancelled: If the job should stop now
+        """
+        if self._critical == 0 and self._cancel_event.is_set():
+            raise JobCancelled()
+    
+    @contextmanager
+    def critical(self):
+        """
+        Run a block that must not be interrupted, e.g. writing results.
+        
+        Cancellation requested inside the block takes effect at the next
+        cancellation point after it, so a job that completes its writes
+        still reports its result.
+        """
+        self._critical += 1
+        try:
+            yield
+        finally:
+            self._critical -= 1
+    
+    def status(self, message: str) -> None:
+        """
+        Post a status message.
+        
+        Args:
+            message: Text for the status bar
+        """
+        self._events.put({"type": "status", "message": message})
+    
+    def progress(self, phase: str, done: int, total: int,
+                 categories: Optional[Dict[str, int]] = None) -> None:
+        """
+        Post progress of the current phase, then check for cancellation.
+        
+        Events are throttled to one per PROGRESS_INTERVAL, except for the
+        first and last item of a phase.
+        
+        Args:
+            phase: Name of the phase (e.g. "Decoding images")
+            done: Items finished so far
+            total: Total items in the phase
+            categories: Optional number of images per category so far
+        
+        Raises:
+            JobCancelled: If the job should stop now
+        """
+        now = time.monotonic()
+        if phase != self._phase:
+            self._phase = phase
+            self._phase_start = now
+            self._last_progress = 0.0
+        
+        if done >= total or done <= 1 or now - self._last_progress >= PROGRESS_INTERVAL:
+            self._last_progress = now
+            elapsed = now - self._phase_start
+            rate = done / elapsed if elapsed > 0 and done > 0 else 0.0
+            eta = (total - done) / rate if rate > 0 else None
+            self._events.put({
+                "type": "progress",
+                "phase": phase,
+                "done": done,
+                "total": total,
+                "rate": rate,
+                "eta": eta,
+                "categories": dict(categories) if categories else None
+            })
+        
+        self.check_cancelled()
+
+
+class JobRunner:
+    """
+    Runs one background job at a time and collects its events.
+    """
+    
+    def __init__(self, jobs: int = DEFAULT_JOBS):
+        """
+        Create a runner.
+        
+        Args:
+            jobs: Number of worker processes handed to jobs for decoding
+        """
+        self.jobs = max(1, jobs)
+        self._events = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._thread = None
+        self._name = None
+    
+    @property
+    def busy(self) -> bool:
+        """
+        Whether a job is running.
+        """
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self, name: str, func: Callable[..., Any], *args, **kwargs) -> bool:
+        """
+        Start a job on the coordinator thread.
+        
+        The job is called as func(context, *args, **kwargs) and its return
+        value is posted in a "done" event. A "cancelled" or "error" event is
+        posted instead if it was cancelled or raised.
+        
+        Args:
+            name: Name of the job, for logging and events
+            func: Job function
+            *args: Positional arguments for the job
+            **kwargs: Keyword arguments for the job
+        
+        Returns:
+            bool: False if another job is still running
+        """
+        if self.busy:
+            logger.warning(f"Cannot start {name}: {self._name} is still running")
+            return False
+        
+        self._cancel_event.clear()
+        self._name = name
+        context = JobContext(self._events, self._cancel_event, self.jobs)
+        
+        def run():
+            start = time.monotonic()
+            try:
+                result = func(context, *args, **kwargs)
+                event = {"type": "done", "result": result}
+            except JobCancelled:
+                logger.info(f"{name} cancelled")
+                event = {"type": "cancelled"}
+            except Exception as e:
+                logger.error(f"Error in {name}: {e}", exc_info=True)
+                event = {"type": "error", "error": str(e)}
+            
+            event["job"] = name
+            event["elapsed"] = time.monotonic() - start
+            self._events.put(event)
+        
+        self._thread = threading.Thread(target=run, name=f"job-{name}", daemon=True)
+        self._thread.start()
+        logger.info(f"Started {name} with {self.jobs} worker process(es)")
+        return True
+    
+    def cancel(self) -> bool:
+        """
+        Ask the running job to stop at its next cancellation point.
+        
+        Returns:
+            bool: True if a job was running
+        """
+        if not self.busy:
+            return False
+        self._cancel_event.set()
+        logger.info(f"Cancellation of {self._name} requested")
+        return True
+    
+    def poll(self) -> List[Dict[str, Any]]:
+        """
+        Take the events posted since the last poll (non-blocking).
+        
+        Returns:
+            list: Events in the order they were posted
+        """
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """
+    Format a duration as H:MM:SS or M:SS.
+    
+    Args:
+        seconds: Duration in seconds (None for unknown)
+    
+    Returns:
+        str: Formatted duration, or "?" if unknown
+    """
+    if seconds is None:
+        return "?"
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def format_progress(event: Dict[str, Any]) -> str:
+    """
+    Describe a progress event in one line, e.g. for a status bar.
+    
+    Args:
+        event: Event posted by JobContext.progress
+    
+    Returns:
+        str: Progress description
+    """
+    text = f"{event['phase']}: {event['done']}/{event['total']}"
+    if event["rate"] > 0:
+        text += f" - {event['rate']:.1f} images/s, ETA {format_duration(event['eta'])}"
+    
+    categories = event.get("categories")
+    if categories:
+        text += " - " + ", ".join(f"{category} {count}" for category, count in categories.items())
+    return text
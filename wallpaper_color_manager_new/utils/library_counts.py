@@ -0,0 +1,200 @@
+"""
+Library Counts Module
+
+This module provides the second stage of a two-stage analysis pipeline:
+- Stage one reduces every image to raw per-category pixel counts, which
+  only depend on the resize dimensions and color detection parameters
+  (see color_analysis.count_image_categories)
+- Stage two, implemented here, keeps those counts for a whole library in
+  one matrix and re-derives weighted percentages and categories from it,
+  so threshold or selection limit changes never touch the image files
+"""
+
+import logging
+from typing import Dict, List, Any, Optional, Callable, Tuple
+import numpy as np
+
+from . import analysis_cache, batch_analysis, color_analysis
+from .color_analysis import COLOR_CATEGORIES
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class LibraryCounts:
+    """
+    Raw per-category pixel counts for a set of images, one row per image.
+    """
+    
+    def __init__(self, image_paths: List[str], counts: np.ndarray, settings_hash: str,
+                 errors: Optional[List[str]] = None):
+        """
+        Initialize the counts matrix.
+        
+        Args:
+            image_paths: Paths to the image files, one per row
+            counts: Integer matrix of shape (len(image_paths), len(COLOR_CATEGORIES))
+            settings_hash: Hash of the analysis settings the counts belong to
+            errors: Paths of images that could not be analyzed
+        """
+        self.image_paths = list(image_paths)
+        self.counts = counts
+        self.settings_hash = settings_hash
+        self.errors = errors or []
+    
+    def __len__(self) -> int:
+        return len(self.image_paths)
+    
+    @classmethod
+    def build(cls,
+              image_paths: List[str],
+              resize_dimensions: Tuple[int, int] = (100, 100),
+              color_params: Dict[str, Any] = None,
+              lut: Optional[np.ndarray] = None,
+              progress_callback: Optional[Callable[[int, int], None]] = None,
+              jobs: int = 1) -> "LibraryCounts":
+        """
+        Collect counts for a set of images.
+        
+        Counts already in the persistent analysis cache are fetched with a
+        single query; only the remaining images are decoded.
+        
+        Args:
+            image_paths: Paths to the image files
+            resize_dimensions: Dimensions to resize image for analysis
+            color_params: Color detection parameters
+            lut: Optional lookup table compiled from color_params
+            progress_callback: Called with (done, total) while decoding; an
+                               exception it raises stops the build (and the
+                               worker processes) and is passed on
+            jobs: Number of worker processes to decode in (see batch_analysis)
+        
+        Returns:
+            LibraryCounts: Counts for every image that could be analyzed
+        """
+        resize_dimensions = tuple(resize_dimensions)
+        settings_hash = color_analysis.analysis_settings_hash(resize_dimensions, color_params)
+        
+        cached = {}
+        store = analysis_cache.get_default_cache()
+        if store is not None:
+            cached = store.get_many(image_paths, settings_hash)
+        
+        misses = [path for path in image_paths if path not in cached]
+        logger.info(f"Counts cached for {len(cached)} images, decoding {len(misses)}")
+        
+        errors = []
+        if jobs > 1 and misses:
+            computed = batch_analysis.count_images(misses, resize_dimensions, color_params, jobs)
+            try:
+                for i, (image_path, counts, error) in enumerate(computed):
+                    if counts is None:
+                        logger.error(f"Error analyzing image {image_path}: {error}")
+                        errors.append(image_path)
+                    else:
+                        cached[image_path] = counts
+                        if store is not None:
+                            store.put(image_path, settings_hash, counts)
+                    
+                    if progress_callback is not None:
+                        progress_callback(i + 1, len(misses))
+            finally:
+                computed.close()
+        else:
+            for i, image_path in enumerate(misses):
+                try:
+                    cached[image_path] = color_analysis.count_image_categories(
+                        image_path, resize_dimensions, color_params, lut
+                    )
+                except Exception as e:
+                    logger.error(f"Error analyzing image {image_path}: {e}")
+                    errors.append(image_path)
+                
+                if progress_callback is not None:
+                    progress_callback(i + 1, len(misses))
+        
+        paths = [path for path in image_paths if path in cached]
+        counts = np.array(
+            [[cached[path].get(color, 0) for color in COLOR_CATEGORIES] for path in paths],
+            dtype=np.int64
+        ).reshape(len(paths), len(COLOR_CATEGORIES))
+        
+        return cls(paths, counts, settings_hash, errors)
+    
+    def matches(self, resize_dimensions: Tuple[int, int], color_params: Dict[str, Any] = None) -> bool:
+        """
+        Check whether these counts are valid for some analysis settings.
+        
+        Args:
+            resize_dimensions: Dimensions to resize image for analysis
+            color_params: Color detection parameters
+        
+        Returns:
+            bool: True if the counts can be reused as they are
+        """
+        return self.settings_hash == color_analysis.analysis_settings_hash(resize_dimensions, color_params)
+    
+    def weighted_percentages(self, color_params: Dict[str, Any] = None) -> np.ndarray:
+        """
+        Compute weighted percentages for every image at once.
+        
+        The arithmetic matches color_analysis.calculate_weighted_percentages
+        element for element.
+        
+        Args:
+            color_params: Color detection parameters (only hue ranges and
+                          weights matter here)
+        
+        Returns:
+            numpy.ndarray: Float matrix with the same shape as counts
+        """
+        _, range_weights = color_analysis.calculate_range_weights(color_params)
+        weights = np.array([range_weights.get(color, 1.0) for color in COLOR_CATEGORIES], dtype=np.float64)
+        weighted = self.counts * weights
+        
+        # Sum left to right like the scalar version so results are identical
+        total = np.zeros(len(self), dtype=np.float64)
+        for column in range(weighted.shape[1]):
+            total = total + weighted[:, column]
+        
+        valid = total > 0
+        safe_total = np.where(valid, total, 1.0)
+        percentages = (weighted / safe_total[:, None]) * 100
+        percentages[~valid] = 0
+        return percentages
+    
+    def categorize(self,
+                   thresholds: Dict[str, float],
+                   color_limits: Optional[Dict[str, Dict[str, int]]] = None,
+                   color_params: Dict[str, Any] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Apply thresholds and color limits to every image.
+        
+        Args:
+            thresholds: Threshold percentage for each color
+            color_limits: Min/max color limits for with/without white_gray_black
+            color_params: Color detection parameters
+        
+        Returns:
+            dict: {image_path: {"categories": [...], "color_percentages": {...}}}
+        """
+        percentages = self.weighted_percentages(color_params)
+        valid = percentages.sum(axis=1) > 0
+        
+        results = {}
+        for image_path, row, is_valid in zip(self.image_paths, percentages.tolist(), valid.tolist()):
+            if is_valid:
+                color_percentages = dict(zip(COLOR_CATEGORIES, row))
+            else:
+                color_percentages = {color: 0 for color in COLOR_CATEGORIES}
+            
+            results[image_path] = {
+                "categories": color_analysis.apply_thresholds(color_percentages, thresholds, color_limits),
+                "color_percentages": color_percentages
+            }
+        
+        return results
@@ -0,0 +1,245 @@
+"""
+Preview Loader Module
+
+This module provides asynchronous loading of the control panel's sample
+image previews:
+- The image is decoded and fitted to each display size, and its colors are
+  analyzed, on a background thread instead of the Tk thread
+- Results are kept for the last few images, and the neighbours of the
+  image being shown are prepared ahead, so flipping back and forth does
+  not decode anything again
+- Each request supersedes the previous one: when the user flips quickly,
+  only the result of the latest request is delivered
+- Delivered images are RGB and already sized, so the UI thread only has to
+  wrap them in a PhotoImage
+"""
+
+import json
+import queue
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+from . import color_analysis, thumbnail_cache
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# How often (milliseconds) the UI should check for a finished preview
+POLL_INTERVAL_MS = 30
+
+# Default number of background threads preparing previews
+DEFAULT_WORKERS = 2
+
+# Default number of prepared previews kept in memory
+DEFAULT_MAX_ENTRIES = 16
+
+
+def _preview_key(image_path: str, sizes: Tuple[Tuple[int, int], ...],
+                 resize_dimensions: Tuple[int, int], color_params: Dict[str, Any]) -> str:
+    """
+    Get the key of a prepared preview.
+    
+    Args:
+        image_path: Path to the image file
+        sizes: Display sizes the image is fitted to
+        resize_dimensions: Dimensions to resize image for analysis
+        color_params: Color detection parameters
+    
+    Returns:
+        str: Key identifying the preview and the settings it was made with
+    """
+    return json.dumps(
+        [image_path, [list(size) for size in sizes], list(resize_dimensions), color_params],
+        sort_keys=True
+    )
+
+
+def prepare_preview(image_path: str, sizes: Tuple[Tuple[int, int], ...],
+                    resize_dimensions: Tuple[int, int],
+                    color_params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Decode an image for display and analyze its colors.
+    
+    Args:
+        image_path: Path to the image file
+        sizes: Display sizes (width, height) to fit the image to
+        resize_dimensions: Dimensions to resize image for analysis
+        color_params: Color detection parameters
+    
+    Returns:
+        dict: {"images": {size: PIL.Image.Image in RGB}, "analysis": result of
+              color_analysis.analyze_image_multi, or None if it failed}
+    """
+    images = {}
+    for size in sizes:
+        images[size] = thumbnail_cache.load_thumbnail(image_path, size).convert("RGB")
+    
+    try:
+        analysis = color_analysis.analyze_image_multi(
+            image_path,
+            resize_dimensions,
+            color_params
+        )
+    except Exception as e:
+        logger.error(f"Error analyzing image {image_path}: {e}")
+        analysis = None
+    
+    return {"images": images, "analysis": analysis}
+
+
+class PreviewLoader:
+    """
+    Prepares previews on background threads and delivers the latest one.
+    """
+    
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Create a loader.
+        
+        Args:
+            workers: Number of background threads
+            max_entries: Number of prepared previews kept in memory
+        """
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preview")
+        self._lock = threading.Lock()
+        self._results = queue.Queue()
+        self._generation = 0
+        
+        # Preview key -> Future of the prepared preview, least recently used first
+        self._entries = OrderedDict()
+    
+    def _get(self, image_path: str, sizes: Tuple[Tuple[int, int], ...],
+             resize_dimensions: Tuple[int, int], color_params: Dict[str, Any]) -> Future:
+        """
+        Get the prepared (or preparing) preview of an image, starting it if needed.
+        
+        Args:
+            image_path: Path to the image file
+            sizes: Display sizes to fit the image to
+            resize_dimensions: Dimensions to resize image for analysis
+            color_params: Color detection parameters
+        
+        Returns:
+            concurrent.futures.Future: Resolves to the result of prepare_preview
+        """
+        key = _preview_key(image_path, sizes, resize_dimensions, color_params)
+        
+        with self._lock:
+            future = self._entries.get(key)
+            if future is not None and not future.cancelled() and not (
+                    future.done() and future.exception() is not None):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return future
+            
+            self.misses += 1
+            future = self._pool.submit(prepare_preview, image_path, sizes, resize_dimensions, color_params)
+            self._entries[key] = future
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_entries:
+                _, oldest = self._entries.popitem(last=False)
+                oldest.cancel()
+        
+        return future
+    
+    def request(self, image_path: str, sizes: List[Tuple[int, int]],
+                resize_dimensions: Tuple[int, int], color_params: Dict[str, Any],
+                prefetch: Optional[List[str]] = None) -> int:
+        """
+        Ask for the preview of an image, superseding earlier requests.
+        
+        The result is delivered through poll(). Previews of the prefetch
+        images are prepared with the same settings but not delivered, and
+        previews queued for earlier requests that have not started yet are
+        dropped, so rapid flipping does not build up a backlog.
+        
+        Args:
+            image_path: Path to the image file
+            sizes: Display sizes (width, height) to fit the image to
+            resize_dimensions: Dimensions to resize image for analysis
+            color_params: Color detection parameters
+            prefetch: Paths of images likely to be requested next
+        
+        Returns:
+            int: Number of the request
+        """
+        sizes = tuple(tuple(size) for size in sizes)
+        resize_dimensions = tuple(resize_dimensions)
+        
+        wanted = [image_path] + [path for path in prefetch or [] if path != image_path]
+        wanted_keys = {_preview_key(path, sizes, resize_dimensions, color_params) for path in wanted}
+        
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            
+            for key, queued in list(self._entries.items()):
+                if key not in wanted_keys and queued.cancel():
+                    del self._entries[key]
+        
+        future = self._get(image_path, sizes, resize_dimensions, color_params)
+        
+        def deliver(done_future, generation=generation):
+            if done_future.cancelled() or generation != self._generation:
+                return
+            event = {"request": generation, "path": image_path}
+            try:
+                event.update(done_future.result())
+            except Exception as e:
+                event["error"] = str(e)
+            self._results.put(event)
+        
+        # Runs at once if the preview is already prepared
+        future.add_done_callback(deliver)
+        
+        for path in wanted[1:]:
+            self._get(path, sizes, resize_dimensions, color_params)
+        
+        return generation
+    
+    def poll(self) -> Optional[Dict[str, Any]]:
+        """
+        Take the result of the latest request if it is ready (non-blocking).
+        
+        Results of superseded requests are dropped.
+        
+        Returns:
+            dict: {"request", "path", "images", "analysis"} or {"request",
+                  "path", "error"}, or None if nothing is ready
+        """
+        latest = None
+        while True:
+            try:
+                event = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if event["request"] == self._generation:
+                latest = event
+        return latest
+    
+    def clear(self) -> None:
+        """
+        Drop every prepared preview, e.g. after the images changed on disk.
+        """
+        with self._lock:
+            for future in self._entries.values():
+                future.cancel()
+            self._entries.clear()
+    
+    def close(self) -> None:
+        """
+        Stop the background threads, dropping previews not yet started.
+        """
+        self.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
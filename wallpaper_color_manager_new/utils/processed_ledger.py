@@ -0,0 +1,481 @@
+"""
+Processed Ledger Module
+
+This module provides a persistent record of which images have been
+categorized with which analysis settings, kept out of config.json:
+- Entries live in an SQLite database next to the configuration file
+- Writes are buffered and committed in batches, so recording an image
+  costs the same however large the library is
+- Settings are identified by a stable fingerprint (SHA-256 of canonical
+  JSON), so entries stay valid across sessions
+- Entries also record color_analysis.percentages_settings_hash, the hash
+  of the settings that determine weighted color percentages (including the
+  analysis version and hue weights), so a threshold or limit change can
+  reuse them
+- Ledgers stored in config.json by older versions are imported once
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Set
+
+from . import color_analysis
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Number of buffered records that triggers a commit
+DEFAULT_BATCH_SIZE = 500
+
+# Default maximum age of ledger entries (30 days)
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60
+
+# Length of a settings fingerprint; older versions used Python's per-process
+# randomized hash() instead, which never matches across sessions
+FINGERPRINT_LENGTH = 64
+
+
+def _canonical(value: Any) -> Any:
+    """
+    Normalize a settings value so equal settings serialize identically.
+    
+    Args:
+        value: Settings value
+    
+    Returns:
+        Any: Value with numbers as floats and tuples as lists
+    """
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def settings_fingerprint(settings: Dict[str, Any]) -> str:
+    """
+    Get the fingerprint of a full set of analysis settings.
+    
+    The settings that determine color percentages are covered by
+    color_analysis.percentages_settings_hash, which includes ANALYSIS_VERSION
+    and the hue weights, so entries recorded by an older analysis or under
+    other weights never match.
+    
+    Args:
+        settings: Dict with "color_thresholds", "color_detection_params",
+                  "color_selection_limits" and "resize_dimensions"
+    
+    Returns:
+        str: Hex fingerprint, stable across processes and sessions
+    """
+    canonical = json.dumps(_canonical({
+        "analysis_hash": _analysis_hash(settings),
+        "color_thresholds": settings.get("color_thresholds"),
+        "color_selection_limits": settings.get("color_selection_limits")
+    }), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _analysis_hash(settings: Dict[str, Any]) -> str:
+    """
+    Get the color_analysis.percentages_settings_hash of a set of analysis settings.
+    
+    Args:
+        settings: Dict with "color_detection_params" and "resize_dimensions"
+    
+    Returns:
+        str: Hex digest of the settings that determine color percentages
+    """
+    return color_analysis.percentages_settings_hash(
+        tuple(settings.get("resize_dimensions") or (100, 100)),
+        settings.get("color_detection_params")
+    )
+
+
+def get_ledger_path(config_path: str) -> str:
+    """
+    Get the ledger database path belonging to a configuration file.
+    
+    Args:
+        config_path: Absolute path to the configuration file
+    
+    Returns:
+        str: Path to the ledger database
+    """
+    return os.path.splitext(config_path)[0] + ".processed.sqlite3"
+
+
+class ProcessedLedger:
+    """
+    SQLite-backed record of processed images per settings hash.
+    """
+    
+    def __init__(self, db_path: str, batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Open (or create) the ledger database.
+        
+        Args:
+            db_path: Path to the SQLite database
+            batch_size: Number of buffered records that triggers a commit
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._buffer = []
+        self._lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        
+        # The control panel reads from the UI thread and writes from the analysis thread
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS processed ("
+            " settings_hash TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " timestamp REAL NOT NULL,"
+            " categories TEXT NOT NULL,"
+            " color_percentages TEXT NOT NULL,"
+            " analysis_hash TEXT NOT NULL DEFAULT '',"
+            " PRIMARY KEY (settings_hash, path))"
+        )
+        
+        # Ledgers created before analysis fingerprints were recorded
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(processed)")]
+        if "analysis_hash" not in columns:
+            self._conn.execute("ALTER TABLE processed ADD COLUMN analysis_hash TEXT NOT NULL DEFAULT ''")
+        
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS processed_timestamp ON processed (timestamp)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS processed_analysis ON processed (analysis_hash, path)"
+        )
+        self._conn.commit()
+    
+    def record(self, settings_hash: str, image_path: str,
+               categories: List[str], color_percentages: Dict[str, float],
+               timestamp: Optional[float] = None, analysis_hash: str = "") -> None:
+        """
+        Record that an image has been processed with some settings.
+        
+        The record is buffered; call flush() to commit it right away.
+        
+        Args:
+            settings_hash: Hash of the analysis settings
+            image_path: Path to the image file
+            categories: Categories the image was placed in
+            color_percentages: Weighted percentage for each category
+            timestamp: Time of processing (defaults to now)
+            analysis_hash: Fingerprint of the settings the percentages
+                           depend on (see color_analysis.percentages_settings_hash)
+        """
+        with self._lock:
+            self._buffer.append((
+                settings_hash,
+                image_path,
+                time.time() if timestamp is None else timestamp,
+                json.dumps(list(categories)),
+                json.dumps(color_percentages),
+                analysis_hash
+            ))
+            if len(self._buffer) >= self.batch_size:
+                self._flush()
+    
+    def _flush(self) -> None:
+        """
+        Commit buffered records. Must be called with the lock held.
+        """
+        if not self._buffer:
+            return
+        
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO processed "
+            "(settings_hash, path, timestamp, categories, color_percentages, analysis_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            self._buffer
+        )
+        self._conn.commit()
+        self._buffer = []
+    
+    def flush(self) -> None:
+        """
+        Commit buffered records.
+        """
+        with self._lock:
+            self._flush()
+    
+    def get_processed_paths(self, settings_hash: str) -> Set[str]:
+        """
+        Get every image processed with some settings.
+        
+        Args:
+            settings_hash: Hash of the analysis settings
+        
+        Returns:
+            set: Paths to the processed image files
+        """
+        with self._lock:
+            self._flush()
+            return {
+                row[0] for row in self._conn.execute(
+                    "SELECT path FROM processed WHERE settings_hash = ?",
+                    (settings_hash,)
+                )
+            }
+    
+    def get_known_paths(self) -> Set[str]:
+        """
+        Get every image processed with any settings.
+
+        Returns:
+            set: Paths to the processed image files
+        """
+        with self._lock:
+            self._flush()
+            return {row[0] for row in self._conn.execute("SELECT DISTINCT path FROM processed")}
+
+    def get(self, settings_hash: str, image_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the record of an image processed with some settings.
+        
+        Args:
+            settings_hash: Hash of the analysis settings
+            image_path: Path to the image file
+        
+        Returns:
+            dict: Entry with timestamp, categories and color_percentages, or
+                  None if the image has not been processed with these settings
+        """
+        with self._lock:
+            self._flush()
+            row = self._conn.execute(
+                "SELECT timestamp, categories, color_percentages FROM processed "
+                "WHERE settings_hash = ? AND path = ?",
+                (settings_hash, image_path)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        
+        return {
+            "timestamp": row[0],
+            "categories": json.loads(row[1]),
+            "color_percentages": json.loads(row[2])
+        }
+    
+    def get_percentages(self, analysis_hash: str, image_paths: List[str]) -> Dict[str, Dict[str, float]]:
+        """
+        Get recorded color percentages that are still valid for some images.
+        
+        Percentages recorded under any thresholds or limits can be reused as
+        long as the analysis fingerprint matches and the file has not been
+        modified since it was recorded.
+        
+        Args:
+            analysis_hash: Fingerprint of the settings the percentages depend on
+            image_paths: Paths to the image files
+        
+        Returns:
+            dict: Color percentages for each image found, keyed by path
+        """
+        if not analysis_hash:
+            return {}
+        
+        with self._lock:
+            self._flush()
+            rows = {}
+            for path, timestamp, color_percentages in self._conn.execute(
+                "SELECT path, timestamp, color_percentages FROM processed WHERE analysis_hash = ?",
+                (analysis_hash,)
+            ):
+                # Keep the most recent record of each image
+                if path not in rows or timestamp > rows[path][0]:
+                    rows[path] = (timestamp, color_percentages)
+        
+        found = {}
+        for image_path in image_paths:
+            row = rows.get(image_path)
+            if row is None:
+                continue
+            try:
+                if os.stat(image_path).st_mtime > row[0]:
+                    continue
+            except OSError:
+                continue
+            found[image_path] = json.loads(row[1])
+        
+        return found
+    
+    def migrate_legacy_hashes(self, last_settings: Optional[Dict[str, Any]]) -> int:
+        """
+        Re-key entries recorded under the randomized hashes of older versions.
+        
+        Those hashes cannot be reversed, but the analysis run that produced
+        the newest entries is known: its settings are saved as
+        last_analysis_settings, with a timestamp taken before any of its
+        images were recorded. Entries from that run are moved to the stable
+        fingerprint of those settings; other legacy entries could never match
+        again and are dropped.
+        
+        Migrated entries keep counting as processed, but get no analysis
+        hash: their percentages come from an older analysis, so
+        get_percentages never reuses them.
+        
+        Args:
+            last_settings: The configuration's last_analysis_settings
+        
+        Returns:
+            int: Number of entries migrated
+        """
+        with self._lock:
+            self._flush()
+            legacy_hashes = [
+                row[0] for row in self._conn.execute(
+                    "SELECT DISTINCT settings_hash FROM processed WHERE length(settings_hash) != ?",
+                    (FINGERPRINT_LENGTH,)
+                )
+            ]
+            if not legacy_hashes:
+                return 0
+            
+            migrated = 0
+            if isinstance(last_settings, dict) and "timestamp" in last_settings:
+                settings_hash = settings_fingerprint(last_settings)
+                migrated = self._conn.execute(
+                    "INSERT OR REPLACE INTO processed "
+                    "(settings_hash, path, timestamp, categories, color_percentages, analysis_hash) "
+                    "SELECT ?, path, timestamp, categories, color_percentages, '' FROM processed "
+                    "WHERE length(settings_hash) != ? AND timestamp >= ?",
+                    (settings_hash, FINGERPRINT_LENGTH, last_settings["timestamp"])
+                ).rowcount
+            
+            dropped = self._conn.execute(
+                "DELETE FROM processed WHERE length(settings_hash) != ?",
+                (FINGERPRINT_LENGTH,)
+            ).rowcount
+            self._conn.commit()
+        
+        logger.info(f"Migrated {migrated} processed file entries to stable settings fingerprints "
+                    f"({dropped - migrated} unrecoverable entries dropped)")
+        return migrated
+    
+    def import_entries(self, processed_files: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Import a ledger in the {settings_hash: {path: entry}} layout that
+        older versions kept in config.json.
+        
+        Args:
+            processed_files: Ledger to import
+        
+        Returns:
+            int: Number of entries imported
+        """
+        imported = 0
+        for settings_hash, entries in processed_files.items():
+            if not isinstance(entries, dict):
+                continue
+            for image_path, entry in entries.items():
+                if not isinstance(entry, dict) or "timestamp" not in entry:
+                    continue
+                self.record(
+                    settings_hash,
+                    image_path,
+                    entry.get("categories", []),
+                    entry.get("color_percentages", {}),
+                    entry["timestamp"]
+                )
+                imported += 1
+        
+        self.flush()
+        return imported
+    
+    def cleanup(self, max_age: float = DEFAULT_MAX_AGE) -> int:
+        """
+        Remove entries older than max_age.
+        
+        Args:
+            max_age: Maximum age of entries in seconds
+        
+        Returns:
+            int: Number of entries removed
+        """
+        with self._lock:
+            self._flush()
+            removed = self._conn.execute(
+                "DELETE FROM processed WHERE timestamp < ?",
+                (time.time() - max_age,)
+            ).rowcount
+            self._conn.commit()
+        
+        if removed:
+            logger.info(f"Removed {removed} old entries from processed files ledger")
+        return removed
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get statistics about the ledger.
+        
+        Returns:
+            dict: Ledger statistics
+        """
+        with self._lock:
+            self._flush()
+            entries = self._conn.execute("SELECT COUNT(*) FROM processed").fetchone()[0]
+            settings = self._conn.execute("SELECT COUNT(DISTINCT settings_hash) FROM processed").fetchone()[0]
+        
+        return {
+            "entries": entries,
+            "settings": settings
+        }
+    
+    def close(self) -> None:
+        """
+        Commit buffered records and close the database connection.
+        """
+        with self._lock:
+            self._flush()
+            self._conn.close()
+
+
+def open_ledger(config: Dict[str, Any], config_path: str) -> ProcessedLedger:
+    """
+    Open the ledger for a configuration, moving any ledger still stored in
+    the configuration into it and re-keying entries from older versions.
+    
+    The caller is responsible for saving the configuration afterwards if
+    "processed_files" was removed from it.
+    
+    Args:
+        config: Configuration dictionary
+        config_path: Absolute path to the configuration file
+    
+    Returns:
+        ProcessedLedger: The ledger (kept in memory only if the database
+                         could not be opened)
+    """
+    try:
+        ledger = ProcessedLedger(get_ledger_path(config_path))
+    except Exception as e:
+        logger.error(f"Error opening processed files ledger, keeping it in memory: {e}")
+        ledger = ProcessedLedger(":memory:")
+    
+    legacy = config.pop("processed_files", None)
+    if isinstance(legacy, dict) and legacy:
+        imported = ledger.import_entries(legacy)
+        logger.info(f"Moved {imported} processed file entries from the configuration to {ledger.db_path}")
+    
+    ledger.migrate_legacy_hashes(config.get("last_analysis_settings"))
+    
+    return ledger
@@ -0,0 +1,326 @@
+"""
+Symlink Reconciler Module
+
+This module provides functions for bringing symlink directories to a
+desired state with as few filesystem changes as possible:
+- The current state of each directory is read with a single os.scandir
+- It is diffed against the desired {filename: target} mapping
+- Only missing links are added, stale links removed and wrong links
+  retargeted (atomically, so the name never disappears)
+- Regular files are never touched; without pruning, a wanted link whose
+  name is taken by one is skipped and reported as a conflict
+- Plans can be reported without being applied (dry run), and every run
+  reports how long scanning, planning and applying took
+"""
+
+import os
+import time
+import logging
+from typing import Dict, List, Any, Iterable, Set, Tuple
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def scan_entries(directory: str) -> Tuple[Dict[str, str], Set[str]]:
+    """
+    Get the symlinks and the other entries in a directory.
+    
+    Args:
+        directory: Directory path
+    
+    Returns:
+        tuple: (target of each symlink keyed by filename, names of the
+               entries that are not symlinks)
+    """
+    links = {}
+    others = set()
+    
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_symlink():
+                    try:
+                        links[entry.name] = os.readlink(entry.path)
+                    except OSError as e:
+                        logger.error(f"Error reading symlink {entry.path}: {e}")
+                else:
+                    others.add(entry.name)
+    except FileNotFoundError:
+        logger.warning(f"Directory does not exist: {directory}")
+    
+    return links, others
+
+
+def scan_symlinks(directory: str) -> Dict[str, str]:
+    """
+    Get the symlinks in a directory.
+    
+    Args:
+        directory: Directory path
+    
+    Returns:
+        dict: Target of each symlink, keyed by filename (regular files are ignored)
+    """
+    return scan_entries(directory)[0]
+
+
+def plan_directory(current: Dict[str, str], desired: Dict[str, str], prune: bool = True,
+                   others: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    Work out the changes that turn one set of symlinks into another.
+    
+    Args:
+        current: Existing symlink targets, keyed by filename
+        desired: Wanted symlink targets, keyed by filename
+        prune: If True, remove links that are not desired and retarget links
+               pointing elsewhere; if False, only add missing names
+        others: Names of existing entries that are not symlinks; unless
+                prune is set, wanted links with these names are skipped
+                as conflicts
+    
+    Returns:
+        dict: {"add": [(name, target)], "replace": [(name, target)],
+               "remove": [name], "conflicts": [name], "unchanged": int}
+    """
+    plan = {
+        "add": [],
+        "replace": [],
+        "remove": [],
+        "conflicts": [],
+        "unchanged": 0
+    }
+    others = set(others)
+    
+    for name, target in desired.items():
+        existing = current.get(name)
+        if existing is None and not prune and name in others:
+            plan["conflicts"].append(name)
+        elif existing is None:
+            plan["add"].append((name, target))
+        elif existing == target or not prune:
+            plan["unchanged"] += 1
+        else:
+            plan["replace"].append((name, target))
+    
+    if prune:
+        plan["remove"] = [name for name in current if name not in desired]
+    
+    return plan
+
+
+def apply_directory_plan(directory: str, plan: Dict[str, Any]) -> int:
+    """
+    Apply a plan made by plan_directory.
+    
+    Args:
+        directory: Directory path
+        plan: Changes to apply
+    
+    Returns:
+        int: Number of changes that failed
+    """
+    errors = 0
+    
+    for name in plan["remove"]:
+        try:
+            os.unlink(os.path.join(directory, name))
+        except OSError as e:
+            logger.error(f"Error removing symlink {os.path.join(directory, name)}: {e}")
+            errors += 1
+    
+    for name, target in plan["replace"]:
+        link_path = os.path.join(directory, name)
+        tmp_path = os.path.join(directory, f".{name}.reconcile-tmp")
+        try:
+            # Swap the link in place so the name is never missing
+            if os.path.lexists(tmp_path):
+                os.unlink(tmp_path)
+            os.symlink(target, tmp_path)
+            os.replace(tmp_path, link_path)
+        except OSError as e:
+            logger.error(f"Error retargeting symlink {link_path}: {e}")
+            errors += 1
+    
+    for name, target in plan["add"]:
+        link_path = os.path.join(directory, name)
+        try:
+            os.symlink(target, link_path)
+        except OSError as e:
+            logger.error(f"Error creating symlink {link_path}: {e}")
+            errors += 1
+    
+    return errors
+
+
+def reconcile_directories(desired: Dict[str, Dict[str, str]],
+                          prune: bool = True,
+                          dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Bring several symlink directories to their desired state.
+    
+    Args:
+        desired: Wanted {filename: target} mapping for each directory
+        prune: If True, remove and retarget links that are not desired
+        dry_run: If True, only plan the changes
+    
+    Returns:
+        dict: Statistics, with per-directory plans under "plans" and
+              durations in seconds under "timings"
+    """
+    stats = {
+        "added": 0,
+        "replaced": 0,
+        "removed": 0,
+        "unchanged": 0,
+        "conflicts": 0,
+        "errors": 0,
+        "dry_run": dry_run,
+        "plans": {},
+        "timings": {"scan": 0.0, "plan": 0.0, "apply": 0.0}
+    }
+    
+    for directory, links in desired.items():
+        start = time.perf_counter()
+        current, others = scan_entries(directory)
+        scanned = time.perf_counter()
+        plan = plan_directory(current, links, prune, others)
+        planned = time.perf_counter()
+        
+        if not dry_run and (plan["add"] or plan["replace"] or plan["remove"]):
+            os.makedirs(directory, exist_ok=True)
+            stats["errors"] += apply_directory_plan(directory, plan)
+        
+        stats["timings"]["scan"] += scanned - start
+        stats["timings"]["plan"] += planned - scanned
+        stats["timings"]["apply"] += time.perf_counter() - planned
+        
+        stats["plans"][directory] = plan
+        stats["added"] += len(plan["add"])
+        stats["replaced"] += len(plan["replace"])
+        stats["removed"] += len(plan["remove"])
+        stats["unchanged"] += plan["unchanged"]
+        stats["conflicts"] += len(plan["conflicts"])
+    
+    logger.info(
+        f"{'Planned' if dry_run else 'Reconciled'} {len(desired)} directories: "
+        f"{stats['added']} added, {stats['replaced']} retargeted, {stats['removed']} removed, "
+        f"{stats['unchanged']} unchanged, {stats['conflicts']} conflicts, {stats['errors']} errors "
+        f"(scan {stats['timings']['scan']:.3f}s, plan {stats['timings']['plan']:.3f}s, "
+        f"apply {stats['timings']['apply']:.3f}s)"
+    )
+    return stats
+
+
+def desired_category_links(config: Dict[str, Any],
+                           assignments: Iterable[Tuple[str, List[str]]]) -> Dict[str, Dict[str, str]]:
+    """
+    Build the wanted symlinks of every color category directory.
+    
+    When two images share a filename, the first one keeps the name, as
+    when symlinks are created one at a time.
+    
+    Args:
+        config: Configuration dictionary
+        assignments: (image_path, categories) for each image
+    
+    Returns:
+        dict: Wanted {filename: image_path} mapping for each color directory
+    """
+    base_dir = config["paths"]["base_dir"]
+    category_dirs = {
+        category: os.path.join(base_dir, color_dir)
+        for category, color_dir in config["paths"]["color_dirs"].items()
+    }
+    
+    desired = {directory: {} for directory in category_dirs.values()}
+    for image_path, categories in assignments:
+        filename = os.path.basename(image_path)
+        for category in categories:
+            desired[category_dirs[category]].setdefault(filename, image_path)
+    
+    return desired
+
+
+def reconcile_categories(config: Dict[str, Any],
+                         assignments: Iterable[Tuple[str, List[str]]],
+                         prune: bool = True,
+                         dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Bring the color category directories in line with a set of categorizations.
+    
+    Args:
+        config: Configuration dictionary
+        assignments: (image_path, categories) for each image
+        prune: If True, the assignments are the complete state: links to
+               other images are removed and links to the wrong image are
+               retargeted. If False, missing links are only added.
+        dry_run: If True, only plan the changes
+    
+    Returns:
+        dict: Statistics as returned by reconcile_directories, plus
+              "categories" (links added or retargeted per category) and
+              "category_totals" (wanted links per category)
+    """
+    base_dir = config["paths"]["base_dir"]
+    desired = desired_category_links(config, assignments)
+    stats = reconcile_directories(desired, prune, dry_run)
+    
+    stats["categories"] = {}
+    stats["category_totals"] = {}
+    for category, color_dir in config["paths"]["color_dirs"].items():
+        directory = os.path.join(base_dir, color_dir)
+        plan = stats["plans"][directory]
+        changed = len(plan["add"]) + len(plan["replace"])
+        if changed:
+            stats["categories"][category] = changed
+        stats["category_totals"][category] = len(desired[directory])
+    
+    return stats
+
+
+def format_report(stats: Dict[str, Any], max_items: int = 20) -> str:
+    """
+    Describe the changes of a reconcile run, e.g. for a dry run.
+    
+    Args:
+        stats: Statistics returned by reconcile_directories or reconcile_categories
+        max_items: Maximum number of changes listed per directory
+    
+    Returns:
+        str: Multi-line report
+    """
+    if stats["dry_run"]:
+        header = (f"Dry run: {stats['added']} to add, {stats['replaced']} to retarget, "
+                  f"{stats['removed']} to remove, {stats['unchanged']} unchanged, "
+                  f"{stats['conflicts']} conflicts")
+    else:
+        header = (f"Reconcile: {stats['added']} added, {stats['replaced']} retargeted, "
+                  f"{stats['removed']} removed, {stats['unchanged']} unchanged, "
+                  f"{stats['conflicts']} conflicts, {stats['errors']} errors")
+    lines = [header]
+    
+    for directory, plan in sorted(stats["plans"].items()):
+        changes = (
+            [f"  + {name} -> {target}" for name, target in plan["add"]]
+            + [f"  ~ {name} -> {target}" for name, target in plan["replace"]]
+            + [f"  - {name}" for name in plan["remove"]]
+            + [f"  ! {name} (not a symlink, skipped)" for name in plan["conflicts"]]
+        )
+        if not changes:
+            continue
+        
+        lines.append(f"{directory}:")
+        lines.extend(changes[:max_items])
+        if len(changes) > max_items:
+            lines.append(f"  ... and {len(changes) - max_items} more")
+    
+    timings = stats["timings"]
+    lines.append(
+        f"Timings: scan {timings['scan']:.3f}s, plan {timings['plan']:.3f}s, apply {timings['apply']:.3f}s"
+    )
+    return "\n".join(lines)
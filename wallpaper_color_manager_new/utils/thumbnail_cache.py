@@ -0,0 +1,426 @@
+"""
+Thumbnail Cache Module
+
+This module provides a shared, size-bounded store of downscaled images for
+every viewer of the wallpaper library:
+- Thumbnails live in ~/.cache/tail/thumbs/<file key>/<size>.webp
+- The file key is derived from the identity of the file a path resolves to
+  (device, inode, size and mtime), so renamed category symlinks still hit
+  and edited originals miss
+- Requested sizes are rounded up to a few standard sizes, and missing ones
+  are generated on demand in a background thread pool
+- The least recently used thumbnails are removed past a maximum total size
+"""
+
+import os
+import shutil
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+from PIL import Image
+
+try:
+    from .image_loader import open_reduced, REDUCING_GAP
+except ImportError:
+    from image_loader import open_reduced, REDUCING_GAP
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Default thumbnail directory
+DEFAULT_THUMB_DIR = os.path.join(os.path.expanduser("~"), ".cache", "tail", "thumbs")
+
+# Default maximum total size of all thumbnails
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Standard sizes (longest edge) thumbnails are generated at
+THUMBNAIL_SIZES = (128, 256, 512, 1024, 2048)
+
+# WebP quality for stored thumbnails
+THUMBNAIL_QUALITY = 90
+
+# Default number of background threads generating thumbnails
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+# How many new thumbnails to allow between cleanup passes
+CLEANUP_INTERVAL = 200
+
+# Shared cache instance (False once opening it has failed)
+_default_cache = None
+
+
+def get_file_key(image_path: str) -> str:
+    """
+    Get the cache key for the file an image path resolves to.
+    
+    Args:
+        image_path: Path to the image file (symlinks are followed)
+    
+    Returns:
+        str: Hex key identifying the file contents
+    """
+    st = os.stat(image_path)
+    identity = f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()[:32]
+
+
+def get_bucket_size(size: Tuple[int, int]) -> Optional[int]:
+    """
+    Get the standard thumbnail size that covers a requested size.
+    
+    Args:
+        size: Requested (width, height)
+    
+    Returns:
+        int: Longest edge of the thumbnail to use, or None if the request is
+             larger than every standard size
+    """
+    longest = max(size)
+    for bucket in THUMBNAIL_SIZES:
+        if bucket >= longest:
+            return bucket
+    return None
+
+
+def fit_image(img: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """
+    Resize an image to fit a box while maintaining aspect ratio.
+    
+    Args:
+        img: Image to resize
+        size: Box (width, height)
+    
+    Returns:
+        PIL.Image.Image: The resized image
+    """
+    img_width, img_height = img.size
+    scale = min(size[0] / img_width, size[1] / img_height)
+    new_width = max(1, int(img_width * scale))
+    new_height = max(1, int(img_height * scale))
+    return img.resize((new_width, new_height), Image.LANCZOS)
+
+
+class ThumbnailCache:
+    """
+    On-disk store of downscaled images with a background generator pool.
+    """
+    
+    def __init__(self, cache_dir: Optional[str] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 workers: int = DEFAULT_WORKERS):
+        """
+        Open (or create) the thumbnail directory.
+        
+        Args:
+            cache_dir: Directory to store thumbnails in
+            max_bytes: Maximum total size of all thumbnails
+            workers: Number of background threads generating thumbnails
+        """
+        if cache_dir is None:
+            cache_dir = DEFAULT_THUMB_DIR
+        
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._writes_since_cleanup = 0
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="thumbnail")
+        
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def _thumbnail_path(self, file_key: str, bucket: int) -> str:
+        """
+        Get the path a thumbnail is stored at.
+        
+        Args:
+            file_key: Cache key of the original file
+            bucket: Standard thumbnail size
+        
+        Returns:
+            str: Path to the thumbnail file
+        """
+        return os.path.join(self.cache_dir, file_key, f"{bucket}.webp")
+    
+    def _generate(self, image_path: str, thumb_path: str, bucket: int) -> str:
+        """
+        Decode an original and store its thumbnail.
+        
+        Args:
+            image_path: Path to the original image
+            thumb_path: Path to store the thumbnail at
+            bucket: Longest edge of the thumbnail
+        
+        Returns:
+            str: Path to the thumbnail file
+        """
+        img = open_reduced(image_path, (bucket, bucket))
+        img.thumbnail((bucket, bucket), Image.LANCZOS, reducing_gap=REDUCING_GAP)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        
+        # Write to a temporary file first so readers never see a partial thumbnail
+        os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+        tmp_path = f"{thumb_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        img.save(tmp_path, "WEBP", quality=THUMBNAIL_QUALITY)
+        os.replace(tmp_path, thumb_path)
+        
+        with self._lock:
+            self._writes_since_cleanup += 1
+            run_cleanup = self._writes_since_cleanup >= CLEANUP_INTERVAL
+            if run_cleanup:
+                self._writes_since_cleanup = 0
+        
+        if run_cleanup:
+            self.cleanup()
+        
+        return thumb_path
+    
+    def request(self, image_path: str, size: Tuple[int, int]) -> Future:
+        """
+        Get a thumbnail covering a size, generating it in the background if needed.
+        
+        Concurrent requests for the same thumbnail share one generation.
+        
+        Args:
+            image_path: Path to the original image
+            size: Requested (width, height)
+        
+        Returns:
+            concurrent.futures.Future: Resolves to the thumbnail path, or to
+            None if the request is larger than every standard size
+        """
+        bucket = get_bucket_size(size)
+        if bucket is None:
+            future = Future()
+            future.set_result(None)
+            return future
+        
+        thumb_path = self._thumbnail_path(get_file_key(image_path), bucket)
+        
+        with self._lock:
+            pending = self._pending.get(thumb_path)
+            if pending is not None:
+                return pending
+            
+            cached = os.path.exists(thumb_path)
+            if cached:
+                self.hits += 1
+            else:
+                self.misses += 1
+                future = self._pool.submit(self._generate, image_path, thumb_path, bucket)
+                self._pending[thumb_path] = future
+        
+        if not cached:
+            # Registered outside the lock: it runs at once if generation already finished
+            future.add_done_callback(lambda _f, key=thumb_path: self._forget(key))
+            return future
+        
+        future = Future()
+        future.set_result(thumb_path)
+        
+        # Mark as recently used for cleanup
+        try:
+            os.utime(thumb_path)
+        except OSError:
+            pass
+        
+        return future
+    
+    def _forget(self, thumb_path: str) -> None:
+        """
+        Drop a finished generation from the pending table.
+        
+        Args:
+            thumb_path: Path of the generated thumbnail
+        """
+        with self._lock:
+            self._pending.pop(thumb_path, None)
+    
+    def prefetch(self, image_paths: List[str], size: Tuple[int, int]) -> None:
+        """
+        Start generating thumbnails for several images without waiting.
+        
+        Args:
+            image_paths: Paths to the original images
+            size: Requested (width, height)
+        """
+        for image_path in image_paths:
+            try:
+                self.request(image_path, size)
+            except OSError as e:
+                logger.debug(f"Skipping thumbnail for {image_path}: {e}")
+    
+    def get_path(self, image_path: str, size: Tuple[int, int]) -> Optional[str]:
+        """
+        Get the path of a thumbnail covering a size, waiting for it if needed.
+        
+        Args:
+            image_path: Path to the original image
+            size: Requested (width, height)
+        
+        Returns:
+            str: Path to the thumbnail file, or None if it could not be made
+        """
+        try:
+            return self.request(image_path, size).result()
+        except Exception as e:
+            logger.error(f"Error creating thumbnail for {image_path}: {e}")
+            return None
+    
+    def load(self, image_path: str, size: Tuple[int, int]) -> Image.Image:
+        """
+        Load an image resized to fit a box while maintaining aspect ratio.
+        
+        The image comes from the smallest standard thumbnail covering the
+        box; the original is only decoded when no thumbnail can be used.
+        
+        Args:
+            image_path: Path to the original image
+            size: Box (width, height)
+        
+        Returns:
+            PIL.Image.Image: The fitted image
+        """
+        thumb_path = self.get_path(image_path, size)
+        if thumb_path is not None:
+            try:
+                img = Image.open(thumb_path)
+                img.load()
+                return fit_image(img, size)
+            except Exception as e:
+                logger.error(f"Error reading thumbnail {thumb_path}: {e}")
+        
+        return fit_image(open_reduced(image_path, size), size)
+    
+    def cleanup(self) -> int:
+        """
+        Remove the least recently used thumbnails beyond max_bytes.
+        
+        Removes down to 90% of max_bytes so cleanup does not run on every write.
+        
+        Returns:
+            int: Number of thumbnails removed
+        """
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        
+        if total <= self.max_bytes:
+            return 0
+        
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+            
+            # Remove the per-file directory once its last thumbnail is gone
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+        
+        logger.info(f"Removed {removed} thumbnails from {self.cache_dir}")
+        return removed
+    
+    def clear(self) -> None:
+        """
+        Remove all thumbnails.
+        """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get statistics about the cache.
+        
+        Returns:
+            dict: Cache statistics
+        """
+        thumbnails = 0
+        size_bytes = 0
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                try:
+                    size_bytes += os.path.getsize(os.path.join(dirpath, filename))
+                    thumbnails += 1
+                except OSError:
+                    pass
+        
+        with self._lock:
+            return {
+                "thumbnails": thumbnails,
+                "size_bytes": size_bytes,
+                "max_bytes": self.max_bytes,
+                "pending": len(self._pending),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+    
+    def close(self) -> None:
+        """
+        Stop the background pool, dropping thumbnails not yet started.
+        """
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def get_default_cache() -> Optional[ThumbnailCache]:
+    """
+    Get the shared cache instance, opening it on first use.
+    
+    Returns:
+        ThumbnailCache: The shared cache, or None if it could not be opened
+    """
+    global _default_cache
+    
+    if _default_cache is None:
+        try:
+            _default_cache = ThumbnailCache()
+        except Exception as e:
+            logger.error(f"Error opening thumbnail cache: {e}")
+            _default_cache = False
+    
+    return _default_cache or None
+
+
+def load_thumbnail(image_path: str, size: Tuple[int, int]) -> Image.Image:
+    """
+    Load an image resized to fit a box, through the shared cache if available.
+    
+    Args:
+        image_path: Path to the original image
+        size: Box (width, height)
+    
+    Returns:
+        PIL.Image.Image: The fitted image
+    """
+    cache = get_default_cache()
+    if cache is None:
+        return fit_image(Image.open(image_path), size)
+    return cache.load(image_path, size)
@@ -13,6 +13,7 @@ Usage:
 
 Commands:
     analyze     Analyze images and categorize them
+    watch       Categorize new images as they arrive
     reset       Reset all color categories
     panel       Run the control panel
     picker      Run the color picker
@@ -22,6 +23,18 @@ Options:
     --config FILE       Use a specific configuration file
     --verbose           Enable verbose logging
     --help              Show this help message and exit
+
+Analyze options:
+    --reset             Remove links that no longer match the analysis
+    --dry-run           Show the symlink changes without making them
+    --jobs N            Analyze images in N worker processes
+    --chunk-size N      Number of images sent to a worker at a time
+
+Watch options:
+    --debounce SEC      Wait until no new image arrived for SEC seconds
+    --poll              Poll directories instead of using inotify
+    --poll-interval SEC Seconds between polls
+    --no-catch-up       Do not categorize images added while not watching
 """
 
 import os
@@ -29,13 +42,15 @@ import sys
 import argparse
 import logging
 import subprocess
+import time
 from typing import Dict, List, Any, Optional
 
 # Add the parent directory to the path so we can import the utils package
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import utility modules
-from utils import config_manager, color_analysis, file_operations
+from utils import config_manager, color_analysis, color_lut, file_operations, batch_analysis, symlink_reconciler
+from utils import category_index, image_watcher, processed_ledger
 
 # Setup logging
 logging.basicConfig(
@@ -67,24 +82,49 @@ def analyze_command(args: argparse.Namespace) -> int:
             logger.error(f"Failed to create directory: {path}")
             return 1
     
-    # Reset categories if requested
-    if args.reset:
-        logger.info("Resetting categories...")
-        stats = file_operations.reset_categories(config)
-        logger.info(f"Reset complete: {stats['total_removed']} symlinks removed, {stats['errors']} errors")
+    # With --reset the analysis is the complete state of the category
+    # directories: stale links are pruned instead of wiping everything first
+    prune = args.reset
+    
+    color_params = config.get("color_detection_params")
     
     # Process new images
     logger.info("Processing new images...")
-    new_stats = file_operations.process_new_images(
-        config,
-        lambda path, thresholds, *args: color_analysis.analyze_and_categorize(
-            path, thresholds, tuple(config["resize_dimensions"]), config.get("color_detection_params"),
-            config.get("color_selection_limits")
+    if args.jobs > 1:
+        # Fan decoding out to worker processes; symlinks are still created
+        # here, in file order, so the result does not depend on --jobs
+        original_dir = os.path.join(config["paths"]["base_dir"], config["paths"]["original_dir"])
+        image_files = file_operations.get_image_files_recursive(original_dir)
+        
+        results = batch_analysis.analyze_images(
+            image_files,
+            config["color_thresholds"],
+            tuple(config["resize_dimensions"]),
+            color_params,
+            config.get("color_selection_limits"),
+            jobs=args.jobs,
+            chunk_size=args.chunk_size
+        )
+        new_stats = file_operations.process_analysis_results(config, results, prune, args.dry_run)
+    else:
+        # Compile (or load) the lookup table once for the whole run
+        lut = color_lut.get_lut(color_params)
+        
+        new_stats = file_operations.process_new_images(
+            config,
+            lambda path, thresholds, *args: color_analysis.analyze_and_categorize(
+                path, thresholds, tuple(config["resize_dimensions"]), color_params,
+                config.get("color_selection_limits"), lut, include_pixel_map=False
+            ),
+            prune,
+            args.dry_run
         )
-    )
     
     logger.info(f"Processed {new_stats['processed']} new images, {new_stats['errors']} errors")
     
+    if args.dry_run and "plans" in new_stats:
+        print(symlink_reconciler.format_report(new_stats))
+    
     # Print category counts
     logger.info("Category counts:")
     for category, count in new_stats["categories"].items():
@@ -93,6 +133,139 @@ def analyze_command(args: argparse.Namespace) -> int:
     return 0
 
 
+def ingest_images(config_path: str, image_paths: List[str], ledger: processed_ledger.ProcessedLedger) -> Dict[str, Any]:
+    """
+    Categorize a batch of new images and link them into their categories.
+    
+    The configuration is read again for every batch, so settings changed in
+    the control panel apply to the next images. Images already processed
+    with the current settings, and not modified since, are skipped.
+    
+    Args:
+        config_path: Path to the configuration file
+        image_paths: Paths to the new images
+        ledger: Processed files ledger to record the results in
+    
+    Returns:
+        dict: Statistics about the processing
+    """
+    config = config_manager.load_config(config_path)
+    thresholds = config["color_thresholds"]
+    resize_dimensions = tuple(config["resize_dimensions"])
+    color_params = config.get("color_detection_params")
+    color_limits = config.get("color_selection_limits")
+    
+    # Same fingerprints as the control panel, so both skip each other's work
+    settings_hash = processed_ledger.settings_fingerprint({
+        "color_thresholds": thresholds,
+        "color_detection_params": color_params,
+        "color_selection_limits": color_limits,
+        "resize_dimensions": config["resize_dimensions"]
+    })
+    analysis_hash = color_analysis.percentages_settings_hash(resize_dimensions, color_params)
+    
+    def is_current(image_path):
+        # Processed with these settings, and not replaced since
+        entry = ledger.get(settings_hash, image_path)
+        try:
+            return entry is not None and os.path.getmtime(image_path) <= entry["timestamp"]
+        except OSError:
+            return False
+    
+    image_paths = [image_path for image_path in image_paths if not is_current(image_path)]
+    if not image_paths:
+        return {"processed": 0, "errors": 0, "categories": {}}
+    
+    lut = color_lut.get_lut(color_params)
+    
+    def analyze_all():
+        for image_path in image_paths:
+            try:
+                result = color_analysis.analyze_and_categorize(
+                    image_path, thresholds, resize_dimensions, color_params,
+                    color_limits, lut, include_pixel_map=False
+                )
+            except Exception as e:
+                yield image_path, None, str(e)
+                continue
+            
+            ledger.record(
+                settings_hash,
+                image_path,
+                result["categories"],
+                result["color_percentages"],
+                analysis_hash=analysis_hash
+            )
+            yield image_path, result, None
+    
+    stats = file_operations.process_analysis_results(config, analyze_all())
+    ledger.flush()
+    return stats
+
+
+def watch_command(args: argparse.Namespace) -> int:
+    """
+    Watch the original directory and categorize new images as they arrive.
+    
+    Args:
+        args: Command-line arguments
+        
+    Returns:
+        int: Exit code
+    """
+    # Load configuration
+    config_path = config_manager.get_config_path(args.config)
+    config = config_manager.load_config(config_path)
+    
+    # Setup color directories
+    for path, success in file_operations.setup_color_directories(config).items():
+        if not success:
+            logger.error(f"Failed to create directory: {path}")
+            return 1
+    
+    original_dir = os.path.join(config["paths"]["base_dir"], config["paths"]["original_dir"])
+    if not os.path.isdir(original_dir):
+        logger.error(f"Original directory does not exist: {original_dir}")
+        return 1
+    
+    had_legacy_ledger = "processed_files" in config
+    ledger = processed_ledger.open_ledger(config, config_path)
+    if had_legacy_ledger:
+        config_manager.save_config(config, config_path)
+    
+    # Start watching before catching up, so no image falls in between
+    watcher = image_watcher.create_watcher(original_dir, args.poll, args.poll_interval)
+    
+    try:
+        if not args.no_catch_up:
+            # Images never processed and not in any category arrived while not watching
+            known = ledger.get_known_paths()
+            categorized = category_index.get_index(config).get_categorized_names()
+            missed = [
+                image_path for image_path in file_operations.get_image_files_recursive(original_dir)
+                if image_path not in known and os.path.basename(image_path) not in categorized
+            ]
+            if missed:
+                logger.info(f"Catching up on {len(missed)} images added while not watching")
+                ingest_images(config_path, missed, ledger)
+        
+        logger.info(f"Watching {original_dir} for new images (Ctrl+C to stop)")
+        for batch in image_watcher.iter_batches(watcher, args.debounce):
+            start = time.perf_counter()
+            stats = ingest_images(config_path, batch, ledger)
+            logger.info(
+                f"Categorized {stats['processed']} new images in {time.perf_counter() - start:.2f}s, "
+                f"{stats['errors']} errors: {stats['categories']}"
+            )
+    except KeyboardInterrupt:
+        logger.info("Stopped watching")
+    finally:
+        watcher.close()
+        ledger.close()
+    
+    return 0
+
+
 def reset_command(args: argparse.Namespace) -> int:
     """
     Reset all color categories.
@@ -199,7 +372,24 @@ def parse_arguments() -> argparse.Namespace:
     # Analyze command
     analyze_parser = subparsers.add_parser("analyze", help="Analyze images and categorize them")
     analyze_parser.add_argument("--reset", action="store_true",
-                               help="Reset categories before analyzing")
+                               help="Remove links that no longer match the analysis")
+    analyze_parser.add_argument("--dry-run", action="store_true",
+                               help="Show the symlink changes without making them")
+    analyze_parser.add_argument("--jobs", type=int, default=1,
+                               help="Number of worker processes for image analysis")
+    analyze_parser.add_argument("--chunk-size", type=int, default=batch_analysis.DEFAULT_CHUNK_SIZE,
+                               help="Number of images sent to a worker at a time")
+    
+    # Watch command
+    watch_parser = subparsers.add_parser("watch", help="Categorize new images as they arrive")
+    watch_parser.add_argument("--debounce", type=float, default=image_watcher.DEFAULT_DEBOUNCE,
+                             help="Wait until no new image arrived for this many seconds")
+    watch_parser.add_argument("--poll", action="store_true",
+                             help="Poll directories instead of using inotify")
+    watch_parser.add_argument("--poll-interval", type=float, default=image_watcher.DEFAULT_POLL_INTERVAL,
+                             help="Seconds between polls")
+    watch_parser.add_argument("--no-catch-up", action="store_true",
+                             help="Do not categorize images added while not watching")
     
     # Reset command
     reset_parser = subparsers.add_parser("reset", help="Reset all color categories")
@@ -234,6 +424,8 @@ def main() -> int:
     # Run the appropriate command
     if args.command == "analyze":
         return analyze_command(args)
+    elif args.command == "watch":
+        return watch_command(args)
     elif args.command == "reset":
         return reset_command(args)
     elif args.command == "panel":
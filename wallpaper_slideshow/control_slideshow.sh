@@ -3,6 +3,21 @@
 # Control script for the custom wallpaper slideshow
 
 PID_FILE="$HOME/.config/custom_wallpaper_slideshow.pid"
+SCRIPT_DIR="$(dirname "$(readlink -f "${BASH_SOURCE[0]}")")"
+
+# Prefer the slideshow's control socket: the command has been carried out
+# when this returns, and status reports whether the slideshow is paused.
+# slideshow_control.py exits with 2 if the slideshow is not listening, in
+# which case the signals below are used
+case "$1" in
+    next|prev|pause|pause_only|unpause|reload|stop|status)
+        python3 "$SCRIPT_DIR/slideshow_control.py" "$1" 2>/dev/null
+        rc=$?
+        if [ $rc -ne 2 ]; then
+            exit $rc
+        fi
+        ;;
+esac
 
 # Check if the PID file exists
 if [ ! -f "$PID_FILE" ]; then
@@ -1,16 +1,32 @@
 #!/usr/bin/env python3
 
 import os
+import sys
 import time
 import random
-import subprocess
 import signal
+import selectors
 import glob
 import configparser
-import importlib.util
 import json
+import collections
 from pathlib import Path
 
+# Incremental directory scanner shared with the color manager; the slideshow
+# falls back to globbing when it is installed without it
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wallpaper_color_manager_new"))
+try:
+    from utils import file_manifest
+except ImportError:
+    file_manifest = None
+
+# Shared D-Bus wallpaper backend (same directory)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import wallpaper_setter
+import slideshow_control
+import wallpaper_prefetch
+import track_current_wallpaper
+
 # --- Configuration ---
 CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.ini")
 
@@ -22,7 +38,12 @@ DEFAULT_CONFIG = {
     "use_favorites_only": False,
     "supported_extensions": ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'],
     "pid_file": os.path.expanduser("~/.config/custom_wallpaper_slideshow.pid"),
-    "log_file": ""
+    "control_socket": slideshow_control.DEFAULT_SOCKET,
+    "log_file": "",
+    "prefetch_count": wallpaper_prefetch.DEFAULT_COUNT,
+    "prefetch_scale": "auto",
+    "prefetch_memory_mb": wallpaper_prefetch.DEFAULT_MEMORY_BYTES // (1024 * 1024),
+    "prefetch_cache_dir": wallpaper_prefetch.DEFAULT_CACHE_DIR
 }
 
 def load_config():
@@ -55,8 +76,23 @@ def load_config():
                 if 'pid_file' in parser['Advanced']:
                     config['pid_file'] = os.path.expanduser(parser['Advanced']['pid_file'])
                 
+                if 'control_socket' in parser['Advanced']:
+                    config['control_socket'] = os.path.expanduser(parser['Advanced']['control_socket'])
+                
                 if 'log_file' in parser['Advanced']:
                     config['log_file'] = os.path.expanduser(parser['Advanced']['log_file'])
+                
+                if 'prefetch_count' in parser['Advanced']:
+                    config['prefetch_count'] = parser.getint('Advanced', 'prefetch_count')
+                
+                if 'prefetch_scale' in parser['Advanced']:
+                    config['prefetch_scale'] = parser['Advanced']['prefetch_scale']
+                
+                if 'prefetch_memory_mb' in parser['Advanced']:
+                    config['prefetch_memory_mb'] = parser.getint('Advanced', 'prefetch_memory_mb')
+                
+                if 'prefetch_cache_dir' in parser['Advanced']:
+                    config['prefetch_cache_dir'] = os.path.expanduser(parser['Advanced']['prefetch_cache_dir'])
         
         except Exception as e:
             print(f"Error loading config file: {e}")
@@ -73,7 +109,12 @@ IMAGE_DIR = config['image_directory']
 SLIDESHOW_INTERVAL = config['interval']
 SUPPORTED_EXTENSIONS = config['supported_extensions']
 PID_FILE = Path(config['pid_file'])
+CONTROL_SOCKET = config['control_socket']
 LOG_FILE = config['log_file']
+PREFETCH_COUNT = config['prefetch_count']
+PREFETCH_SCALE = config['prefetch_scale']
+PREFETCH_MEMORY_BYTES = config['prefetch_memory_mb'] * 1024 * 1024
+PREFETCH_CACHE_DIR = config['prefetch_cache_dir']
 SHUFFLE_IMAGES = config['shuffle']
 USE_FAVORITES_ONLY = config['use_favorites_only']
 FAVORITES_FILE = os.path.expanduser("~/.wallpaper_favorites/favorites.json")
@@ -82,7 +123,13 @@ FAVORITES_FILE = os.path.expanduser("~/.wallpaper_favorites/favorites.json")
 image_files = []
 current_index = -1
 paused = False
-last_change_time = 0
+last_change_time = 0  # time.monotonic() of the last change
+last_change_at = None  # time.time() of the last change, for clients
+stop_requested = False
+control_server = None
+finished_changes = collections.deque()  # (image_path, success, change) from the setter's thread
+change_wakeup_fd = None  # Write end of the pipe that wakes the loop for them
+prefetcher = None
 program_pid = os.getpid()
 
 # --- Helper Functions ---
@@ -126,15 +173,24 @@ def get_image_files():
         current_index = -1
         return
 
-    for ext in SUPPORTED_EXTENSIONS:
-        found_files.extend(glob.glob(os.path.join(IMAGE_DIR, f"*{ext}"), recursive=False))  # Set recursive=True if you have subfolders
-        found_files.extend(glob.glob(os.path.join(IMAGE_DIR, f"*{ext.upper()}"), recursive=False))
+    if file_manifest is not None:
+        # Only lists the directory again if it changed since the last scan;
+        # resolved paths are kept in the manifest
+        result = file_manifest.scan_directory(IMAGE_DIR, SUPPORTED_EXTENSIONS, recursive=False)  # Set recursive=True if you have subfolders
+        found_files = list(result["files"].values())
+        if result["added"] or result["removed"]:
+            log(f"Image directory changed: {len(result['added'])} added, {len(result['removed'])} removed.")
+    else:
+        for ext in SUPPORTED_EXTENSIONS:
+            found_files.extend(glob.glob(os.path.join(IMAGE_DIR, f"*{ext}"), recursive=False))  # Set recursive=True if you have subfolders
+            found_files.extend(glob.glob(os.path.join(IMAGE_DIR, f"*{ext.upper()}"), recursive=False))
+        found_files = [str(Path(f).resolve()) for f in found_files]
 
     if not found_files:
         log("No image files found.")
     else:
         # Deduplicate in case of case-insensitive filesystem and mixed case extensions
-        all_images = sorted(list(set(str(Path(f).resolve()) for f in found_files)))
+        all_images = sorted(set(found_files))
         
         # Filter for favorites if configured to do so
         if USE_FAVORITES_ONLY:
@@ -161,85 +217,75 @@ def get_image_files():
             log("Images shuffled randomly.")
     current_index = -1  # Reset index
 
-def set_kde_wallpaper(image_path):
-    if not image_path or not os.path.exists(image_path):
-        log(f"Error: Image path is invalid or file does not exist: {image_path}")
-        return
+def report_wallpaper_result(image_path, success, change):
+    """Hand the outcome of a wallpaper change to the event loop (called from the setter's thread)."""
+    finished_changes.append((image_path, success, change))
+    if change_wakeup_fd is not None:
+        try:
+            os.write(change_wakeup_fd, b"\0")
+        except (BlockingIOError, InterruptedError):
+            pass  # The loop has already been woken
 
-    # Ensure absolute path and correct file:// prefix
-    abs_image_path = str(Path(image_path).resolve())
-    file_uri = f"file://{abs_image_path}"
-
-    script = f"""
-    var allDesktops = desktops();
-    if (allDesktops.length === 0) {{
-        print("No desktops found by Plasma scripting engine.");
-    }}
-    for (var i = 0; i < allDesktops.length; i++) {{
-        var d = allDesktops[i];
-        d.wallpaperPlugin = "org.kde.image";
-        d.currentConfigGroup = ["Wallpaper", "org.kde.image", "General"];
-        d.writeConfig("Image", "{file_uri}");
-    }}
+def apply_finished_changes():
+    """Track and announce the wallpaper changes the setter has finished.
+
+    Only changes that were actually set are tracked and sent on
+    wallpaper_changed; a failed change leaves the previous wallpaper as the
+    current one, and a change replaced by a newer request never gets here.
     """
-    try:
-        log(f"Setting wallpaper to: {file_uri}")
-        # Use subprocess to call qdbus with full path
-        qdbus_executable = "/usr/lib/qt6/bin/qdbus"
-        result = subprocess.run([
-            qdbus_executable, "org.kde.plasmashell", "/PlasmaShell",
-            "org.kde.PlasmaShell.evaluateScript", script
-        ], capture_output=True, text=True, check=False)  # check=False to inspect output
-
-        if result.returncode != 0:
-            log(f"Error setting wallpaper via qdbus. Return code: {result.returncode}")
-            log(f"Stdout: {result.stdout.strip()}")
-            log(f"Stderr: {result.stderr.strip()}")
-        elif result.stdout.strip():  # Sometimes Plasma script engine prints its own errors here
-            if "Error:" in result.stdout or "failed" in result.stdout:
-                log(f"Plasma script engine reported an error: {result.stdout.strip()}")
-            else:
-                log("Wallpaper set successfully (qdbus returned 0, got output).")
+    while finished_changes:
+        image_path, success, change = finished_changes.popleft()
+        if not success:
+            log(f"Error setting wallpaper to {image_path}. See log for details.")
+            continue
+        log(f"Wallpaper set successfully: {os.path.basename(image_path)}")
+        
+        # Track the current wallpaper (one shared tracker, written atomically)
+        if track_current_wallpaper.save_current_wallpaper(image_path):
+            log(f"Tracked current wallpaper: {image_path}")
         else:
-            log("Wallpaper set successfully (qdbus returned 0, no output).")
+            log(f"Warning: Failed to track current wallpaper: {image_path}")
+        
+        notify("wallpaper_changed", change)
 
-    except FileNotFoundError:
-        log("Error: qdbus command not found. Is it installed and in your PATH?")
-    except Exception as e:
-        log(f"An unexpected error occurred while setting wallpaper: {e}")
+def set_kde_wallpaper(image_path, change):
+    """Ask the setter to show an image; change is sent on wallpaper_changed once it is set."""
+    if not image_path or not os.path.exists(image_path):
+        log(f"Error: Image path is invalid or file does not exist: {image_path}")
+        return
+
+    # Plasma gets the copy pre-scaled to the screen if it is ready (see
+    # wallpaper_prefetch.py); everything else keeps using the original path
+    wallpaper_path = prefetcher.resolve(image_path) if prefetcher is not None else image_path
+    if wallpaper_path != image_path:
+        log(f"Using pre-scaled copy: {wallpaper_path}")
+    
+    # Sent over one persistent D-Bus connection by a background thread, so
+    # the event loop returns at once; if next/previous arrive while a change
+    # is being sent, only the newest image is sent (see wallpaper_setter.py)
+    log(f"Setting wallpaper to: file://{Path(wallpaper_path).resolve()}")
+    wallpaper_setter.get_default_setter().request(
+        wallpaper_path, callback=lambda path, success: report_wallpaper_result(image_path, success, change))
 
 
 def change_wallpaper_and_update_state(new_index):
-    global current_index, last_change_time
+    global current_index, last_change_time, last_change_at
     if not image_files:
         log("No images available to display.")
         return
 
     current_index = new_index % len(image_files)  # Wrap around
     current_wallpaper = image_files[current_index]
-    set_kde_wallpaper(current_wallpaper)
-    last_change_time = time.time()
-    log(f"Current wallpaper index: {current_index}, Image: {os.path.basename(current_wallpaper)}")
+    last_change_time = time.monotonic()
+    last_change_at = time.time()
     
-    # Track the current wallpaper
-    try:
-        # Try to import the track_current_wallpaper module
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        tracker_path = os.path.join(script_dir, "track_current_wallpaper.py")
-        
-        if os.path.exists(tracker_path):
-            # Import the module dynamically
-            spec = importlib.util.spec_from_file_location("track_current_wallpaper", tracker_path)
-            tracker = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(tracker)
-            
-            # Save the current wallpaper
-            tracker.save_current_wallpaper(current_wallpaper)
-            log(f"Tracked current wallpaper: {current_wallpaper}")
-        else:
-            log(f"Warning: track_current_wallpaper.py not found at {tracker_path}")
-    except Exception as e:
-        log(f"Warning: Failed to track current wallpaper: {e}")
+    # Tracked and announced once the setter reports it was set (see apply_finished_changes)
+    set_kde_wallpaper(current_wallpaper, get_current())
+    
+    # Prepare the images coming next while this one is shown
+    if prefetcher is not None:
+        prefetcher.prefetch(peek_queue(PREFETCH_COUNT))
+    log(f"Current wallpaper index: {current_index}, Image: {os.path.basename(current_wallpaper)}")
 
 def show_next_image(force_change=False):
     global paused
@@ -262,42 +308,215 @@ def show_previous_image():
     change_wallpaper_and_update_state(prev_idx)
 
 
-# --- Signal Handlers ---
-def handle_sigusr1(signum, frame):  # Next image
-    log("SIGUSR1 received: Next image.")
-    show_next_image(force_change=True)  # Force change even if paused by interval
+# --- Commands ---
+def notify(method, params):
+    """Send a notification to the control socket's subscribers."""
+    if control_server is not None:
+        control_server.notify(method, params)
+
+def set_paused(value):
+    global paused
+    paused = value
+    if paused:
+        log("Pausing slideshow.")
+    else:
+        # The interval timer keeps running while paused, so a slide that
+        # became due in the meantime is shown as soon as the loop resumes
+        log("Resuming slideshow.")
+    notify("state_changed", get_status())
+
+def describe_state():
+    state = f"Slideshow is {'paused' if paused else 'running'} with PID {program_pid}"
+    if image_files and current_index >= 0:
+        state += f" (image {current_index + 1}/{len(image_files)}: {os.path.basename(image_files[current_index])})"
+    else:
+        state += " (no images)"
+    return state
+
+def get_current():
+    """The image being shown, as answered to current and sent on wallpaper_changed."""
+    showing = bool(image_files) and current_index >= 0
+    return {
+        "image": image_files[current_index] if showing else None,
+        "index": current_index if showing else None,
+        "count": len(image_files),
+        "changed_at": last_change_at
+    }
+
+def get_status(message=None):
+    """The slideshow's state, as answered to commands and sent on state_changed."""
+    status = get_current()
+    status.update({
+        "pid": program_pid,
+        "paused": paused,
+        "interval": SLIDESHOW_INTERVAL,
+        "next_change_in": next_timeout(),
+        "prefetch": prefetcher.stats() if prefetcher is not None else None,
+        "message": message or describe_state()
+    })
+    return status
+
+def peek_queue(count):
+    """The next images in playback order (not including the current one)."""
+    if not image_files:
+        return []
+    count = min(count, len(image_files))
+    return [image_files[(current_index + offset) % len(image_files)] for offset in range(1, count + 1)]
+
+def run_command(command):
+    """Carry out a control command (from the control socket or a signal).
 
-def handle_sigusr2(signum, frame):  # Previous image
-    log("SIGUSR2 received: Previous image.")
-    show_previous_image()
+    Returns a message describing the state afterwards.
+    """
+    global stop_requested
+    if command == "next":
+        show_next_image(force_change=True)  # Force change even if paused
+    elif command == "prev":
+        show_previous_image()
+    elif command == "pause":
+        set_paused(not paused)
+    elif command == "pause_only":
+        if paused:
+            return "Slideshow is already paused."
+        set_paused(True)
+    elif command == "unpause":
+        if not paused:
+            return "Slideshow is already running."
+        set_paused(False)
+    elif command == "reload":
+        log("Reloading image list.")
+        get_image_files()
+        if image_files and current_index == -1:  # If list was empty or just reloaded
+            show_next_image(force_change=True)
+        notify("state_changed", get_status())
+    elif command == "stop":
+        # The loop exits once the command has been answered
+        log("Shutting down.")
+        stop_requested = True
+        return f"Stopping slideshow with PID {program_pid}"
+    return describe_state()
+
+def handle_request(method, params):
+    """Answer a request on the control socket (see slideshow_control.py)."""
+    if method == "current":
+        return get_current()
+    if method == "queue":
+        count = params.get("count", 5)
+        if not isinstance(count, int) or count < 0:
+            raise slideshow_control.ControlError(slideshow_control.INVALID_PARAMS, "count must be a non-negative integer")
+        return {"index": get_current()["index"], "images": peek_queue(count)}
+    if method == "subscribe":
+        log("Control client subscribed.")
+        return {"status": get_status(), "current": get_current()}
+
+    log(f"Control command received: {method}")
+    return get_status(run_command(method))
+
+# --- Event Loop ---
+# Signals are turned into the same commands as the control socket. The
+# handlers do nothing: the signal number is written to a pipe by the
+# interpreter (signal.set_wakeup_fd) and the command runs in the loop, so
+# no disk or D-Bus I/O happens inside a signal handler
+SIGNAL_COMMANDS = {
+    signal.SIGUSR1: "next",
+    signal.SIGUSR2: "prev",
+    signal.SIGHUP: "reload",
+    signal.SIGTSTP: "pause",  # Ctrl+Z usually sends this, or use kill -TSTP
+    signal.SIGTERM: "stop",
+    signal.SIGINT: "stop",  # Ctrl+C
+}
 
-def handle_sighup(signum, frame):  # Reload images from disk
-    log("SIGHUP received: Reloading image list.")
-    get_image_files()
-    if image_files and current_index == -1:  # If list was empty or just reloaded
-        show_next_image(force_change=True)
+def ignore_signal(signum, frame):
+    pass
 
-def handle_sigterm(signum, frame):  # Graceful shutdown
-    log("SIGTERM received: Shutting down.")
-    cleanup_and_exit()
+def next_timeout():
+    """Seconds until the next slide is due, or None when nothing is scheduled."""
+    if paused or not image_files:
+        return None
+    return max(0.0, last_change_time + SLIDESHOW_INTERVAL - time.monotonic())
 
-def handle_sigint(signum, frame):  # Ctrl+C
-    log("SIGINT received (Ctrl+C): Shutting down.")
-    cleanup_and_exit()
+def run_event_loop():
+    """Run the slideshow until a stop command.
 
-def handle_sigtstp(signum, frame):  # Pause/Resume (Ctrl+Z usually sends this, or use kill -TSTP)
-    global paused
-    paused = not paused
-    if paused:
-        log("SIGTSTP received: Pausing slideshow.")
+    The loop sleeps in select() until the next slide is due (exactly, on the
+    monotonic clock), a signal arrives or a control client sends something.
+    While paused or without images it sleeps without a timeout, so it does
+    not wake up at all between events. Each registered file object carries
+    the callback that handles it as its selector data.
+    """
+    global control_server, change_wakeup_fd
+    selector = selectors.DefaultSelector()
+
+    wakeup_read, wakeup_write = os.pipe()
+    os.set_blocking(wakeup_read, False)
+    os.set_blocking(wakeup_write, False)
+    signal.set_wakeup_fd(wakeup_write, warn_on_full_buffer=False)
+    for signum in SIGNAL_COMMANDS:
+        signal.signal(signum, ignore_signal)
+
+    def read_signals():
+        try:
+            signums = os.read(wakeup_read, 512)
+        except (BlockingIOError, InterruptedError):
+            return
+        for signum in signums:
+            command = SIGNAL_COMMANDS.get(signum)
+            if command is not None and not stop_requested:
+                log(f"{signal.Signals(signum).name} received: {command}.")
+                run_command(command)
+
+    selector.register(wakeup_read, selectors.EVENT_READ, read_signals)
+
+    # Finished wallpaper changes are handled here too, not on the setter's thread
+    changes_read, change_wakeup_fd = os.pipe()
+    os.set_blocking(changes_read, False)
+    os.set_blocking(change_wakeup_fd, False)
+
+    def read_finished_changes():
+        try:
+            os.read(changes_read, 512)
+        except (BlockingIOError, InterruptedError):
+            pass
+        apply_finished_changes()
+
+    selector.register(changes_read, selectors.EVENT_READ, read_finished_changes)
+
+    server = slideshow_control.ControlServer(CONTROL_SOCKET, selector, handle_request)
+    if server.open():
+        control_server = server
+        log(f"Control socket: {CONTROL_SOCKET}")
     else:
-        log("SIGTSTP received: Resuming slideshow.")
-        # Optionally, change wallpaper immediately on resume if interval passed
-        # if image_files and (time.time() - last_change_time >= SLIDESHOW_INTERVAL):
-        #    show_next_image()
+        log("Control commands are only accepted as signals.")
+
+    # Changes finished before the loop started (the first image)
+    apply_finished_changes()
+
+    while not stop_requested:
+        events = selector.select(next_timeout())
+        if not events:
+            # Timer expired
+            if next_timeout() == 0.0:
+                show_next_image()
+            continue
+
+        for key, _ in events:
+            if stop_requested:
+                break
+            key.data()
 
 def cleanup_and_exit(exit_code=0):
     log("Cleaning up...")
+    if prefetcher is not None:
+        stats = prefetcher.stats()
+        if stats["hit_rate"] is not None:
+            log(f"Prefetch: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%}), {stats['scaled']} images pre-scaled")
+        prefetcher.close()
+    if control_server is not None:
+        try:
+            control_server.close()
+            log(f"Removed control socket: {CONTROL_SOCKET}")
+        except OSError as e:
+            log(f"Error removing control socket: {e}")
     if PID_FILE.exists():
         try:
             PID_FILE.unlink()
@@ -316,6 +535,8 @@ if __name__ == "__main__":
     log(f"Shuffle mode: {'Enabled' if SHUFFLE_IMAGES else 'Disabled'}")
     log(f"Favorites only mode: {'Enabled' if USE_FAVORITES_ONLY else 'Disabled'}")
     log(f"To control: ")
+    log(f"  python3 slideshow_control.py next|prev|pause|pause_only|unpause|reload|status|stop|current|queue|watch")
+    log(f"or with signals:")
     log(f"  Next:     kill -USR1 {program_pid}")
     log(f"  Previous: kill -USR2 {program_pid}")
     log(f"  Pause/Resume: kill -TSTP {program_pid}")
@@ -332,26 +553,23 @@ if __name__ == "__main__":
         log(f"Could not write PID file {PID_FILE}: {e}")
         log("Controls requiring PID file might not work as easily.")
 
-    # Register signal handlers
-    signal.signal(signal.SIGUSR1, handle_sigusr1)
-    signal.signal(signal.SIGUSR2, handle_sigusr2)
-    signal.signal(signal.SIGHUP, handle_sighup)
-    signal.signal(signal.SIGTERM, handle_sigterm)
-    signal.signal(signal.SIGINT, handle_sigint)
-    signal.signal(signal.SIGTSTP, handle_sigtstp)  # For pause/resume
+    if PREFETCH_COUNT > 0:
+        screen_size = wallpaper_prefetch.parse_screen_size(PREFETCH_SCALE)
+        prefetcher = wallpaper_prefetch.Prefetcher(screen_size, PREFETCH_CACHE_DIR, PREFETCH_MEMORY_BYTES)
+        log(f"Prefetching {PREFETCH_COUNT} images ahead, "
+            f"{'pre-scaled to ' + 'x'.join(map(str, prefetcher.screen_size)) if prefetcher.screen_size else 'not pre-scaled'}")
 
     get_image_files()
     if image_files:
         show_next_image(force_change=True)  # Show first image immediately
     else:
-        log("No images found on startup. Waiting for SIGHUP or restart with images.")
+        log("No images found on startup. Waiting for a reload command or restart with images.")
 
+    exit_code = 1
     try:
-        while True:
-            if not paused and image_files and (time.time() - last_change_time >= SLIDESHOW_INTERVAL):
-                show_next_image()
-            time.sleep(1)  # Check every second
+        run_event_loop()
+        exit_code = 0
     except Exception as e:
         log(f"Unhandled exception in main loop: {e}")
     finally:
-        cleanup_and_exit(1)
\ No newline at end of file
+        cleanup_and_exit(exit_code)
\ No newline at end of file
@@ -12,14 +12,28 @@ It allows users to:
 """
 
 import os
+import sys
 import json
 import subprocess
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListWidget,
                             QListWidgetItem, QPushButton, QFileDialog, QMessageBox,
                             QCheckBox, QSplitter, QGroupBox, QFormLayout)
-from PyQt5.QtGui import QIcon, QPixmap
-from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtGui import QIcon, QPixmap, QImage, QImageReader, QColor
+from PyQt5.QtCore import Qt, QSize, QObject, pyqtSignal
+
+# Share the thumbnail cache with the wallpaper color manager
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wallpaper_color_manager_new"))
+try:
+    from utils import thumbnail_cache
+except ImportError:
+    thumbnail_cache = None
+
+# Wallpaper changes go through the shared D-Bus backend (same directory)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from set_specific_wallpaper import request_wallpaper
+import track_current_wallpaper
 
 # Setup logging
 logging.basicConfig(
@@ -33,13 +47,111 @@ logger = logging.getLogger(__name__)
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 FAVORITES_DIR = os.path.expanduser("~/.wallpaper_favorites")
 FAVORITES_FILE = os.path.join(FAVORITES_DIR, "favorites.json")
-SET_WALLPAPER_SCRIPT = os.path.join(SCRIPT_DIR, "set_specific_wallpaper.py")
 CONFIG_FILE = os.path.join(SCRIPT_DIR, "config.ini")
-CURRENT_WALLPAPER_FILE = os.path.expanduser("~/.current_wallpaper")
 
 # Load supported image extensions from config
 SUPPORTED_EXTENSIONS = [".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp"]
 
+# Background color of thumbnails that are still loading (same as the preview labels)
+PLACEHOLDER_COLOR = "#f0f0f0"
+
+# Shared thumbnail loader (created with the first request, once Qt is running)
+_thumbnail_loader = None
+
+def prefetch_thumbnails(wallpaper_paths, width=100, height=60):
+    """Start generating cached thumbnails for a list of wallpapers in the background"""
+    cache = thumbnail_cache.get_default_cache() if thumbnail_cache else None
+    if cache is not None and b"webp" in QImageReader.supportedImageFormats():
+        cache.prefetch([path for path in wallpaper_paths if os.path.exists(path)], (width, height))
+
+def read_thumbnail_image(wallpaper_path, width=100, height=60):
+    """Read a wallpaper scaled to fit width x height, from the shared thumbnail cache when possible.
+    
+    Only uses QImage, so it can run off the GUI thread; a cold cache generates the thumbnail here.
+    """
+    source_path = wallpaper_path
+    
+    # Qt can only read the cached WebP files with the imageformats plugin installed
+    cache = thumbnail_cache.get_default_cache() if thumbnail_cache else None
+    if cache is not None and b"webp" in QImageReader.supportedImageFormats():
+        source_path = cache.get_path(wallpaper_path, (width, height)) or wallpaper_path
+    
+    image = QImage(source_path)
+    if not image.isNull():
+        image = image.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return image
+
+def thumbnail_placeholder(width=100, height=60):
+    """Blank pixmap shown in place of a thumbnail that is still loading"""
+    pixmap = QPixmap(width, height)
+    pixmap.fill(QColor(PLACEHOLDER_COLOR))
+    return pixmap
+
+class ThumbnailLoader(QObject):
+    """Reads thumbnails on background threads and hands them to callbacks on the GUI thread"""
+    
+    # (callback, QImage), emitted from a worker thread and delivered on the GUI thread
+    loaded = pyqtSignal(object, object)
+    
+    def __init__(self, parent=None, max_workers=2):
+        super().__init__(parent)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnails")
+        self.loaded.connect(self._deliver)
+    
+    def load(self, wallpaper_path, width, height, callback):
+        """Read a thumbnail in the background; callback(pixmap) is called on the GUI thread"""
+        self._pool.submit(self._read, wallpaper_path, width, height, callback)
+    
+    def _read(self, wallpaper_path, width, height, callback):
+        try:
+            image = read_thumbnail_image(wallpaper_path, width, height)
+        except Exception as e:
+            logger.error(f"Error creating thumbnail for {wallpaper_path}: {e}")
+            image = QImage()
+        self.loaded.emit(callback, image)
+    
+    def _deliver(self, callback, image):
+        # QPixmap may only be created on the GUI thread
+        pixmap = QPixmap.fromImage(image) if not image.isNull() else QPixmap()
+        try:
+            callback(pixmap)
+        except RuntimeError as e:
+            # The widget the thumbnail was for has been deleted meanwhile
+            logger.debug(f"Dropped thumbnail: {e}")
+
+def load_thumbnail_async(wallpaper_path, width, height, callback):
+    """Load a wallpaper thumbnail without blocking the GUI; callback(pixmap) gets a null pixmap on failure"""
+    global _thumbnail_loader
+    if _thumbnail_loader is None:
+        _thumbnail_loader = ThumbnailLoader()
+    _thumbnail_loader.load(wallpaper_path, width, height, callback)
+
+def set_item_thumbnail(item, wallpaper_path, width=100, height=60):
+    """Give a list item a placeholder icon, replaced by the thumbnail once it is loaded"""
+    item.setIcon(QIcon(thumbnail_placeholder(width, height)))
+    
+    def show(pixmap):
+        if not pixmap.isNull():
+            item.setIcon(QIcon(pixmap))
+    
+    load_thumbnail_async(wallpaper_path, width, height, show)
+
+def show_thumbnail_preview(label, wallpaper_path, width=400, height=200):
+    """Show a wallpaper in a preview label once its thumbnail is loaded, with a placeholder until then"""
+    # A preview requested later replaces this one, even if this one finishes last
+    label.preview_path = wallpaper_path
+    label.setText("Loading preview...")
+    
+    def show(pixmap):
+        if getattr(label, "preview_path", None) != wallpaper_path:
+            return
+        if pixmap.isNull():
+            label.setText("Preview not available")
+        else:
+            label.setPixmap(pixmap)
+    
+    load_thumbnail_async(wallpaper_path, width, height, show)
+
 class FavoritesTab(QWidget):
     """Tab for managing favorite wallpapers"""
     
@@ -189,19 +301,16 @@ class FavoritesTab(QWidget):
         """Populate the list of favorite wallpapers"""
         self.favorites_list.clear()
         
+        # Generate missing thumbnails in parallel while the list fills
+        prefetch_thumbnails(self.favorites)
+        
         for wallpaper_path in self.favorites:
             if os.path.exists(wallpaper_path):
                 item = QListWidgetItem(os.path.basename(wallpaper_path))
                 item.setData(Qt.UserRole, wallpaper_path)
                 
-                # Add thumbnail
-                try:
-                    pixmap = QPixmap(wallpaper_path)
-                    if not pixmap.isNull():
-                        pixmap = pixmap.scaled(100, 60, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                        item.setIcon(QIcon(pixmap))
-                except Exception as e:
-                    logger.error(f"Error creating thumbnail for {wallpaper_path}: {e}")
+                # Add thumbnail (loaded in the background)
+                set_item_thumbnail(item, wallpaper_path, 100, 60)
                 
                 self.favorites_list.addItem(item)
             else:
@@ -236,11 +345,9 @@ class FavoritesTab(QWidget):
             return
         
         try:
-            # Use set_specific_wallpaper.py to set the wallpaper
-            subprocess.run(
-                ["python3", SET_WALLPAPER_SCRIPT, wallpaper_path],
-                check=True
-            )
+            # Set in the background over the shared D-Bus connection; rapid
+            # requests are coalesced (see wallpaper_setter.py)
+            request_wallpaper(wallpaper_path)
             
             if self.parent_window:
                 self.parent_window.statusBar().showMessage(f"Set wallpaper to {os.path.basename(wallpaper_path)}", 3000)
@@ -294,17 +401,11 @@ class FavoritesTab(QWidget):
     
     def get_current_wallpaper_path(self):
         """Get the path to the current wallpaper"""
-        # First try to get from tracking file
-        if os.path.exists(CURRENT_WALLPAPER_FILE):
-            try:
-                with open(CURRENT_WALLPAPER_FILE, 'r') as f:
-                    wallpaper_path = f.read().strip()
-                
-                if wallpaper_path and os.path.exists(wallpaper_path):
-                    logger.debug(f"Got current wallpaper from tracking file: {wallpaper_path}")
-                    return wallpaper_path
-            except Exception as e:
-                logger.error(f"Error reading current wallpaper file: {e}")
+        # First try the shared tracker (the tracking file, read again only when it changes)
+        wallpaper_path = track_current_wallpaper.get_current_wallpaper()
+        if wallpaper_path:
+            logger.debug(f"Got current wallpaper from tracking file: {wallpaper_path}")
+            return wallpaper_path
         
         # If tracking file didn't work, try the get_current_wallpaper.py script
         try:
@@ -18,7 +18,10 @@ import signal
 import psutil
 from pathlib import Path
 import logging
-import importlib.util
+
+# Shared wallpaper tracker (same directory)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import track_current_wallpaper
 
 # Set up logging
 logging.basicConfig(
@@ -34,8 +37,6 @@ TRAY_APP_SCRIPT = os.path.join(SCRIPT_DIR, "wallpaper_tray.py")
 PID_FILE = os.path.expanduser("~/.config/custom_wallpaper_slideshow.pid")
 NOTES_DIR = os.path.expanduser("~/.wallpaper_notes")
 CUSTOM_WALLPAPER_SCRIPT = os.path.join(SCRIPT_DIR, "custom_wallpaper.py")
-TRACK_CURRENT_WALLPAPER = os.path.join(SCRIPT_DIR, "track_current_wallpaper.py")
-CURRENT_WALLPAPER_FILE = os.path.expanduser("~/.current_wallpaper")
 
 def is_tray_app_running():
     """Check if the tray app is already running"""
@@ -153,35 +154,10 @@ def open_notes_tab(image_path):
 
 def get_current_wallpaper():
     """Get the current wallpaper path using the tracking system"""
-    # First try to read from the tracking file
-    if os.path.exists(CURRENT_WALLPAPER_FILE):
-        try:
-            with open(CURRENT_WALLPAPER_FILE, 'r') as f:
-                wallpaper_path = f.read().strip()
-            
-            if wallpaper_path and os.path.exists(wallpaper_path):
-                logger.info(f"Got current wallpaper from tracking file: {wallpaper_path}")
-                return wallpaper_path
-            else:
-                logger.warning(f"Invalid wallpaper path in tracking file: {wallpaper_path}")
-        except Exception as e:
-            logger.error(f"Error reading current wallpaper file: {e}")
-    
-    # If that fails, try to use the tracking module
-    try:
-        if os.path.exists(TRACK_CURRENT_WALLPAPER):
-            # Import the module dynamically
-            spec = importlib.util.spec_from_file_location("track_current_wallpaper", TRACK_CURRENT_WALLPAPER)
-            tracker = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(tracker)
-            
-            # Get the current wallpaper
-            wallpaper_path = tracker.get_current_wallpaper()
-            if wallpaper_path:
-                logger.info(f"Got current wallpaper from tracking module: {wallpaper_path}")
-                return wallpaper_path
-    except Exception as e:
-        logger.error(f"Error using tracking module: {e}")
+    wallpaper_path = track_current_wallpaper.get_current_wallpaper()
+    if wallpaper_path:
+        logger.info(f"Got current wallpaper from tracking file: {wallpaper_path}")
+        return wallpaper_path
     
     logger.warning("Could not determine current wallpaper using tracking system")
     return None
@@ -7,10 +7,12 @@ Also tracks the current wallpaper for instant access by other scripts.
 """
 
 import os
-import subprocess
 import sys
-from pathlib import Path
-import importlib.util
+
+# Shared D-Bus wallpaper backend and wallpaper tracker (same directory)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import wallpaper_setter
+import track_current_wallpaper
 
 def set_kde_wallpaper(image_path):
     """Set the KDE Plasma wallpaper to the specified image."""
@@ -18,53 +20,36 @@ def set_kde_wallpaper(image_path):
         print(f"Error: Image path is invalid or file does not exist: {image_path}")
         return False
 
-    # Ensure absolute path and correct file:// prefix
-    abs_image_path = str(Path(image_path).resolve())
-    file_uri = f"file://{abs_image_path}"
-
-    script = f"""
-    var allDesktops = desktops();
-    if (allDesktops.length === 0) {{
-        print("No desktops found by Plasma scripting engine.");
-    }}
-    for (var i = 0; i < allDesktops.length; i++) {{
-        var d = allDesktops[i];
-        d.wallpaperPlugin = "org.kde.image";
-        d.currentConfigGroup = ["Wallpaper", "org.kde.image", "General"];
-        d.writeConfig("Image", "{file_uri}");
-    }}
-    """
-    try:
-        print(f"Setting wallpaper to: {file_uri}")
-        # Use subprocess to call qdbus with full path
-        qdbus_executable = "/usr/lib/qt6/bin/qdbus"
-        result = subprocess.run([
-            qdbus_executable, "org.kde.plasmashell", "/PlasmaShell",
-            "org.kde.PlasmaShell.evaluateScript", script
-        ], capture_output=True, text=True, check=False)
+    file_uri, _ = wallpaper_setter.build_script(image_path)
+    print(f"Setting wallpaper to: {file_uri}")
+    
+    # Sent over the shared D-Bus connection (see wallpaper_setter.py)
+    if wallpaper_setter.set_wallpaper(image_path):
+        print("Wallpaper set successfully.")
+        return True
+    
+    print("Error setting wallpaper. See log for details.")
+    return False
 
-        if result.returncode != 0:
-            print(f"Error setting wallpaper via qdbus. Return code: {result.returncode}")
-            print(f"Stdout: {result.stdout.strip()}")
-            print(f"Stderr: {result.stderr.strip()}")
-            return False
-        elif result.stdout.strip():  # Sometimes Plasma script engine prints its own errors here
-            if "Error:" in result.stdout or "failed" in result.stdout:
-                print(f"Plasma script engine reported an error: {result.stdout.strip()}")
-                return False
-            else:
-                print("Wallpaper set successfully (qdbus returned 0, got output).")
-                return True
-        else:
-            print("Wallpaper set successfully (qdbus returned 0, no output).")
-            return True
+def track_wallpaper(image_path):
+    """Record the image as the current wallpaper for other scripts."""
+    if track_current_wallpaper.save_current_wallpaper(image_path):
+        print(f"Tracked current wallpaper: {image_path}")
+    else:
+        print(f"Warning: Failed to track current wallpaper: {image_path}")
 
-    except FileNotFoundError:
-        print("Error: qdbus command not found. Is it installed and in your PATH?")
-        return False
-    except Exception as e:
-        print(f"An unexpected error occurred while setting wallpaper: {e}")
-        return False
+def request_wallpaper(image_path):
+    """
+    Set the wallpaper in the background, tracking it once it is set.
+    
+    Used by the tray and its windows: the call returns at once, and of
+    several requests made in quick succession only the newest is sent.
+    """
+    def track_if_set(path, success):
+        if success:
+            track_wallpaper(path)
+    
+    wallpaper_setter.get_default_setter().request(image_path, callback=track_if_set)
 
 def main():
     """Main function."""
@@ -79,24 +64,7 @@ def main():
     
     # Track the current wallpaper
     if success:
-        try:
-            # Try to import the track_current_wallpaper module
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            tracker_path = os.path.join(script_dir, "track_current_wallpaper.py")
-            
-            if os.path.exists(tracker_path):
-                # Import the module dynamically
-                spec = importlib.util.spec_from_file_location("track_current_wallpaper", tracker_path)
-                tracker = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(tracker)
-                
-                # Save the current wallpaper
-                tracker.save_current_wallpaper(image_path)
-                print(f"Tracked current wallpaper: {image_path}")
-            else:
-                print(f"Warning: track_current_wallpaper.py not found at {tracker_path}")
-        except Exception as e:
-            print(f"Warning: Failed to track current wallpaper: {e}")
+        track_wallpaper(image_path)
     
     return 0 if success else 1
 
@@ -7,63 +7,15 @@ The name is kept for backward compatibility.
 """
 
 import os
-import subprocess
 import sys
-from pathlib import Path
+
+# Same D-Bus backend as set_specific_wallpaper.py
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from set_specific_wallpaper import set_kde_wallpaper
 
 def set_kde_wallpaper_kwrite(image_path):
     """Set the KDE Plasma wallpaper to the specified image using D-Bus."""
-    if not image_path or not os.path.exists(image_path):
-        print(f"Error: Image path is invalid or file does not exist: {image_path}")
-        return False
-
-    # Ensure absolute path and correct file:// prefix
-    abs_image_path = str(Path(image_path).resolve())
-    file_uri = f"file://{abs_image_path}"
-
-    script = f"""
-    var allDesktops = desktops();
-    if (allDesktops.length === 0) {{
-        print("No desktops found by Plasma scripting engine.");
-    }}
-    for (var i = 0; i < allDesktops.length; i++) {{
-        var d = allDesktops[i];
-        d.wallpaperPlugin = "org.kde.image";
-        d.currentConfigGroup = ["Wallpaper", "org.kde.image", "General"];
-        d.writeConfig("Image", "{file_uri}");
-    }}
-    """
-    try:
-        print(f"Setting wallpaper to: {file_uri}")
-        # Use subprocess to call qdbus with full path
-        qdbus_executable = "/usr/lib/qt6/bin/qdbus"
-        result = subprocess.run([
-            qdbus_executable, "org.kde.plasmashell", "/PlasmaShell",
-            "org.kde.PlasmaShell.evaluateScript", script
-        ], capture_output=True, text=True, check=False)
-
-        if result.returncode != 0:
-            print(f"Error setting wallpaper via qdbus. Return code: {result.returncode}")
-            print(f"Stdout: {result.stdout.strip()}")
-            print(f"Stderr: {result.stderr.strip()}")
-            return False
-        elif result.stdout.strip():  # Sometimes Plasma script engine prints its own errors here
-            if "Error:" in result.stdout or "failed" in result.stdout:
-                print(f"Plasma script engine reported an error: {result.stdout.strip()}")
-                return False
-            else:
-                print("Wallpaper set successfully (qdbus returned 0, got output).")
-                return True
-        else:
-            print("Wallpaper set successfully (qdbus returned 0, no output).")
-            return True
-
-    except FileNotFoundError:
-        print("Error: qdbus command not found. Is it installed and in your PATH?")
-        return False
-    except Exception as e:
-        print(f"An unexpected error occurred while setting wallpaper: {e}")
-        return False
+    return set_kde_wallpaper(image_path)
 
 def main():
     """Main function."""
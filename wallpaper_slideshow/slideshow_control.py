@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Slideshow Control
+
+This module provides the control API of the wallpaper slideshow
+(custom_wallpaper.py), a JSON-RPC 2.0 service on a Unix socket:
+- The socket is ~/.config/custom_wallpaper_slideshow.sock by default, or
+  control_socket in the [Advanced] section of config.ini
+- Messages are JSON objects, one per line, in both directions; a
+  connection can carry any number of requests
+- Commands (next, prev, pause, pause_only, unpause, reload, status, stop)
+  are queued in the slideshow's event loop and answered with its state
+  once they have been carried out; current and queue describe the image
+  being shown and the images coming next
+- After subscribe, the connection also receives notifications:
+  wallpaper_changed (with the current image) and state_changed (with the
+  status)
+- Signals (kill -USR1 and so on) keep working for older callers
+
+The server side (ControlServer) runs in the slideshow; call(),
+send_command() and Subscription are the client side.
+
+Usage:
+    python3 slideshow_control.py next|prev|pause|pause_only|unpause|reload|status|stop
+    python3 slideshow_control.py current|queue|watch
+
+Exit status is 0 if the command succeeded, 1 if the slideshow reported an
+error and 2 if the slideshow could not be reached.
+"""
+
+import os
+import sys
+import json
+import socket
+import logging
+import selectors
+import configparser
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Constants
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = os.path.join(SCRIPT_DIR, "config.ini")
+DEFAULT_SOCKET = os.path.expanduser("~/.config/custom_wallpaper_slideshow.sock")
+
+# Commands that act on the slideshow and answer with its status
+COMMANDS = ("next", "prev", "pause", "pause_only", "unpause", "reload", "status", "stop")
+
+# Every method of the API
+METHODS = COMMANDS + ("current", "queue", "subscribe")
+
+# Notifications sent to subscribers
+NOTIFICATIONS = ("wallpaper_changed", "state_changed")
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+# Seconds to wait for the slideshow to answer
+DEFAULT_TIMEOUT = 5.0
+
+# Longest accepted message
+MAX_LINE = 65536
+
+
+class ControlError(Exception):
+    """
+    Error answered to a request (JSON-RPC error object).
+    """
+    
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def get_socket_path():
+    """
+    Get the path of the slideshow's control socket.
+    
+    Returns:
+        str: Socket path from config.ini, or the default
+    """
+    if os.path.exists(CONFIG_FILE):
+        try:
+            parser = configparser.ConfigParser()
+            parser.read(CONFIG_FILE)
+            if parser.has_option('Advanced', 'control_socket'):
+                return os.path.expanduser(parser.get('Advanced', 'control_socket'))
+        except Exception as e:
+            logger.error(f"Error reading config.ini: {e}")
+    return DEFAULT_SOCKET
+
+
+def encode_message(message):
+    """
+    Encode a message as one line.
+    
+    Args:
+        message (dict): JSON-RPC request, response or notification
+    
+    Returns:
+        bytes: JSON line
+    """
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _error_response(request_id, code, message):
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+# --- Server side ---
+
+class _Client:
+    """
+    A connection to the control socket.
+    """
+    
+    def __init__(self, conn):
+        self.conn = conn
+        self.buffer = b""
+        self.subscribed = False
+
+
+class ControlServer:
+    """
+    The control socket of the slideshow, served from its selectors loop.
+    
+    Every file object the server registers carries a callback as its
+    selector data; the loop calls key.data() for each ready key.
+    """
+    
+    def __init__(self, socket_path, selector, handler):
+        """
+        Create the server; the socket is opened by open().
+        
+        Args:
+            socket_path (str): Path of the Unix socket
+            selector (selectors.BaseSelector): Selector of the event loop
+            handler (callable): Called as handler(method, params) for each
+                                request; returns the result or raises
+                                ControlError
+        """
+        self.socket_path = socket_path
+        self.selector = selector
+        self.handler = handler
+        self._listener = None
+        self._clients = []
+    
+    def open(self):
+        """
+        Listen on the socket, replacing one left behind by a killed slideshow.
+        
+        Returns:
+            bool: False if the socket could not be opened or another
+                  slideshow is listening on it
+        """
+        try:
+            os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+            if os.path.exists(self.socket_path):
+                try:
+                    call("status", socket_path=self.socket_path, timeout=1.0)
+                    logger.warning(f"Another slideshow is listening on {self.socket_path}")
+                    return False
+                except (OSError, ValueError, ControlError):
+                    os.unlink(self.socket_path)
+            
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(self.socket_path)
+            listener.listen(8)
+            listener.setblocking(False)
+        except OSError as e:
+            logger.error(f"Could not open control socket {self.socket_path}: {e}")
+            return False
+        
+        self._listener = listener
+        self.selector.register(listener, selectors.EVENT_READ, self._accept)
+        return True
+    
+    def close(self):
+        """
+        Close every connection and remove the socket.
+        """
+        for client in list(self._clients):
+            self._drop(client)
+        if self._listener is not None:
+            self.selector.unregister(self._listener)
+            self._listener.close()
+            self._listener = None
+            os.unlink(self.socket_path)
+    
+    def notify(self, method, params):
+        """
+        Send a notification to every subscriber.
+        
+        Args:
+            method (str): One of NOTIFICATIONS
+            params (dict): Notification data
+        """
+        data = encode_message({"jsonrpc": "2.0", "method": method, "params": params})
+        for client in [c for c in self._clients if c.subscribed]:
+            self._send(client, data)
+    
+    def _accept(self):
+        try:
+            conn, _ = self._listener.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        conn.setblocking(False)
+        client = _Client(conn)
+        self._clients.append(client)
+        self.selector.register(conn, selectors.EVENT_READ, lambda: self._read(client))
+    
+    def _drop(self, client):
+        if client in self._clients:
+            self._clients.remove(client)
+            self.selector.unregister(client.conn)
+        client.conn.close()
+    
+    def _send(self, client, data):
+        # Messages are small and the socket buffer large; a client that
+        # lets it fill up is not reading and is dropped rather than
+        # stalling the slideshow
+        try:
+            sent = client.conn.send(data)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self._drop(client)
+            return
+        if sent < len(data):
+            logger.warning("Dropping control client that is not reading its messages")
+            self._drop(client)
+    
+    def _read(self, client):
+        try:
+            chunk = client.conn.recv(MAX_LINE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            chunk = b""
+        
+        if not chunk:
+            self._drop(client)
+            return
+        
+        client.buffer += chunk
+        while b"\n" in client.buffer and client in self._clients:
+            line, client.buffer = client.buffer.split(b"\n", 1)
+            if line.strip():
+                self._handle(client, line)
+        
+        if len(client.buffer) > MAX_LINE and client in self._clients:
+            self._send(client, encode_message(_error_response(None, INVALID_REQUEST, "Message too long")))
+            self._drop(client)
+    
+    def _handle(self, client, line):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            self._send(client, encode_message(_error_response(None, PARSE_ERROR, "Parse error")))
+            return
+        
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            self._send(client, encode_message(_error_response(None, INVALID_REQUEST, "Invalid request")))
+            return
+        
+        request_id = request.get("id")
+        method = request["method"]
+        params = request.get("params") or {}
+        
+        try:
+            if not isinstance(params, dict):
+                raise ControlError(INVALID_PARAMS, "Params must be an object")
+            if method not in METHODS:
+                raise ControlError(METHOD_NOT_FOUND, f"Unknown command: {method}")
+            if method == "subscribe":
+                client.subscribed = True
+            response = {"jsonrpc": "2.0", "id": request_id, "result": self.handler(method, params)}
+        except ControlError as e:
+            response = _error_response(request_id, e.code, e.message)
+        except Exception as e:
+            logger.error(f"Error handling {method}: {e}")
+            response = _error_response(request_id, INTERNAL_ERROR, str(e))
+        
+        # Requests without an id are notifications and get no answer
+        if "id" in request and client in self._clients:
+            self._send(client, encode_message(response))
+
+
+# --- Client side ---
+
+def _connect(socket_path, timeout):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(socket_path or get_socket_path())
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _read_message(reader):
+    line = reader.readline(MAX_LINE + 1)
+    if not line:
+        raise ConnectionError("The slideshow closed the connection")
+    return json.loads(line)
+
+
+def _request(sock, reader, method, params, request_id):
+    """
+    Send a request and read messages until its response arrives.
+    
+    Returns:
+        tuple: (result, notifications received before the response)
+    """
+    sock.sendall(encode_message({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params or {}}))
+    
+    notifications = []
+    while True:
+        message = _read_message(reader)
+        if "id" not in message:
+            notifications.append(message)
+        elif message["id"] == request_id:
+            if "error" in message:
+                error = message["error"]
+                raise ControlError(error.get("code", INTERNAL_ERROR), error.get("message", ""))
+            return message.get("result"), notifications
+
+
+def call(method, params=None, socket_path=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Call a method of the slideshow and wait for its answer.
+    
+    Args:
+        method (str): One of METHODS (for subscribe, use Subscription)
+        params (dict): Parameters, e.g. {"count": 5} for queue
+        socket_path (str): Control socket (default: get_socket_path())
+        timeout (float): Seconds to wait for the answer
+    
+    Returns:
+        The result, e.g. the status dict for commands
+    
+    Raises:
+        OSError: If the slideshow is not running or did not answer
+        ControlError: If the slideshow answered with an error
+    """
+    with _connect(socket_path, timeout) as sock:
+        with sock.makefile("rb") as reader:
+            result, _ = _request(sock, reader, method, params, 1)
+    return result
+
+
+def send_command(command, socket_path=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Send a command to the slideshow and wait until it has been carried out.
+    
+    Args:
+        command (str): One of COMMANDS
+        socket_path (str): Control socket (default: get_socket_path())
+        timeout (float): Seconds to wait for the answer
+    
+    Returns:
+        tuple: (ok, message), where message describes the slideshow's state
+               afterwards, or the error
+    
+    Raises:
+        OSError: If the slideshow is not running or did not answer
+    """
+    try:
+        result = call(command, socket_path=socket_path, timeout=timeout)
+    except ControlError as e:
+        return False, e.message
+    return True, result.get("message", "")
+
+
+class Subscription:
+    """
+    A connection that receives the slideshow's notifications.
+    
+    Iterating over it yields (method, params) for each notification. It
+    blocks until one arrives, and ends when the slideshow closes the
+    connection or close() is called (from any thread).
+    """
+    
+    def __init__(self, socket_path=None, timeout=DEFAULT_TIMEOUT):
+        """
+        Connect and subscribe.
+        
+        Args:
+            socket_path (str): Control socket (default: get_socket_path())
+            timeout (float): Seconds to wait for the subscription to be answered
+        
+        Raises:
+            OSError: If the slideshow is not running or did not answer
+        """
+        self._sock = _connect(socket_path, timeout)
+        try:
+            self._reader = self._sock.makefile("rb")
+            # {"status": ..., "current": ...} at the time of subscribing
+            self.state, self._pending = _request(self._sock, self._reader, "subscribe", {}, 1)
+        except BaseException:
+            self._sock.close()
+            raise
+        
+        # Notifications are waited for indefinitely
+        self._sock.settimeout(None)
+    
+    def __iter__(self):
+        while True:
+            if self._pending:
+                message = self._pending.pop(0)
+            else:
+                try:
+                    message = _read_message(self._reader)
+                except (OSError, ValueError):
+                    return
+            if message.get("method") in NOTIFICATIONS:
+                yield message["method"], message.get("params") or {}
+    
+    def close(self):
+        """
+        Close the connection, ending a running iteration.
+        """
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+
+def main():
+    """Main function."""
+    commands = COMMANDS + ("current", "queue", "watch")
+    if len(sys.argv) != 2 or sys.argv[1] not in commands:
+        print(f"Usage: {sys.argv[0]} {'|'.join(commands)}")
+        return 1
+    
+    command = sys.argv[1]
+    try:
+        if command == "watch":
+            # Print the state, then every notification, as JSON lines
+            subscription = Subscription()
+            print(json.dumps(subscription.state), flush=True)
+            try:
+                for method, params in subscription:
+                    print(json.dumps({"event": method, **params}), flush=True)
+            except KeyboardInterrupt:
+                subscription.close()
+            return 0
+        
+        if command == "current":
+            print(call("current").get("image") or "")
+            return 0
+        
+        if command == "queue":
+            for image in call("queue").get("images", []):
+                print(image)
+            return 0
+        
+        ok, message = send_command(command)
+    except OSError as e:
+        print(f"Slideshow not reachable on {get_socket_path()}: {e}", file=sys.stderr)
+        return 2
+    except ControlError as e:
+        print(e.message, file=sys.stderr)
+        return 1
+    
+    print(message)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
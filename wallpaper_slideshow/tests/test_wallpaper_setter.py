@@ -0,0 +1,219 @@
+"""
+Tests for the D-Bus backend in wallpaper_setter.py.
+
+Messages are checked by round-tripping them through marshal_message and
+unmarshal_message in both byte orders; the setter itself is run against
+MockPlasmaShell on a private dbus-daemon (skipped if it is not installed).
+"""
+
+import os
+import sys
+import time
+import shutil
+import struct
+import threading
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wallpaper_setter
+from wallpaper_setter import (
+    METHOD_CALL, METHOD_RETURN, ERROR, NO_REPLY_EXPECTED,
+    marshal_message, unmarshal_message
+)
+
+ENDIANS = ["<", ">"]
+
+
+@pytest.mark.parametrize("endian", ENDIANS)
+def test_method_call_round_trip(endian):
+    fields = {
+        "path": "/PlasmaShell",
+        "interface": "org.kde.PlasmaShell",
+        "member": "evaluateScript",
+        "destination": "org.kde.plasmashell"
+    }
+    data = marshal_message(METHOD_CALL, 7, fields, "s", ("var d = desktops();",), endian=endian)
+
+    message = unmarshal_message(data)
+
+    assert message["type"] == METHOD_CALL
+    assert message["serial"] == 7
+    assert message["flags"] == 0
+    for name, value in fields.items():
+        assert message[name] == value
+    assert message["signature"] == "s"
+    assert message["body"] == ["var d = desktops();"]
+
+
+@pytest.mark.parametrize("endian", ENDIANS)
+def test_every_basic_type_round_trips(endian):
+    # Mixed sizes so every value needs its own alignment
+    signature = "ysyobguiy"
+    args = (1, "naïve → ünïcode", 255, "/a/b", True, "su", 0xFFFFFFFF, -123456, 0)
+    data = marshal_message(METHOD_RETURN, 2**32 - 1, {"reply_serial": 3}, signature, args,
+                           flags=NO_REPLY_EXPECTED, endian=endian)
+
+    message = unmarshal_message(data)
+
+    assert message["serial"] == 2**32 - 1
+    assert message["reply_serial"] == 3
+    assert message["flags"] == NO_REPLY_EXPECTED
+    assert message["body"] == list(args)
+
+
+@pytest.mark.parametrize("endian", ENDIANS)
+def test_error_round_trip(endian):
+    data = marshal_message(ERROR, 5, {
+        "reply_serial": 4,
+        "destination": ":1.42",
+        "error_name": "org.freedesktop.DBus.Error.UnknownMethod"
+    }, "s", ("No such method",), endian=endian)
+
+    message = unmarshal_message(data)
+
+    assert message["type"] == ERROR
+    assert message["error_name"] == "org.freedesktop.DBus.Error.UnknownMethod"
+    assert message["destination"] == ":1.42"
+    assert message["body"] == ["No such method"]
+
+
+def test_byte_order_mark_and_lengths():
+    little = marshal_message(METHOD_CALL, 1, {"member": "Hello"}, "u", (1,))
+    big = marshal_message(METHOD_CALL, 1, {"member": "Hello"}, "u", (1,), endian=">")
+
+    assert little[0:1] == b"l"
+    assert big[0:1] == b"B"
+    assert len(little) == len(big)
+    for data, endian in ((little, "<"), (big, ">")):
+        body_length, _, array_length = struct.unpack_from(endian + "III", data, 4)
+        header_length = 16 + array_length + (-(16 + array_length) % 8)
+        assert header_length % 8 == 0
+        assert len(data) == header_length + body_length
+
+
+def test_message_without_body():
+    message = unmarshal_message(marshal_message(METHOD_RETURN, 9, {"reply_serial": 8}))
+
+    assert "signature" not in message
+    assert message["body"] == []
+
+
+def test_non_basic_body_is_not_parsed():
+    # A reply with an array body (as): the header is read, the body is not
+    data = bytearray(marshal_message(METHOD_RETURN, 1, {"reply_serial": 1, "signature": "as"}))
+    data += struct.pack("<I", 0)
+    struct.pack_into("<I", data, 4, 4)
+
+    message = unmarshal_message(bytes(data))
+
+    assert message["reply_serial"] == 1
+    assert message["body"] is None
+
+
+def test_unsupported_type_is_rejected():
+    with pytest.raises(ValueError):
+        marshal_message(METHOD_CALL, 1, {"member": "Hello"}, "d", (1.5,))
+
+
+def test_invalid_byte_order_mark_is_rejected():
+    data = b"X" + marshal_message(METHOD_CALL, 1, {"member": "Hello"})[1:]
+
+    with pytest.raises(ValueError):
+        unmarshal_message(data)
+
+
+@pytest.fixture
+def bus_address():
+    """Address of a private session bus, stopped after the test."""
+    if shutil.which("dbus-daemon") is None:
+        pytest.skip("dbus-daemon is not installed")
+    daemon = subprocess.Popen(
+        ["dbus-daemon", "--session", "--nofork", "--print-address=1"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    try:
+        address = daemon.stdout.readline().strip()
+        if not address:
+            pytest.skip("dbus-daemon did not start")
+        yield address
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+
+@pytest.fixture
+def mock_plasma(bus_address):
+    """MockPlasmaShell registered on the private bus."""
+    mock = wallpaper_setter.MockPlasmaShell(bus_address)
+    mock.start()
+    yield mock
+    mock.stop()
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    path = tmp_path / "wallpaper one.jpg"
+    path.write_bytes(b"\xff\xd8\xff\xd9")
+    return str(path)
+
+
+def test_set_wallpaper_through_mock(bus_address, mock_plasma, image_path):
+    setter = wallpaper_setter.WallpaperSetter(bus_address)
+    try:
+        assert setter.set_wallpaper(image_path)
+        assert setter.set_wallpaper(image_path)
+    finally:
+        setter.close()
+
+    assert len(mock_plasma.scripts) == 2
+    assert os.path.basename(image_path) in mock_plasma.scripts[0]
+
+
+def test_unknown_method_raises(bus_address, mock_plasma):
+    connection = wallpaper_setter.DBusConnection(bus_address)
+    try:
+        with pytest.raises(wallpaper_setter.DBusError) as error:
+            connection.call(wallpaper_setter.PLASMA_SERVICE, wallpaper_setter.PLASMA_PATH,
+                            wallpaper_setter.PLASMA_INTERFACE, "noSuchMethod")
+    finally:
+        connection.close()
+
+    assert error.value.name == "org.freedesktop.DBus.Error.UnknownMethod"
+
+
+def test_requests_are_coalesced(bus_address, mock_plasma, tmp_path):
+    mock_plasma.delay = 0.2
+    images = []
+    for i in range(5):
+        path = tmp_path / f"image{i}.jpg"
+        path.write_bytes(b"\xff\xd8\xff\xd9")
+        images.append(str(path))
+
+    results = []
+    done = threading.Event()
+
+    def callback(path, success):
+        results.append((path, success))
+        if path == images[-1]:
+            done.set()
+
+    setter = wallpaper_setter.WallpaperSetter(bus_address)
+    try:
+        # Queue the others while the first is being evaluated by Plasma
+        setter.request(images[0], callback)
+        deadline = time.monotonic() + 10
+        while not mock_plasma.scripts and time.monotonic() < deadline:
+            time.sleep(0.01)
+        for path in images[1:]:
+            setter.request(path, callback)
+        assert done.wait(10)
+    finally:
+        setter.close()
+
+    # Only the newest of the queued images is sent after the first
+    assert results == [(images[0], True), (images[-1], True)]
+    assert setter.coalesced == 3
+    assert len(mock_plasma.scripts) == 2
@@ -2,9 +2,17 @@
 """
 Wallpaper Tracking System
 
-This script provides functions to save and retrieve the current wallpaper path.
-It maintains a simple text file with the path of the current wallpaper,
-allowing for instant access when adding notes or performing other operations.
+This module keeps track of the current wallpaper path for the slideshow,
+the tray and the helper scripts:
+- The path is kept in a simple text file (~/.current_wallpaper), allowing
+  for instant access when adding notes or performing other operations
+- Long-running programs import this module once and share one
+  WallpaperTracker, which keeps the current path in memory and only reads
+  the file again when its mtime changes
+- The file is written atomically (written under a temporary name and
+  renamed), so readers never see a half-written path
+- Listeners are notified when the current wallpaper changes, whether it
+  was saved in this process or the file was changed by another one
 
 Usage:
     # Get the current wallpaper path
@@ -17,6 +25,8 @@ Usage:
 import os
 import sys
 import logging
+import tempfile
+import threading
 from pathlib import Path
 
 # Set up logging
@@ -28,56 +38,225 @@ logger = logging.getLogger(__name__)
 
 # Constants
 CURRENT_WALLPAPER_FILE = os.path.expanduser("~/.current_wallpaper")
+SUPPORTED_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp']
 
-def save_current_wallpaper(wallpaper_path):
+# Shared tracker instance
+_default_tracker = None
+
+def is_supported_image(wallpaper_path):
     """
-    Save the path of the current wallpaper to a file.
+    Check that a path names an existing image file of a supported type.
     
     Args:
-        wallpaper_path (str): Path to the current wallpaper
+        wallpaper_path (str): Path to check
     
     Returns:
-        bool: True if successful, False otherwise
+        bool: True if the path can be tracked
     """
-    try:
-        # Validate input
-        if not wallpaper_path:
-            logger.error("Empty wallpaper path provided")
-            return False
-            
-        # Ensure the path is absolute
-        abs_path = str(Path(wallpaper_path).resolve())
+    if not os.path.exists(wallpaper_path):
+        logger.warning(f"Wallpaper file does not exist: {wallpaper_path}")
+        return False
+    
+    _, ext = os.path.splitext(wallpaper_path.lower())
+    if ext not in SUPPORTED_EXTENSIONS:
+        logger.warning(f"File is not a supported image type: {wallpaper_path}")
+        return False
+    
+    return True
+
+class WallpaperTracker:
+    """
+    In-memory view of the current wallpaper, backed by the tracking file.
+    """
+    
+    def __init__(self, tracking_file=CURRENT_WALLPAPER_FILE):
+        """
+        Create a tracker; the file is read on first use.
         
-        # Check if the file exists
-        if not os.path.exists(abs_path):
-            logger.error(f"Wallpaper file does not exist: {abs_path}")
-            return False
+        Args:
+            tracking_file (str): Path of the tracking file
+        """
+        self.tracking_file = tracking_file
+        self.reads = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._path = None
+        
+        # (mtime_ns, size, inode) of the tracking file when it was last read
+        # or written (None = read again)
+        self._file_state = None
+    
+    def _stat(self):
+        try:
+            st = os.stat(self.tracking_file)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    def _set_path(self, wallpaper_path):
+        """
+        Update the current path; returns the listeners to notify if it changed.
+        """
+        if wallpaper_path == self._path:
+            return []
+        self._path = wallpaper_path
+        return list(self._listeners)
+    
+    def _notify(self, listeners, wallpaper_path):
+        for listener in listeners:
+            try:
+                listener(wallpaper_path)
+            except Exception as e:
+                logger.error(f"Error in wallpaper change listener: {e}")
+    
+    def add_listener(self, listener):
+        """
+        Call a function whenever the current wallpaper changes.
+        
+        The listener is called with the new path from the thread that saved
+        it, or that noticed the tracking file had changed.
+        
+        Args:
+            listener (callable): Called as listener(wallpaper_path)
+        """
+        with self._lock:
+            self._listeners.append(listener)
+    
+    def remove_listener(self, listener):
+        """
+        Stop calling a listener added with add_listener.
+        
+        Args:
+            listener (callable): The listener
+        """
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+    
+    def get(self):
+        """
+        Get the path of the current wallpaper.
+        
+        Costs one stat() of the tracking file unless it changed since it
+        was last read.
+        
+        Returns:
+            str: Path to the current wallpaper, or None if not found
+        """
+        with self._lock:
+            file_state = self._stat()
+            if file_state is None:
+                self._file_state = None
+                listeners = self._set_path(None)
+            elif file_state == self._file_state:
+                listeners = []
+            else:
+                try:
+                    with open(self.tracking_file, 'r') as f:
+                        wallpaper_path = f.read().strip()
+                except OSError as e:
+                    logger.warning(f"Current wallpaper file is not readable: {e}")
+                    return None
+                
+                self.reads += 1
+                self._file_state = file_state
+                if not wallpaper_path:
+                    logger.warning("Current wallpaper file is empty")
+                    wallpaper_path = None
+                listeners = self._set_path(wallpaper_path)
             
-        # Check if the file is an image
-        _, ext = os.path.splitext(abs_path.lower())
-        if ext not in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp']:
-            logger.error(f"File is not a supported image type: {abs_path}")
-            return False
+            wallpaper_path = self._path
         
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(CURRENT_WALLPAPER_FILE), exist_ok=True)
+        if listeners:
+            logger.info(f"Retrieved current wallpaper path: {wallpaper_path}")
+            self._notify(listeners, wallpaper_path)
+        
+        # The image itself may have been moved or deleted since
+        if wallpaper_path is None or not is_supported_image(wallpaper_path):
+            return None
+        return wallpaper_path
+    
+    def save(self, wallpaper_path):
+        """
+        Save the path of the current wallpaper.
         
-        # Save the path to the file
-        with open(CURRENT_WALLPAPER_FILE, 'w') as f:
-            f.write(abs_path)
+        Args:
+            wallpaper_path (str): Path to the current wallpaper
         
-        # Set appropriate permissions
+        Returns:
+            bool: True if successful, False otherwise
+        """
         try:
-            os.chmod(CURRENT_WALLPAPER_FILE, 0o644)  # rw-r--r--
+            # Validate input
+            if not wallpaper_path:
+                logger.error("Empty wallpaper path provided")
+                return False
+            
+            # Ensure the path is absolute
+            abs_path = str(Path(wallpaper_path).resolve())
+            if not is_supported_image(abs_path):
+                return False
+            
+            with self._lock:
+                if abs_path == self._path and self._stat() == self._file_state:
+                    # Already saved and the file was not changed since
+                    return True
+                
+                # Written under a temporary name in the same directory and
+                # renamed over the file, so readers see the old or the new
+                # path, never a partial one
+                tracking_dir = os.path.dirname(self.tracking_file)
+                os.makedirs(tracking_dir, exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(prefix=".current_wallpaper.", dir=tracking_dir)
+                try:
+                    with os.fdopen(fd, 'w') as f:
+                        f.write(abs_path)
+                    
+                    # Set appropriate permissions
+                    os.chmod(temp_path, 0o644)  # rw-r--r--
+                    os.replace(temp_path, self.tracking_file)
+                except BaseException:
+                    try:
+                        os.remove(temp_path)
+                    except OSError:
+                        pass
+                    raise
+                
+                self.writes += 1
+                self._file_state = self._stat()
+                listeners = self._set_path(abs_path)
+            
+            logger.info(f"Saved current wallpaper path: {abs_path}")
+            self._notify(listeners, abs_path)
+            return True
         except Exception as e:
-            logger.warning(f"Could not set permissions on tracking file: {e}")
-        
-        logger.info(f"Saved current wallpaper path: {abs_path}")
-        print(f"Current wallpaper set to: {abs_path}")
-        return True
-    except Exception as e:
-        logger.error(f"Error saving current wallpaper path: {e}")
-        return False
+            logger.error(f"Error saving current wallpaper path: {e}")
+            return False
+
+def get_default_tracker():
+    """
+    Get the tracker shared by everything in this process.
+    
+    Returns:
+        WallpaperTracker: The shared tracker
+    """
+    global _default_tracker
+    if _default_tracker is None:
+        _default_tracker = WallpaperTracker()
+    return _default_tracker
+
+def save_current_wallpaper(wallpaper_path):
+    """
+    Save the path of the current wallpaper to a file.
+    
+    Args:
+        wallpaper_path (str): Path to the current wallpaper
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    return get_default_tracker().save(wallpaper_path)
 
 def get_current_wallpaper():
     """
@@ -87,36 +266,7 @@ def get_current_wallpaper():
         str: Path to the current wallpaper, or None if not found
     """
     try:
-        if not os.path.exists(CURRENT_WALLPAPER_FILE):
-            logger.warning(f"Current wallpaper file not found: {CURRENT_WALLPAPER_FILE}")
-            return None
-        
-        # Check if the file is readable
-        if not os.access(CURRENT_WALLPAPER_FILE, os.R_OK):
-            logger.warning(f"Current wallpaper file is not readable: {CURRENT_WALLPAPER_FILE}")
-            return None
-            
-        with open(CURRENT_WALLPAPER_FILE, 'r') as f:
-            wallpaper_path = f.read().strip()
-        
-        # Validate the path
-        if not wallpaper_path:
-            logger.warning("Current wallpaper file is empty")
-            return None
-            
-        # Check if the file exists
-        if not os.path.exists(wallpaper_path):
-            logger.warning(f"Wallpaper file does not exist: {wallpaper_path}")
-            return None
-            
-        # Check if the file is an image
-        _, ext = os.path.splitext(wallpaper_path.lower())
-        if ext not in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp']:
-            logger.warning(f"File is not a supported image type: {wallpaper_path}")
-            return None
-        
-        logger.info(f"Retrieved current wallpaper path: {wallpaper_path}")
-        return wallpaper_path
+        return get_default_tracker().get()
     except Exception as e:
         logger.error(f"Error getting current wallpaper path: {e}")
         return None
@@ -126,7 +276,8 @@ def main():
     # If an argument is provided, save it as the current wallpaper
     if len(sys.argv) > 1:
         wallpaper_path = sys.argv[1]
-        save_current_wallpaper(wallpaper_path)
+        if save_current_wallpaper(wallpaper_path):
+            print(f"Current wallpaper set to: {get_current_wallpaper()}")
     # Otherwise, get and print the current wallpaper
     else:
         wallpaper_path = get_current_wallpaper()
@@ -34,6 +34,10 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QTabWidget, QVBoxLayout, QHBo
 from PyQt5.QtGui import QIcon, QPixmap, QImageReader
 from PyQt5.QtCore import Qt, QSize, pyqtSignal, QObject, QTimer, QDir, QFileSystemModel, QModelIndex
 
+# Wallpaper changes go through the shared D-Bus backend (same directory)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from set_specific_wallpaper import request_wallpaper
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -211,11 +215,9 @@ class HistoryTab(QWidget):
             return
         
         try:
-            # Use set_specific_wallpaper.py to set the wallpaper
-            subprocess.run(
-                ["python3", SET_WALLPAPER_SCRIPT, wallpaper_path],
-                check=True
-            )
+            # Set in the background over the shared D-Bus connection; rapid
+            # requests are coalesced (see wallpaper_setter.py)
+            request_wallpaper(wallpaper_path)
             
             if self.parent_window:
                 self.parent_window.statusBar().showMessage(f"Set wallpaper to {os.path.basename(wallpaper_path)}", 3000)
@@ -246,7 +248,6 @@ class HistoryTab(QWidget):
                 logger.error(f"Error clearing wallpaper history: {e}")
 CONTROL_SCRIPT = os.path.join(SCRIPT_DIR, "control_slideshow.sh")
 GET_CURRENT_WALLPAPER = os.path.join(os.path.dirname(SCRIPT_DIR), "get_current_wallpaper.py")
-SET_WALLPAPER_SCRIPT = os.path.join(SCRIPT_DIR, "set_specific_wallpaper.py")
 CUSTOM_WALLPAPER_SCRIPT = os.path.join(SCRIPT_DIR, "custom_wallpaper.py")
 class NotesTab(QWidget):
     """Tab for viewing and editing notes for wallpapers"""
@@ -866,11 +867,9 @@ class NotesTab(QWidget):
             return
         
         try:
-            # Use set_specific_wallpaper.py to set the wallpaper
-            subprocess.run(
-                ["python3", SET_WALLPAPER_SCRIPT, wallpaper_path],
-                check=True
-            )
+            # Set in the background over the shared D-Bus connection; rapid
+            # requests are coalesced (see wallpaper_setter.py)
+            request_wallpaper(wallpaper_path)
             
             if self.parent_window:
                 self.parent_window.statusBar().showMessage(f"Set wallpaper to {os.path.basename(wallpaper_path)}", 3000)
@@ -1202,11 +1201,9 @@ class FavoritesTab(QWidget):
             return
         
         try:
-            # Use set_specific_wallpaper.py to set the wallpaper
-            subprocess.run(
-                ["python3", SET_WALLPAPER_SCRIPT, wallpaper_path],
-                check=True
-            )
+            # Set in the background over the shared D-Bus connection; rapid
+            # requests are coalesced (see wallpaper_setter.py)
+            request_wallpaper(wallpaper_path)
             
             if self.parent_window:
                 self.parent_window.statusBar().showMessage(f"Set wallpaper to {os.path.basename(wallpaper_path)}", 3000)
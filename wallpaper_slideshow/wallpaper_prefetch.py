@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Wallpaper Prefetch
+
+This module provides decode-ahead for the slideshow (custom_wallpaper.py):
+- The next few images in playback order are read into the page cache on
+  a background thread, so Plasma does not wait on the disk at the switch
+- JPEG and PNG images larger than the screen are pre-scaled to cover the
+  screen resolution into a cache directory (~/.cache/tail/wallpapers by
+  default), and the slideshow hands Plasma that ready-sized file instead
+  of decoding and scaling the multi-megapixel original on the switch
+- A memory budget bounds both the bytes read ahead and the size of the
+  cache directory (least recently used files are removed first)
+- Hits (the image had been prepared when it was shown) and misses are
+  counted, and reported in the slideshow's status
+
+Usage:
+    # Prepare images for a 2560x1440 screen and report the time taken
+    python3 wallpaper_prefetch.py --size 2560x1440 image1.png image2.jpg ...
+"""
+
+import os
+import sys
+import time
+import glob
+import hashlib
+import logging
+import argparse
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Reduced JPEG decoding shared with the color manager; plain PIL decoding
+# is used when the slideshow is installed without it
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wallpaper_color_manager_new"))
+try:
+    from utils.image_loader import open_reduced, REDUCING_GAP
+except ImportError:
+    open_reduced = None
+    REDUCING_GAP = 2.0
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Default directory of pre-scaled wallpapers
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "tail", "wallpapers")
+
+# Default number of images prepared ahead
+DEFAULT_COUNT = 3
+
+# Default memory budget (bytes read ahead, and size of the cache directory)
+DEFAULT_MEMORY_BYTES = 256 * 1024 * 1024
+
+# Images are only pre-scaled if that shrinks them below this fraction of
+# their size; barely larger images are not worth a second copy
+SCALE_THRESHOLD = 0.8
+
+# Formats that are pre-scaled (PIL format name -> save options)
+SCALED_FORMATS = {
+    "JPEG": {"quality": 95, "subsampling": 0},
+    "PNG": {"compress_level": 1},
+}
+
+# Plasma's desktop configuration, which records the image each screen shows
+PLASMA_APPLETS_CONFIG = os.path.join(os.path.expanduser("~"), ".config", "plasma-org.kde.plasma.desktop-appletsrc")
+
+# Connected outputs and their modes (first mode is the preferred one)
+DRM_DIR = "/sys/class/drm"
+
+
+def detect_screen_size() -> Optional[Tuple[int, int]]:
+    """
+    Get the resolution of the largest connected screen from the kernel.
+    
+    Works the same under X11 and Wayland, without a display connection.
+    
+    Returns:
+        tuple: (width, height), or None if no connected screen was found
+    """
+    sizes = []
+    for status_path in glob.glob(os.path.join(DRM_DIR, "card*-*", "status")):
+        output_dir = os.path.dirname(status_path)
+        try:
+            with open(status_path) as f:
+                if f.read().strip() != "connected":
+                    continue
+            with open(os.path.join(output_dir, "modes")) as f:
+                mode = f.readline().strip()
+            width, height = mode.split("x")
+            sizes.append((int(width), int("".join(c for c in height if c.isdigit()))))
+        except (OSError, ValueError):
+            continue
+    
+    return max(sizes, key=lambda size: size[0] * size[1]) if sizes else None
+
+
+def parse_screen_size(value: str) -> Optional[Tuple[int, int]]:
+    """
+    Parse the prefetch_scale setting.
+    
+    Args:
+        value: "auto" (detect the screen), "off", or "WIDTHxHEIGHT"
+    
+    Returns:
+        tuple: (width, height) to pre-scale to, or None to not pre-scale
+    """
+    value = (value or "").strip().lower()
+    if value in ("", "off", "no", "false", "0"):
+        return None
+    if value == "auto":
+        return detect_screen_size()
+    try:
+        width, height = value.split("x")
+        return int(width), int(height)
+    except ValueError:
+        logger.error(f"Invalid prefetch_scale {value!r}, expected auto, off or WIDTHxHEIGHT")
+        return None
+
+
+def warm_page_cache(path: str) -> int:
+    """
+    Ask the kernel to read a file into the page cache (without waiting for it).
+    
+    Args:
+        path: File to read ahead
+    
+    Returns:
+        int: Size of the file in bytes, or 0 if it cannot be opened
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return 0
+    try:
+        size = os.fstat(fd).st_size
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        else:
+            while os.read(fd, 1024 * 1024):
+                pass
+        return size
+    finally:
+        os.close(fd)
+
+
+def plasma_wallpaper_paths(config_path: str = PLASMA_APPLETS_CONFIG) -> Set[str]:
+    """
+    Get the image files Plasma's desktop configuration points to.
+    
+    Args:
+        config_path: Path to plasma-org.kde.plasma.desktop-appletsrc
+    
+    Returns:
+        set: Local paths from the Image= entries of every containment
+             (empty if the file cannot be read)
+    """
+    paths = set()
+    try:
+        with open(config_path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                key, sep, value = line.strip().partition("=")
+                if sep and key == "Image" and value.startswith("file://"):
+                    path = value[len("file://"):]
+                    paths.add(path)
+                    paths.add(urllib.parse.unquote(path))
+    except OSError:
+        pass
+    return paths
+
+
+class Prefetcher:
+    """
+    Prepares the next images of the slideshow on a background thread.
+    """
+    
+    def __init__(self, screen_size: Optional[Tuple[int, int]] = None,
+                 cache_dir: str = DEFAULT_CACHE_DIR,
+                 max_bytes: int = DEFAULT_MEMORY_BYTES):
+        """
+        Create a prefetcher.
+        
+        Args:
+            screen_size: (width, height) to pre-scale to, or None to only
+                         read images into the page cache
+            cache_dir: Directory of pre-scaled images
+            max_bytes: Memory budget for reading ahead and for cache_dir
+        """
+        if screen_size and Image is None:
+            logger.warning("PIL is not installed; images are not pre-scaled")
+            screen_size = None
+        
+        self.screen_size = screen_size
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.scaled = 0
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._last_handed_out = None
+        
+        # Image path -> path to hand to Plasma, for prepared images
+        self._ready = {}
+        
+        # One thread; idle, it blocks on the executor's queue without waking up
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+    
+    def _scaled_path(self, image_path: str) -> Optional[str]:
+        """
+        Get where the pre-scaled copy of an image is stored.
+        
+        The directory is derived from the file's identity and the screen
+        size; the file keeps the original name, so tools that look up the
+        current wallpaper by name still find it.
+        
+        Args:
+            image_path: Path to the original image
+        
+        Returns:
+            str: Path of the copy, or None if the image cannot be read
+        """
+        try:
+            st = os.stat(image_path)
+        except OSError:
+            return None
+        identity = f"{os.path.realpath(image_path)}:{st.st_size}:{st.st_mtime_ns}:{self.screen_size[0]}x{self.screen_size[1]}"
+        key = hashlib.sha1(identity.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, key, os.path.basename(image_path))
+    
+    def _scale(self, image_path: str) -> str:
+        """
+        Pre-scale an image to cover the screen, if that is worth it.
+        
+        Args:
+            image_path: Path to the original image
+        
+        Returns:
+            str: Path of the pre-scaled copy, or image_path if the image is
+                 kept as it is
+        """
+        scaled_path = self._scaled_path(image_path)
+        if scaled_path is None:
+            return image_path
+        if os.path.exists(scaled_path):
+            return scaled_path
+        
+        screen_width, screen_height = self.screen_size
+        with Image.open(image_path) as probe:
+            image_format = probe.format
+            width, height = probe.size
+            animated = getattr(probe, "is_animated", False)
+        
+        scale = max(screen_width / width, screen_height / height)
+        if image_format not in SCALED_FORMATS or animated or scale > SCALE_THRESHOLD:
+            return image_path
+        
+        target = (max(1, round(width * scale)), max(1, round(height * scale)))
+        if open_reduced is not None:
+            img = open_reduced(image_path, target)
+        else:
+            img = Image.open(image_path)
+        with img:
+            scaled = img.resize(target, Image.LANCZOS, reducing_gap=REDUCING_GAP)
+        
+        # Written under a temporary name and renamed, so a half-written
+        # file is never handed to Plasma
+        os.makedirs(os.path.dirname(scaled_path), exist_ok=True)
+        temp_path = f"{scaled_path}.{os.getpid()}.tmp"
+        try:
+            scaled.save(temp_path, image_format, **SCALED_FORMATS[image_format])
+            os.replace(temp_path, scaled_path)
+        except Exception:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        
+        with self._lock:
+            self.scaled += 1
+        logger.debug(f"Pre-scaled {os.path.basename(image_path)} from {width}x{height} to {target[0]}x{target[1]}")
+        return scaled_path
+    
+    def _prepare(self, image_paths: List[str], generation: int) -> None:
+        """
+        Prepare images in order until the budget is used or a newer request came in.
+        
+        Args:
+            image_paths: Images in the order they will be shown
+            generation: Number of the request
+        """
+        budget = self.max_bytes
+        for image_path in image_paths:
+            if generation != self._generation:
+                return
+            
+            try:
+                path = image_path
+                if self.screen_size:
+                    path = self._scale(image_path)
+                size = warm_page_cache(path)
+            except Exception as e:
+                logger.error(f"Error preparing {image_path}: {e}")
+                continue
+            
+            with self._lock:
+                self._ready[image_path] = path
+            
+            budget -= size
+            if budget <= 0:
+                break
+        
+        if self.screen_size:
+            self.cleanup()
+    
+    def prefetch(self, image_paths: List[str]) -> None:
+        """
+        Prepare the next images, replacing the previous request.
+        
+        Args:
+            image_paths: Images in the order they will be shown
+        """
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            
+            # Only prepared images that are still coming up are kept
+            self._ready = {path: ready for path, ready in self._ready.items() if path in image_paths}
+        
+        self._pool.submit(self._prepare, list(image_paths), generation)
+    
+    def resolve(self, image_path: str) -> str:
+        """
+        Get the file to hand to Plasma for an image being shown.
+        
+        Args:
+            image_path: Path to the original image
+        
+        Returns:
+            str: Path of the prepared (possibly pre-scaled) file, or
+                 image_path if it was not prepared
+        """
+        with self._lock:
+            path = self._ready.pop(image_path, None)
+        
+        # Images shown again (e.g. going back) may still have a copy on disk
+        if path is None and self.screen_size:
+            scaled_path = self._scaled_path(image_path)
+            if scaled_path and os.path.exists(scaled_path):
+                path = scaled_path
+        
+        with self._lock:
+            if path is None:
+                self.misses += 1
+                return image_path
+            self.hits += 1
+        
+        if path != image_path:
+            try:
+                # Mark as recently used for cleanup
+                os.utime(path)
+            except OSError:
+                return image_path
+            self._last_handed_out = path
+        return path
+    
+    def cleanup(self) -> int:
+        """
+        Remove the least recently used pre-scaled images beyond the budget.
+        
+        Images Plasma may still show are kept: the one handed to Plasma last,
+        and those its configuration points to, which is how a copy handed out
+        before the slideshow was restarted (and shown again at the next
+        login) is found.
+        
+        Returns:
+            int: Number of images removed
+        """
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        
+        in_use = plasma_wallpaper_paths()
+        in_use.add(self._last_handed_out)
+        
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path in in_use or os.path.realpath(path) in in_use:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+            
+            # Remove the per-file directory once its image is gone
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+        
+        if removed:
+            logger.debug(f"Removed {removed} pre-scaled images from {self.cache_dir}")
+        return removed
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get statistics about the prefetcher.
+        
+        Returns:
+            dict: Hits, misses, hit rate and the number of images pre-scaled
+        """
+        with self._lock:
+            shown = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / shown if shown else None,
+                "scaled": self.scaled,
+                "screen_size": list(self.screen_size) if self.screen_size else None
+            }
+    
+    def close(self) -> None:
+        """
+        Stop the background thread, dropping work not yet started.
+        """
+        with self._lock:
+            self._generation += 1
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Pre-scale wallpapers for the screen")
+    parser.add_argument("--size", default="auto", help="auto, off or WIDTHxHEIGHT (default: auto)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Directory of pre-scaled images")
+    parser.add_argument("images", nargs="+", help="Images to prepare")
+    args = parser.parse_args()
+    
+    screen_size = parse_screen_size(args.size)
+    print(f"Screen size: {'x'.join(map(str, screen_size)) if screen_size else 'not pre-scaling'}")
+    
+    prefetcher = Prefetcher(screen_size, args.cache_dir, max_bytes=sys.maxsize)
+    start = time.perf_counter()
+    prefetcher._prepare(args.images, prefetcher._generation)
+    elapsed = time.perf_counter() - start
+    
+    for image_path in args.images:
+        print(f"{image_path} -> {prefetcher.resolve(image_path)}")
+    print(f"Prepared {len(args.images)} images in {elapsed:.2f}s ({prefetcher.scaled} pre-scaled)")
+    prefetcher.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,990 @@
+#!/usr/bin/env python3
+"""
+Wallpaper Setter
+
+This module provides the backend that sets the KDE Plasma wallpaper for the
+slideshow, the tray and the helper scripts:
+- One D-Bus session bus connection is opened in-process and kept open,
+  instead of forking qdbus for every change (the D-Bus protocol is spoken
+  directly over the bus socket, so no extra package is needed)
+- The Plasma script is prepared once; a change only fills in the image URI
+- Changes requested while another one is being sent are coalesced: only the
+  newest image is sent, so a burst of next/previous presses costs one call
+- If the session bus cannot be used, qdbus is called as before
+- A mock org.kde.plasmashell service allows measuring the latency without a
+  Plasma session
+
+Usage:
+    # Set the wallpaper
+    python3 wallpaper_setter.py /path/to/wallpaper.jpg
+    
+    # Compare the latency of the persistent connection and of qdbus
+    # against a mock Plasma service on the current session bus
+    python3 wallpaper_setter.py --benchmark 200 /path/to/wallpaper.jpg
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import struct
+import logging
+import argparse
+import threading
+import subprocess
+from pathlib import Path
+from urllib.parse import unquote
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Plasma shell D-Bus service
+PLASMA_SERVICE = "org.kde.plasmashell"
+PLASMA_PATH = "/PlasmaShell"
+PLASMA_INTERFACE = "org.kde.PlasmaShell"
+
+# Message bus itself
+BUS_SERVICE = "org.freedesktop.DBus"
+BUS_PATH = "/org/freedesktop/DBus"
+BUS_INTERFACE = "org.freedesktop.DBus"
+
+# qdbus used when the session bus cannot be reached directly
+QDBUS_EXECUTABLE = "/usr/lib/qt6/bin/qdbus"
+
+# Seconds to wait for a reply from Plasma
+CALL_TIMEOUT = 10.0
+
+# Plasma script setting the image on every desktop; %s is the JSON-quoted URI
+SCRIPT_TEMPLATE = """
+var imageUri = %s;
+var allDesktops = desktops();
+if (allDesktops.length === 0) {
+    print("No desktops found by Plasma scripting engine.");
+}
+for (var i = 0; i < allDesktops.length; i++) {
+    var d = allDesktops[i];
+    d.wallpaperPlugin = "org.kde.image";
+    d.currentConfigGroup = ["Wallpaper", "org.kde.image", "General"];
+    d.writeConfig("Image", imageUri);
+}
+"""
+
+# D-Bus message types
+METHOD_CALL = 1
+METHOD_RETURN = 2
+ERROR = 3
+SIGNAL = 4
+
+# D-Bus message flags
+NO_REPLY_EXPECTED = 0x1
+
+# D-Bus header fields: code -> (name, signature)
+HEADER_FIELDS = {
+    1: ("path", "o"),
+    2: ("interface", "s"),
+    3: ("member", "s"),
+    4: ("error_name", "s"),
+    5: ("reply_serial", "u"),
+    6: ("destination", "s"),
+    7: ("sender", "s"),
+    8: ("signature", "g"),
+    9: ("unix_fds", "u")
+}
+HEADER_CODES = {name: (code, sig) for code, (name, sig) in HEADER_FIELDS.items()}
+
+# Byte order marks (first byte of every message) -> struct byte order
+ENDIAN_MARKS = {b"l": "<", b"B": ">"}
+
+# Shared setter instance
+_default_setter = None
+
+
+class DBusError(Exception):
+    """
+    Error reply from D-Bus, or failure to talk to the bus.
+    """
+    
+    def __init__(self, name: str, message: str = ""):
+        """
+        Create an error.
+        
+        Args:
+            name: D-Bus error name (e.g. org.freedesktop.DBus.Error.ServiceUnknown)
+            message: Error description
+        """
+        super().__init__(f"{name}: {message}" if message else name)
+        self.name = name
+
+
+def _pad(length: int, alignment: int) -> int:
+    """
+    Get the padding needed to align an offset.
+    
+    Args:
+        length: Current offset
+        alignment: Required alignment
+    
+    Returns:
+        int: Number of padding bytes
+    """
+    return -length % alignment
+
+
+def _marshal_value(buf: bytearray, code: str, value: Any, endian: str = "<") -> None:
+    """
+    Append a basic D-Bus value to a message buffer.
+    
+    Args:
+        buf: Buffer, starting at an 8-byte aligned message offset
+        code: Type code (s, o, g, u, i, b or y)
+        value: Value to append
+        endian: "<" (little-endian) or ">" (big-endian)
+    """
+    if code in "so":
+        data = value.encode("utf-8")
+        buf.extend(b"\0" * _pad(len(buf), 4))
+        buf.extend(struct.pack(endian + "I", len(data)))
+        buf.extend(data + b"\0")
+    elif code == "g":
+        data = value.encode("ascii")
+        buf.extend(struct.pack("B", len(data)))
+        buf.extend(data + b"\0")
+    elif code in "ub":
+        buf.extend(b"\0" * _pad(len(buf), 4))
+        buf.extend(struct.pack(endian + "I", int(value)))
+    elif code == "i":
+        buf.extend(b"\0" * _pad(len(buf), 4))
+        buf.extend(struct.pack(endian + "i", value))
+    elif code == "y":
+        buf.extend(struct.pack("B", value))
+    else:
+        raise ValueError(f"Unsupported D-Bus type: {code}")
+
+
+def _unmarshal_value(data: bytes, offset: int, code: str, endian: str) -> Tuple[Any, int]:
+    """
+    Read a basic D-Bus value from a message.
+    
+    Args:
+        data: Message bytes
+        offset: Offset of the value (before alignment)
+        code: Type code (s, o, g, u, i, b or y)
+        endian: "<" or ">" as given by the message
+    
+    Returns:
+        tuple: (value, offset after the value)
+    """
+    if code in "so":
+        offset += _pad(offset, 4)
+        length, = struct.unpack_from(endian + "I", data, offset)
+        offset += 4
+        return data[offset:offset + length].decode("utf-8"), offset + length + 1
+    if code == "g":
+        length = data[offset]
+        offset += 1
+        return data[offset:offset + length].decode("ascii"), offset + length + 1
+    if code in "ubi":
+        offset += _pad(offset, 4)
+        value, = struct.unpack_from(endian + ("i" if code == "i" else "I"), data, offset)
+        return (bool(value) if code == "b" else value), offset + 4
+    if code == "y":
+        return data[offset], offset + 1
+    raise ValueError(f"Unsupported D-Bus type: {code}")
+
+
+def _message_endian(data: bytes) -> str:
+    """
+    Get the byte order of a message from its first byte.
+    
+    Args:
+        data: Message bytes (at least the first one)
+    
+    Returns:
+        str: "<" or ">"
+    
+    Raises:
+        ValueError: If the first byte is not a D-Bus byte order mark
+    """
+    mark = data[0:1]
+    if mark not in ENDIAN_MARKS:
+        raise ValueError(f"Invalid D-Bus byte order mark: {mark!r}")
+    return ENDIAN_MARKS[mark]
+
+
+def marshal_message(msg_type: int, serial: int, fields: Dict[str, Any],
+                    signature: str = "", args: Tuple = (), flags: int = 0,
+                    endian: str = "<") -> bytes:
+    """
+    Build a D-Bus message.
+    
+    Only bodies made of basic types (strings and integers) are supported,
+    which covers every call made here.
+    
+    Args:
+        msg_type: METHOD_CALL, METHOD_RETURN, ERROR or SIGNAL
+        serial: Serial number of the message
+        fields: Header fields by name (path, interface, member, ...)
+        signature: Body signature
+        args: Body values
+        flags: Message flags
+        endian: "<" (little-endian, what is sent here) or ">" (big-endian)
+    
+    Returns:
+        bytes: The message
+    """
+    body = bytearray()
+    for code, value in zip(signature, args):
+        _marshal_value(body, code, value, endian)
+    
+    fields = dict(fields)
+    if signature:
+        fields["signature"] = signature
+    
+    mark = b"l" if endian == "<" else b"B"
+    header = bytearray(struct.pack(endian + "cBBBII", mark, msg_type, flags, 1, len(body), serial))
+    header.extend(b"\0\0\0\0")  # Length of the header field array
+    array_start = len(header)
+    for name, value in fields.items():
+        code, sig = HEADER_CODES[name]
+        header.extend(b"\0" * _pad(len(header), 8))
+        header.append(code)
+        _marshal_value(header, "g", sig)
+        _marshal_value(header, sig, value, endian)
+    struct.pack_into(endian + "I", header, 12, len(header) - array_start)
+    header.extend(b"\0" * _pad(len(header), 8))
+    
+    return bytes(header + body)
+
+
+def unmarshal_message(data: bytes) -> Dict[str, Any]:
+    """
+    Parse a D-Bus message.
+    
+    Args:
+        data: The complete message
+    
+    Returns:
+        dict: {"type", "flags", "serial", header field names..., "body": list
+              of values, or None if the body has non-basic types}
+    
+    Raises:
+        ValueError: If the message does not start with a byte order mark
+    """
+    endian = _message_endian(data)
+    msg_type, flags = data[1], data[2]
+    body_length, serial, array_length = struct.unpack_from(endian + "III", data, 4)
+    
+    message = {"type": msg_type, "flags": flags, "serial": serial}
+    offset = 16
+    end = 16 + array_length
+    while offset < end:
+        offset += _pad(offset, 8)
+        code = data[offset]
+        sig, offset = _unmarshal_value(data, offset + 1, "g", endian)
+        value, offset = _unmarshal_value(data, offset, sig, endian)
+        if code in HEADER_FIELDS:
+            message[HEADER_FIELDS[code][0]] = value
+    
+    body_start = end + _pad(end, 8)
+    body = []
+    offset = body_start
+    try:
+        for code in message.get("signature", ""):
+            value, offset = _unmarshal_value(data, offset, code, endian)
+            body.append(value)
+    except ValueError:
+        body = None
+    message["body"] = body
+    
+    return message
+
+
+def get_session_bus_address() -> Optional[str]:
+    """
+    Get the address of the session bus.
+    
+    Returns:
+        str: D-Bus address, or None if no session bus is known
+    """
+    address = os.environ.get("DBUS_SESSION_BUS_ADDRESS")
+    if address:
+        return address
+    
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.exists(os.path.join(runtime_dir, "bus")):
+        return f"unix:path={os.path.join(runtime_dir, 'bus')}"
+    return None
+
+
+def _socket_path(address: str) -> str:
+    """
+    Get the socket to connect to from a D-Bus address.
+    
+    Args:
+        address: D-Bus address (e.g. unix:path=/run/user/1000/bus)
+    
+    Returns:
+        str: Socket path, starting with a NUL byte for abstract sockets
+    
+    Raises:
+        DBusError: If the address has no usable unix socket
+    """
+    for entry in address.split(";"):
+        transport, _, params = entry.partition(":")
+        if transport != "unix":
+            continue
+        values = dict(param.split("=", 1) for param in params.split(",") if "=" in param)
+        if "path" in values:
+            return unquote(values["path"])
+        if "abstract" in values:
+            return "\0" + unquote(values["abstract"])
+    raise DBusError("org.freedesktop.DBus.Error.BadAddress", f"No unix socket in {address}")
+
+
+class DBusConnection:
+    """
+    Connection to a D-Bus message bus, speaking the protocol directly.
+    """
+    
+    def __init__(self, address: Optional[str] = None, timeout: float = CALL_TIMEOUT):
+        """
+        Connect and authenticate to a bus.
+        
+        Args:
+            address: D-Bus address (default: the session bus)
+            timeout: Seconds to wait for a reply
+        
+        Raises:
+            DBusError: If no bus address is known or authentication failed
+            OSError: If the bus socket cannot be reached
+        """
+        address = address or get_session_bus_address()
+        if not address:
+            raise DBusError("org.freedesktop.DBus.Error.NoServer", "No session bus address")
+        
+        self.timeout = timeout
+        self._serial = 0
+        self._buffer = b""
+        self._lock = threading.RLock()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._sock.settimeout(timeout)
+            self._sock.connect(_socket_path(address))
+            self._authenticate()
+            self.unique_name = self.call(BUS_SERVICE, BUS_PATH, BUS_INTERFACE, "Hello")[0]
+        except Exception:
+            self._sock.close()
+            raise
+    
+    def _authenticate(self) -> None:
+        """
+        Authenticate with the EXTERNAL mechanism (the uid of this process).
+        
+        Raises:
+            DBusError: If the bus rejected the authentication
+        """
+        uid = str(os.getuid()).encode("ascii").hex().encode("ascii")
+        self._sock.sendall(b"\0AUTH EXTERNAL " + uid + b"\r\n")
+        
+        line = self._read_line()
+        if not line.startswith(b"OK "):
+            raise DBusError("org.freedesktop.DBus.Error.AuthFailed", line.decode("ascii", "replace"))
+        self._sock.sendall(b"BEGIN\r\n")
+    
+    def _read_line(self) -> bytes:
+        """
+        Read one line of the authentication exchange.
+        
+        Returns:
+            bytes: The line without its line ending
+        """
+        while b"\r\n" not in self._buffer:
+            chunk = self._sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("D-Bus connection closed during authentication")
+            self._buffer += chunk
+        line, _, self._buffer = self._buffer.partition(b"\r\n")
+        return line
+    
+    def _read_exact(self, size: int) -> bytes:
+        """
+        Read a number of bytes from the connection.
+        
+        Args:
+            size: Number of bytes
+        
+        Returns:
+            bytes: The data
+        """
+        while len(self._buffer) < size:
+            chunk = self._sock.recv(max(65536, size - len(self._buffer)))
+            if not chunk:
+                raise ConnectionError("D-Bus connection closed")
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+    
+    def _next_serial(self) -> int:
+        """
+        Get the serial number for a new message.
+        
+        Returns:
+            int: Serial number
+        """
+        self._serial += 1
+        return self._serial
+    
+    def send(self, message: bytes) -> None:
+        """
+        Send a marshalled message.
+        
+        Args:
+            message: Message built by marshal_message
+        """
+        with self._lock:
+            self._sock.sendall(message)
+    
+    def receive(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Receive the next message.
+        
+        Args:
+            timeout: Seconds to wait (default: the connection timeout)
+        
+        Returns:
+            dict: Message parsed by unmarshal_message, or None on timeout
+        """
+        with self._lock:
+            self._sock.settimeout(self.timeout if timeout is None else timeout)
+            try:
+                if not self._buffer:
+                    self._buffer = self._sock.recv(65536)
+                    if not self._buffer:
+                        raise ConnectionError("D-Bus connection closed")
+            except socket.timeout:
+                return None
+            
+            # A message that has started arriving is read in full
+            self._sock.settimeout(self.timeout)
+            fixed = self._read_exact(16)
+            try:
+                endian = _message_endian(fixed)
+            except ValueError as e:
+                # The stream is out of step; the caller reconnects
+                raise ConnectionError(f"Corrupt D-Bus message stream: {e}")
+            body_length, _, array_length = struct.unpack_from(endian + "III", fixed, 4)
+            header_length = 16 + array_length + _pad(16 + array_length, 8)
+            return unmarshal_message(fixed + self._read_exact(header_length - 16 + body_length))
+    
+    def call(self, destination: str, path: str, interface: str, member: str,
+             signature: str = "", args: Tuple = (), timeout: Optional[float] = None) -> List[Any]:
+        """
+        Call a method and wait for its reply.
+        
+        Messages that arrive before the reply (e.g. signals) are skipped.
+        
+        Args:
+            destination: Bus name of the service
+            path: Object path
+            interface: Interface name
+            member: Method name
+            signature: Signature of the arguments
+            args: Arguments
+            timeout: Seconds to wait for the reply (default: the connection timeout)
+        
+        Returns:
+            list: Values of the reply
+        
+        Raises:
+            DBusError: If the service replied with an error or did not reply in time
+        """
+        timeout = self.timeout if timeout is None else timeout
+        
+        with self._lock:
+            serial = self._next_serial()
+            self.send(marshal_message(METHOD_CALL, serial, {
+                "path": path,
+                "interface": interface,
+                "member": member,
+                "destination": destination
+            }, signature, args))
+            
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                message = self.receive(remaining) if remaining > 0 else None
+                if message is None:
+                    raise DBusError("org.freedesktop.DBus.Error.NoReply",
+                                    f"No reply to {interface}.{member} within {timeout:g}s")
+                if message.get("reply_serial") != serial:
+                    continue
+                if message["type"] == ERROR:
+                    text = message["body"][0] if message["body"] else ""
+                    raise DBusError(message.get("error_name", "org.freedesktop.DBus.Error.Failed"), text)
+                return message["body"] or []
+    
+    def reply(self, call: Dict[str, Any], signature: str = "", args: Tuple = ()) -> None:
+        """
+        Send the return value of a method call received by this connection.
+        
+        Args:
+            call: The received method call
+            signature: Signature of the return values
+            args: Return values
+        """
+        if call["flags"] & NO_REPLY_EXPECTED:
+            return
+        with self._lock:
+            self.send(marshal_message(METHOD_RETURN, self._next_serial(), {
+                "reply_serial": call["serial"],
+                "destination": call.get("sender", "")
+            }, signature, args))
+    
+    def reply_error(self, call: Dict[str, Any], name: str, text: str) -> None:
+        """
+        Send an error in reply to a method call received by this connection.
+        
+        Args:
+            call: The received method call
+            name: D-Bus error name
+            text: Error description
+        """
+        if call["flags"] & NO_REPLY_EXPECTED:
+            return
+        with self._lock:
+            self.send(marshal_message(ERROR, self._next_serial(), {
+                "reply_serial": call["serial"],
+                "destination": call.get("sender", ""),
+                "error_name": name
+            }, "s", (text,)))
+    
+    def request_name(self, name: str) -> bool:
+        """
+        Claim a well-known bus name for this connection.
+        
+        Args:
+            name: Bus name (e.g. org.kde.plasmashell)
+        
+        Returns:
+            bool: True if this connection now owns the name
+        """
+        # Flag 4: do not queue if someone else owns the name
+        result = self.call(BUS_SERVICE, BUS_PATH, BUS_INTERFACE, "RequestName", "su", (name, 4))
+        return result[0] in (1, 4)  # Primary owner, or already owner
+    
+    def close(self) -> None:
+        """
+        Close the connection.
+        """
+        self._sock.close()
+
+
+def build_script(image_path: str) -> Tuple[str, str]:
+    """
+    Fill in the prepared Plasma script for an image.
+    
+    Args:
+        image_path: Path to the image file
+    
+    Returns:
+        tuple: (file URI of the image, Plasma script)
+    """
+    file_uri = f"file://{Path(image_path).resolve()}"
+    return file_uri, SCRIPT_TEMPLATE % json.dumps(file_uri)
+
+
+def check_script_output(output: str) -> bool:
+    """
+    Check the output of a Plasma script for errors reported by its engine.
+    
+    Args:
+        output: Text returned by evaluateScript
+    
+    Returns:
+        bool: True if no error was reported
+    """
+    return not ("Error:" in output or "failed" in output)
+
+
+class WallpaperSetter:
+    """
+    Sets the wallpaper over a persistent D-Bus connection.
+    """
+    
+    def __init__(self, address: Optional[str] = None, use_qdbus: bool = False,
+                 timeout: float = CALL_TIMEOUT):
+        """
+        Create a setter; the bus is connected on first use.
+        
+        Args:
+            address: D-Bus address (default: the session bus)
+            use_qdbus: If True, always call qdbus instead of using the bus directly
+            timeout: Seconds to wait for Plasma
+        """
+        self.address = address
+        self.use_qdbus = use_qdbus
+        self.timeout = timeout
+        self.calls = 0
+        self.coalesced = 0
+        self._connection = None
+        self._lock = threading.Lock()
+        
+        # Newest pending (image_path, callback) for the background sender
+        self._cond = threading.Condition()
+        self._pending = None
+        self._busy = False
+        self._worker = None
+    
+    def _evaluate(self, script: str) -> str:
+        """
+        Run a Plasma script over the persistent connection.
+        
+        A broken connection (e.g. after plasmashell or the bus restarted) is
+        opened again once.
+        
+        Args:
+            script: Plasma script
+        
+        Returns:
+            str: Output of the script
+        """
+        for attempt in range(2):
+            if self._connection is None:
+                self._connection = DBusConnection(self.address, self.timeout)
+            try:
+                result = self._connection.call(
+                    PLASMA_SERVICE, PLASMA_PATH, PLASMA_INTERFACE,
+                    "evaluateScript", "s", (script,)
+                )
+                return result[0] if result else ""
+            except (OSError, ConnectionError):
+                self._connection.close()
+                self._connection = None
+                if attempt:
+                    raise
+                logger.info("D-Bus connection lost, reconnecting")
+        return ""
+    
+    def _evaluate_with_qdbus(self, script: str) -> str:
+        """
+        Run a Plasma script by calling qdbus.
+        
+        Args:
+            script: Plasma script
+        
+        Returns:
+            str: Output of the script
+        
+        Raises:
+            RuntimeError: If qdbus failed
+        """
+        result = subprocess.run([
+            QDBUS_EXECUTABLE, PLASMA_SERVICE, PLASMA_PATH,
+            f"{PLASMA_INTERFACE}.evaluateScript", script
+        ], capture_output=True, text=True, check=False, timeout=self.timeout)
+        
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"qdbus returned {result.returncode}: {result.stderr.strip() or result.stdout.strip()}"
+            )
+        return result.stdout.strip()
+    
+    def set_wallpaper(self, image_path: str) -> bool:
+        """
+        Set the wallpaper and wait until Plasma has applied it.
+        
+        Args:
+            image_path: Path to the image file
+        
+        Returns:
+            bool: True if the wallpaper was set
+        """
+        if not image_path or not os.path.exists(image_path):
+            logger.error(f"Image path is invalid or file does not exist: {image_path}")
+            return False
+        
+        file_uri, script = build_script(image_path)
+        
+        with self._lock:
+            self.calls += 1
+            try:
+                if self.use_qdbus:
+                    output = self._evaluate_with_qdbus(script)
+                else:
+                    try:
+                        output = self._evaluate(script)
+                    except (OSError, ConnectionError, DBusError) as e:
+                        if isinstance(e, DBusError) and e.name not in (
+                                "org.freedesktop.DBus.Error.NoServer",
+                                "org.freedesktop.DBus.Error.BadAddress",
+                                "org.freedesktop.DBus.Error.AuthFailed"):
+                            raise
+                        logger.warning(f"Session bus unavailable ({e}), using qdbus")
+                        output = self._evaluate_with_qdbus(script)
+            except FileNotFoundError:
+                logger.error("qdbus command not found. Is it installed and in your PATH?")
+                return False
+            except Exception as e:
+                logger.error(f"Error setting wallpaper to {file_uri}: {e}")
+                return False
+        
+        if not check_script_output(output):
+            logger.error(f"Plasma script engine reported an error: {output}")
+            return False
+        
+        logger.info(f"Wallpaper set to {file_uri}")
+        return True
+    
+    def request(self, image_path: str,
+                callback: Optional[Callable[[str, bool], None]] = None) -> None:
+        """
+        Set the wallpaper in the background, without waiting.
+        
+        If a change is already being sent, the image is queued; a later
+        request replaces a queued one, so only the newest image is sent.
+        
+        Args:
+            image_path: Path to the image file
+            callback: Called (from the background thread) with the image path
+                      and whether it was set, if the request was not replaced
+        """
+        with self._cond:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = (image_path, callback)
+            
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="wallpaper-setter", daemon=True)
+                self._worker.start()
+            self._cond.notify_all()
+    
+    def _run(self) -> None:
+        """
+        Send queued requests, newest only, until the queue stays empty.
+        """
+        while True:
+            with self._cond:
+                if self._pending is None:
+                    self._cond.wait(timeout=60.0)
+                    if self._pending is None:
+                        # Idle: let the thread end; request() starts a new one
+                        self._worker = None
+                        self._cond.notify_all()
+                        return
+                image_path, callback = self._pending
+                self._pending = None
+                self._busy = True
+            
+            try:
+                ok = self.set_wallpaper(image_path)
+                if callback is not None:
+                    callback(image_path, ok)
+            except Exception as e:
+                logger.error(f"Error in wallpaper callback: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every requested change has been sent.
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+        
+        Returns:
+            bool: True if nothing is pending
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending is None and not self._busy, timeout)
+    
+    def close(self) -> None:
+        """
+        Close the D-Bus connection.
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def get_default_setter() -> WallpaperSetter:
+    """
+    Get the shared setter of this process, creating it on first use.
+    
+    Returns:
+        WallpaperSetter: The shared setter
+    """
+    global _default_setter
+    
+    if _default_setter is None:
+        _default_setter = WallpaperSetter()
+    return _default_setter
+
+
+def set_wallpaper(image_path: str) -> bool:
+    """
+    Set the wallpaper through the shared setter and wait for it.
+    
+    Args:
+        image_path: Path to the image file
+    
+    Returns:
+        bool: True if the wallpaper was set
+    """
+    return get_default_setter().set_wallpaper(image_path)
+
+
+class MockPlasmaShell:
+    """
+    Stand-in for the org.kde.plasmashell service, for benchmarks and tests.
+    """
+    
+    def __init__(self, address: Optional[str] = None, delay: float = 0.0):
+        """
+        Create the service; it is registered on the bus by start().
+        
+        Args:
+            address: D-Bus address (default: the session bus)
+            delay: Seconds each evaluateScript call takes, to simulate Plasma
+        """
+        self.address = address
+        self.delay = delay
+        self.scripts = []
+        self._connection = None
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self) -> None:
+        """
+        Register org.kde.plasmashell and start answering calls.
+        
+        Raises:
+            DBusError: If the name is already owned (e.g. by a real Plasma session)
+        """
+        self._connection = DBusConnection(self.address)
+        if not self._connection.request_name(PLASMA_SERVICE):
+            self._connection.close()
+            raise DBusError("org.freedesktop.DBus.Error.AddressInUse", f"{PLASMA_SERVICE} is already owned")
+        
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._serve, name="mock-plasmashell", daemon=True)
+        self._thread.start()
+    
+    def _serve(self) -> None:
+        """
+        Answer method calls until stopped.
+        """
+        while not self._stop.is_set():
+            try:
+                message = self._connection.receive(timeout=0.1)
+            except (OSError, ConnectionError):
+                return
+            if message is None or message["type"] != METHOD_CALL:
+                continue
+            
+            if message.get("interface") == PLASMA_INTERFACE and message.get("member") == "evaluateScript":
+                self.scripts.append(message["body"][0] if message["body"] else "")
+                if self.delay:
+                    time.sleep(self.delay)
+                self._connection.reply(message, "s", ("",))
+            else:
+                self._connection.reply_error(
+                    message, "org.freedesktop.DBus.Error.UnknownMethod",
+                    f"No such method {message.get('interface')}.{message.get('member')}"
+                )
+    
+    def stop(self) -> None:
+        """
+        Stop answering and release the name.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._connection is not None:
+            self._connection.close()
+
+
+def benchmark(image_path: str, count: int) -> Dict[str, float]:
+    """
+    Measure the latency of setting the wallpaper against a mock Plasma service.
+    
+    Args:
+        image_path: Image to set
+        count: Number of calls per method
+    
+    Returns:
+        dict: Mean milliseconds per call for each method measured, and the
+              number of calls sent for a coalesced burst of count requests
+    """
+    mock = MockPlasmaShell()
+    mock.start()
+    results = {}
+    try:
+        setter = WallpaperSetter()
+        setter.set_wallpaper(image_path)  # Connect before timing
+        start = time.perf_counter()
+        for _ in range(count):
+            setter.set_wallpaper(image_path)
+        results["persistent_ms"] = (time.perf_counter() - start) * 1000 / count
+        
+        calls_before = setter.calls
+        start = time.perf_counter()
+        for _ in range(count):
+            setter.request(image_path)
+        setter.wait()
+        results["burst_ms"] = (time.perf_counter() - start) * 1000
+        results["burst_calls"] = setter.calls - calls_before
+        setter.close()
+        
+        if os.path.exists(QDBUS_EXECUTABLE):
+            qdbus_setter = WallpaperSetter(use_qdbus=True)
+            qdbus_count = min(count, 50)
+            start = time.perf_counter()
+            for _ in range(qdbus_count):
+                qdbus_setter.set_wallpaper(image_path)
+            results["qdbus_ms"] = (time.perf_counter() - start) * 1000 / qdbus_count
+    finally:
+        mock.stop()
+    
+    return results
+
+
+def parse_arguments():
+    """
+    Parse command line arguments.
+    
+    Returns:
+        argparse.Namespace: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Set the KDE Plasma wallpaper")
+    parser.add_argument("image", help="Image to set as wallpaper")
+    parser.add_argument("--benchmark", type=int, metavar="N",
+                        help="Time N calls against a mock Plasma service instead")
+    return parser.parse_args()
+
+
+def main():
+    """
+    Main function.
+    """
+    args = parse_arguments()
+    
+    if args.benchmark:
+        results = benchmark(args.image, args.benchmark)
+        for name, value in results.items():
+            print(f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}")
+        return 0
+    
+    return 0 if set_wallpaper(args.image) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
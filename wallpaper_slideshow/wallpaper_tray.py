@@ -25,7 +25,6 @@ import signal
 import subprocess
 import threading
 import configparser
-import importlib.util
 from pathlib import Path
 import logging
 from datetime import datetime
@@ -40,14 +39,21 @@ from PyQt5.QtWidgets import (QApplication, QSystemTrayIcon, QMenu, QAction,
 
 # Import the FavoritesTab class
 try:
-    from favorites_tab import FavoritesTab
+    from favorites_tab import FavoritesTab, prefetch_thumbnails, set_item_thumbnail, show_thumbnail_preview
 except ImportError:
     # Try with full path
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-    from favorites_tab import FavoritesTab
-from PyQt5.QtGui import QIcon, QPixmap, QImageReader
+    from favorites_tab import FavoritesTab, prefetch_thumbnails, set_item_thumbnail, show_thumbnail_preview
+
+# Wallpaper changes go through the shared D-Bus backend (same directory)
+from set_specific_wallpaper import request_wallpaper
+# The current wallpaper comes from the shared tracker (same directory)
+import track_current_wallpaper
+# Slideshow commands go through its control socket (same directory)
+import slideshow_control
+from PyQt5.QtGui import QIcon
 from PyQt5.QtCore import Qt, QTimer, QSize, QDir, QModelIndex, pyqtSignal, QObject
 
 # Set up logging
@@ -66,17 +72,17 @@ FAVORITES_FILE = os.path.join(FAVORITES_DIR, "favorites.json")
 CONTROL_SCRIPT = os.path.join(SCRIPT_DIR, "control_slideshow.sh")
 COLOR_CONTROL_PANEL = os.path.join(os.path.dirname(SCRIPT_DIR), "wallpaper_color_manager_new/color_control_panel.py")
 GET_CURRENT_WALLPAPER = os.path.join(os.path.dirname(SCRIPT_DIR), "get_current_wallpaper.py")
-TRACK_CURRENT_WALLPAPER = os.path.join(SCRIPT_DIR, "track_current_wallpaper.py")
-CURRENT_WALLPAPER_FILE = os.path.expanduser("~/.current_wallpaper")
 PID_FILE = os.path.expanduser("~/.config/custom_wallpaper_slideshow.pid")
 ICON_PATH = os.path.join(SCRIPT_DIR, "wallpaper_tray_icon.png")
 DEFAULT_ICON = "preferences-desktop-wallpaper"
 CONFIG_FILE = os.path.join(SCRIPT_DIR, "config.ini")
-SET_WALLPAPER_SCRIPT = os.path.join(SCRIPT_DIR, "set_specific_wallpaper.py")
 CUSTOM_WALLPAPER_SCRIPT = os.path.join(SCRIPT_DIR, "custom_wallpaper.py")
 RESTART_SCRIPT = os.path.join(SCRIPT_DIR, "restart_slideshow.sh")
 ADD_TO_FAVORITES_SCRIPT = os.path.join(SCRIPT_DIR, "kde_shortcuts/add_to_favorites.sh")
 
+# Seconds between attempts to subscribe to the slideshow while it is not running
+SUBSCRIBE_RETRY_INTERVAL = 5
+
 # Load supported image extensions from config
 SUPPORTED_EXTENSIONS = [".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp"]
 if os.path.exists(CONFIG_FILE):
@@ -329,20 +335,17 @@ class NotesTab(QWidget):
             self.wallpaper_label.setText(f"Wallpaper: {os.path.basename(wallpaper_path)}")
             self.notes_edit.setText(self.notes_data[wallpaper_path].get("notes", ""))
             
-            # Load preview if the file exists
+            # Load preview if the file exists (in the background)
             if os.path.exists(wallpaper_path):
-                pixmap = QPixmap(wallpaper_path)
-                if not pixmap.isNull():
-                    pixmap = pixmap.scaled(400, 200, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                    self.preview_label.setPixmap(pixmap)
-                else:
-                    self.preview_label.setText("Preview not available")
+                show_thumbnail_preview(self.preview_label, wallpaper_path, 400, 200)
             else:
+                self.preview_label.preview_path = None
                 self.preview_label.setText("Image file not found")
         else:
             self.current_wallpaper = None
             self.wallpaper_label.setText("No wallpaper selected")
             self.notes_edit.clear()
+            self.preview_label.preview_path = None
             self.preview_label.clear()
     
     def save_current_notes(self):
@@ -383,39 +386,8 @@ class NotesTab(QWidget):
             
         logger.info("Starting refresh_current_wallpaper in WallpaperNotesWindow (main thread)")
         try:
-            # First try to get the current wallpaper from the tracking file
-            wallpaper_path = None
-            
-            if os.path.exists(CURRENT_WALLPAPER_FILE):
-                try:
-                    with open(CURRENT_WALLPAPER_FILE, 'r') as f:
-                        wallpaper_path = f.read().strip()
-                    
-                    if wallpaper_path and os.path.exists(wallpaper_path):
-                        logger.info(f"Got current wallpaper from tracking file: {wallpaper_path}")
-                    else:
-                        logger.warning(f"Invalid wallpaper path in tracking file: {wallpaper_path}")
-                        wallpaper_path = None
-                except Exception as e:
-                    logger.error(f"Error reading current wallpaper file: {e}")
-                    wallpaper_path = None
-            
-            # If tracking file didn't work, try the tracking module
-            if not wallpaper_path:
-                try:
-                    if os.path.exists(TRACK_CURRENT_WALLPAPER):
-                        # Import the module dynamically
-                        spec = importlib.util.spec_from_file_location("track_current_wallpaper", TRACK_CURRENT_WALLPAPER)
-                        tracker = importlib.util.module_from_spec(spec)
-                        spec.loader.exec_module(tracker)
-                        
-                        # Get the current wallpaper
-                        wallpaper_path = tracker.get_current_wallpaper()
-                        if wallpaper_path:
-                            logger.info(f"Got current wallpaper from tracking module: {wallpaper_path}")
-                except Exception as e:
-                    logger.error(f"Error using tracking module: {e}")
-                    wallpaper_path = None
+            # First try the shared tracker: a stat() of the tracking file unless it changed
+            wallpaper_path = track_current_wallpaper.get_current_wallpaper()
             
             # If tracking system didn't work, fall back to the old method
             if not wallpaper_path:
@@ -475,23 +447,13 @@ class NotesTab(QWidget):
                 self.notes_edit.clear()
                 logger.info("Created new entry for wallpaper")
                 
-                # Load preview
-                try:
-                    if os.path.exists(wallpaper_path):
-                        pixmap = QPixmap(wallpaper_path)
-                        if not pixmap.isNull():
-                            pixmap = pixmap.scaled(400, 200, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                            self.preview_label.setPixmap(pixmap)
-                            logger.info("Loaded preview image successfully")
-                        else:
-                            self.preview_label.setText("Preview not available (null pixmap)")
-                            logger.warning("Failed to load preview - null pixmap")
-                    else:
-                        self.preview_label.setText("Image file not found")
-                        logger.warning(f"Image file not found: {wallpaper_path}")
-                except Exception as e:
-                    self.preview_label.setText("Error loading preview")
-                    logger.error(f"Error loading preview: {e}")
+                # Load preview (in the background)
+                if os.path.exists(wallpaper_path):
+                    show_thumbnail_preview(self.preview_label, wallpaper_path, 400, 200)
+                else:
+                    self.preview_label.preview_path = None
+                    self.preview_label.setText("Image file not found")
+                    logger.warning(f"Image file not found: {wallpaper_path}")
             
             if self.parent_window:
                 self.parent_window.statusBar().showMessage(f"Current wallpaper: {os.path.basename(wallpaper_path)}", 3000)
@@ -747,13 +709,9 @@ class NotesTab(QWidget):
     def load_image_preview(self, image_path):
         """Load an image preview into the preview label"""
         if os.path.exists(image_path):
-            pixmap = QPixmap(image_path)
-            if not pixmap.isNull():
-                pixmap = pixmap.scaled(400, 200, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                self.preview_label.setPixmap(pixmap)
-            else:
-                self.preview_label.setText("Preview not available")
+            show_thumbnail_preview(self.preview_label, image_path, 400, 200)
         else:
+            self.preview_label.preview_path = None
             self.preview_label.setText("Image file not found")
     
     def set_as_wallpaper(self, wallpaper_path):
@@ -764,12 +722,9 @@ class NotesTab(QWidget):
             return
         
         try:
-            # Use set_specific_wallpaper.py to set the wallpaper
-            set_wallpaper_script = os.path.join(SCRIPT_DIR, "set_specific_wallpaper.py")
-            subprocess.run(
-                ["python3", set_wallpaper_script, wallpaper_path],
-                check=True
-            )
+            # Set in the background over the shared D-Bus connection; rapid
+            # requests are coalesced (see wallpaper_setter.py)
+            request_wallpaper(wallpaper_path)
             
             if self.parent_window:
                 self.parent_window.statusBar().showMessage(f"Set wallpaper to {os.path.basename(wallpaper_path)}", 3000)
@@ -833,6 +788,9 @@ class HistoryTab(QWidget):
                 with open(self.history_file, 'r') as f:
                     history_data = json.load(f)
                 
+                # Generate missing thumbnails in parallel while the list fills
+                prefetch_thumbnails([entry.get("path", "") for entry in reversed(history_data)])
+                
                 # Add wallpapers to list in reverse order (newest first)
                 for entry in reversed(history_data):
                     wallpaper_path = entry.get("path", "")
@@ -842,11 +800,8 @@ class HistoryTab(QWidget):
                         item = QListWidgetItem(f"{os.path.basename(wallpaper_path)} - {timestamp}")
                         item.setData(Qt.UserRole, wallpaper_path)
                         
-                        # Add thumbnail
-                        pixmap = QPixmap(wallpaper_path)
-                        if not pixmap.isNull():
-                            pixmap = pixmap.scaled(100, 60, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                            item.setIcon(QIcon(pixmap))
+                        # Add thumbnail (loaded in the background)
+                        set_item_thumbnail(item, wallpaper_path, 100, 60)
                         
                         self.history_list.addItem(item)
                 
@@ -926,11 +881,9 @@ class HistoryTab(QWidget):
             return
         
         try:
-            # Use set_specific_wallpaper.py to set the wallpaper
-            subprocess.run(
-                ["python3", SET_WALLPAPER_SCRIPT, wallpaper_path],
-                check=True
-            )
+            # Set in the background over the shared D-Bus connection; rapid
+            # requests are coalesced (see wallpaper_setter.py)
+            request_wallpaper(wallpaper_path)
             
             if self.parent_window:
                 self.parent_window.statusBar().showMessage(f"Set wallpaper to {os.path.basename(wallpaper_path)}", 3000)
@@ -1237,6 +1190,61 @@ class WallpaperMainWindow(QMainWindow):
             if self.tab_widget.currentWidget() == self.notes_tab:
                 self.notes_tab.refresh_current_wallpaper()
 
+class SlideshowSubscriber(QObject):
+    """Follows the slideshow's notifications on a background thread"""
+    
+    wallpaper_changed = pyqtSignal(str)
+    state_changed = pyqtSignal(object)
+    connection_changed = pyqtSignal(bool)
+    
+    def __init__(self):
+        super().__init__()
+        self.connected = False
+        self._subscription = None
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def stop(self):
+        self._stop_event.set()
+        if self._subscription is not None:
+            self._subscription.close()
+    
+    def _set_connected(self, connected):
+        if connected != self.connected:
+            self.connected = connected
+            self.connection_changed.emit(connected)
+    
+    def _run(self):
+        """Subscribe, and subscribe again whenever the slideshow restarts"""
+        while not self._stop_event.is_set():
+            try:
+                self._subscription = slideshow_control.Subscription()
+            except (OSError, ValueError, slideshow_control.ControlError) as e:
+                logger.debug(f"Cannot subscribe to the slideshow: {e}")
+                self._set_connected(False)
+                self._stop_event.wait(SUBSCRIBE_RETRY_INTERVAL)
+                continue
+            
+            logger.info("Subscribed to slideshow notifications")
+            self._set_connected(True)
+            state = self._subscription.state
+            self.state_changed.emit(state["status"])
+            if state["current"]["image"]:
+                self.wallpaper_changed.emit(state["current"]["image"])
+            
+            for method, params in self._subscription:
+                if method == "wallpaper_changed" and params.get("image"):
+                    self.wallpaper_changed.emit(params["image"])
+                elif method == "state_changed":
+                    self.state_changed.emit(params)
+            
+            logger.info("Slideshow closed the notification connection")
+            self._subscription.close()
+            self._subscription = None
+
 class WallpaperTrayApp:
     """System tray application for controlling wallpaper slideshow"""
     
@@ -1280,6 +1288,14 @@ class WallpaperTrayApp:
         self.favorites_refresh_timer.timeout.connect(self.check_favorites_refresh)
         self.favorites_refresh_timer.start(1000)  # Check every second
         
+        # Follow the slideshow's notifications; the timers above only run
+        # while it cannot be subscribed to (e.g. it is not running)
+        self.slideshow_events = SlideshowSubscriber()
+        self.slideshow_events.wallpaper_changed.connect(self.on_wallpaper_changed)
+        self.slideshow_events.state_changed.connect(self.on_slideshow_state_changed)
+        self.slideshow_events.connection_changed.connect(self.on_slideshow_connection_changed)
+        self.slideshow_events.start()
+        
         # Initial check if slideshow is running and start it if not
         QTimer.singleShot(1000, self.check_and_start_slideshow)
         
@@ -1428,14 +1444,33 @@ class WallpaperTrayApp:
         except Exception as e:
             logger.error(f"Error refreshing main window: {e}")
     
+    def run_control_command(self, command):
+        """Send a command to the slideshow and return its answer.
+        
+        The control socket answers once the command has been carried out;
+        if the slideshow is not listening on it, control_slideshow.sh is
+        used instead (signals, not waited for).
+        """
+        try:
+            ok, message = slideshow_control.send_command(command)
+        except OSError as e:
+            logger.debug(f"Control socket unavailable ({e}), using {CONTROL_SCRIPT}")
+            result = subprocess.run([CONTROL_SCRIPT, command], capture_output=True, text=True, check=True)
+            return result.stdout.strip()
+        
+        if not ok:
+            raise RuntimeError(message)
+        return message
+    
     def next_wallpaper(self):
         """Show the next wallpaper"""
         try:
-            subprocess.run([CONTROL_SCRIPT, "next"], check=True)
+            self.run_control_command("next")
             logger.info("Showing next wallpaper")
             
-            # Wait a moment for the wallpaper to change
-            QTimer.singleShot(500, self.check_wallpaper_changed)
+            # Wait a moment for the wallpaper to change (subscribers are notified)
+            if not self.slideshow_events.connected:
+                QTimer.singleShot(500, self.check_wallpaper_changed)
         except Exception as e:
             logger.error(f"Error showing next wallpaper: {e}")
             self.tray_icon.showMessage("Error", f"Failed to show next wallpaper: {str(e)}")
@@ -1443,11 +1478,12 @@ class WallpaperTrayApp:
     def prev_wallpaper(self):
         """Show the previous wallpaper"""
         try:
-            subprocess.run([CONTROL_SCRIPT, "prev"], check=True)
+            self.run_control_command("prev")
             logger.info("Showing previous wallpaper")
             
-            # Wait a moment for the wallpaper to change
-            QTimer.singleShot(500, self.check_wallpaper_changed)
+            # Wait a moment for the wallpaper to change (subscribers are notified)
+            if not self.slideshow_events.connected:
+                QTimer.singleShot(500, self.check_wallpaper_changed)
         except Exception as e:
             logger.error(f"Error showing previous wallpaper: {e}")
             self.tray_icon.showMessage("Error", f"Failed to show previous wallpaper: {str(e)}")
@@ -1455,11 +1491,12 @@ class WallpaperTrayApp:
     def toggle_pause(self):
         """Toggle pause/resume slideshow"""
         try:
-            subprocess.run([CONTROL_SCRIPT, "pause"], check=True)
+            self.run_control_command("pause")
             logger.info("Toggling pause/resume")
             
-            # Update pause action text
-            self.check_slideshow_status()
+            # Update pause action text (subscribers are notified)
+            if not self.slideshow_events.connected:
+                self.check_slideshow_status()
         except Exception as e:
             logger.error(f"Error toggling pause/resume: {e}")
             self.tray_icon.showMessage("Error", f"Failed to toggle pause/resume: {str(e)}")
@@ -1569,33 +1606,11 @@ class WallpaperTrayApp:
     
     def get_current_wallpaper_path(self):
         """Get the path to the current wallpaper"""
-        # First try to get from tracking file
-        if os.path.exists(CURRENT_WALLPAPER_FILE):
-            try:
-                with open(CURRENT_WALLPAPER_FILE, 'r') as f:
-                    wallpaper_path = f.read().strip()
-                
-                if wallpaper_path and os.path.exists(wallpaper_path):
-                    logger.debug(f"Got current wallpaper from tracking file: {wallpaper_path}")
-                    return wallpaper_path
-            except Exception as e:
-                logger.error(f"Error reading current wallpaper file: {e}")
-        
-        # If tracking file didn't work, try the tracking module
-        try:
-            if os.path.exists(TRACK_CURRENT_WALLPAPER):
-                # Import the module dynamically
-                spec = importlib.util.spec_from_file_location("track_current_wallpaper", TRACK_CURRENT_WALLPAPER)
-                tracker = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(tracker)
-                
-                # Get the current wallpaper
-                wallpaper_path = tracker.get_current_wallpaper()
-                if wallpaper_path:
-                    logger.debug(f"Got current wallpaper from tracking module: {wallpaper_path}")
-                    return wallpaper_path
-        except Exception as e:
-            logger.error(f"Error using tracking module: {e}")
+        # First try the shared tracker: a stat() of the tracking file unless it changed
+        wallpaper_path = track_current_wallpaper.get_current_wallpaper()
+        if wallpaper_path:
+            logger.debug(f"Got current wallpaper from tracking file: {wallpaper_path}")
+            return wallpaper_path
         
         # If tracking system didn't work, fall back to the old method
         try:
@@ -1634,7 +1649,7 @@ class WallpaperTrayApp:
             if os.path.exists(PID_FILE):
                 try:
                     # Try to stop the slideshow
-                    subprocess.run([CONTROL_SCRIPT, "stop"], check=True)
+                    self.run_control_command("stop")
                     logger.info("Stopping slideshow")
                     
                     # Wait a moment for the slideshow to stop
@@ -1671,8 +1686,39 @@ class WallpaperTrayApp:
         """Quit the application"""
         # Don't stop the slideshow when quitting the app
         logger.info("Quitting application")
+        self.slideshow_events.stop()
         self.app.quit()
     
+    def on_slideshow_connection_changed(self, connected):
+        """Poll on timers only while the slideshow's notifications are unavailable"""
+        if connected:
+            self.wallpaper_check_timer.stop()
+            self.status_timer.stop()
+        else:
+            logger.info("Slideshow notifications unavailable, checking on timers")
+            self.wallpaper_check_timer.start(10000)
+            self.status_timer.start(30000)
+            self.check_slideshow_status()
+    
+    def on_slideshow_state_changed(self, status):
+        """Update the pause action and tooltip from a slideshow status"""
+        if status.get("paused"):
+            self.pause_action.setText("Resume Slideshow")
+            self.tray_icon.setToolTip("Wallpaper Slideshow (Paused)")
+        else:
+            self.pause_action.setText("Pause Slideshow")
+            self.tray_icon.setToolTip("Wallpaper Slideshow (Running)")
+        logger.info(f"Slideshow status: {status.get('message')}")
+    
+    def on_wallpaper_changed(self, wallpaper_path):
+        """Record a wallpaper change notified by the slideshow"""
+        self.detected_wallpaper_path = wallpaper_path
+        if wallpaper_path != self.current_wallpaper:
+            logger.info(f"Wallpaper changed to: {wallpaper_path}")
+            self.current_wallpaper = wallpaper_path
+            if self.main_window.isVisible():
+                self._update_main_window_wallpaper(wallpaper_path)
+    
     def check_slideshow_status(self):
         """Check if the slideshow is running and if it's paused"""
         # Use a thread to avoid blocking the UI
@@ -1697,10 +1743,10 @@ class WallpaperTrayApp:
                 os.kill(int(pid), 0)  # Signal 0 doesn't kill the process, just checks if it exists
                 
                 # Process is running, check if it's paused
-                result = subprocess.run([CONTROL_SCRIPT, "status"], capture_output=True, text=True, check=True)
+                status = self.run_control_command("status")
                 
                 # Update UI in the main thread
-                if "paused" in result.stdout.lower():
+                if "paused" in status.lower():
                     self.app.processEvents()  # Process any pending events
                     self.pause_action.setText("Resume Slideshow")
                     self.tray_icon.setToolTip("Wallpaper Slideshow (Paused)")
@@ -1709,7 +1755,7 @@ class WallpaperTrayApp:
                     self.pause_action.setText("Pause Slideshow")
                     self.tray_icon.setToolTip("Wallpaper Slideshow (Running)")
                 
-                logger.info(f"Slideshow status: {result.stdout.strip()}")
+                logger.info(f"Slideshow status: {status}")
             except ProcessLookupError:
                 logger.warning(f"Process with PID {pid} is not running")
                 self.app.processEvents()  # Process any pending events
@@ -1733,39 +1779,8 @@ class WallpaperTrayApp:
         try:
             logger.debug("Starting wallpaper change check in background thread")
             
-            # First try to get the current wallpaper from the tracking file
-            wallpaper_path = None
-            
-            if os.path.exists(CURRENT_WALLPAPER_FILE):
-                try:
-                    with open(CURRENT_WALLPAPER_FILE, 'r') as f:
-                        wallpaper_path = f.read().strip()
-                    
-                    if wallpaper_path and os.path.exists(wallpaper_path):
-                        logger.debug(f"Got current wallpaper from tracking file: {wallpaper_path}")
-                    else:
-                        logger.debug(f"Invalid wallpaper path in tracking file: {wallpaper_path}")
-                        wallpaper_path = None
-                except Exception as e:
-                    logger.error(f"Error reading current wallpaper file: {e}")
-                    wallpaper_path = None
-            
-            # If tracking file didn't work, try the tracking module
-            if not wallpaper_path:
-                try:
-                    if os.path.exists(TRACK_CURRENT_WALLPAPER):
-                        # Import the module dynamically
-                        spec = importlib.util.spec_from_file_location("track_current_wallpaper", TRACK_CURRENT_WALLPAPER)
-                        tracker = importlib.util.module_from_spec(spec)
-                        spec.loader.exec_module(tracker)
-                        
-                        # Get the current wallpaper
-                        wallpaper_path = tracker.get_current_wallpaper()
-                        if wallpaper_path:
-                            logger.debug(f"Got current wallpaper from tracking module: {wallpaper_path}")
-                except Exception as e:
-                    logger.error(f"Error using tracking module: {e}")
-                    wallpaper_path = None
+            # First try the shared tracker: a stat() of the tracking file unless it changed
+            wallpaper_path = track_current_wallpaper.get_current_wallpaper()
             
             # If tracking system didn't work, fall back to the old method
             if not wallpaper_path:
@@ -2027,19 +2042,8 @@ class WallpaperTrayApp:
                 self.main_window.notes_tab.notes_edit.clear()
                 logger.info("Created new entry for wallpaper")
                 
-                # Load preview
-                try:
-                    pixmap = QPixmap(wallpaper_path)
-                    if not pixmap.isNull():
-                        pixmap = pixmap.scaled(400, 200, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                        self.main_window.notes_tab.preview_label.setPixmap(pixmap)
-                        logger.info("Loaded preview image successfully")
-                    else:
-                        self.main_window.notes_tab.preview_label.setText("Preview not available (null pixmap)")
-                        logger.warning("Failed to load preview - null pixmap")
-                except Exception as e:
-                    self.main_window.notes_tab.preview_label.setText("Error loading preview")
-                    logger.error(f"Error loading preview: {e}")
+                # Load preview (in the background)
+                show_thumbnail_preview(self.main_window.notes_tab.preview_label, wallpaper_path, 400, 200)
             
             # Focus on the notes edit field
             self.main_window.notes_tab.notes_edit.setFocus()